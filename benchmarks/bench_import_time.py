@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Import-time benchmark based on `python -X importtime`.
+
+Measures the cumulative import time of each project module in a fresh
+interpreter, lists the heaviest imports and checks that no heavy
+dependency (scikit-learn, imbalanced-learn, scipy, pandas, MNE,
+TensorFlow, matplotlib) is loaded at import. The inference-only path
+(src/inference.py) must stay within --budget-ms.
+
+Usage:
+    python benchmarks/bench_import_time.py --budget-ms 250
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+ROOT = os.path.join(SRC, '..')
+
+TARGETS = ['inference', 'config', 'data_processing', 'models', 'validation', 'main']
+HEAVY_MODULES = ['sklearn', 'imblearn', 'scipy', 'pandas', 'mne', 'tensorflow', 'matplotlib']
+
+LINE = re.compile(r'import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)')
+
+
+def profile_import(module: str) -> dict:
+    """Run one import in a fresh interpreter and parse -X importtime output."""
+    code = (f"import sys; sys.path[:0] = [{SRC!r}, {ROOT!r}]; import {module}; "
+            f"print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))")
+    out = subprocess.run([sys.executable, '-X', 'importtime', '-c', code],
+                         capture_output=True, text=True, check=True)
+
+    entries = []
+    for line in out.stderr.splitlines():
+        match = LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            entries.append((name, int(cumulative_us), len(indent)))
+
+    # Top-level entries (smallest indent) sum to the total import time
+    min_indent = min(indent for _, _, indent in entries)
+    total_us = sum(cum for _, cum, indent in entries if indent == min_indent)
+    top_level = sorted(((name, cum) for name, cum, indent in entries if indent == min_indent),
+                       key=lambda e: -e[1])
+
+    heavy = [m for m in out.stdout.strip().split(',') if m]
+    return {'module': module, 'total_ms': total_us / 1e3, 'top': top_level[:5], 'heavy': heavy}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--budget-ms', type=float, default=250.0,
+                        help='Import budget for the inference-only path')
+    parser.add_argument('--repeats', type=int, default=3, help='Best-of-N runs per module')
+    args = parser.parse_args()
+
+    failures = []
+    for module in TARGETS:
+        runs = [profile_import(module) for _ in range(args.repeats)]
+        best = min(runs, key=lambda r: r['total_ms'])
+        top = ', '.join(f"{name} {cum / 1e3:.0f}ms" for name, cum in best['top'])
+        print(f"{module:<16} {best['total_ms']:7.1f}ms  [{top}]")
+
+        if best['heavy']:
+            failures.append(f"{module} imports heavy dependencies at import: {best['heavy']}")
+        if module == 'inference' and best['total_ms'] > args.budget_ms:
+            failures.append(f"inference import {best['total_ms']:.1f}ms exceeds budget {args.budget_ms}ms")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
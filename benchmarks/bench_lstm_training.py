@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Training-throughput benchmark for the LSTM SeizurePredictor on CPU.
+
+Compares the notebook's default training setup (batch 32, float32) with
+the CPU training mode (large batch, LR schedule, tuned thread pools,
+bfloat16 where supported). --jit additionally compiles the CPU-mode train
+step with XLA. Each mode runs in its own process because TensorFlow thread
+pools and precision policy are global.
+
+Usage:
+    CUDA_VISIBLE_DEVICES="" python benchmarks/bench_lstm_training.py --n-sequences 4096
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import numpy as np
+
+
+def run_mode(mode: str, n_sequences: int, n_epochs: int, seed: int, jit: bool) -> dict:
+    """Train in the current process and return sequences/sec."""
+    os.environ.setdefault('CUDA_VISIBLE_DEVICES', '')
+    from config import Config
+    from prediction import (SeizurePredictor, TrainingPipeline, configure_cpu_training,
+                            epochs_to_sequences, epoch_features, _import_tensorflow)
+
+    settings = configure_cpu_training(mixed_precision='auto') if mode == 'cpu' else {}
+    tf = _import_tensorflow()
+    tf.keras.utils.set_random_seed(seed)
+
+    n_channels = len(Config.SELECTED_CHANNELS)
+    n_times = Config.TARGET_SAMPLING_RATE * Config.EPOCH_LENGTH
+    rng = np.random.RandomState(seed)
+    X = rng.randn(n_sequences, n_channels * n_times).astype(np.float32)
+    y = (rng.rand(n_sequences) < 0.1).astype(np.float32)
+
+    X_seq = epochs_to_sequences(X, n_channels, n_steps=40)
+    X_feat = epoch_features(X, n_channels)
+    n_val = n_sequences // 10
+
+    predictor = SeizurePredictor(X_seq.shape[1:], X_feat.shape[1:])
+    pipeline = TrainingPipeline(predictor, cpu_optimized=(mode == 'cpu'),
+                                jit_compile=jit and mode == 'cpu')
+
+    # One warmup epoch absorbs graph tracing and XLA compilation
+    epoch_times = []
+
+    class _Timer(tf.keras.callbacks.Callback):
+        def on_epoch_begin(self, epoch, logs=None):
+            self._start = time.perf_counter()
+
+        def on_epoch_end(self, epoch, logs=None):
+            epoch_times.append(time.perf_counter() - self._start)
+
+    predictor.create_callbacks = lambda **kwargs: [_Timer()]
+    pipeline.train(X_seq[n_val:], X_feat[n_val:], y[n_val:],
+                   X_seq[:n_val], X_feat[:n_val], y[:n_val],
+                   epochs=n_epochs + 1, verbose=0)
+
+    steady = epoch_times[1:]
+    return {
+        'mode': mode,
+        'sequences_per_sec': (n_sequences - n_val) * len(steady) / sum(steady),
+        'first_epoch_sec': epoch_times[0],
+        'n_sequences': n_sequences,
+        'n_epochs_timed': len(steady),
+        'jit_compile': pipeline.jit_compile,
+        'tensorflow': tf.__version__,
+        **settings
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--n-sequences', type=int, default=4096)
+    parser.add_argument('--epochs', type=int, default=3, help='Timed epochs (after one warmup epoch)')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--jit', action='store_true', help='XLA-compile the CPU-mode train step')
+    parser.add_argument('--mode', choices=['baseline', 'cpu'], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        print(json.dumps(run_mode(args.mode, args.n_sequences, args.epochs, args.seed, args.jit)))
+        return
+
+    results = []
+    for mode in ['baseline', 'cpu']:
+        out = subprocess.run(
+            [sys.executable, __file__, '--mode', mode, '--n-sequences', str(args.n_sequences),
+             '--epochs', str(args.epochs), '--seed', str(args.seed)] + (['--jit'] if args.jit else []),
+            capture_output=True, text=True, check=True,
+            env={**os.environ, 'CUDA_VISIBLE_DEVICES': '', 'TF_CPP_MIN_LOG_LEVEL': '2'}
+        )
+        results.append(json.loads(out.stdout.strip().splitlines()[-1]))
+
+    print(f"Platform: {platform.platform()}, {os.cpu_count()} CPUs, Python {platform.python_version()}")
+    for r in results:
+        print(f"  {r['mode']:>8}: {r['sequences_per_sec']:8.1f} sequences/sec "
+              f"(first epoch {r['first_epoch_sec']:.1f}s)")
+    print(f"  Speedup: {results[1]['sequences_per_sec'] / results[0]['sequences_per_sec']:.2f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,459 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite for the ingestion, validation and model hot paths.
+
+Each benchmark is timed (best of --repeats) and profiled once with
+tracemalloc for peak Python/numpy allocations. Results are appended to a
+JSON-lines history file; --compare checks the new run against the
+previous one and exits non-zero when any benchmark got slower (or used
+more memory) by more than --threshold.
+
+Usage:
+    python benchmarks/run_benchmarks.py
+    python benchmarks/run_benchmarks.py --only smote model_ --n-epochs 500
+    python benchmarks/run_benchmarks.py --compare --threshold 0.15
+"""
+import argparse
+import atexit
+import json
+import os
+import pickle
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import warnings
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.insert(0, os.path.dirname(__file__))
+
+import numpy as np
+
+from config import Config
+from synthetic import make_patient_data, make_recording, write_synthetic_edf
+
+warnings.filterwarnings('ignore')
+
+# name -> factory(args) returning (zero-argument callable to time, extra info)
+BENCHMARKS: Dict[str, Callable] = {}
+
+
+def benchmark(name: str):
+    """Register a benchmark factory."""
+    def register(factory):
+        BENCHMARKS[name] = factory
+        return factory
+    return register
+
+
+def _patient_data(args):
+    return make_patient_data(args.n_patients, args.n_epochs, args.n_features, seed=args.seed)
+
+
+def _splits(patient_ids: List[str]) -> Dict[str, List[str]]:
+    from data_processing import PatientIndependentSplitter
+    return PatientIndependentSplitter.split_patients(patient_ids, test_ratio=0.3, val_ratio=0.2,
+                                                     random_state=Config.RANDOM_STATE)
+
+
+@benchmark('process_single_file')
+def bench_process_single_file(args):
+    """_process_single_file on a synthetic EDF; time is per recording-hour."""
+    from data_processing import CHBMITDataProcessor
+
+    tmp = Path(tempfile.mkdtemp())
+    atexit.register(shutil.rmtree, tmp, True)
+    edf = write_synthetic_edf(tmp / 'bench_01.edf', hours=args.hours)
+    seizures = [{'file': edf.name, 'start_time': 600, 'end_time': 660}]
+    processor = CHBMITDataProcessor(str(tmp))
+    return (lambda: processor._process_single_file(edf, seizures)), {'per': args.hours, 'unit': 'recording-hour'}
+
+
+@benchmark('create_labels_for_file')
+def bench_create_labels(args):
+    """_create_labels_for_file over 24 h of epochs with one seizure per hour."""
+    from data_processing import CHBMITDataProcessor
+
+    step = Config.EPOCH_LENGTH - Config.EPOCH_OVERLAP
+    starts = np.arange(0, 24 * 3600 - Config.EPOCH_LENGTH, step)
+    epoch_times = [(float(s), float(s) + Config.EPOCH_LENGTH) for s in starts]
+    seizures = [{'file': 'bench.edf', 'start_time': h * 3600 + 600, 'end_time': h * 3600 + 660}
+                for h in range(24)]
+    processor = CHBMITDataProcessor('.')
+    return (lambda: processor._create_labels_for_file('bench.edf', epoch_times, seizures)), {}
+
+
+@benchmark('combine_patient_data')
+def bench_combine(args):
+    from validation import PatientIndependentValidator
+
+    patient_data = _patient_data(args)
+    validator = PatientIndependentValidator()
+    return (lambda: validator._combine_patient_data(patient_data, list(patient_data))), {}
+
+
+@benchmark('apply_smote_safely')
+def bench_smote(args):
+    from validation import PatientIndependentValidator
+
+    patient_data = _patient_data(args)
+    validator = PatientIndependentValidator()
+    X, y = validator._combine_patient_data(patient_data, list(patient_data))
+    return (lambda: validator._apply_smote_safely(X, y)), {}
+
+
+@benchmark('interictal_subsample')
+def bench_interictal_subsample(args):
+    """InterictalSubsampler.fit_resample, the alternative to apply_smote_safely."""
+    from subsampling import InterictalSubsampler
+    from validation import PatientIndependentValidator
+
+    patient_data = _patient_data(args)
+    X, y = PatientIndependentValidator()._combine_patient_data(patient_data, list(patient_data))
+    groups = np.repeat(np.arange(len(patient_data)), [len(labels) for _, labels in patient_data.values()])
+    subsampler = InterictalSubsampler()
+    return (lambda: subsampler.fit_resample(X, y, groups)), {}
+
+
+def _model_benchmark(model_name: str, phase: str):
+    def factory(args):
+        from models import ModelFactory
+        from validation import PatientIndependentValidator
+
+        patient_data = _patient_data(args)
+        X, y = PatientIndependentValidator()._combine_patient_data(patient_data, list(patient_data))
+        X = (X - X.mean(axis=0)) / X.std(axis=0)
+        if phase == 'fit':
+            return (lambda: ModelFactory.create_model(model_name).fit(X, y)), {'input_mb': X.nbytes / 2 ** 20}
+        if phase == 'fit_binned':
+            # uint8 bins as handed over by the validator's BinnedPatientCache
+            from binning import apply_bins, fit_bin_edges
+            model = ModelFactory.create_model(model_name)
+            edges = fit_bin_edges(X, model.max_bins)
+            bins = apply_bins(X, edges)
+            return (lambda: ModelFactory.create_model(model_name).fit(bins, y, bin_edges=edges)), \
+                {'input_mb': bins.nbytes / 2 ** 20}
+        model = ModelFactory.create_model(model_name).fit(X, y)
+        # Pickled estimator size, as exported by SeizureDetectionModel.export
+        model_mb = len(pickle.dumps(model.model, protocol=pickle.HIGHEST_PROTOCOL)) / 2 ** 20
+        return (lambda: model.predict_proba(X)), {'model_mb': model_mb}
+    return factory
+
+
+for _name in ['knn', 'logistic', 'random_forest', 'svm', 'gradient_boosting']:
+    for _phase in ['fit', 'predict']:
+        benchmark(f'model_{_name}_{_phase}')(_model_benchmark(_name, _phase))
+benchmark('model_gradient_boosting_fit_binned')(_model_benchmark('gradient_boosting', 'fit_binned'))
+
+
+@benchmark('compare_models')
+def bench_compare_models(args):
+    """End-to-end compare_models on synthetic patients."""
+    from models import compare_models
+    from validation import PatientIndependentValidator
+
+    patient_data = _patient_data(args)
+    splits = _splits(list(patient_data))
+    return (lambda: compare_models(patient_data, splits, PatientIndependentValidator())), {}
+
+
+def _tangent_benchmark(phase: str):
+    """TangentSpaceFeatures over all synthetic epochs; time is per epoch."""
+    def factory(args):
+        from features import TangentSpaceFeatures
+
+        patient_data = _patient_data(args)
+        X = np.concatenate([X for X, _ in patient_data.values()])
+        stage = TangentSpaceFeatures(n_channels=len(Config.SELECTED_CHANNELS))
+        if phase == 'fit':
+            return (lambda: stage.fit(X)), {'per': len(X), 'unit': 'epoch'}
+        stage.fit(X)
+        return (lambda: stage.transform(X)), {'per': len(X), 'unit': 'epoch'}
+    return factory
+
+
+for _phase in ['fit', 'transform']:
+    benchmark(f'tangent_space_{_phase}')(_tangent_benchmark(_phase))
+
+
+def _spatial_filter_benchmark(method: str, phase: str):
+    """SpatialFilter over all synthetic epochs; time is per epoch."""
+    def factory(args):
+        from spatial_filters import SpatialFilter
+
+        patient_data = _patient_data(args)
+        X = np.concatenate([X for X, _ in patient_data.values()])
+        y = np.concatenate([y for _, y in patient_data.values()])
+        stage = SpatialFilter(method, n_channels=len(Config.SELECTED_CHANNELS))
+        if phase == 'fit':
+            return (lambda: stage.fit(X, y)), {'per': len(X), 'unit': 'epoch'}
+        stage.fit(X, y)
+        return (lambda: stage.transform(X)), {'per': len(X), 'unit': 'epoch'}
+    return factory
+
+
+for _method in ['spoc', 'ica']:
+    for _phase in ['fit', 'transform']:
+        benchmark(f'spatial_filter_{_method}_{_phase}')(_spatial_filter_benchmark(_method, _phase))
+
+
+def _recording_epochs(args):
+    """Overlapping epochs of one synthetic recording and their start times in seconds."""
+    data, _, _ = make_recording(args.hours, Config.SELECTED_CHANNELS, Config.TARGET_SAMPLING_RATE,
+                                seed=args.seed)
+    sfreq = Config.TARGET_SAMPLING_RATE
+    epoch, step = Config.EPOCH_LENGTH * sfreq, (Config.EPOCH_LENGTH - Config.EPOCH_OVERLAP) * sfreq
+    starts = np.arange(0, data.shape[1] - epoch + 1, step)
+    return np.stack([data[:, s:s + epoch] for s in starts]), starts / sfreq
+
+
+def _spectral_benchmark(shared: bool):
+    """SpectralFeatures of one recording's overlapping epochs; time is per epoch."""
+    def factory(args):
+        from spectral import SpectralFeatures
+
+        epochs, starts = _recording_epochs(args)
+        stage = SpectralFeatures()
+        if shared:
+            return (lambda: stage.from_recording(epochs, starts)), {'per': len(epochs), 'unit': 'epoch'}
+        return (lambda: stage.transform(epochs)), {'per': len(epochs), 'unit': 'epoch'}
+    return factory
+
+
+benchmark('spectral_features_shared')(_spectral_benchmark(True))
+benchmark('spectral_features_per_epoch')(_spectral_benchmark(False))
+
+
+def _tmp_dir() -> Path:
+    tmp = Path(tempfile.mkdtemp())
+    atexit.register(shutil.rmtree, tmp, True)
+    return tmp
+
+
+def _epoch_store_benchmark(storage: str):
+    """Reload one recording's stored float64 epochs; time is per epoch, disk_mb the footprint."""
+    def factory(args):
+        epochs, starts = _recording_epochs(args)
+        tmp = _tmp_dir()
+        if storage == 'npy':
+            path = tmp / 'epochs.npy'
+            np.save(path, epochs)
+            load = lambda: np.load(path)
+        elif storage == 'pickle':
+            path = tmp / 'epochs.pkl'
+            with open(path, 'wb') as f:
+                pickle.dump(epochs, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+            def load():
+                with open(path, 'rb') as f:
+                    return pickle.load(f)
+        else:
+            from epoch_archive import EpochArchive, EpochArchiveWriter
+            path = tmp / 'epochs.epochs'
+            with EpochArchiveWriter(path, dtype=storage) as writer:
+                writer.append(epochs, times=np.column_stack([starts, starts + Config.EPOCH_LENGTH]))
+
+            def load():
+                with EpochArchive(path) as archive:
+                    return archive.read()
+        disk = sum(f.stat().st_size for f in path.iterdir()) if path.is_dir() else path.stat().st_size
+        return load, {'per': len(epochs), 'unit': 'epoch', 'disk_mb': disk / 2 ** 20}
+    return factory
+
+
+for _storage in ['npy', 'pickle', 'float32', 'int16']:
+    benchmark(f'epoch_store_load_{_storage}')(_epoch_store_benchmark(_storage))
+
+
+@benchmark('epoch_archive_random_access')
+def bench_epoch_archive_random_access(args):
+    """Read 8-epoch ranges at random positions of a float32 archive; time is per read."""
+    from epoch_archive import EpochArchive, EpochArchiveWriter
+
+    epochs, _ = _recording_epochs(args)
+    path = _tmp_dir() / 'epochs.epochs'
+    with EpochArchiveWriter(path) as writer:
+        writer.append(epochs)
+    archive = EpochArchive(path)
+    atexit.register(archive.close)
+    rng = np.random.RandomState(args.seed)
+    starts = rng.randint(0, len(epochs) - 8, 200)
+
+    def run():
+        for start in starts:
+            archive.read(start, start + 8)
+    return run, {'per': len(starts), 'unit': 'read'}
+
+
+@benchmark('bin_cache_prepare')
+def bench_bin_cache_prepare(args):
+    """BinnedPatientCache.prepare on a new split (sketches and moments cached)."""
+    from binning import BinnedPatientCache
+
+    patient_data = _patient_data(args)
+    splits = _splits(list(patient_data))
+    cache = BinnedPatientCache(max_versions=0)
+    cache.prepare(patient_data, splits)
+    return (lambda: cache.prepare(patient_data, splits)), {}
+
+
+@benchmark('patient_bootstrap')
+def bench_patient_bootstrap(args):
+    """Config.N_BOOTSTRAP patient-level replicates of all metrics; time is per epoch."""
+    from validation import PatientBootstrap
+
+    patient_data = _patient_data(args)
+    y = np.concatenate([y for _, y in patient_data.values()]).astype(int)
+    rng = np.random.RandomState(args.seed)
+    proba = np.clip(rng.rand(len(y)) * 0.7 + 0.3 * y, 0, 1)
+    sizes = [len(y) for _, y in patient_data.values()]
+    bootstrap = PatientBootstrap(random_state=args.seed)
+    return (lambda: bootstrap.confidence_intervals(y, proba >= 0.5, proba, sizes)), \
+        {'per': len(y), 'unit': 'epoch'}
+
+
+@benchmark('profile_stage_disabled')
+def bench_profile_stage_disabled(args):
+    """Cost of an instrumented stage with no active profiler; time is per stage."""
+    from profiling import profile_stage
+
+    X = np.zeros(16)
+    n = 100000
+
+    def run():
+        for _ in range(n):
+            with profile_stage('stage', X):
+                pass
+    return run, {'per': n, 'unit': 'stage'}
+
+
+def run_benchmark(name: str, args) -> Dict[str, Any]:
+    """Time a benchmark and measure its peak traced allocation."""
+    fn, info = BENCHMARKS[name](args)
+    per = info.get('per', 1)
+
+    times = []
+    for _ in range(args.repeats):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+
+    result = {'time_s': min(times) / per, 'median_s': float(np.median(times)) / per}
+    if info.get('unit'):
+        result['unit'] = info['unit']
+        result['throughput_per_s'] = per / min(times)
+    for key in ['model_mb', 'disk_mb', 'input_mb']:
+        if key in info:
+            result[key] = info[key]
+
+    if not args.no_memory:
+        tracemalloc.start()
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        result['peak_mb'] = peak / 2 ** 20
+    return result
+
+
+def _git_commit() -> str:
+    try:
+        out = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                             text=True, cwd=os.path.dirname(__file__))
+        return out.stdout.strip() or 'unknown'
+    except OSError:
+        return 'unknown'
+
+
+def load_history(path: Path) -> List[Dict]:
+    if not path.exists():
+        return []
+    with open(path, 'r') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def find_regressions(previous: Dict, current: Dict, threshold: float) -> List[str]:
+    """Benchmarks slower or more memory-hungry than previous by more than threshold."""
+    regressions = []
+    if previous.get('params') != current.get('params'):
+        return [f"parameters differ from previous run ({previous.get('commit')}), not comparable"]
+    for name, now in current['results'].items():
+        before = previous['results'].get(name)
+        if not before or 'error' in now or 'error' in before:
+            continue
+        for metric in ['time_s', 'peak_mb']:
+            if metric in now and metric in before and before[metric] > 0:
+                change = now[metric] / before[metric] - 1
+                if change > threshold:
+                    regressions.append(f"{name}.{metric}: {before[metric]:.4g} -> {now[metric]:.4g} "
+                                       f"(+{change:.0%})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--only', nargs='+', help='Run benchmarks whose name starts with any prefix')
+    parser.add_argument('--n-patients', type=int, default=6)
+    parser.add_argument('--n-epochs', type=int, default=200, help='Epochs per synthetic patient')
+    parser.add_argument('--n-features', type=int, default=1280)
+    parser.add_argument('--hours', type=float, default=1.0, help='Synthetic EDF duration')
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--no-memory', action='store_true', help='Skip tracemalloc profiling')
+    parser.add_argument('--history', type=Path, default=Config.OUTPUT_DIR / 'benchmark_history.jsonl')
+    parser.add_argument('--compare', action='store_true', help='Flag regressions against the previous run')
+    parser.add_argument('--threshold', type=float, default=0.10, help='Allowed relative slowdown')
+    args = parser.parse_args()
+
+    names = [n for n in BENCHMARKS if not args.only or any(n.startswith(p) for p in args.only)]
+    params = {k: getattr(args, k) for k in ['n_patients', 'n_epochs', 'n_features', 'hours', 'seed']}
+
+    results = {}
+    for name in names:
+        try:
+            results[name] = run_benchmark(name, args)
+            r = results[name]
+            mem = f"{r['peak_mb']:9.1f} MB" if 'peak_mb' in r else ''
+            unit = f" per {r['unit']} ({r['throughput_per_s']:,.0f} {r['unit']}s/s)" if 'unit' in r else ''
+            size = f" (model {r['model_mb']:.2f} MB)" if 'model_mb' in r else ''
+            size += f" (disk {r['disk_mb']:.2f} MB)" if 'disk_mb' in r else ''
+            print(f"{name:<32} {r['time_s'] * 1e3:10.2f} ms{unit} {mem}{size}")
+        except ImportError as e:
+            results[name] = {'error': f"skipped: {e}"}
+            print(f"{name:<32} skipped ({e})")
+
+    record = {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'commit': _git_commit(),
+        'platform': {'machine': platform.machine(), 'python': platform.python_version(),
+                     'cpus': os.cpu_count()},
+        'params': params,
+        'results': results
+    }
+
+    history = load_history(args.history)
+    args.history.parent.mkdir(parents=True, exist_ok=True)
+    with open(args.history, 'a') as f:
+        f.write(json.dumps(record) + '\n')
+    print(f"\nAppended results to {args.history}")
+
+    if args.compare:
+        if not history:
+            print("No previous run to compare against")
+            return
+        regressions = find_regressions(history[-1], record, args.threshold)
+        if regressions:
+            print(f"REGRESSIONS vs {history[-1]['commit']} (threshold {args.threshold:.0%}):")
+            for regression in regressions:
+                print(f"  {regression}")
+            sys.exit(1)
+        print(f"No regressions vs {history[-1]['commit']}")
+
+
+if __name__ == '__main__':
+    main()
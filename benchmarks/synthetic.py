@@ -0,0 +1,65 @@
+"""
+Synthetic data generators shared by the benchmarks.
+"""
+import os
+import sys
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import numpy as np
+
+from config import Config
+
+# Full CHB-MIT bipolar montage (23 channels, as in most recordings)
+CHBMIT_CHANNELS = [
+    'FP1-F7', 'F7-T7', 'T7-P7', 'P7-O1', 'FP1-F3', 'F3-C3', 'C3-P3', 'P3-O1',
+    'FP2-F4', 'F4-C4', 'C4-P4', 'P4-O2', 'FP2-F8', 'F8-T8', 'T8-P8-0', 'P8-O2',
+    'FZ-CZ', 'CZ-PZ', 'P7-T7', 'T7-FT9', 'FT9-FT10', 'FT10-T8', 'T8-P8-1'
+]
+
+
+def make_patient_data(n_patients: int = 6, n_epochs: int = 200, n_features: int = 1280,
+                      seizure_ratio: float = 0.08, seed: int = 42) -> Dict[str, Tuple[np.ndarray, np.ndarray]]:
+    """
+    Flattened-epoch patient data in the format used by the validator.
+
+    Seizure epochs get extra rhythmic power so models have something to learn.
+    """
+    rng = np.random.RandomState(seed)
+    t = np.arange(n_features)
+    patient_data = {}
+    for i in range(n_patients):
+        X = rng.randn(n_epochs, n_features) + 0.15 * np.sin(2 * np.pi * t / 100)
+        y = np.zeros(n_epochs, dtype=int)
+        seizure_idx = rng.choice(n_epochs, max(2, int(n_epochs * seizure_ratio)), replace=False)
+        y[seizure_idx] = 1
+        X[seizure_idx] += 0.5 * np.sin(2 * np.pi * t / 30) + 0.5 * rng.randn(len(seizure_idx), n_features)
+        patient_data[f'bench_{i:02d}'] = (X, y)
+    return patient_data
+
+
+def make_recording(hours: float = 1.0, channels: List[str] = None, sfreq: int = None,
+                   seed: int = 42) -> Tuple[np.ndarray, List[str], int]:
+    """Continuous EEG-like recording in volts, shape (n_channels, n_samples)."""
+    channels = channels or CHBMIT_CHANNELS
+    sfreq = sfreq or Config.SAMPLING_RATE
+    rng = np.random.RandomState(seed)
+    n_samples = int(hours * 3600 * sfreq)
+    t = np.arange(n_samples) / sfreq
+    # ~20 uV background noise plus a 10 Hz alpha rhythm
+    data = 20 * rng.randn(len(channels), n_samples) + 10 * np.sin(2 * np.pi * 10 * t)
+    return data * 1e-6, channels, sfreq
+
+
+def write_synthetic_edf(path: Path, hours: float = 1.0, channels: List[str] = None,
+                        seed: int = 42) -> Path:
+    """Write a synthetic CHB-MIT-like EDF file (requires mne and edfio)."""
+    import mne
+
+    data, channels, sfreq = make_recording(hours, channels, seed=seed)
+    info = mne.create_info(channels, sfreq, 'eeg')
+    raw = mne.io.RawArray(data, info, verbose=False)
+    mne.export.export_raw(str(path), raw, fmt='edf', overwrite=True, verbose=False)
+    return Path(path)
@@ -1,18 +1,38 @@
 """
-Main script demonstrating proper seizure detection pipeline.
+Command-line seizure detection pipeline.
 
-This script shows how to use the fixed codebase correctly:
-1. Patient-independent data loading
-2. Proper validation without data leakage
-3. Realistic performance evaluation
-4. Comprehensive model comparison
+Runs the pipeline as separately runnable stages with checkpoints under
+Config.OUTPUT_DIR (see src/pipeline.py):
+1. ingest   - Patient-independent data loading from EDF files
+2. features - Feature matrices for the classical models
+3. compare  - Model comparison with proper validation without data leakage
+4. cv       - Patient-independent cross-validation
+5. analyze  - Realistic performance evaluation with red-flag detection
+
+A stage runs its prerequisite stages first, reusing their checkpoints when
+the inputs are unchanged, so interrupted runs resume where they stopped.
+
+Usage:
+    python main.py                      # all stages (synthetic demo if no data)
+    python main.py ingest --patients chb01 chb02
+    python main.py cv --model logistic
+    python main.py cv --model logistic --lopo --workers 8  # leave-one-patient-out
+    python main.py analyze --force      # recompute instead of using checkpoints
+    python main.py compare --feature-set tangent  # covariance tangent-space features
+    python main.py compare --feature-set spectral # band powers from a shared spectrogram
+    python main.py analyze --min-recall 0.9       # tune the decision threshold
+    python main.py demo                 # synthetic data demonstration
+    python main.py patients --model random_forest --workers 4  # one model per patient
+    python main.py compare --profile outputs/compare.folded  # flamegraph.pl input
+    python main.py serve --artifact logistic --port 8765       # multi-stream detection server
+    python main.py serve --artifact logistic --load-test 1 10 100  # p50/p99 latency vs streams
+    python main.py experiments --model ImprovedRandomForest --patients chb01  # stored runs
 
 FIXES all critical issues from the original implementation.
 """
+import argparse
 import logging
 import numpy as np
-import pandas as pd
-from pathlib import Path
 import warnings
 
 # Setup logging
@@ -28,122 +48,88 @@ warnings.filterwarnings('ignore')
 # Import our fixed modules
 import sys
 import os
+from pathlib import Path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
 
 from config import Config
-from data_processing import CHBMITDataProcessor, PatientIndependentSplitter
-from validation import PatientIndependentValidator, RealisticPerformanceAnalyzer
-from models import ModelFactory, compare_models
+from data_processing import PatientIndependentSplitter
+from validation import PatientIndependentValidator, RealisticPerformanceAnalyzer, ThresholdAnalyzer
+from models import ModelFactory, MODEL_DISPLAY_NAMES, compare_models
+from pipeline import StagedPipeline, STAGES, FEATURE_SETS
+from profiling import StageProfiler, profiling
 
-def main():
-    """
-    Main pipeline demonstrating proper seizure detection.
-    """
-    logger.info("Starting Seizure Detection Pipeline")
-    logger.info("=" * 50)
-    
-    # Create output directories
-    Config.create_directories()
-    
-    # Initialize components
-    processor = CHBMITDataProcessor()
-    validator = PatientIndependentValidator()
-    analyzer = RealisticPerformanceAnalyzer()
-    
-    # Step 1: Load and process patient data
-    logger.info("Step 1: Loading patient data...")
-    
-    # For demonstration, we'll use a subset of patients
-    # In practice, you'd load all available patients
-    demo_patients = ['chb01', 'chb02', 'chb03', 'chb04', 'chb05']
-    
-    patient_data = {}
-    successful_patients = []
-    
-    for patient_id in demo_patients:
-        try:
-            logger.info(f"Processing patient {patient_id}...")
-            epochs, labels, metadata = processor.process_patient_data(patient_id)
-            
-            # Flatten epochs for traditional ML models
-            n_epochs, n_channels, n_timepoints = epochs.shape
-            X_flattened = epochs.reshape(n_epochs, n_channels * n_timepoints)
-            
-            patient_data[patient_id] = (X_flattened, labels)
-            successful_patients.append(patient_id)
-            
-            logger.info(f"Patient {patient_id}: {len(epochs)} epochs, "
-                       f"{np.sum(labels)} seizure epochs")
-            
-        except Exception as e:
-            logger.warning(f"Failed to process {patient_id}: {e}")
-            continue
-    
-    if len(successful_patients) < 3:
-        logger.error("Not enough patients loaded for proper validation")
-        logger.error("Please ensure CHB-MIT dataset is available and paths are correct")
-        raise FileNotFoundError("Insufficient patient data for validation")
-    
-    logger.info(f"Successfully loaded {len(successful_patients)} patients")
-    
-    # Step 2: Create patient-independent splits
-    logger.info("\nStep 2: Creating patient-independent splits...")
-    
-    splitter = PatientIndependentSplitter()
-    patient_splits = splitter.split_patients(
-        successful_patients, 
-        test_ratio=0.3, 
-        val_ratio=0.2,
-        random_state=Config.RANDOM_STATE
-    )
-    
-    logger.info(f"Train patients: {patient_splits['train']}")
-    logger.info(f"Validation patients: {patient_splits['val']}")
-    logger.info(f"Test patients: {patient_splits['test']}")
-    
-    # Step 3: Model evaluation and comparison
-    logger.info("\nStep 3: Evaluating models with proper validation...")
-    
-    # Compare all models
-    comparison_df = compare_models(patient_data, patient_splits, validator)
-    
+MIN_PATIENTS = 3
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Seizure detection pipeline")
+    parser.add_argument('command', nargs='?', default='all', choices=STAGES + ['all', 'demo', 'patients', 'serve', 'experiments'],
+                        help="Stage to run (prerequisite stages run from checkpoints)")
+    parser.add_argument('--patients', nargs='+',
+                        help="Patient IDs (default: all patients under the data root)")
+    parser.add_argument('--data-root', help="CHB-MIT data directory (default: Config.DATA_ROOT)")
+    parser.add_argument('--output-dir', type=Path, help="Output directory (default: Config.OUTPUT_DIR)")
+    parser.add_argument('--model', choices=sorted(ModelFactory.get_available_models()),
+                        help="Model for cv/analyze (default: best F1-score from compare); "
+                             "experiments: only runs of this model")
+    parser.add_argument('--n-folds', type=int, help="Folds for cv (default: Config.N_FOLDS)")
+    parser.add_argument('--lopo', action='store_true',
+                        help="cv: leave-one-patient-out, one fold per patient in parallel (--workers)")
+    parser.add_argument('--test-ratio', type=float, default=0.3)
+    parser.add_argument('--val-ratio', type=float, default=0.2)
+    parser.add_argument('--force', action='store_true', help="Ignore existing checkpoints")
+    parser.add_argument('--feature-set', choices=FEATURE_SETS, default='flatten',
+                        help="Model inputs: flattened epochs, covariance tangent-space features, "
+                             "SPoC/ICA spatially filtered epochs or band-power/spectral features")
+    parser.add_argument('--n-bootstrap', type=int,
+                        help="Patient-level bootstrap replicates for compare/cv confidence "
+                             "intervals (default: Config.N_BOOTSTRAP, 0 disables)")
+    parser.add_argument('--min-recall', type=float,
+                        help="analyze: pick the decision threshold on validation patients "
+                             "that meets this recall, and report it on test")
+    parser.add_argument('--workers', type=int,
+                        help="patients, cv --lopo: parallel processes (default: CPU count)")
+    parser.add_argument('--worker-memory', type=int, metavar='MB',
+                        help="patients: resident-memory limit per training process")
+    parser.add_argument('--artifact',
+                        help="serve: exported detector name in Config.MODELS_DIR or .npz path")
+    parser.add_argument('--host', default='127.0.0.1', help="serve: address to listen on")
+    parser.add_argument('--port', type=int, help="serve: TCP port (default: Config.SERVING_PORT)")
+    parser.add_argument('--load-test', type=int, nargs='+', metavar='N_STREAMS',
+                        help="serve: replay recordings from this many concurrent streams and "
+                             "report latency instead of serving")
+    parser.add_argument('--edf', type=Path, nargs='+',
+                        help="serve --load-test: EDF recordings to replay (default: synthetic)")
+    parser.add_argument('--seconds', type=float, default=120.0,
+                        help="serve --load-test: length of synthetic recordings")
+    parser.add_argument('--speed', type=float, default=1.0,
+                        help="serve --load-test: replay speed relative to real time")
+    parser.add_argument('--tcp', action='store_true',
+                        help="serve --load-test: stream over TCP instead of in-process")
+    parser.add_argument('--profile', type=Path, metavar='FOLDED',
+                        help="Record stage timings and write folded stacks (flame-graph input)")
+    return parser.parse_args(argv)
+
+
+def print_comparison(comparison_df):
     print("\n" + "=" * 80)
     print("MODEL COMPARISON RESULTS")
     print("=" * 80)
-    print(comparison_df.to_string(index=False, float_format='%.3f'))
-    
-    # Step 4: Detailed analysis of best model
-    logger.info("\nStep 4: Detailed analysis...")
-    
-    # Find best model based on F1-score (balanced metric for imbalanced data)
-    best_idx = comparison_df['F1-Score'].idxmax()
-    best_model_name = comparison_df.loc[best_idx, 'Model']
-    
-    logger.info(f"Best performing model: {best_model_name}")
-    
-    # Get detailed results for best model
-    model_name_map = {
-        'KNN': 'knn',
-        'Logistic Regression': 'logistic', 
-        'Random Forest': 'random_forest',
-        'SVM': 'svm'
-    }
-    
-    best_model_key = model_name_map[best_model_name]
-    best_model_class = ModelFactory.get_available_models()[best_model_key]
-    
-    detailed_results = validator.validate_model(
-        model_class=best_model_class,
-        patient_data=patient_data,
-        patient_splits=patient_splits,
-        apply_smote=True
-    )
-    
-    # Analyze results for red flags
-    analysis = analyzer.analyze_results(detailed_results)
-    
+    ci_columns = [c for c in comparison_df.columns if c.endswith(' CI low') or c.endswith(' CI high')]
+    print(comparison_df.drop(columns=ci_columns).to_string(index=False, float_format='%.3f'))
+    
+    if ci_columns:
+        print("\nPatient-level bootstrap 95% CI:")
+        metrics = [c[:-len(' CI low')] for c in ci_columns if c.endswith(' CI low')]
+        for _, row in comparison_df.iterrows():
+            intervals = ", ".join(f"{m} [{row[f'{m} CI low']:.3f}, {row[f'{m} CI high']:.3f}]"
+                                  for m in metrics)
+            print(f"  {row['Model']}: {intervals}")
+
+
+def print_analysis(model_display_name: str, detailed_results: dict, analysis: dict):
     print(f"\n" + "=" * 80)
-    print(f"DETAILED ANALYSIS: {best_model_name}")
+    print(f"DETAILED ANALYSIS: {model_display_name}")
     print("=" * 80)
     
     print(f"\nTest Set Performance:")
@@ -151,7 +137,24 @@ def main():
     for metric, value in test_metrics.items():
         if isinstance(value, (int, float)) and not metric.startswith('n_'):
             print(f"  {metric.capitalize()}: {value:.3f}")
-    
+
+    events = (detailed_results.get('events') or {}).get('test')
+    if events:
+        print(f"\nSeizure-Level Performance (threshold {events['threshold']:.2f}, "
+              f"refractory {events['refractory_period']:.0f}s):")
+        print(f"  Seizures detected: {events['seizures_detected']}/{events['n_seizures']}")
+        print(f"  False alarms per hour: {events['fa_per_hour']:.2f}")
+        print(f"  Detection latency: {events['latency_mean']:.1f}s mean, "
+              f"{events['latency_median']:.1f}s median")
+
+    report = detailed_results.get('model_report') or {}
+    if 'throughput_gain' in report:
+        print(f"\nCascade ({report['screen_features']}-feature screen -> {report['expert']}):")
+        print(f"  Escalated epochs: {report['escalated_fraction']:.1%} "
+              f"(screen threshold {report['screen_threshold']:.3f})")
+        print(f"  Throughput: {report['cascade_epochs_per_second']:.0f} vs "
+              f"{report['expert_epochs_per_second']:.0f} epochs/s ({report['throughput_gain']:.1f}x)")
+
     print(f"\nClass Distribution Analysis:")
     class_dist = detailed_results['metadata']['class_distribution']
     print(f"  Original training: {class_dist['train_original']}")
@@ -175,50 +178,241 @@ def main():
             print(f"  - {rec}")
     
     print(f"\nIs performance realistic? {'✅ Yes' if analysis['is_realistic'] else '❌ No'}")
+
+
+def print_threshold(tuning: dict):
+    constraints = {k: v for k, v in tuning['constraints'].items() if v is not None}
+    print(f"\nTuned Operating Point (max {tuning['objective']}, {constraints}):")
+    print(f"  Threshold: {tuning['threshold']:.4f}")
+    for split in ['val', 'test']:
+        m = tuning[split]
+        print(f"  {split.capitalize()}: recall {m['recall']:.3f}, precision {m['precision']:.3f}, "
+              f"specificity {m['specificity']:.3f}, F1 {m['f1']:.3f}")
+
+
+def print_patients(registry: dict):
+    print(f"\n" + "=" * 80)
+    print(f"PATIENT-SPECIFIC MODELS: {MODEL_DISPLAY_NAMES.get(registry['model_name'], registry['model_name'])}")
+    print("=" * 80)
     
-    # Step 5: Cross-validation analysis
-    logger.info("\nStep 5: Cross-validation analysis...")
+    for patient_id, record in registry['patients'].items():
+        if record['status'] != 'trained':
+            print(f"  {patient_id}: {record['status']} ({record['error']})")
+            continue
+        events = record.get('events') or {}
+        seizures = (f", seizures {events['seizures_detected']}/{events['n_seizures']}, "
+                    f"{events['fa_per_hour']:.2f} FA/h" if events else "")
+        print(f"  {patient_id}: F1 {record['test'].get('f1', np.nan):.3f}, "
+              f"recall {record['test'].get('recall', np.nan):.3f}{seizures}")
+    
+    aggregate = registry['aggregate']
+    print(f"\nTrained {aggregate['n_patients']} patients ({aggregate['n_failed']} failed); "
+          f"mean F1 {aggregate['f1_mean']:.3f}")
+    events = aggregate.get('events')
+    if events:
+        print(f"Seizures detected: {events['seizures_detected']}/{events['n_seizures']} "
+              f"(sensitivity {events['sensitivity']:.3f}), "
+              f"false alarms per hour: {events['fa_per_hour']:.2f}")
+
+
+def print_experiments(rows: list):
+    print(f"\n" + "=" * 80)
+    print(f"STORED EXPERIMENTS ({len(rows)})")
+    print("=" * 80)
+    print(f"{'id':>5} {'created':<19} {'kind':<8} {'model':<30} {'test patients':<20} {'F1':>6} {'AUC':>6} {'s':>8}")
+    for row in rows:
+        test = row['splits'].get('test', row['splits'].get('all', []))
+        f1 = row.get('f1', row.get('f1_mean', np.nan))
+        auc = row.get('auc', row.get('auc_mean', np.nan))
+        print(f"{row['id']:>5} {row['created']:<19} {row['kind']:<8} {row['model']:<30} "
+              f"{','.join(test)[:20]:<20} {f1:>6.3f} {auc:>6.3f} {row['seconds'] or 0:>8.1f}")
+
+
+def print_load_test(results: list):
+    print(f"\n" + "=" * 80)
+    print(f"DETECTION SERVER LOAD TEST ({results[0]['transport']})")
+    print("=" * 80)
+    print(f"{'streams':>8} {'epochs':>8} {'epochs/s':>9} {'batch':>7} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    for r in results:
+        print(f"{r['n_streams']:>8} {r['epochs']:>8} {r['epochs_per_second']:>9.1f} "
+              f"{r['batch_size_mean']:>7.1f} {r['latency_p50_ms']:>8.2f} {r['latency_p99_ms']:>8.2f} "
+              f"{r['latency_max_ms']:>8.2f}")
+
+
+def print_cv(model_display_name: str, cv_results: dict):
+    print(f"\n" + "=" * 80)
+    print(f"CROSS-VALIDATION RESULTS: {model_display_name}")
+    print("=" * 80)
     
-    try:
-        cv_results = validator.cross_validate_patients(
-            model_class=best_model_class,
-            patient_data=patient_data,
-            n_folds=min(5, len(successful_patients))
-        )
-        
-        print(f"\n" + "=" * 80)
-        print(f"CROSS-VALIDATION RESULTS: {best_model_name}")
-        print("=" * 80)
+    for metric in ['accuracy', 'precision', 'recall', 'f1', 'auc']:
+        mean_key = f'{metric}_mean'
+        std_key = f'{metric}_std'
+        ci_key = f'{metric}_ci'
         
-        for metric in ['accuracy', 'precision', 'recall', 'f1', 'auc']:
-            mean_key = f'{metric}_mean'
-            std_key = f'{metric}_std'
-            ci_key = f'{metric}_ci'
+        if mean_key in cv_results:
+            mean_val = cv_results[mean_key]
+            std_val = cv_results.get(std_key, 0)
             
-            if mean_key in cv_results:
-                mean_val = cv_results[mean_key]
-                std_val = cv_results.get(std_key, 0)
-                
-                print(f"{metric.capitalize()}: {mean_val:.3f} ± {std_val:.3f}")
-                
-                if ci_key in cv_results:
-                    ci_low, ci_high = cv_results[ci_key]
-                    print(f"  95% CI: [{ci_low:.3f}, {ci_high:.3f}]")
-                    
-    except Exception as e:
-        logger.warning(f"Cross-validation failed: {e}")
-    
-    # Final summary
-    print(f"\n" + "=" * 80)
-    print("PIPELINE SUMMARY")
-    print("=" * 80)
-    print(f"✅ Patients processed: {len(successful_patients)}")
-    print(f"✅ Patient-independent validation: Applied")
-    print(f"✅ Data leakage prevention: Applied")
-    print(f"✅ Class imbalance handling: SMOTE applied")
-    print(f"✅ Statistical validation: Cross-validation completed")
-    print(f"✅ Performance analysis: Red flag detection applied")
+            print(f"{metric.capitalize()}: {mean_val:.3f} ± {std_val:.3f}")
+            
+            if ci_key in cv_results:
+                ci_low, ci_high = cv_results[ci_key]
+                print(f"  95% CI: [{ci_low:.3f}, {ci_high:.3f}]")
+            if f'{ci_key}_bootstrap' in cv_results:
+                ci_low, ci_high = cv_results[f'{ci_key}_bootstrap']
+                print(f"  95% CI (patient bootstrap): [{ci_low:.3f}, {ci_high:.3f}]")
+    
+    if 'pooled' in cv_results:
+        # Leave-one-patient-out: every epoch is tested exactly once
+        pooled = cv_results['pooled']
+        print(f"Pooled over {cv_results['n_folds']} patients: " +
+              ", ".join(f"{m} {pooled[m]:.3f}" for m in ['precision', 'recall', 'f1', 'auc'] if m in pooled))
+        if cv_results.get('failed'):
+            print(f"Failed patients: {', '.join(sorted(cv_results['failed']))}")
+
+
+def main(argv=None):
+    """
+    Parse arguments and run the requested command, optionally profiled.
+    """
+    args = parse_args(argv)
+    
+    if args.output_dir:
+        Config.OUTPUT_DIR = args.output_dir
+    Config.create_directories()
     
+    profiler = StageProfiler() if args.profile else None
+    with profiling(profiler):
+        if args.command == 'demo':
+            demo_with_synthetic_data()
+        elif args.command == 'serve':
+            run_server(args)
+        elif args.command == 'experiments':
+            list_experiments(args)
+        else:
+            run_stages(args)
+    
+    if profiler is not None:
+        path = profiler.write_collapsed(args.profile)
+        logger.info(f"Stage profile written to {path}")
+
+
+def list_experiments(args):
+    """
+    Print the validation runs recorded in the experiment store.
+    """
+    from experiments import ExperimentStore
+    from pipeline import CheckpointStore
+    
+    store = ExperimentStore(CheckpointStore().root / 'experiments')
+    model = ModelFactory.get_available_models()[args.model].__name__ if args.model else None
+    rows = {}
+    for patient_id in args.patients or [None]:
+        rows.update((row['id'], row) for row in store.query(model=model, patient=patient_id))
+    print_experiments([rows[i] for i in sorted(rows, reverse=True)])
+
+
+def run_server(args):
+    """
+    Serve an exported detector to many streams, or load-test it.
+    """
+    import asyncio
+    from inference import load_artifact
+    from serving import DetectionServer, latency_vs_streams
+    
+    if not args.artifact:
+        raise ValueError("serve needs --artifact (export a model first)")
+    model = load_artifact(args.artifact)
+    
+    if args.load_test:
+        address = (args.host, 0) if args.tcp else None
+        results = asyncio.run(latency_vs_streams(model, args.load_test, seconds=args.seconds,
+                                                 edf_files=args.edf, speed=args.speed,
+                                                 address=address))
+        print_load_test(results)
+        return
+    
+    async def serve():
+        server = DetectionServer(model)
+        tcp = await server.serve(args.host, args.port)
+        async with tcp:
+            await tcp.serve_forever()
+    
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        logger.info("Detection server stopped")
+
+
+def run_stages(args):
+    """
+    Run the requested pipeline stage and its prerequisites.
+    """
+    logger.info(f"Starting Seizure Detection Pipeline: {args.command}")
+    logger.info("=" * 50)
+    
+    pipeline = StagedPipeline(data_root=args.data_root, force=args.force,
+                              feature_set=args.feature_set)
+    if args.command == 'patients':
+        stages = STAGES[:STAGES.index('features') + 1]
+    else:
+        target = len(STAGES) if args.command == 'all' else STAGES.index(args.command) + 1
+        stages = STAGES[:target]
+    
+    # Step 1: Load and process patient data (checkpointed per patient)
+    patient_ids = args.patients or pipeline.processor.discover_patients()
+    ingest_keys = pipeline.ingest(patient_ids)
+    
+    if len(ingest_keys) < (1 if args.command == 'patients' else MIN_PATIENTS):
+        logger.error("Not enough patients loaded for proper validation")
+        logger.error("Please ensure CHB-MIT dataset is available and paths are correct")
+        raise FileNotFoundError("Insufficient patient data for validation")
+    
+    logger.info(f"Successfully loaded {len(ingest_keys)} patients")
+    if 'features' not in stages:
+        return
+    
+    # Step 2: Feature matrices
+    feature_keys = pipeline.features(ingest_keys)
+    if args.command == 'patients':
+        registry, _ = pipeline.patients(feature_keys, args.model or 'random_forest', args.workers,
+                                        args.worker_memory, args.test_ratio, args.val_ratio)
+        print_patients(registry)
+        return
+    if 'compare' not in stages:
+        return
+    
+    # Step 3: Model evaluation and comparison (skipped when a model is given)
+    model_name = args.model
+    if model_name is None or args.command in ('compare', 'all'):
+        comparison_df, _ = pipeline.compare(feature_keys, args.test_ratio, args.val_ratio,
+                                            args.n_bootstrap)
+        print_comparison(comparison_df)
+        model_name = model_name or pipeline.best_model(comparison_df)
+        logger.info(f"Best performing model: {MODEL_DISPLAY_NAMES.get(model_name, model_name)}")
+    display_name = MODEL_DISPLAY_NAMES.get(model_name, model_name)
+    
+    # Step 4: Cross-validation analysis
+    if args.command in ('cv', 'all'):
+        if args.lopo:
+            cv_results, _ = pipeline.lopo(feature_keys, model_name, args.workers, args.n_bootstrap)
+        else:
+            cv_results, _ = pipeline.cv(feature_keys, model_name, args.n_folds, args.n_bootstrap)
+        print_cv(display_name, cv_results)
+    
+    # Step 5: Detailed analysis
+    if args.command in ('analyze', 'all'):
+        detailed, _ = pipeline.analyze(feature_keys, model_name, args.test_ratio, args.val_ratio)
+        print_analysis(display_name, detailed['results'], detailed['analysis'])
+        if args.min_recall is not None:
+            try:
+                tuning = ThresholdAnalyzer.tune(detailed['results'], objective='specificity',
+                                                min_recall=args.min_recall)
+                print_threshold(tuning)
+            except ValueError as e:
+                logger.warning(f"Threshold tuning failed: {e}")
+    
+    logger.info(f"Checkpoints stored under {pipeline.store.root}")
     logger.info("Pipeline completed successfully!")
 
 def demo_with_synthetic_data():
@@ -310,14 +504,7 @@ def demo_with_synthetic_data():
     print("RED FLAG ANALYSIS")
     print("=" * 80)
     
-    models_to_analyze = [
-        ('KNN', 'knn'),
-        ('Logistic Regression', 'logistic'),
-        ('Random Forest', 'random_forest'),
-        ('SVM', 'svm')
-    ]
-    
-    for model_display_name, model_name in models_to_analyze:
+    for model_name, model_display_name in MODEL_DISPLAY_NAMES.items():
         try:
             model_class = ModelFactory.get_available_models()[model_name]
             detailed_results = validator.validate_model(
@@ -344,14 +531,12 @@ def demo_with_synthetic_data():
             print(f"  ❌ Analysis failed: {e}")
 
 if __name__ == "__main__":
+    args = parse_args()
     try:
-        # Try to run with real data first
         main()
     except FileNotFoundError as e:
+        if args.command != 'all':
+            raise
         logger.warning(f"CHB-MIT dataset not found: {e}")
         logger.info("Running synthetic data demonstration instead...")
         demo_with_synthetic_data()
-    except Exception as e:
-        logger.error(f"Pipeline failed: {e}")
-        logger.info("Running synthetic data demonstration instead...")
-        demo_with_synthetic_data()
@@ -0,0 +1,190 @@
+"""
+Vectorized artifact screening of EEG epochs.
+
+Replaces the notebook's epochs.drop_bad(): per-epoch, per-channel
+statistics are computed in one pass over the (n_epochs, n_channels,
+n_times) tensor, and a channel is flagged when it is
+    amplitude  peak-to-peak above Config.ARTIFACT_MAX_PTP (movement, electrode pops)
+    flat       peak-to-peak below Config.ARTIFACT_MIN_PTP, or more than
+               ARTIFACT_MAX_FLAT_FRACTION of its samples unchanged
+               (disconnected or saturated/clipped channels)
+    variance   log-variance more than ARTIFACT_VARIANCE_Z robust z-scores
+               (median/MAD) from the channel's reference
+
+An epoch with more than ARTIFACT_MAX_BAD_CHANNELS bad channels is bad. In
+'drop' mode bad epochs are removed; in 'mask' mode every epoch is kept and
+its bad channels are zeroed.
+
+The variance reference is the batch itself (e.g. one recording) unless the
+rejector was fitted; for streaming, fit it on a calibration block, or leave
+it unfitted to apply the absolute thresholds only. Only numpy is required.
+"""
+from typing import Any, Dict, Tuple
+
+import numpy as np
+
+try:
+    from .config import Config
+    from .profiling import profile_stage
+except ImportError:
+    from config import Config
+    from profiling import profile_stage
+
+ARTIFACT_MODES = ['drop', 'mask']
+
+REASONS = ['amplitude', 'flat', 'variance']
+
+# Epochs processed at once; bounds the np.diff temporary
+CHUNK_SIZE = 512
+
+# Fewest epochs for the batch to serve as its own variance reference
+MIN_REFERENCE_EPOCHS = 10
+
+# MAD -> standard deviation for normally distributed values
+_MAD_SCALE = 1.4826
+
+
+def epoch_statistics(epochs: np.ndarray, flat_tolerance: float = None) -> Dict[str, np.ndarray]:
+    """
+    Per-epoch, per-channel screening statistics.
+
+    Args:
+        epochs: Array of shape (n_epochs, n_channels, n_times)
+        flat_tolerance: Largest sample-to-sample change counted as
+            unchanged (defaults to Config.ARTIFACT_FLAT_TOLERANCE)
+
+    Returns:
+        Dict of (n_epochs, n_channels) arrays: 'ptp' (peak-to-peak),
+        'log_var' and 'flat_fraction' (share of unchanged samples)
+    """
+    tolerance = Config.ARTIFACT_FLAT_TOLERANCE if flat_tolerance is None else flat_tolerance
+    epochs = np.asarray(epochs)
+    n_epochs, n_channels = epochs.shape[:2]
+    stats = {key: np.empty((n_epochs, n_channels)) for key in ['ptp', 'log_var', 'flat_fraction']}
+    for start in range(0, n_epochs, CHUNK_SIZE):
+        chunk = epochs[start:start + CHUNK_SIZE]
+        rows = slice(start, start + len(chunk))
+        stats['ptp'][rows] = chunk.max(axis=-1) - chunk.min(axis=-1)
+        stats['log_var'][rows] = np.log(chunk.var(axis=-1) + np.finfo(np.float64).tiny)
+        stats['flat_fraction'][rows] = (np.abs(np.diff(chunk, axis=-1)) <= tolerance).mean(axis=-1)
+    return stats
+
+
+def _robust_reference(log_var: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Per-channel median and MAD-based scale of the log-variances."""
+    median = np.median(log_var, axis=0)
+    scale = _MAD_SCALE * np.median(np.abs(log_var - median), axis=0)
+    return median, np.where(scale > 0, scale, np.inf)
+
+
+class ArtifactRejector:
+    """
+    Flags bad channels and epochs from epoch_statistics().
+
+    Thresholds default to the ARTIFACT_* settings in Config.
+    """
+
+    def __init__(self, mode: str = None, max_ptp: float = None, min_ptp: float = None,
+                 max_flat_fraction: float = None, variance_z: float = None,
+                 max_bad_channels: int = None):
+        self.mode = mode or Config.ARTIFACT_MODE or 'drop'
+        if self.mode not in ARTIFACT_MODES:
+            raise ValueError(f"Unknown artifact mode '{self.mode}'. Available: {ARTIFACT_MODES}")
+        self.max_ptp = Config.ARTIFACT_MAX_PTP if max_ptp is None else max_ptp
+        self.min_ptp = Config.ARTIFACT_MIN_PTP if min_ptp is None else min_ptp
+        self.max_flat_fraction = (Config.ARTIFACT_MAX_FLAT_FRACTION if max_flat_fraction is None
+                                  else max_flat_fraction)
+        self.variance_z = Config.ARTIFACT_VARIANCE_Z if variance_z is None else variance_z
+        self.max_bad_channels = (Config.ARTIFACT_MAX_BAD_CHANNELS if max_bad_channels is None
+                                 else max_bad_channels)
+        self.reference_ = None
+
+    def fit(self, epochs: np.ndarray):
+        """Fix the variance reference to these (artifact-free) epochs."""
+        self.reference_ = _robust_reference(epoch_statistics(epochs)['log_var'])
+        return self
+
+    def screen(self, epochs: np.ndarray) -> Dict[str, np.ndarray]:
+        """
+        Flag bad channels and epochs.
+
+        Returns:
+            Dict with one (n_epochs, n_channels) mask per reason, the
+            combined 'bad_channels' mask and the (n_epochs,) 'bad_epochs'
+        """
+        stats = epoch_statistics(epochs)
+        flags = {
+            'amplitude': stats['ptp'] > self.max_ptp,
+            'flat': (stats['ptp'] < self.min_ptp) | (stats['flat_fraction'] > self.max_flat_fraction)
+        }
+
+        reference = self.reference_
+        if reference is None and len(stats['log_var']) >= MIN_REFERENCE_EPOCHS:
+            reference = _robust_reference(stats['log_var'])
+        if reference is not None:
+            median, scale = reference
+            flags['variance'] = np.abs(stats['log_var'] - median) / scale > self.variance_z
+        else:
+            flags['variance'] = np.zeros_like(flags['flat'])
+
+        bad_channels = flags['amplitude'] | flags['flat'] | flags['variance']
+        flags['bad_channels'] = bad_channels
+        flags['bad_epochs'] = bad_channels.sum(axis=1) > self.max_bad_channels
+        return flags
+
+    def apply(self, epochs: np.ndarray, protect: np.ndarray = None) -> Tuple[np.ndarray, np.ndarray, Dict[str, Any]]:
+        """
+        Screen epochs and drop or mask the bad ones.
+
+        Args:
+            epochs: Array of shape (n_epochs, n_channels, n_times)
+            protect: Optional (n_epochs,) mask of epochs never dropped or
+                masked (e.g. annotated seizures, whose high amplitude is
+                the signal of interest); they are still counted
+
+        Returns:
+            (epochs, keep, summary): the kept (and, in mask mode, masked)
+            epochs, the (n_epochs,) mask of kept input epochs, and counts
+            for the metadata
+        """
+        epochs = np.asarray(epochs)
+        with profile_stage('artifacts', epochs):
+            flags = self.screen(epochs)
+            bad = flags['bad_epochs']
+            if protect is not None:
+                protect = np.asarray(protect, dtype=bool)
+                acted = bad & ~protect
+            else:
+                acted = bad
+
+            if self.mode == 'drop':
+                keep = ~acted
+                epochs = epochs[keep]
+                n_masked = 0
+            else:
+                keep = np.ones(len(epochs), dtype=bool)
+                masked = flags['bad_channels'] & acted[:, None]
+                n_masked = int(masked.sum())
+                if n_masked:
+                    epochs = epochs.copy()
+                    epochs[masked] = 0.0
+
+        summary = {
+            'mode': self.mode,
+            'n_screened': int(len(bad)),
+            'n_bad': int(bad.sum()),
+            'n_rejected': int((~keep).sum()),
+            'n_masked_channels': n_masked,
+            'n_protected': int((bad & protect).sum()) if protect is not None else 0,
+            'reasons': {reason: int(flags[reason][bad].any(axis=1).sum()) for reason in REASONS}
+        }
+        return epochs, keep, summary
+
+
+def merge_summaries(summaries) -> Dict[str, Any]:
+    """Add up per-file rejection summaries."""
+    summaries = [s for s in summaries if s]
+    total = {key: sum(s[key] for s in summaries)
+             for key in ['n_screened', 'n_bad', 'n_rejected', 'n_masked_channels', 'n_protected']}
+    total['reasons'] = {reason: sum(s['reasons'][reason] for s in summaries) for reason in REASONS}
+    return total
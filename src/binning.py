@@ -0,0 +1,243 @@
+"""
+Quantile binning of epoch features to uint8, cached per patient.
+
+Histogram-based models (ImprovedHistGradientBoosting) only need each
+feature's bin index, so the training matrix can be held as uint8 instead of
+float64 (8x smaller). Bin edges must come from the training patients only,
+so they are merged from per-patient quantile sketches; a patient's sketch
+and moments are computed once and reused by every fold and model, and its
+binned matrix is reused whenever the same training patients define the
+edges (e.g. every model of compare_models, or analyze after compare).
+
+Only numpy is required; scikit-learn is imported for the scaler only.
+"""
+import hashlib
+import logging
+from collections import OrderedDict
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+try:
+    from .config import Config
+except ImportError:
+    from config import Config
+
+logger = logging.getLogger(__name__)
+
+# Rows transposed at once when binning; bounds the float64 temporary
+CHUNK_ROWS = 1024
+
+
+def quantile_sketch(X: np.ndarray, levels: int = 256, max_rows: int = 4096,
+                    random_state: int = None) -> np.ndarray:
+    """
+    Per-feature quantiles of a (subsample of a) feature matrix.
+
+    Returns:
+        Array of shape (levels, n_features); each row carries an equal
+        share of the rows of X
+    """
+    if len(X) > max_rows:
+        rng = np.random.RandomState(random_state or Config.RANDOM_STATE)
+        X = X[np.sort(rng.choice(len(X), max_rows, replace=False))]
+    return np.quantile(X, (np.arange(levels) + 0.5) / levels, axis=0)
+
+
+def merge_sketches(sketches: List[np.ndarray], counts: List[int], max_bins: int = 255) -> np.ndarray:
+    """
+    Bin edges at the pooled quantiles of several patients' sketches.
+
+    Args:
+        sketches: quantile_sketch() outputs of the same features
+        counts: Rows each sketch summarizes (its weight)
+        max_bins: At most this many bins (max_bins - 1 edges) per feature
+
+    Returns:
+        Edges of shape (n_features, max_bins - 1), increasing per feature
+        and padded with +inf where a feature has fewer distinct edges
+    """
+    values = np.concatenate(sketches).T  # (n_features, n_points)
+    weights = np.concatenate([np.full(len(s), n / len(s)) for s, n in zip(sketches, counts)])
+    order = np.argsort(values, axis=1, kind='stable')
+    values = np.take_along_axis(values, order, axis=1)
+    cumulative = np.cumsum(weights[order], axis=1)
+    cumulative /= cumulative[:, -1:]
+
+    targets = np.arange(1, max_bins) / max_bins
+    last = values.shape[1] - 1
+    edges = np.empty((len(values), max_bins - 1))
+    for j in range(len(values)):
+        edges[j] = values[j, np.minimum(np.searchsorted(cumulative[j], targets), last)]
+
+    # Repeated edges (discrete or constant features) and edges at the
+    # minimum, which would leave bin 0 empty, become +inf padding
+    unused = edges <= values[:, :1]
+    unused[:, 1:] |= np.diff(edges, axis=1) == 0
+    edges[unused] = np.inf
+    return np.sort(edges, axis=1)
+
+
+def apply_bins(X: np.ndarray, edges: np.ndarray) -> np.ndarray:
+    """
+    Bin index of every value: the number of edges <= the value.
+
+    Args:
+        X: Array of shape (n_samples, n_features)
+        edges: Output of merge_sketches() (at most 255 edges per feature)
+
+    Returns:
+        uint8 array of shape (n_samples, n_features)
+    """
+    if edges.shape[1] > 255:
+        raise ValueError(f"{edges.shape[1] + 1} bins do not fit in uint8")
+    X = np.asarray(X)
+    binned = np.empty(X.shape, dtype=np.uint8)
+    for start in range(0, len(X), CHUNK_ROWS):
+        block = np.ascontiguousarray(X[start:start + CHUNK_ROWS].T)
+        out = np.empty(block.shape, dtype=np.uint8)
+        for j in range(len(block)):
+            out[j] = np.searchsorted(edges[j], block[j], side='right')
+        binned[start:start + CHUNK_ROWS] = out.T
+    return binned
+
+
+def fit_bin_edges(X: np.ndarray, max_bins: int = 255) -> np.ndarray:
+    """Bin edges of a single feature matrix (e.g. feature-stage outputs)."""
+    return merge_sketches([quantile_sketch(X)], [len(X)], max_bins)
+
+
+def scaler_from_moments(moments: List[Tuple[int, np.ndarray, np.ndarray]]):
+    """
+    StandardScaler fitted from per-patient (n, mean, m2) moments, equal to
+    fitting it on the stacked patients, without stacking them.
+    """
+    from sklearn.preprocessing import StandardScaler
+
+    n = np.array([m[0] for m in moments], dtype=np.float64)
+    means = np.stack([m[1] for m in moments])
+    total = n.sum()
+    mean = n @ means / total
+    m2 = sum(m[2] for m in moments) + n @ (means - mean) ** 2
+
+    scaler = StandardScaler()
+    scaler.mean_ = mean
+    scaler.var_ = m2 / total
+    std = np.sqrt(scaler.var_)
+    scaler.scale_ = np.where(std < 10 * np.finfo(np.float64).eps, 1.0, std)
+    scaler.n_features_in_ = len(mean)
+    scaler.n_samples_seen_ = int(total)
+    return scaler
+
+
+class BinnedPatientCache:
+    """
+    Per-patient sketches, moments and uint8 matrices for binned models.
+
+    Entries are tied to the patient's feature array object: passing a
+    different array for the same patient id recomputes them. Each patient
+    keeps its binned matrices for the max_versions most recent edge sets.
+    """
+
+    def __init__(self, max_versions: int = 2):
+        self.max_versions = max_versions
+        self._entries: Dict[str, Dict] = {}
+
+    def _entry(self, patient_id: str, X: np.ndarray) -> Dict:
+        entry = self._entries.get(patient_id)
+        if entry is None or entry['X'] is not X:
+            mean = X.mean(axis=0)
+            entry = {
+                'X': X,
+                'sketch': quantile_sketch(X),
+                'moments': (len(X), mean, ((X - mean) ** 2).sum(axis=0)),
+                'binned': OrderedDict()
+            }
+            self._entries[patient_id] = entry
+        return entry
+
+    def precompute(self, patient_data: Dict[str, Tuple[np.ndarray, np.ndarray]]):
+        """Sketches and moments of every patient (e.g. before forking fold workers)."""
+        for patient_id, (X, _) in patient_data.items():
+            self._entry(patient_id, X)
+        return self
+
+    def binned(self, patient_id: str, X: np.ndarray, edges: np.ndarray, edges_key: str) -> np.ndarray:
+        """uint8 matrix of one patient under the given edges."""
+        versions = self._entry(patient_id, X)['binned']
+        if edges_key in versions:
+            versions.move_to_end(edges_key)
+            return versions[edges_key]
+        binned = versions[edges_key] = apply_bins(X, edges)
+        while len(versions) > self.max_versions:
+            versions.popitem(last=False)
+        return binned
+
+    def prepare(self, patient_data: Dict[str, Tuple[np.ndarray, np.ndarray]],
+                patient_splits: Dict[str, List[str]], max_bins: int = 255):
+        """
+        Binned train/val/test data with edges and scaler from the training
+        patients only.
+
+        Returns:
+            (train, val, test) as (uint8 X, y) tuples, the StandardScaler
+            of the training patients, and the bin edges in scaled units (so
+            a model can bin scaled float inputs at prediction time)
+        """
+        train_ids = [p for p in patient_splits['train'] if p in patient_data]
+        if not train_ids:
+            raise ValueError(f"No data found for patients: {patient_splits['train']}")
+        entries = [self._entry(p, patient_data[p][0]) for p in train_ids]
+        edges = merge_sketches([e['sketch'] for e in entries], [len(e['X']) for e in entries], max_bins)
+        edges_key = hashlib.sha1(edges.tobytes()).hexdigest()
+        scaler = scaler_from_moments([e['moments'] for e in entries])
+
+        splits = []
+        for split in ['train', 'val', 'test']:
+            patient_ids = [p for p in patient_splits[split] if p in patient_data]
+            if not patient_ids:
+                raise ValueError(f"No data found for patients: {patient_splits[split]}")
+            splits.append((
+                np.concatenate([self.binned(p, patient_data[p][0], edges, edges_key) for p in patient_ids]),
+                np.concatenate([patient_data[p][1] for p in patient_ids])
+            ))
+
+        scaled_edges = (edges - scaler.mean_[:, None]) / scaler.scale_[:, None]
+        return splits[0], splits[1], splits[2], scaler, scaled_edges
+
+
+class BinnedEstimator:
+    """
+    Estimator trained on uint8 bin indices.
+
+    uint8 inputs are taken as already binned; float inputs are binned with
+    the stored edges first, so the pickled estimator scores scaled features
+    like every other model.
+    """
+
+    def __init__(self, estimator, bin_edges: np.ndarray = None, max_bins: int = 255):
+        self.estimator = estimator
+        self.bin_edges = bin_edges
+        self.max_bins = max_bins
+
+    def transform(self, X: np.ndarray) -> np.ndarray:
+        X = np.asarray(X)
+        if X.dtype == np.uint8:
+            return X
+        if self.bin_edges is None:
+            raise ValueError("BinnedEstimator needs bin edges to bin float inputs")
+        return apply_bins(X, self.bin_edges)
+
+    def fit(self, X: np.ndarray, y: np.ndarray, **fit_params):
+        if self.bin_edges is None:
+            if np.asarray(X).dtype == np.uint8:
+                raise ValueError("Pre-binned inputs need the bin edges they were binned with")
+            self.bin_edges = fit_bin_edges(X, self.max_bins)
+        self.estimator.fit(self.transform(X), y, **fit_params)
+        return self
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        return self.estimator.predict(self.transform(X))
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        return self.estimator.predict_proba(self.transform(X))
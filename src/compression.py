@@ -0,0 +1,323 @@
+"""
+Compressed detector variants for edge inference.
+
+Trained detectors were kept as full-precision scikit-learn or Keras
+objects. CompressedModel trains a ModelFactory model and compresses it
+with one of:
+    int8       linear weights (logistic, sgd_logistic) quantized to int8
+               with one scale; LSTM kernels quantized per output unit
+    prune      the first n_trees trees of a random forest (its trees are
+               exchangeable, so any subset is an unbiased smaller forest)
+    distill    one depth-limited regression tree fitted to the random
+               forest's probabilities on the training epochs
+    reduce_sv  an SVM refitted on the sv_fraction of its support vectors
+               with the largest dual coefficients
+
+As a ModelFactory-style class it runs through validate_model like any
+other model, so compare_compressed() validates every variant on the same
+patient splits as its uncompressed base and reports model size,
+single-epoch latency and metric deltas side by side.
+
+Only numpy is required; scikit-learn and TensorFlow are imported by the
+models that need them.
+"""
+import copy
+import logging
+import pickle
+import time
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+try:
+    from .models import ModelFactory, SeizureDetectionModel
+    from .profiling import profile_stage
+except ImportError:
+    from models import ModelFactory, SeizureDetectionModel
+    from profiling import profile_stage
+
+logger = logging.getLogger(__name__)
+
+# method -> ModelFactory models it applies to
+COMPRESSION_METHODS = {
+    'int8': ['logistic', 'sgd_logistic', 'lstm'],
+    'prune': ['random_forest'],
+    'distill': ['random_forest'],
+    'reduce_sv': ['svm']
+}
+
+# (base model, method, CompressedModel parameters) compared by default
+DEFAULT_VARIANTS = [
+    ('logistic', 'int8', {}),
+    ('random_forest', 'prune', {'n_trees': 20}),
+    ('random_forest', 'distill', {'max_depth': 8}),
+    ('svm', 'reduce_sv', {'sv_fraction': 0.3})
+]
+
+
+def quantize_int8(weights: np.ndarray, axis: int = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Symmetric int8 quantization.
+
+    Args:
+        weights: Float array
+        axis: Axis with one scale per entry (e.g. output units); None
+            uses a single scale
+
+    Returns:
+        (int8 array, float32 scales broadcastable against it)
+    """
+    weights = np.asarray(weights, dtype=np.float32)
+    if axis is None:
+        peak = np.abs(weights).max(keepdims=True)
+    else:
+        reduce = tuple(i for i in range(weights.ndim) if i != axis % weights.ndim)
+        peak = np.abs(weights).max(axis=reduce, keepdims=True)
+    scale = np.where(peak > 0, peak / 127, 1.0).astype(np.float32)
+    return np.clip(np.round(weights / scale), -127, 127).astype(np.int8), scale
+
+
+class QuantizedLinear:
+    """Logistic model with int8 weights; scores in float32."""
+
+    def __init__(self, coef_q: np.ndarray, coef_scale: float, intercept: float):
+        self.coef_q = coef_q
+        self.coef_scale = coef_scale
+        self.intercept = intercept
+
+    @classmethod
+    def from_estimator(cls, estimator) -> 'QuantizedLinear':
+        coef_q, scale = quantize_int8(estimator.coef_.ravel())
+        return cls(coef_q, float(scale.ravel()[0]), float(np.ravel(estimator.intercept_)[0]))
+
+    def decision_function(self, X: np.ndarray) -> np.ndarray:
+        X = np.asarray(X, dtype=np.float32)
+        return (X @ self.coef_q.astype(np.float32)) * self.coef_scale + self.intercept
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        proba = 0.5 * (1.0 + np.tanh(0.5 * self.decision_function(X)))
+        return np.column_stack([1 - proba, proba])
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        return (self.decision_function(X) >= 0).astype(int)
+
+
+class TreeStudent:
+    """Depth-limited regression tree of a teacher's positive-class probability."""
+
+    def __init__(self, tree):
+        self.tree = tree
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        proba = np.clip(self.tree.predict(X), 0.0, 1.0)
+        return np.column_stack([1 - proba, proba])
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        return (self.predict_proba(X)[:, 1] >= 0.5).astype(int)
+
+
+def prune_forest(forest, n_trees: int):
+    """Copy of a fitted random forest with its first n_trees trees."""
+    pruned = copy.copy(forest)
+    pruned.estimators_ = forest.estimators_[:n_trees]
+    pruned.n_estimators = len(pruned.estimators_)
+    return pruned
+
+
+def distill_forest(forest, X: np.ndarray, max_depth: int, random_state: int = None) -> TreeStudent:
+    """Regression tree fitted to the forest's probabilities on X."""
+    from sklearn.tree import DecisionTreeRegressor
+
+    tree = DecisionTreeRegressor(max_depth=max_depth, min_samples_leaf=5, random_state=random_state)
+    tree.fit(X, forest.predict_proba(X)[:, 1])
+    return TreeStudent(tree)
+
+
+def reduce_support_vectors(svc, X: np.ndarray, y: np.ndarray, fraction: float):
+    """SVC with the same parameters refitted on its strongest support vectors."""
+    from sklearn.base import clone
+
+    y = np.asarray(y)
+    weight = np.abs(svc.dual_coef_).sum(axis=0)
+    n_keep = max(int(np.ceil(fraction * len(weight))), 2)
+    keep = svc.support_[np.argsort(-weight, kind='stable')[:n_keep]]
+    if len(np.unique(y[keep])) < 2:
+        # Make sure both classes stay represented
+        for label in np.unique(y[svc.support_]):
+            if label not in y[keep]:
+                keep = np.append(keep, svc.support_[np.argmax(np.where(y[svc.support_] == label, weight, -1))])
+    return clone(svc).fit(X[keep], y[keep])
+
+
+def quantize_keras(model) -> int:
+    """
+    Quantize the kernels (2-D and larger weights) of a Keras model to int8
+    per output unit and load the dequantized values back, so the model
+    scores as its int8 form would.
+
+    Returns:
+        Bytes of the int8 kernels plus the float32 vectors (biases, norms)
+    """
+    n_bytes = 0
+    for layer in model.layers:
+        weights = layer.get_weights()
+        if not weights:
+            continue
+        restored = []
+        for w in weights:
+            if w.ndim >= 2:
+                q, scale = quantize_int8(w, axis=-1)
+                restored.append((q * scale).astype(w.dtype))
+                n_bytes += q.nbytes + scale.nbytes
+            else:
+                restored.append(w)
+                n_bytes += w.astype(np.float32).nbytes
+        layer.set_weights(restored)
+    return n_bytes
+
+
+class CompressedModel(SeizureDetectionModel):
+    """
+    ModelFactory model trained as usual, then compressed (see module docstring).
+
+    FIXES: Detectors had no compact form for wearable or bedside hardware.
+    """
+
+    def __init__(self, base: str = 'logistic', method: str = 'int8', base_params: Dict[str, Any] = None,
+                 n_trees: int = 20, max_depth: int = 8, sv_fraction: float = 0.3,
+                 random_state: int = None):
+        super().__init__(random_state)
+        if base not in COMPRESSION_METHODS.get(method, []):
+            raise ValueError(f"Cannot apply '{method}' to '{base}'. Supported: {COMPRESSION_METHODS}")
+        self.base = base
+        self.method = method
+        self.base_params = base_params
+        self.n_trees = n_trees
+        self.max_depth = max_depth
+        self.sv_fraction = sv_fraction
+        self.base_model = ModelFactory.create_model(base, random_state=self.random_state, **(base_params or {}))
+        self.n_bytes = None
+
+    def fit(self, X: np.ndarray, y: np.ndarray):
+        """Fit the base model, then compress it."""
+        self.base_model.fit(X, y)
+        with profile_stage(f'compress_{self.method}', X):
+            if self.base == 'lstm':
+                self.n_bytes = quantize_keras(self.base_model.model.model)
+                self.model = None
+            else:
+                estimator = self.base_model.model
+                if self.method == 'int8':
+                    self.model = QuantizedLinear.from_estimator(estimator)
+                elif self.method == 'prune':
+                    self.model = prune_forest(estimator, self.n_trees)
+                elif self.method == 'distill':
+                    self.model = distill_forest(estimator, X, self.max_depth, self.random_state)
+                else:
+                    self.model = reduce_support_vectors(estimator, X, y, self.sv_fraction)
+                self.n_bytes = len(pickle.dumps(self.model, protocol=pickle.HIGHEST_PROTOCOL))
+                # Only the compressed estimator is kept
+                self.base_model = None
+        self.is_fitted = True
+        return self
+
+    def _predict_proba(self, X: np.ndarray) -> np.ndarray:
+        if self.model is None:
+            return self.base_model.predict_proba(X)
+        return self.model.predict_proba(X)
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        """Make predictions at decision_threshold (0.5 by default)."""
+        threshold = 0.5 if self.decision_threshold is None else self.decision_threshold
+        return (self.predict_proba(X)[:, 1] >= threshold).astype(int)
+
+    def _export_params(self) -> Tuple[str, Dict[str, np.ndarray]]:
+        if isinstance(self.model, QuantizedLinear):
+            return 'linear_int8', {
+                'coef_q': self.model.coef_q,
+                'coef_scale': np.array([self.model.coef_scale], dtype=np.float32),
+                'intercept': np.array([self.model.intercept])
+            }
+        if self.model is None:
+            raise TypeError("Quantized LSTM models are not exportable as inference artifacts; "
+                            "save the base model's Keras weights instead")
+        return super()._export_params()
+
+
+def model_size(model: SeizureDetectionModel) -> int:
+    """Bytes of a fitted model's parameters (pickled estimator, or Keras weights)."""
+    if isinstance(model, CompressedModel):
+        return model.n_bytes
+    if getattr(model, 'pipeline', None) is not None:
+        return int(sum(w.nbytes for w in model.model.model.get_weights()))
+    return len(pickle.dumps(model.model, protocol=pickle.HIGHEST_PROTOCOL))
+
+
+def single_epoch_latency(fitted: Dict[str, Any], X: np.ndarray, repeats: int = 50) -> float:
+    """
+    Median seconds to preprocess and score one epoch with a validate_model
+    'fitted' dict, single-threaded like the inference runtime.
+    """
+    estimator = getattr(fitted['model'], 'model', None)
+    if hasattr(estimator, 'n_jobs'):
+        estimator.n_jobs = 1
+    epoch = np.asarray(X[:1])
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        features = epoch
+        if fitted['feature_stage'] is not None:
+            features = fitted['feature_stage'].transform(features)
+        fitted['model'].predict_proba(fitted['scaler'].transform(features))
+        timings.append(time.perf_counter() - start)
+    return float(np.median(timings))
+
+
+def compare_compressed(validator, patient_data: Dict, patient_splits: Dict[str, List[str]],
+                       variants: List[Tuple[str, str, Dict]] = None, feature_stage=None,
+                       apply_smote: bool = True, repeats: int = 50) -> 'pd.DataFrame':
+    """
+    Validate compressed variants and their base models on the same split.
+
+    Args:
+        variants: (base, method, params) triples (default DEFAULT_VARIANTS)
+        repeats: Single-epoch scoring runs; the median is reported
+
+    Returns:
+        DataFrame with one row per base model and variant: size in KB,
+        single-epoch latency in ms, test metrics and their change from
+        the base model
+    """
+    import pandas as pd
+
+    metrics = ['precision', 'recall', 'f1', 'specificity', 'auc']
+    X_epoch = patient_data[patient_splits['test'][0]][0]
+    rows, bases = [], {}
+
+    def row(name, method, results):
+        fitted = results['fitted']
+        return dict({'Model': name, 'Method': method,
+                     'Size KB': model_size(fitted['model']) / 1024,
+                     'Latency ms': 1000 * single_epoch_latency(fitted, X_epoch, repeats)},
+                    **{metric: results['test'].get(metric, np.nan) for metric in metrics})
+
+    for base, method, params in variants or DEFAULT_VARIANTS:
+        try:
+            if base not in bases:
+                results = validator.validate_model(
+                    ModelFactory.get_available_models()[base], patient_data, patient_splits,
+                    apply_smote=apply_smote, keep_fitted=True, feature_stage=feature_stage)
+                bases[base] = row(base, 'none', results)
+                rows.append(bases[base])
+            results = validator.validate_model(
+                CompressedModel, patient_data, patient_splits, dict(params, base=base, method=method),
+                apply_smote=apply_smote, keep_fitted=True, feature_stage=feature_stage)
+            compressed = row(base, method, results)
+            compressed['Size ratio'] = compressed['Size KB'] / bases[base]['Size KB']
+            compressed['Speedup'] = bases[base]['Latency ms'] / compressed['Latency ms']
+            compressed.update({f'{metric} delta': compressed[metric] - bases[base][metric]
+                               for metric in metrics})
+            rows.append(compressed)
+        except Exception as e:
+            logger.error(f"Failed to compress {base} with {method}: {e}")
+    return pd.DataFrame(rows)
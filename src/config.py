@@ -24,6 +24,25 @@ class Config:
         'FP1-F7', 'F7-T7', 'T7-P7', 'P7-O1', 'FP1-F3',
         'F3-C3', 'C3-P3', 'P3-O1', 'FP2-F4', 'F4-C4'
     ]
+    # Files whose labels differ (aliases, duplicates, missing channels; see montage.py)
+    MISSING_CHANNEL_STRATEGY = 'reject'  # 'reject' the file or 'zero'-fill the channel
+    MAX_MISSING_CHANNELS = 1            # most zero-filled channels per file
+    DUPLICATE_CHANNEL_STRATEGY = 'first'  # 'first' signal with the label, or 'reject'
+    
+    # Artifact screening of epochs ('drop', 'mask' or None to disable)
+    ARTIFACT_MODE = 'drop'
+    ARTIFACT_MAX_PTP = 2e-3             # volts peak-to-peak (2000 uV)
+    ARTIFACT_MIN_PTP = 1e-6             # volts; flatter channels are disconnected
+    ARTIFACT_FLAT_TOLERANCE = 1e-8      # volts; smaller sample steps count as unchanged
+    ARTIFACT_MAX_FLAT_FRACTION = 0.25   # unchanged samples (flat line or clipping)
+    ARTIFACT_VARIANCE_Z = 6.0           # robust z-score of channel log-variance
+    ARTIFACT_MAX_BAD_CHANNELS = 0       # more bad channels make the epoch bad
+    ARTIFACT_KEEP_SEIZURES = True       # never drop or mask annotated seizure epochs
+
+    # Epoch archives (epoch_archive.py): storage of ingested epochs
+    ARCHIVE_DTYPE = 'float32'           # or 'int16', scaled per block (lossy, ~half the size)
+    ARCHIVE_CHUNK_EPOCHS = 256          # epochs per compressed block
+    ARCHIVE_COMPRESSION_LEVEL = 6       # zlib level
     
     # Model parameters
     RANDOM_STATE = 42
@@ -32,10 +51,64 @@ class Config:
     
     # Cross-validation strategy
     N_FOLDS = 5
+    LOPO_VAL_PATIENTS = 2   # validation patients per leave-one-patient-out fold
     
     # Class imbalance handling
     SMOTE_RATIO = 0.5
     
+    # Interictal subsampling (alternative to SMOTE, see subsampling.py)
+    SUBSAMPLE_NEGATIVE_RATIO = 10   # interictal epochs kept per ictal epoch
+    SUBSAMPLE_TIME_STRATA = 8       # stretches of each recording sampled evenly
+    SUBSAMPLE_HARD_FRACTION = 0.3   # share of the budget mined as hard negatives
+    SUBSAMPLE_HARD_ROUNDS = 3
+    
+    # LSTM prediction model training
+    LSTM_BATCH_SIZE = 32          # Reference batch size for the base learning rate
+    LSTM_CPU_BATCH_SIZE = 256     # Larger batches for CPU training mode
+    LSTM_LEARNING_RATE = 0.001
+    LSTM_WARMUP_EPOCHS = 2
+    LSTM_INTER_OP_THREADS = 2
+    LSTM_JIT_COMPILE = False      # XLA slowed LSTM training on CPU in benchmarks
+
+    # Event-level evaluation (seizure sensitivity, false alarms/hour, latency)
+    ALARM_REFRACTORY_PERIOD = 60   # seconds; closer alarms merge into one event
+    DETECTION_COLLAR = 30          # seconds after seizure end an alarm still counts
+
+    # Cascade detector (linear screen in front of an expensive expert)
+    CASCADE_SCREEN_FEATURES = 256   # columns the screen sees
+    CASCADE_TARGET_RECALL = 0.99    # validation seizure epochs the screen must pass
+
+    # Distillation of the LSTM into a feature model (distillation.py)
+    DISTILLATION_ALPHA = 0.7        # weight of the teacher's probability vs. the label
+
+    # Patient-level bootstrap confidence intervals
+    N_BOOTSTRAP = 2000
+
+    # Validation results kept in memory (older ones stay in the experiment store)
+    RESULTS_HISTORY_SIZE = 20
+
+    # Spatial filtering (SPoC/ICA) feature stage
+    SPATIAL_FILTER_COMPONENTS = 4
+
+    # Shared-spectrogram spectral features (feature set 'spectral')
+    SPECTRAL_WINDOW = 2.0   # seconds per sub-window FFT
+    SPECTRAL_HOP = 1.0      # seconds between sub-windows; divides the epoch step
+    SPECTRAL_BANDS = {
+        'delta': (0.5, 4), 'theta': (4, 8), 'alpha': (8, 13), 'beta': (13, 30), 'gamma': (30, 32)
+    }
+
+    # Stage timing/memory instrumentation in validation results
+    PROFILE_STAGES = False
+
+    # Incremental model updates from confirmed annotations
+    INCREMENTAL_KNN_MAX_SAMPLES = 100000  # epochs kept in the KNN index
+
+    # Multi-stream detection server
+    SERVING_MAX_BATCH_SIZE = 64    # epochs per predict_proba call
+    SERVING_MAX_LATENCY = 0.05     # seconds an epoch may wait for its batch to fill
+    SERVING_PORT = 8765
+    SERVING_STATS_WINDOW = 100000  # latest epochs/batches kept for the latency statistics
+
     @classmethod
     def create_directories(cls):
         """Create necessary directories if they don't exist."""
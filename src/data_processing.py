@@ -1,33 +1,89 @@
 """
 Robust EEG data processing pipeline for seizure detection.
 Fixes critical issues in original implementation.
+
+MNE is optional and only imported when an EDF file is read.
 """
 import logging
 import numpy as np
-import pandas as pd
 from pathlib import Path
 from typing import List, Tuple, Dict, Optional
-from collections import Counter
 import warnings
 
 try:
+    from .artifacts import ArtifactRejector, merge_summaries
     from .config import Config
+    from .epoch_archive import EpochArchiveWriter
+    from .montage import ChannelMapping, MontageIndex
+    from .profiling import profile_stage
 except ImportError:
+    from artifacts import ArtifactRejector, merge_summaries
     from config import Config
-
-# Optional MNE import for EEG processing
-try:
-    import mne
-    # Suppress MNE warnings for cleaner output
-    warnings.filterwarnings('ignore', category=RuntimeWarning)
-    mne.set_log_level('ERROR')
-    MNE_AVAILABLE = True
-except ImportError:
-    MNE_AVAILABLE = False
-    mne = None
+    from epoch_archive import EpochArchiveWriter
+    from montage import ChannelMapping, MontageIndex
+    from profiling import profile_stage
 
 logger = logging.getLogger(__name__)
 
+_mne = None
+
+
+def _import_mne():
+    """Import MNE on first use and configure its logging."""
+    global _mne
+    if _mne is None:
+        try:
+            import mne
+        except ImportError:
+            raise ImportError("MNE library is required for EEG file processing. Install with: pip install mne")
+        # Suppress MNE warnings for cleaner output
+        warnings.filterwarnings('ignore', category=RuntimeWarning)
+        mne.set_log_level('ERROR')
+        _mne = mne
+    return _mne
+
+
+def __getattr__(name):
+    # MNE_AVAILABLE is resolved lazily so importing this module never loads MNE
+    if name == 'MNE_AVAILABLE':
+        import importlib.util
+        return _mne is not None or importlib.util.find_spec('mne') is not None
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def load_edf_channels(edf_file: Path, mapping: ChannelMapping, sfreq: float = None) -> Tuple[np.ndarray, float]:
+    """
+    Read the mapped channels of an EDF file in the selected order.
+
+    Only the mapped signals are decoded; missing channels (MISSING_CHANNEL_
+    STRATEGY 'zero') are zero rows.
+
+    Args:
+        edf_file: Path to the EDF file
+        mapping: Compatible mapping from MontageIndex
+        sfreq: Resample to this rate (None: keep the file's rate)
+
+    Returns:
+        (data of shape (n_selected, n_samples), duration in seconds)
+    """
+    if not mapping.compatible:
+        raise ValueError(f"{mapping.file} is incompatible: {mapping.reason}")
+    mne = _import_mne()
+    raw = mne.io.read_raw_edf(str(edf_file), preload=False, verbose=False)
+    picks = [raw.ch_names[i] for i in mapping.indices if i >= 0]
+    raw.pick(picks)
+    raw.reorder_channels(picks)
+    raw.load_data()
+    if sfreq:
+        raw.resample(sfreq)
+    present = raw.get_data()
+    if len(picks) == len(mapping.indices):
+        return present, raw.times[-1]
+    data = np.zeros((len(mapping.indices), present.shape[1]), dtype=present.dtype)
+    data[[k for k, i in enumerate(mapping.indices) if i >= 0]] = present
+    return data, raw.times[-1]
+
+
 class CHBMITDataProcessor:
     """
     Robust processor for CHB-MIT database that fixes critical issues:
@@ -40,6 +96,16 @@ class CHBMITDataProcessor:
     def __init__(self, data_root: str = None):
         self.data_root = Path(data_root) if data_root else Path(Config.DATA_ROOT)
         self.config = Config()
+        # Screens each file's epochs before they are stored (None: disabled)
+        self.artifact_rejector = ArtifactRejector() if self.config.ARTIFACT_MODE else None
+        # Header-only channel mappings; incompatible files are skipped unread
+        self.montage_index = MontageIndex(self.config.SELECTED_CHANNELS)
+        
+    def discover_patients(self) -> List[str]:
+        """List patient directories (e.g. 'chb01') under the data root."""
+        if not self.data_root.exists():
+            raise FileNotFoundError(f"Data root not found: {self.data_root}")
+        return sorted(p.name for p in self.data_root.glob('chb*') if p.is_dir())
         
     def get_patient_files(self, patient_id: str) -> Dict[str, any]:
         """
@@ -131,17 +197,33 @@ class CHBMITDataProcessor:
         all_epochs = []
         all_labels = []
         file_metadata = []
+        # Files are laid end to end on one patient timeline for event-level evaluation
+        all_times = []
+        seizure_intervals = []
+        offset = 0.0
+        
+        with profile_stage('scan_headers'):
+            mappings = self.montage_index.scan(patient_info['edf_files'])
         
         for edf_file in patient_info['edf_files']:
+            if not mappings[edf_file.name].compatible:
+                continue
             try:
-                epochs, labels, metadata = self._process_single_file(
-                    edf_file, patient_info['seizures']
-                )
+                with profile_stage('process_file'):
+                    epochs, labels, metadata = self._process_single_file(
+                        edf_file, patient_info['seizures'], mappings[edf_file.name]
+                    )
                 
                 if epochs is not None and len(epochs) > 0:
                     all_epochs.extend(epochs)
                     all_labels.extend(labels)
                     file_metadata.append(metadata)
+                    all_times.append(metadata['epoch_times'] + offset)
+                    seizure_intervals.extend(
+                        (s['start_time'] + offset, s['end_time'] + offset)
+                        for s in patient_info['seizures'] if s['file'] == edf_file.name
+                    )
+                    offset += metadata['duration']
                     
             except Exception as e:
                 logger.warning(f"Failed to process {edf_file}: {e}")
@@ -150,8 +232,10 @@ class CHBMITDataProcessor:
         if not all_epochs:
             raise ValueError(f"No valid epochs found for patient {patient_id}")
             
-        epochs_array = np.array(all_epochs)
-        labels_array = np.array(all_labels)
+        with profile_stage('stack') as stage:
+            epochs_array = np.array(all_epochs)
+            labels_array = np.array(all_labels)
+            stage.record_arrays(epochs_array)
         
         # Validate epoch-label alignment
         assert len(epochs_array) == len(labels_array), \
@@ -162,7 +246,11 @@ class CHBMITDataProcessor:
             'total_epochs': len(epochs_array),
             'seizure_epochs': np.sum(labels_array),
             'files_processed': len(file_metadata),
-            'file_details': file_metadata
+            'files_rejected': {m.file: m.reason for m in mappings.values() if not m.compatible},
+            'file_details': file_metadata,
+            'artifact_rejection': merge_summaries(f.get('artifact_rejection') for f in file_metadata),
+            'epoch_times': np.concatenate(all_times),
+            'seizure_intervals': np.array(seizure_intervals, dtype=np.float64).reshape(-1, 2)
         }
         
         logger.info(f"Patient {patient_id}: {len(epochs_array)} epochs, "
@@ -170,31 +258,60 @@ class CHBMITDataProcessor:
         
         return epochs_array, labels_array, metadata
     
-    def _process_single_file(self, edf_file: Path, patient_seizures: List[Dict]) -> Tuple[List, List, Dict]:
+    def write_epochs(self, writer: EpochArchiveWriter, patient_id: str, epochs: np.ndarray,
+                     labels: np.ndarray, metadata: Dict):
+        """
+        Append one patient's processed epochs to an epoch archive, indexed
+        by recording file and time within the file.
+        """
+        files = metadata.get('file_details') or [{'filename': '', 'total_epochs': len(epochs)}]
+        start = 0
+        for details in files:
+            stop = start + details['total_epochs']
+            writer.append(epochs[start:stop], labels[start:stop], details.get('epoch_times'),
+                          patient=patient_id, file=details['filename'])
+            start = stop
+    
+    def write_archive(self, patient_ids: List[str], path: Path, dtype: str = None) -> Path:
+        """
+        Process patients into one epoch archive (see epoch_archive.py).
+        
+        Patients that fail are logged and skipped.
+        """
+        with EpochArchiveWriter(path, dtype=dtype, sfreq=self.config.TARGET_SAMPLING_RATE,
+                                channels=self.config.SELECTED_CHANNELS) as writer:
+            for patient_id in patient_ids:
+                try:
+                    epochs, labels, metadata = self.process_patient_data(patient_id)
+                except Exception as e:
+                    logger.warning(f"Failed to process {patient_id}: {e}")
+                    continue
+                with profile_stage('write_archive', epochs):
+                    self.write_epochs(writer, patient_id, epochs, labels, metadata)
+        return Path(path)
+    
+    def _process_single_file(self, edf_file: Path, patient_seizures: List[Dict],
+                             mapping: ChannelMapping = None) -> Tuple[List, List, Dict]:
         """
         Process a single EDF file with correct temporal alignment.
         
         FIXES: Proper epoch timing calculation
+        
+        Args:
+            mapping: Channel mapping from the montage index (scanned from
+                the header if not given)
         """
-        if not MNE_AVAILABLE:
-            raise ImportError("MNE library is required for EEG file processing. Install with: pip install mne")
+        if mapping is None:
+            mapping = self.montage_index.mapping(edf_file)
+        if not mapping.compatible:
+            logger.warning(f"Skipping {edf_file.name}: {mapping.reason}")
+            return None, None, None
             
         try:
-            # Load raw data
-            raw = mne.io.read_raw_edf(str(edf_file), preload=True, verbose=False)
-            
-            # Check if required channels exist
-            available_channels = set(raw.ch_names)
-            required_channels = set(self.config.SELECTED_CHANNELS)
-            
-            missing_channels = required_channels - available_channels
-            if missing_channels:
-                logger.warning(f"Missing channels in {edf_file.name}: {missing_channels}")
-                return None, None, None
-                
-            # Select channels and resample
-            raw.pick_channels(self.config.SELECTED_CHANNELS)
-            raw.resample(self.config.TARGET_SAMPLING_RATE)
+            # Load the mapped channels in the selected order and resample
+            with profile_stage('read_edf'):
+                data, total_duration = load_edf_channels(edf_file, mapping,
+                                                         self.config.TARGET_SAMPLING_RATE)
             
             # Create epochs with proper timing
             epoch_duration = self.config.EPOCH_LENGTH
@@ -204,35 +321,50 @@ class CHBMITDataProcessor:
             epochs_data = []
             epoch_times = []
             
-            total_duration = raw.times[-1]  # Total recording duration in seconds
-            
-            current_time = 0
-            while current_time + epoch_duration <= total_duration:
-                # Extract epoch data
-                start_sample = int(current_time * self.config.TARGET_SAMPLING_RATE)
-                end_sample = int((current_time + epoch_duration) * self.config.TARGET_SAMPLING_RATE)
-                
-                epoch_data = raw.get_data()[:, start_sample:end_sample]
-                epochs_data.append(epoch_data)
-                epoch_times.append((current_time, current_time + epoch_duration))
-                
-                current_time += step_size
+            with profile_stage('epoching') as stage:
+                current_time = 0
+                while current_time + epoch_duration <= total_duration:
+                    # Extract epoch data
+                    start_sample = int(current_time * self.config.TARGET_SAMPLING_RATE)
+                    end_sample = int((current_time + epoch_duration) * self.config.TARGET_SAMPLING_RATE)
+                    
+                    epoch_data = data[:, start_sample:end_sample]
+                    epochs_data.append(epoch_data)
+                    epoch_times.append((current_time, current_time + epoch_duration))
+                    
+                    current_time += step_size
+                stage.record_arrays(*epochs_data)
             
             # Create labels with CORRECT temporal alignment
-            labels = self._create_labels_for_file(
-                edf_file.name, epoch_times, patient_seizures
-            )
+            with profile_stage('labels'):
+                labels = self._create_labels_for_file(
+                    edf_file.name, epoch_times, patient_seizures
+                )
             
             # Validate alignment
             assert len(epochs_data) == len(labels), \
                 f"Epoch-label mismatch in {edf_file.name}: {len(epochs_data)} vs {len(labels)}"
             
+            rejection = None
+            if self.artifact_rejector is not None and epochs_data:
+                protect = np.asarray(labels, dtype=bool) if self.config.ARTIFACT_KEEP_SEIZURES else None
+                screened, keep, rejection = self.artifact_rejector.apply(np.asarray(epochs_data), protect)
+                epochs_data = list(screened)
+                epoch_times = [t for t, k in zip(epoch_times, keep) if k]
+                labels = [label for label, k in zip(labels, keep) if k]
+                if rejection['n_rejected']:
+                    logger.info(f"{edf_file.name}: rejected {rejection['n_rejected']}/"
+                                f"{rejection['n_screened']} epochs with artifacts")
+            
             metadata = {
                 'filename': edf_file.name,
                 'total_epochs': len(epochs_data),
                 'seizure_epochs': sum(labels),
                 'duration': total_duration,
-                'channels': raw.ch_names
+                'channels': list(self.config.SELECTED_CHANNELS),
+                'montage': mapping.summary(),
+                'epoch_times': np.array(epoch_times, dtype=np.float64).reshape(-1, 2),
+                'artifact_rejection': rejection
             }
             
             return epochs_data, labels, metadata
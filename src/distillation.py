@@ -0,0 +1,210 @@
+"""
+Knowledge distillation of the BiLSTM detector into a fast feature model.
+
+The BiLSTM (LSTMSeizureDetector) is the most accurate detector but too
+slow to run on every stream. DistilledModel trains it (or takes an already
+fitted one), scores a transfer set with it and fits a compact ModelFactory
+student on the soft targets:
+    transfer set  the training epochs, whose target blends the teacher's
+                  probability with the label (alpha * p + (1 - alpha) * y),
+                  plus any unlabeled epochs passed to fit(unlabeled=...)
+                  (teacher probability only); the validation patients are
+                  never part of it, so validation metrics and threshold
+                  tuning stay unbiased
+    student       any ModelFactory model whose estimator takes
+                  sample_weight, fitted on every epoch twice, as a seizure
+                  with weight target and as interictal with 1 - target
+                  (hard teacher labels otherwise, e.g. KNN)
+    features      the LSTM's engineered per-channel log-variance and line
+                  length (prediction.epoch_features), standardized, or the
+                  model inputs unchanged (student_features='raw')
+
+As a model class it runs through validate_model on the usual patient
+splits; compare_distilled() validates teacher and student on the same
+split and reports accuracy retention against inference speedup.
+
+Only numpy is required; TensorFlow and scikit-learn are imported by the
+models.
+"""
+import inspect
+import logging
+import pickle
+import time
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+try:
+    from .config import Config
+    from .models import ModelFactory, SeizureDetectionModel
+    from .prediction import epoch_features
+    from .profiling import profile_stage
+except ImportError:
+    from config import Config
+    from models import ModelFactory, SeizureDetectionModel
+    from prediction import epoch_features
+    from profiling import profile_stage
+
+logger = logging.getLogger(__name__)
+
+STUDENT_FEATURES = ['epoch', 'raw']
+
+
+def soft_fit(estimator, X: np.ndarray, target: np.ndarray):
+    """
+    Fit a binary classifier to probabilities: every row once per class,
+    weighted by its target probability.
+    """
+    parameters = inspect.signature(estimator.fit).parameters.values()
+    if not any(p.name == 'sample_weight' or p.kind == p.VAR_KEYWORD for p in parameters):
+        logger.warning(f"{type(estimator).__name__} takes no sample_weight, fitting hard teacher labels")
+        return estimator.fit(X, (target >= 0.5).astype(int))
+    return estimator.fit(np.concatenate([X, X]),
+                         np.concatenate([np.ones(len(X), dtype=int), np.zeros(len(X), dtype=int)]),
+                         sample_weight=np.concatenate([target, 1 - target]))
+
+
+class DistilledModel(SeizureDetectionModel):
+    """
+    Student model fitted to a teacher's soft predictions (see module docstring).
+
+    FIXES: The BiLSTM could not run on every stream at low cost.
+    """
+
+    def __init__(self, student: str = 'logistic', student_params: Dict[str, Any] = None,
+                 teacher: str = 'lstm', teacher_params: Dict[str, Any] = None, teacher_model=None,
+                 alpha: float = None, student_features: str = 'epoch', n_channels: int = None, random_state: int = None):
+        super().__init__(random_state)
+        if student_features not in STUDENT_FEATURES:
+            raise ValueError(f"Unknown student features '{student_features}'. Available: {STUDENT_FEATURES}")
+        self.student = student
+        self.student_params = student_params
+        self.teacher = teacher
+        self.teacher_params = teacher_params
+        self.teacher_model = teacher_model
+        self.alpha = Config.DISTILLATION_ALPHA if alpha is None else alpha
+        self.student_features = student_features
+        self.n_channels = n_channels or len(Config.SELECTED_CHANNELS)
+        self.student_model = ModelFactory.create_model(student, random_state=self.random_state,
+                                                       **(student_params or {}))
+        self.model = self.student_model.model
+
+    def features(self, X: np.ndarray) -> np.ndarray:
+        """Student inputs of model inputs X."""
+        X = np.asarray(X)
+        if self.student_features == 'raw':
+            return X
+        return (epoch_features(X, self.n_channels) - self.feature_mean_) / self.feature_scale_
+
+    def fit(self, X: np.ndarray, y: np.ndarray, unlabeled: np.ndarray = None):
+        """
+        Fit the teacher (unless a fitted teacher_model was given), then the
+        student on its soft targets.
+
+        Args:
+            unlabeled: Model inputs of extra unlabeled epochs (e.g.
+                unannotated recordings of the training patients) for the
+                transfer set; never the validation split
+        """
+        y = np.asarray(y, dtype=np.float64)
+        teacher = self.teacher_model
+        if teacher is None:
+            teacher = ModelFactory.create_model(self.teacher, random_state=self.random_state,
+                                                **(self.teacher_params or {}))
+            teacher.fit(X, y.astype(int))
+
+        with profile_stage('distill_targets', X):
+            target = self.alpha * teacher.predict_proba(X)[:, 1] + (1 - self.alpha) * y
+            transfer = [np.asarray(X)]
+            if unlabeled is not None and len(unlabeled):
+                transfer.append(np.asarray(unlabeled))
+                target = np.concatenate([target, teacher.predict_proba(unlabeled)[:, 1]])
+            X_transfer = np.concatenate(transfer) if len(transfer) > 1 else transfer[0]
+
+        if self.student_features == 'epoch':
+            raw = epoch_features(X_transfer, self.n_channels)
+            self.feature_mean_ = raw.mean(axis=0)
+            std = raw.std(axis=0)
+            self.feature_scale_ = np.where(std > 0, std, 1.0).astype(np.float32)
+        with profile_stage(f'{type(self).__name__}.fit', X_transfer):
+            soft_fit(self.model, self.features(X_transfer), np.clip(target, 0.0, 1.0))
+        self.n_transfer_ = len(X_transfer)
+        # The teacher is only needed for training
+        self.teacher_model = None
+        self.student_model.is_fitted = True
+        self.is_fitted = True
+        return self
+
+    def _predict_proba(self, X: np.ndarray) -> np.ndarray:
+        return self.model.predict_proba(self.features(X))
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        """Make predictions at decision_threshold (0.5 by default)."""
+        threshold = 0.5 if self.decision_threshold is None else self.decision_threshold
+        return (self.predict_proba(X)[:, 1] >= threshold).astype(int)
+
+    def _export_params(self) -> Tuple[str, Dict[str, np.ndarray]]:
+        if self.student_features == 'raw':
+            return self.student_model._export_params()
+        # The student needs its feature extraction: pickle the whole model
+        payload = pickle.dumps(self, protocol=pickle.HIGHEST_PROTOCOL)
+        return 'pickle', {'estimator': np.frombuffer(payload, dtype=np.uint8)}
+
+
+def _throughput(model, X: np.ndarray, repeats: int = 3) -> Dict[str, float]:
+    """Median batch and single-epoch scoring times of a fitted model."""
+    single, batch = [], []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        model.predict_proba(X[:1])
+        single.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        model.predict_proba(X)
+        batch.append(time.perf_counter() - start)
+    return {'latency_ms': 1000 * float(np.median(single)),
+            'epochs_per_second': len(X) / max(float(np.median(batch)), 1e-9)}
+
+
+def compare_distilled(validator, patient_data: Dict, patient_splits: Dict[str, List[str]],
+                      students: List[str] = None, teacher_params: Dict = None,
+                      apply_smote: bool = True, repeats: int = 3) -> 'pd.DataFrame':
+    """
+    Validate the LSTM teacher and students distilled from it on one split.
+
+    The teacher is fitted once and handed to every student, so all of them
+    learn from the same soft targets.
+
+    Returns:
+        DataFrame with one row per model: test metrics, single-epoch
+        latency, batch throughput, and for students the retention of the
+        teacher's F1/AUC and the speedup over it
+    """
+    import pandas as pd
+
+    metrics = ['precision', 'recall', 'f1', 'specificity', 'auc']
+    teacher_results = validator.validate_model(
+        ModelFactory.get_available_models()['lstm'], patient_data, patient_splits, teacher_params,
+        apply_smote=apply_smote, keep_fitted=True)
+    teacher = teacher_results['fitted']['model']
+    X_test = teacher_results['fitted']['scaler'].transform(
+        np.concatenate([patient_data[p][0] for p in patient_splits['test']]))
+
+    def row(name, results, model):
+        return dict({'Model': name}, **{metric: results['test'].get(metric, np.nan) for metric in metrics},
+                    **_throughput(model, X_test, repeats))
+
+    rows = [row('lstm (teacher)', teacher_results, teacher)]
+    for student in students or ['logistic', 'gradient_boosting']:
+        try:
+            results = validator.validate_model(
+                DistilledModel, patient_data, patient_splits,
+                {'student': student, 'teacher_model': teacher, 'n_channels': teacher.n_channels},
+                apply_smote=apply_smote, keep_fitted=True)
+            student_row = row(f'{student} (student)', results, results['fitted']['model'])
+            for metric in ['f1', 'auc']:
+                student_row[f'{metric} retention'] = student_row[metric] / rows[0][metric]
+            student_row['speedup'] = student_row['epochs_per_second'] / rows[0]['epochs_per_second']
+            rows.append(student_row)
+        except Exception as e:
+            logger.error(f"Failed to distill into {student}: {e}")
+    return pd.DataFrame(rows)
@@ -0,0 +1,352 @@
+"""
+Chunked, compressed on-disk archive of EEG epochs.
+
+Pickling (n_epochs, n_channels, n_times) float64 arrays (or the notebook's
+MNE Epochs pickles) stores 8 bytes per sample and must be read back whole.
+An epoch archive is a directory
+
+    manifest.json   format version, shape, storage dtype, chunking
+    index.npz       one row per epoch: patient, file, start/end time in
+                    the file and label; plus the block table
+    data.bin        zlib-compressed blocks, one per chunk of
+                    Config.ARCHIVE_CHUNK_EPOCHS epochs and channel
+
+Samples are stored as float32, or as int16 scaled per block (lossy,
+Config.ARCHIVE_DTYPE = 'int16'; first-differenced along time, which
+compresses EEG well). Block bytes are shuffled (all first bytes, then all
+second bytes, ...) before compression. Any range of epochs and channels is
+read by decompressing only the blocks it touches. Reads return float32.
+Only numpy and the standard library are required.
+"""
+import json
+import logging
+import os
+import shutil
+import zlib
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+try:
+    from .config import Config
+    from .profiling import profile_stage
+except ImportError:
+    from config import Config
+    from profiling import profile_stage
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_VERSION = 1
+
+ARCHIVE_DTYPES = ['float32', 'int16']
+
+_INT16_MAX = np.iinfo(np.int16).max
+
+
+def _shuffle(values: np.ndarray) -> bytes:
+    """Bytes of values grouped by byte position (compresses better than interleaved)."""
+    raw = values.view(np.uint8).reshape(-1, values.dtype.itemsize)
+    return np.ascontiguousarray(raw.T).tobytes()
+
+
+def _unshuffle(data: bytes, dtype: np.dtype, shape: Tuple[int, ...]) -> np.ndarray:
+    raw = np.frombuffer(data, dtype=np.uint8).reshape(np.dtype(dtype).itemsize, -1)
+    return np.ascontiguousarray(raw.T).view(dtype).reshape(shape)
+
+
+def encode_block(block: np.ndarray, dtype: str, level: int) -> Tuple[bytes, float]:
+    """
+    Compress one (n_epochs, n_times) block of a channel.
+
+    Returns:
+        (compressed bytes, scale); the scale converts int16 back to volts
+        and is 1 for float32 blocks
+    """
+    if dtype == 'float32':
+        return zlib.compress(_shuffle(block.astype('<f4')), level), 1.0
+    peak = float(np.max(np.abs(block))) if block.size else 0.0
+    scale = peak / _INT16_MAX if peak > 0 else 1.0
+    quantized = np.round(block / scale).astype('<i2')
+    # Differences of int16 wrap around and are undone exactly by cumsum in int16
+    delta = np.diff(quantized, axis=-1, prepend=np.zeros((len(block), 1), dtype='<i2'))
+    return zlib.compress(_shuffle(delta.astype('<i2')), level), scale
+
+
+def decode_block(data: bytes, dtype: str, scale: float, shape: Tuple[int, int]) -> np.ndarray:
+    """Inverse of encode_block, as float32."""
+    if dtype == 'float32':
+        return _unshuffle(zlib.decompress(data), '<f4', shape)
+    quantized = np.cumsum(_unshuffle(zlib.decompress(data), '<i2', shape), axis=-1, dtype=np.int16)
+    return quantized.astype(np.float32) * np.float32(scale)
+
+
+class EpochArchiveWriter:
+    """
+    Writes an epoch archive, appending epochs file by file.
+
+    The archive is built in '<path>.tmp' and renamed on close(), so an
+    interrupted write never leaves an archive that looks complete. Use as a
+    context manager.
+    """
+
+    def __init__(self, path: Path, dtype: str = None, chunk_epochs: int = None,
+                 level: int = None, sfreq: float = None, channels: Sequence[str] = None):
+        self.path = Path(path)
+        self.dtype = dtype or Config.ARCHIVE_DTYPE
+        if self.dtype not in ARCHIVE_DTYPES:
+            raise ValueError(f"Unknown archive dtype '{self.dtype}'. Available: {ARCHIVE_DTYPES}")
+        self.chunk_epochs = chunk_epochs or Config.ARCHIVE_CHUNK_EPOCHS
+        self.level = Config.ARCHIVE_COMPRESSION_LEVEL if level is None else level
+        self.sfreq = sfreq
+        self.channels = list(channels) if channels is not None else None
+
+        self._tmp = self.path.with_name(self.path.name + '.tmp')
+        if self._tmp.exists():
+            shutil.rmtree(self._tmp)
+        self._tmp.mkdir(parents=True)
+        self._data = open(self._tmp / 'data.bin', 'wb')
+        self._shape: Optional[Tuple[int, int]] = None
+        self._pending: List[np.ndarray] = []
+        self._n_pending = 0
+        self._blocks: Dict[str, List] = {'offsets': [], 'lengths': [], 'scales': []}
+        self._rows: Dict[str, List] = {'patient': [], 'file': [], 'start': [], 'end': [], 'label': []}
+
+    def append(self, epochs: np.ndarray, labels: Sequence[int] = None, times: np.ndarray = None,
+               patient: str = '', file: str = ''):
+        """
+        Add epochs of one recording.
+
+        Args:
+            epochs: Array of shape (n_epochs, n_channels, n_times)
+            labels: Per-epoch labels (default 0)
+            times: (n_epochs, 2) start/end times in seconds within the file
+            patient, file: Identifiers for the row index
+        """
+        epochs = np.asarray(epochs)
+        if epochs.ndim != 3:
+            raise ValueError(f"Expected (n_epochs, n_channels, n_times) epochs, got shape {epochs.shape}")
+        if self._shape is None:
+            self._shape = epochs.shape[1:]
+        elif epochs.shape[1:] != self._shape:
+            raise ValueError(f"Epoch shape {epochs.shape[1:]} differs from the archive's {self._shape}")
+        n = len(epochs)
+        times = np.full((n, 2), np.nan) if times is None else np.asarray(times, dtype=np.float64).reshape(n, 2)
+        self._rows['patient'].extend([patient] * n)
+        self._rows['file'].extend([file] * n)
+        self._rows['start'].extend(times[:, 0])
+        self._rows['end'].extend(times[:, 1])
+        self._rows['label'].extend(np.zeros(n, dtype=int) if labels is None else np.asarray(labels))
+
+        self._pending.append(epochs)
+        self._n_pending += n
+        while self._n_pending >= self.chunk_epochs:
+            self._flush(self.chunk_epochs)
+        # Keep a copy of the remainder, not a view of the caller's array
+        self._pending = [np.array(p) for p in self._pending]
+
+    def _flush(self, n: int):
+        """Compress the first n pending epochs as one chunk."""
+        pending = np.concatenate(self._pending) if len(self._pending) > 1 else self._pending[0]
+        chunk, rest = pending[:n], pending[n:]
+        self._pending = [rest] if len(rest) else []
+        self._n_pending = len(rest)
+
+        offsets, lengths, scales = [], [], []
+        for channel in range(chunk.shape[1]):
+            data, scale = encode_block(chunk[:, channel], self.dtype, self.level)
+            offsets.append(self._data.tell())
+            lengths.append(len(data))
+            scales.append(scale)
+            self._data.write(data)
+        self._blocks['offsets'].append(offsets)
+        self._blocks['lengths'].append(lengths)
+        self._blocks['scales'].append(scales)
+
+    def close(self) -> Path:
+        """Write the remaining epochs and the index, and move the archive into place."""
+        if self._n_pending:
+            self._flush(self._n_pending)
+        self._data.close()
+        n_channels, n_times = self._shape or (0, 0)
+        n_chunks = len(self._blocks['offsets'])
+
+        np.savez(self._tmp / 'index.npz',
+                 patient=np.array(self._rows['patient'], dtype=str),
+                 file_name=np.array(self._rows['file'], dtype=str),
+                 start=np.array(self._rows['start'], dtype=np.float64),
+                 end=np.array(self._rows['end'], dtype=np.float64),
+                 label=np.array(self._rows['label'], dtype=np.int8),
+                 offsets=np.array(self._blocks['offsets'], dtype=np.int64).reshape(n_chunks, n_channels),
+                 lengths=np.array(self._blocks['lengths'], dtype=np.int64).reshape(n_chunks, n_channels),
+                 scales=np.array(self._blocks['scales'], dtype=np.float64).reshape(n_chunks, n_channels))
+        with open(self._tmp / 'manifest.json', 'w') as f:
+            json.dump({'version': ARCHIVE_VERSION, 'dtype': self.dtype,
+                       'n_epochs': len(self._rows['label']), 'n_channels': n_channels,
+                       'n_times': n_times, 'chunk_epochs': self.chunk_epochs,
+                       'sfreq': self.sfreq, 'channels': self.channels}, f, indent=2)
+
+        if self.path.exists():
+            shutil.rmtree(self.path)
+        os.replace(self._tmp, self.path)
+        return self.path
+
+    def abort(self):
+        """Discard a partially written archive."""
+        self._data.close()
+        shutil.rmtree(self._tmp, ignore_errors=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+class EpochArchive:
+    """
+    Random-access reader of an epoch archive.
+
+    The row index is loaded on open; sample blocks are read and
+    decompressed on demand. The most recently decompressed chunk is kept,
+    so reading consecutive small ranges decompresses each chunk once.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        with open(self.path / 'manifest.json', 'r') as f:
+            self.manifest = json.load(f)
+        if self.manifest.get('version') != ARCHIVE_VERSION:
+            raise ValueError(f"Unsupported epoch archive version {self.manifest.get('version')} "
+                             f"in {self.path}")
+        with np.load(self.path / 'index.npz') as index:
+            self.index = {key: index[key] for key in index.files}
+        self.dtype = self.manifest['dtype']
+        self.chunk_epochs = self.manifest['chunk_epochs']
+        self._data = open(self.path / 'data.bin', 'rb')
+        self._cached: Tuple[Optional[int], Dict[int, np.ndarray]] = (None, {})
+
+    # ------------------------------------------------------------------ index
+    def __len__(self) -> int:
+        return self.manifest['n_epochs']
+
+    @property
+    def shape(self) -> Tuple[int, int, int]:
+        return len(self), self.manifest['n_channels'], self.manifest['n_times']
+
+    @property
+    def labels(self) -> np.ndarray:
+        return self.index['label'].astype(int)
+
+    @property
+    def times(self) -> np.ndarray:
+        """(n_epochs, 2) start/end times within each epoch's file."""
+        return np.column_stack([self.index['start'], self.index['end']])
+
+    def patients(self) -> List[str]:
+        """Patient ids in archive order."""
+        return list(dict.fromkeys(self.index['patient'].tolist()))
+
+    def rows(self, patient: str = None, file: str = None, start_time: float = None,
+             end_time: float = None) -> np.ndarray:
+        """Indices of epochs matching all given conditions (times within the file)."""
+        mask = np.ones(len(self), dtype=bool)
+        if patient is not None:
+            mask &= self.index['patient'] == patient
+        if file is not None:
+            mask &= self.index['file_name'] == file
+        if start_time is not None:
+            mask &= self.index['end'] > start_time
+        if end_time is not None:
+            mask &= self.index['start'] < end_time
+        return np.flatnonzero(mask)
+
+    # ------------------------------------------------------------------ data
+    def _chunk(self, chunk: int, channels: Sequence[int]) -> Dict[int, np.ndarray]:
+        """Decompressed blocks of one chunk for the given channels."""
+        cached_chunk, blocks = self._cached
+        if cached_chunk != chunk:
+            blocks = {}
+        needed = [c for c in channels if c not in blocks]
+        if needed:
+            offsets = self.index['offsets'][chunk]
+            lengths = self.index['lengths'][chunk]
+            n_rows = min(self.chunk_epochs, len(self) - chunk * self.chunk_epochs)
+            shape = (n_rows, self.manifest['n_times'])
+            # Blocks of a chunk are contiguous: read the span once
+            start = int(offsets[min(needed)])
+            self._data.seek(start)
+            span = self._data.read(int(offsets[max(needed)] + lengths[max(needed)]) - start)
+            for c in needed:
+                data = span[offsets[c] - start:offsets[c] - start + lengths[c]]
+                blocks[c] = decode_block(data, self.dtype, self.index['scales'][chunk, c], shape)
+        self._cached = (chunk, blocks)
+        return blocks
+
+    def read(self, start: int = 0, stop: int = None, channels: Sequence[int] = None) -> np.ndarray:
+        """
+        Epochs start..stop (float32, shape (n, n_channels, n_times)),
+        decompressing only the chunks and channels they touch.
+        """
+        stop = len(self) if stop is None else min(stop, len(self))
+        channels = list(range(self.manifest['n_channels'])) if channels is None else list(channels)
+        out = np.empty((max(stop - start, 0), len(channels), self.manifest['n_times']), dtype=np.float32)
+        if stop <= start:
+            return out
+        with profile_stage('archive_read') as stage:
+            for chunk in range(start // self.chunk_epochs, (stop - 1) // self.chunk_epochs + 1):
+                first = chunk * self.chunk_epochs
+                lo, hi = max(start, first), min(stop, first + self.chunk_epochs)
+                blocks = self._chunk(chunk, channels)
+                for k, c in enumerate(channels):
+                    out[lo - start:hi - start, k] = blocks[c][lo - first:hi - first]
+            stage.record_arrays(out)
+        return out
+
+    def take(self, rows: Sequence[int], channels: Sequence[int] = None) -> np.ndarray:
+        """Epochs at arbitrary row indices, in the given order."""
+        rows = np.asarray(rows, dtype=np.int64)
+        channels = list(range(self.manifest['n_channels'])) if channels is None else list(channels)
+        out = np.empty((len(rows), len(channels), self.manifest['n_times']), dtype=np.float32)
+        chunks = rows // self.chunk_epochs
+        for chunk in np.unique(chunks):
+            selected = np.flatnonzero(chunks == chunk)
+            blocks = self._chunk(int(chunk), channels)
+            local = rows[selected] - chunk * self.chunk_epochs
+            for k, c in enumerate(channels):
+                out[selected, k] = blocks[c][local]
+        return out
+
+    def __getitem__(self, item: Union[int, slice]) -> np.ndarray:
+        if isinstance(item, slice):
+            start, stop, step = item.indices(len(self))
+            epochs = self.read(start, stop)
+            return epochs[::step] if step != 1 else epochs
+        if item < 0:
+            item += len(self)
+        if not 0 <= item < len(self):
+            raise IndexError(f"epoch {item} out of range for archive of {len(self)}")
+        return self.read(item, item + 1)[0]
+
+    def patient(self, patient_id: str) -> Tuple[np.ndarray, np.ndarray]:
+        """All epochs and labels of one patient."""
+        rows = self.rows(patient=patient_id)
+        if len(rows) and np.all(np.diff(rows) == 1):
+            return self.read(rows[0], rows[-1] + 1), self.labels[rows]
+        return self.take(rows), self.labels[rows]
+
+    def nbytes(self) -> int:
+        """Size of the archive on disk."""
+        return sum(f.stat().st_size for f in self.path.iterdir())
+
+    def close(self):
+        self._data.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -0,0 +1,308 @@
+"""
+Persistent store of validation experiments, indexed in SQLite.
+
+A validator given an ExperimentStore records every validate_model and
+cross_validate_patients call: model, parameters, feature stage, patient
+splits, a hash of the Config settings, a digest of the input data, test
+and validation metrics and timings. The full results go to a pickle and
+the stored predictions to an .npz file next to the database; the
+database rows point to them.
+
+Each experiment has a key over everything that determines its results,
+including a digest of the event metadata (epoch times, seizure
+intervals). When an experiment with the same key is run again, the
+validator loads it from the store instead of recomputing it. Inputs that
+cannot be keyed by value (e.g. a fitted model passed as a parameter) make
+experiment_key() raise TypeError, and the run is not stored. Metrics, patients and models
+are indexed tables, so queries by model, patient or config hash do not
+scan stored results. Only the standard library and numpy are required
+(pandas for to_frame()).
+"""
+import hashlib
+import json
+import logging
+import os
+import pickle
+import sqlite3
+import weakref
+from contextlib import closing
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+try:
+    from .config import Config
+except ImportError:
+    from config import Config
+
+logger = logging.getLogger(__name__)
+
+DB_NAME = 'experiments.sqlite'
+
+# Config settings that do not change validation results
+_CONFIG_EXCLUDED = ('DIR', 'ROOT', 'PATH', 'PROFILE_STAGES', 'RESULTS_HISTORY', 'SERVING_')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS experiments (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    key TEXT UNIQUE NOT NULL,
+    kind TEXT NOT NULL,
+    model TEXT NOT NULL,
+    params TEXT NOT NULL,
+    feature_stage TEXT,
+    config_hash TEXT NOT NULL,
+    data_hash TEXT NOT NULL,
+    splits TEXT NOT NULL,
+    created TEXT NOT NULL,
+    seconds REAL,
+    results_path TEXT NOT NULL,
+    predictions_path TEXT
+);
+CREATE INDEX IF NOT EXISTS experiments_model ON experiments (model);
+CREATE INDEX IF NOT EXISTS experiments_config ON experiments (config_hash);
+CREATE TABLE IF NOT EXISTS experiment_patients (
+    experiment_id INTEGER NOT NULL REFERENCES experiments (id) ON DELETE CASCADE,
+    patient_id TEXT NOT NULL,
+    split TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS experiment_patients_patient ON experiment_patients (patient_id);
+CREATE INDEX IF NOT EXISTS experiment_patients_experiment ON experiment_patients (experiment_id);
+CREATE TABLE IF NOT EXISTS metrics (
+    experiment_id INTEGER NOT NULL REFERENCES experiments (id) ON DELETE CASCADE,
+    split TEXT NOT NULL,
+    metric TEXT NOT NULL,
+    value REAL
+);
+CREATE INDEX IF NOT EXISTS metrics_experiment ON metrics (experiment_id);
+CREATE INDEX IF NOT EXISTS metrics_metric ON metrics (metric, split);
+"""
+
+
+def _json(value) -> str:
+    return json.dumps(value, sort_keys=True, default=_json_default)
+
+
+def _json_default(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, Path):
+        return str(value)
+    # repr() of arbitrary objects includes addresses: such keys would never match
+    raise TypeError(f"{type(value).__name__} cannot be part of an experiment key")
+
+
+def config_hash() -> str:
+    """Hash of the Config settings that can change validation results."""
+    settings = {key: getattr(Config, key) for key in dir(Config)
+                if key.isupper() and not any(part in key for part in _CONFIG_EXCLUDED)}
+    return hashlib.sha256(_json(settings).encode('utf-8')).hexdigest()[:16]
+
+
+def describe(obj) -> Optional[Dict[str, Any]]:
+    """Class name and scalar constructor-style attributes (not fitted ones) of an object."""
+    if obj is None:
+        return None
+    attributes = {key: value for key, value in vars(obj).items()
+                  if not key.startswith('_') and not key.endswith('_')
+                  and isinstance(value, (int, float, str, bool, type(None), tuple, list, dict))}
+    return {'class': type(obj).__name__, 'attributes': attributes}
+
+
+class ExperimentStore:
+    """
+    SQLite index of experiments plus per-experiment result files in root.
+
+    A connection is opened per operation, so one store can be used from
+    several processes (e.g. pool workers).
+    """
+
+    def __init__(self, root: Path = None):
+        self.root = Path(root) if root else Config.OUTPUT_DIR / 'experiments'
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.db_path = self.root / DB_NAME
+        # id(array) -> (weak reference, digest); data digests are computed once per array
+        self._digests: Dict[int, tuple] = {}
+        with closing(self._connect()) as conn, conn:
+            conn.executescript(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        conn.execute('PRAGMA foreign_keys = ON')
+        return conn
+
+    # ------------------------------------------------------------------- keys
+    def digest(self, array: np.ndarray) -> str:
+        """Content digest of an array, cached while the array object lives."""
+        cached = self._digests.get(id(array))
+        if cached is not None and cached[0]() is array:
+            return cached[1]
+        data = np.ascontiguousarray(array)
+        h = hashlib.blake2b(digest_size=16)
+        h.update(_json([data.shape, str(data.dtype)]).encode('utf-8'))
+        h.update(data.data)
+        digest = h.hexdigest()
+        try:
+            self._digests[id(array)] = (weakref.ref(array), digest)
+        except TypeError:
+            pass
+        return digest
+
+    def data_hash(self, patient_data: Dict, patient_ids: List[str]) -> str:
+        """Digest of the given patients' (X, y)."""
+        parts = [(p, self.digest(patient_data[p][0]), self.digest(np.asarray(patient_data[p][1])))
+                 for p in sorted(patient_ids) if p in patient_data]
+        return hashlib.sha256(_json(parts).encode('utf-8')).hexdigest()[:16]
+
+    def metadata_hash(self, patient_metadata: Optional[Dict], patient_ids: List[str]) -> Optional[str]:
+        """Digest of the given patients' event metadata (None without metadata)."""
+        if patient_metadata is None:
+            return None
+        parts = [(p, sorted((name, self.digest(np.asarray(value)))
+                            for name, value in patient_metadata[p].items()))
+                 for p in sorted(patient_ids) if p in patient_metadata]
+        return hashlib.sha256(_json(parts).encode('utf-8')).hexdigest()[:16]
+
+    @staticmethod
+    def experiment_key(**inputs) -> str:
+        """Key of an experiment from everything that determines its results."""
+        return hashlib.sha256(_json(inputs).encode('utf-8')).hexdigest()
+
+    # ------------------------------------------------------------------ write
+    def record(self, key: str, kind: str, model: str, params: Dict, splits: Dict[str, List[str]],
+               results: Dict[str, Any], data_hash: str, feature_stage: Dict = None,
+               seconds: float = None) -> int:
+        """
+        Store one experiment's results (replacing an earlier one with the key).
+
+        Returns:
+            The experiment id
+        """
+        name = key[:24]
+        results = dict(results)
+        predictions = results.pop('predictions', None)
+        results_path = self.root / f"{name}.pkl"
+        predictions_path = None
+        if predictions:
+            arrays = {f"{split}__{field}": value for split, stored in predictions.items()
+                      for field, value in stored.items() if value is not None}
+            predictions_path = self.root / f"{name}.npz"
+            tmp = self.root / f"{name}.tmp.npz"
+            np.savez_compressed(tmp, **arrays)
+            os.replace(tmp, predictions_path)
+        tmp = results_path.with_suffix('.pkl.tmp')
+        with open(tmp, 'wb') as f:
+            pickle.dump(results, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, results_path)
+
+        with closing(self._connect()) as conn, conn:
+            conn.execute('DELETE FROM experiments WHERE key = ?', (key,))
+            cursor = conn.execute(
+                'INSERT INTO experiments (key, kind, model, params, feature_stage, config_hash, '
+                'data_hash, splits, created, seconds, results_path, predictions_path) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (key, kind, model, _json(params or {}), _json(feature_stage) if feature_stage else None,
+                 config_hash(), data_hash, _json(splits), datetime.now().isoformat(timespec='seconds'),
+                 seconds, results_path.name, predictions_path.name if predictions_path else None))
+            experiment_id = cursor.lastrowid
+            conn.executemany('INSERT INTO experiment_patients VALUES (?, ?, ?)',
+                             [(experiment_id, p, split) for split, ids in splits.items() for p in ids])
+            conn.executemany('INSERT INTO metrics VALUES (?, ?, ?, ?)',
+                             [(experiment_id, split, metric, value)
+                              for split, metric, value in _metric_rows(results)])
+        return experiment_id
+
+    # ------------------------------------------------------------------- read
+    def lookup(self, key: str) -> Optional[int]:
+        """Id of the experiment with this key, if stored (and its files exist)."""
+        with closing(self._connect()) as conn:
+            row = conn.execute('SELECT id, results_path FROM experiments WHERE key = ?', (key,)).fetchone()
+        if row is None or not (self.root / row['results_path']).exists():
+            return None
+        return row['id']
+
+    def load(self, experiment_id: int) -> Dict[str, Any]:
+        """Full results of an experiment, with its stored predictions."""
+        with closing(self._connect()) as conn:
+            row = conn.execute('SELECT results_path, predictions_path FROM experiments WHERE id = ?',
+                               (experiment_id,)).fetchone()
+        if row is None:
+            raise KeyError(f"No experiment {experiment_id}")
+        with open(self.root / row['results_path'], 'rb') as f:
+            results = pickle.load(f)
+        if row['predictions_path']:
+            predictions = {}
+            with np.load(self.root / row['predictions_path']) as arrays:
+                for name in arrays.files:
+                    split, field = name.split('__', 1)
+                    predictions.setdefault(split, {'proba': None})[field] = arrays[name]
+            results['predictions'] = predictions
+        return results
+
+    def query(self, model: str = None, patient: str = None, split: str = None,
+              config: str = None, kind: str = None, metric_split: str = 'test') -> List[Dict[str, Any]]:
+        """
+        Experiments matching all given conditions, newest first.
+
+        Args:
+            model: Model class name (e.g. 'ImprovedRandomForest')
+            patient: Patient id used in the experiment (in split, if given)
+            config: Config hash (see config_hash())
+            kind: 'validate' or 'cv'
+            metric_split: Split whose metrics are included in each row
+
+        Returns:
+            One dict per experiment: its index columns plus the metrics
+        """
+        where, args = [], []
+        if model is not None:
+            where.append('e.model = ?')
+            args.append(model)
+        if config is not None:
+            where.append('e.config_hash = ?')
+            args.append(config)
+        if kind is not None:
+            where.append('e.kind = ?')
+            args.append(kind)
+        if patient is not None:
+            where.append('e.id IN (SELECT experiment_id FROM experiment_patients WHERE patient_id = ?'
+                         + (' AND split = ?)' if split else ')'))
+            args.extend([patient, split] if split else [patient])
+        sql = ('SELECT e.id, e.kind, e.model, e.params, e.feature_stage, e.config_hash, e.data_hash, '
+               'e.splits, e.created, e.seconds FROM experiments e'
+               + (' WHERE ' + ' AND '.join(where) if where else '') + ' ORDER BY e.id DESC')
+        with closing(self._connect()) as conn:
+            rows = [dict(row) for row in conn.execute(sql, args)]
+            for row in rows:
+                row['params'] = json.loads(row['params'])
+                row['splits'] = json.loads(row['splits'])
+                row.update({metric: value for metric, value in conn.execute(
+                    'SELECT metric, value FROM metrics WHERE experiment_id = ? AND split = ?',
+                    (row['id'], metric_split))})
+        return rows
+
+    def to_frame(self, **conditions) -> 'pd.DataFrame':
+        """query() as a DataFrame."""
+        import pandas as pd
+        return pd.DataFrame(self.query(**conditions))
+
+    def __len__(self) -> int:
+        with closing(self._connect()) as conn:
+            return conn.execute('SELECT COUNT(*) FROM experiments').fetchone()[0]
+
+
+def _metric_rows(results: Dict[str, Any]):
+    """(split, metric, value) of the scalar metrics in validate_model / CV results."""
+    for split in ['train', 'val', 'test']:
+        for metric, value in (results.get(split) or {}).items():
+            if isinstance(value, (int, float, np.number)):
+                yield split, metric, float(value)
+    # Cross-validation: aggregated '<metric>_mean' etc. count as test metrics
+    for metric, value in results.items():
+        if isinstance(value, (int, float, np.number)) and metric not in ('n_folds',):
+            yield 'test', metric, float(value)
+
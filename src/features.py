@@ -0,0 +1,212 @@
+"""
+Covariance and Riemannian tangent-space features for EEG epochs.
+
+Each epoch is summarised by its channel covariance matrix (10x10 for the
+default montage instead of 12,800 samples). Covariances are symmetric
+positive definite, so they are projected onto the tangent space at a
+reference mean before use with the Euclidean models in models.py, as
+pyriemann's Covariances + TangentSpace do in the original notebook.
+
+All operations are batched over epochs: one matmul for the covariances,
+closed-form Ledoit-Wolf shrinkage and stacked eigendecompositions for the
+matrix logarithms. Only numpy is required.
+"""
+from typing import Dict, Tuple, Union
+
+import numpy as np
+
+try:
+    from .config import Config
+    from .profiling import profile_stage
+except ImportError:
+    from config import Config
+    from profiling import profile_stage
+
+# Epochs processed at once; bounds the (n_epochs, n_times) shrinkage temporaries
+CHUNK_SIZE = 512
+
+
+def as_epoch_tensor(X: np.ndarray, n_channels: int) -> np.ndarray:
+    """Reshape flattened epochs (n, channels*times) to (n, channels, times)."""
+    X = np.asarray(X)
+    if X.ndim == 3:
+        return X
+    if X.shape[1] % n_channels:
+        raise ValueError(f"{X.shape[1]} features are not divisible by {n_channels} channels")
+    return X.reshape(len(X), n_channels, -1)
+
+
+def covariances(epochs: np.ndarray, shrinkage: Union[str, float] = 'ledoit_wolf') -> np.ndarray:
+    """
+    Spatial covariance matrix of every epoch.
+
+    Args:
+        epochs: Array of shape (n_epochs, n_channels, n_times)
+        shrinkage: 'ledoit_wolf' for the analytic Ledoit-Wolf estimate per
+            epoch, a float in [0, 1] for fixed shrinkage, or 0 for none
+
+    Returns:
+        Array of shape (n_epochs, n_channels, n_channels)
+    """
+    # Centering from raw moments avoids writing a centered copy of the
+    # epochs, which costs more than the matmul itself
+    n_times = epochs.shape[-1]
+    means = epochs.mean(axis=-1)
+    covs = np.matmul(epochs, epochs.transpose(0, 2, 1)) / n_times
+    covs -= means[:, :, None] * means[:, None, :]
+
+    n_channels = covs.shape[-1]
+    mu = np.trace(covs, axis1=1, axis2=2) / n_channels
+
+    if shrinkage == 'ledoit_wolf':
+        # Same estimate as sklearn.covariance.ledoit_wolf, batched over epochs;
+        # sample_sq[n, t] = ||x_t - mean||^2
+        cov_sq = np.einsum('nij,nij->n', covs, covs)
+        sample_sq = (np.einsum('nct,nct->nt', epochs, epochs)
+                     - 2 * np.einsum('nc,nct->nt', means, epochs)
+                     + np.einsum('nc,nc->n', means, means)[:, None])
+        beta = (np.einsum('nt,nt->n', sample_sq, sample_sq) / n_times - cov_sq) / (n_channels * n_times)
+        delta = (cov_sq - n_channels * mu ** 2) / n_channels  # ||S - mu*I||^2 / p
+        alpha = np.divide(np.minimum(beta, delta), delta, out=np.zeros_like(delta), where=delta > 0)
+    else:
+        alpha = np.full(len(covs), float(shrinkage))
+
+    covs *= (1 - alpha)[:, None, None]
+    diag = np.arange(n_channels)
+    covs[:, diag, diag] += (alpha * mu)[:, None]
+    return covs
+
+
+def _eig_apply(matrices: np.ndarray, fn) -> np.ndarray:
+    """Apply a scalar function to the eigenvalues of symmetric matrices."""
+    eigvals, eigvecs = np.linalg.eigh(matrices)
+    return np.matmul(eigvecs * fn(eigvals)[..., None, :], np.swapaxes(eigvecs, -1, -2))
+
+
+def _clip_eigvals(eigvals: np.ndarray) -> np.ndarray:
+    return np.maximum(eigvals, np.finfo(eigvals.dtype).tiny)
+
+
+def logm(matrices: np.ndarray) -> np.ndarray:
+    """Matrix logarithm of SPD matrices (batched)."""
+    return _eig_apply(matrices, lambda w: np.log(_clip_eigvals(w)))
+
+
+def expm(matrices: np.ndarray) -> np.ndarray:
+    """Matrix exponential of symmetric matrices (batched)."""
+    return _eig_apply(matrices, np.exp)
+
+
+def powm(matrices: np.ndarray, power: float) -> np.ndarray:
+    """Matrix power of SPD matrices (batched)."""
+    return _eig_apply(matrices, lambda w: _clip_eigvals(w) ** power)
+
+
+def riemannian_mean(covs: np.ndarray, max_iter: int = 50, tol: float = 1e-8) -> np.ndarray:
+    """
+    Geometric (Karcher) mean of SPD matrices under the affine-invariant metric.
+
+    Starts from the log-Euclidean mean and takes gradient steps in the
+    tangent space until the mean tangent vector is below tol.
+    """
+    mean = expm(logm(covs).mean(axis=0))
+    for _ in range(max_iter):
+        sqrt_mean = powm(mean, 0.5)
+        isqrt_mean = powm(mean, -0.5)
+        tangent = logm(isqrt_mean @ covs @ isqrt_mean).mean(axis=0)
+        mean = sqrt_mean @ expm(tangent) @ sqrt_mean
+        if np.linalg.norm(tangent) < tol:
+            break
+    return mean
+
+
+def _upper_weights(n_channels: int) -> Tuple[Tuple[np.ndarray, np.ndarray], np.ndarray]:
+    """Upper-triangle indices and the sqrt(2) weights that preserve the norm."""
+    rows, cols = np.triu_indices(n_channels)
+    weights = np.where(rows == cols, 1.0, np.sqrt(2.0))
+    return (rows, cols), weights
+
+
+def tangent_space(covs: np.ndarray, whitener: np.ndarray) -> np.ndarray:
+    """
+    Project covariances onto the tangent space at a reference point.
+
+    Args:
+        covs: Array of shape (n_epochs, n_channels, n_channels)
+        whitener: Reference mean to the power -1/2
+
+    Returns:
+        Array of shape (n_epochs, n_channels * (n_channels + 1) / 2)
+    """
+    (rows, cols), weights = _upper_weights(covs.shape[-1])
+    projected = logm(whitener @ covs @ whitener)
+    return projected[:, rows, cols] * weights
+
+
+def tangent_space_stage(arrays: Dict[str, np.ndarray], X: np.ndarray) -> np.ndarray:
+    """Inference-runtime feature stage for an exported TangentSpaceFeatures."""
+    shrinkage = float(arrays['shrinkage'])
+    epochs = as_epoch_tensor(X, int(arrays['n_channels']))
+    covs = covariances(epochs, 'ledoit_wolf' if shrinkage < 0 else shrinkage)
+    return tangent_space(covs, arrays['whitener'])
+
+
+class TangentSpaceFeatures:
+    """
+    Flattened epochs -> tangent-space covariance features.
+
+    Fit on training epochs only: the reference point is the Riemannian mean
+    of the training covariances. Use as the validator's feature_stage.
+    """
+
+    def __init__(self, n_channels: int = None, shrinkage: Union[str, float] = 'ledoit_wolf',
+                 metric: str = 'riemann'):
+        if metric not in ('riemann', 'logeuclid'):
+            raise ValueError(f"Unknown metric '{metric}'. Use 'riemann' or 'logeuclid'")
+        self.n_channels = n_channels or len(Config.SELECTED_CHANNELS)
+        self.shrinkage = shrinkage
+        self.metric = metric
+        self.reference_ = None
+        self.whitener_ = None
+
+    def covariances(self, X: np.ndarray) -> np.ndarray:
+        """Covariance matrices of flattened or (n, channels, times) epochs."""
+        epochs = as_epoch_tensor(X, self.n_channels)
+        return np.concatenate([covariances(epochs[i:i + CHUNK_SIZE], self.shrinkage)
+                               for i in range(0, max(len(epochs), 1), CHUNK_SIZE)])
+
+    def _fit_covariances(self, covs: np.ndarray):
+        if self.metric == 'riemann':
+            self.reference_ = riemannian_mean(covs)
+        else:
+            self.reference_ = expm(logm(covs).mean(axis=0))
+        self.whitener_ = powm(self.reference_, -0.5)
+
+    def fit(self, X: np.ndarray, y: np.ndarray = None):
+        """Compute the reference point from training epochs."""
+        with profile_stage('TangentSpaceFeatures.fit', X):
+            self._fit_covariances(self.covariances(X))
+        return self
+
+    def transform(self, X: np.ndarray) -> np.ndarray:
+        """Tangent-space features, shape (n_epochs, n_channels * (n_channels + 1) / 2)."""
+        if self.whitener_ is None:
+            raise ValueError("TangentSpaceFeatures must be fitted before transform")
+        with profile_stage('TangentSpaceFeatures.transform', X):
+            return tangent_space(self.covariances(X), self.whitener_)
+
+    def fit_transform(self, X: np.ndarray, y: np.ndarray = None) -> np.ndarray:
+        """Fit on training epochs and return their features."""
+        with profile_stage('TangentSpaceFeatures.fit', X):
+            covs = self.covariances(X)
+            self._fit_covariances(covs)
+        with profile_stage('TangentSpaceFeatures.transform', X):
+            return tangent_space(covs, self.whitener_)
+
+    def export_arrays(self) -> Tuple[str, Dict[str, np.ndarray]]:
+        """Arrays for the inference runtime (see inference.FEATURE_STAGES)."""
+        if self.whitener_ is None:
+            raise ValueError("TangentSpaceFeatures must be fitted before export")
+        shrinkage = -1.0 if self.shrinkage == 'ledoit_wolf' else float(self.shrinkage)
+        return 'tangent_space', {'whitener': self.whitener_, 'n_channels': np.array(self.n_channels),
+                                 'shrinkage': np.array(shrinkage)}
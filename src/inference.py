@@ -0,0 +1,241 @@
+"""
+Lightweight inference runtime for exported seizure detectors.
+
+Loads a versioned artifact written by SeizureDetectionModel.export() and
+scores epochs with as few imports as possible: linear models and numpy
+feature stages need only numpy. Other estimators are stored pickled and
+pull in scikit-learn when loaded.
+
+Artifact layout (a single uncompressed .npz file):
+    __header__        JSON metadata (format version, model class, kind, ...)
+    scaler_mean/scale StandardScaler statistics (optional)
+    feature__*        Arrays of a numpy feature stage (optional)
+    coef/intercept    Weights for kind='linear'
+    coef_q/coef_scale int8 weights and their scale for kind='linear_int8'
+    estimator         Pickled estimator bytes for kind='pickle'
+"""
+import json
+import pickle
+import re
+from pathlib import Path
+from typing import Callable, Dict, Tuple, Union
+
+import numpy as np
+
+try:
+    from .config import Config
+    from .features import tangent_space_stage
+    from .spatial_filters import spatial_filter_stage
+    from .spectral import spectral_stage
+except ImportError:
+    from config import Config
+    from features import tangent_space_stage
+    from spatial_filters import spatial_filter_stage
+    from spectral import spectral_stage
+
+FORMAT_VERSION = 1
+
+# Feature stages that can be applied with numpy alone: kind -> fn(arrays, X)
+FEATURE_STAGES: Dict[str, Callable[[Dict[str, np.ndarray], np.ndarray], np.ndarray]] = {
+    'tangent_space': tangent_space_stage,
+    'spatial_filter': spatial_filter_stage,
+    'spectral': spectral_stage
+}
+
+
+def _sigmoid(z: np.ndarray) -> np.ndarray:
+    """Numerically stable logistic function."""
+    return 0.5 * (1.0 + np.tanh(0.5 * z))
+
+
+def _pack_bytes(data: bytes) -> np.ndarray:
+    return np.frombuffer(data, dtype=np.uint8)
+
+
+def _artifact_version(path: Path) -> int:
+    match = re.search(r'-v(\d+)\.npz$', path.name)
+    return int(match.group(1)) if match else 0
+
+
+def artifact_path(name: str, version: int = None, models_dir: Path = None) -> Path:
+    """
+    Resolve the artifact path for a model name.
+
+    Args:
+        name: Artifact name (e.g. 'logistic')
+        version: Explicit version; the latest existing version if None
+        models_dir: Defaults to Config.MODELS_DIR
+
+    Returns:
+        Path of the form <models_dir>/<name>-v<version>.npz
+    """
+    models_dir = Path(models_dir or Config.MODELS_DIR)
+    if version is None:
+        existing = sorted(models_dir.glob(f"{name}-v*.npz"), key=_artifact_version)
+        if not existing:
+            raise FileNotFoundError(f"No artifact named '{name}' in {models_dir}")
+        return existing[-1]
+    return models_dir / f"{name}-v{version}.npz"
+
+
+def next_artifact_path(name: str, models_dir: Path = None) -> Path:
+    """Path for the next version of an artifact."""
+    try:
+        latest = _artifact_version(artifact_path(name, models_dir=models_dir))
+    except FileNotFoundError:
+        latest = 0
+    return artifact_path(name, version=latest + 1, models_dir=models_dir)
+
+
+def save_artifact(path: Path, header: Dict, model_arrays: Dict[str, np.ndarray],
+                  scaler=None, feature_stage=None) -> Path:
+    """
+    Write an inference artifact.
+
+    Args:
+        path: Output .npz path
+        header: Model metadata; 'kind' selects how model_arrays are scored
+        model_arrays: Arrays describing the fitted model
+        scaler: Fitted StandardScaler-like object (mean_, scale_) or None
+        feature_stage: Fitted transformer applied before the scaler, or None.
+            Stages with export_arrays() -> (kind, arrays) are stored as
+            arrays; anything else is pickled.
+    """
+    arrays = dict(model_arrays)
+    header = dict(header, format_version=FORMAT_VERSION, scaler=scaler is not None)
+
+    if scaler is not None:
+        mean = getattr(scaler, 'mean_', None)
+        scale = getattr(scaler, 'scale_', None)
+        n_features = len(mean if mean is not None else scale)
+        arrays['scaler_mean'] = np.zeros(n_features) if mean is None else np.asarray(mean, dtype=np.float64)
+        arrays['scaler_scale'] = np.ones(n_features) if scale is None else np.asarray(scale, dtype=np.float64)
+
+    header['feature_stage'] = None
+    if feature_stage is not None:
+        if hasattr(feature_stage, 'export_arrays'):
+            kind, stage_arrays = feature_stage.export_arrays()
+            header['feature_stage'] = kind
+            for key, value in stage_arrays.items():
+                arrays[f'feature__{key}'] = np.asarray(value)
+        else:
+            header['feature_stage'] = 'pickle'
+            arrays['feature_stage'] = _pack_bytes(pickle.dumps(feature_stage, protocol=pickle.HIGHEST_PROTOCOL))
+
+    arrays['__header__'] = _pack_bytes(json.dumps(header).encode('utf-8'))
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'wb') as f:
+        np.savez(f, **arrays)
+    return path
+
+
+class InferenceModel:
+    """
+    Scores epochs with an exported detector.
+
+    Pipeline: feature stage -> scaler -> model -> probability -> threshold.
+    """
+
+    def __init__(self, header: Dict, arrays: Dict[str, np.ndarray]):
+        if header.get('format_version', 0) > FORMAT_VERSION:
+            raise ValueError(f"Artifact format {header['format_version']} is newer than "
+                             f"supported version {FORMAT_VERSION}")
+        self.header = header
+        self.threshold = header.get('threshold', 0.5)
+        self._feature_fn = self._build_feature_stage(header, arrays)
+        self._mean, self._inv_scale = self._build_scaler(header, arrays)
+        self._score_fn = self._build_scorer(header, arrays)
+
+    @staticmethod
+    def _build_feature_stage(header, arrays):
+        kind = header.get('feature_stage')
+        if kind is None:
+            return None
+        if kind == 'pickle':
+            stage = pickle.loads(arrays['feature_stage'].tobytes())
+            return stage.transform
+        if kind not in FEATURE_STAGES:
+            raise ValueError(f"Unknown feature stage '{kind}'. Available: {list(FEATURE_STAGES)}")
+        stage_arrays = {k[len('feature__'):]: v for k, v in arrays.items() if k.startswith('feature__')}
+        stage_fn = FEATURE_STAGES[kind]
+        return lambda X: stage_fn(stage_arrays, X)
+
+    @staticmethod
+    def _build_scaler(header, arrays) -> Tuple[np.ndarray, np.ndarray]:
+        if not header.get('scaler'):
+            return None, None
+        scale = arrays['scaler_scale']
+        # StandardScaler leaves zero-variance features unscaled
+        inv_scale = 1.0 / np.where(scale == 0, 1.0, scale)
+        return arrays['scaler_mean'], inv_scale
+
+    @staticmethod
+    def _build_scorer(header, arrays) -> Callable[[np.ndarray], np.ndarray]:
+        kind = header['kind']
+        if kind == 'linear':
+            coef = arrays['coef'].ravel()
+            intercept = float(arrays['intercept'].ravel()[0])
+            return lambda X: _sigmoid(X @ coef + intercept)
+        if kind == 'linear_int8':
+            coef = arrays['coef_q'].astype(np.float32)
+            scale = float(arrays['coef_scale'].ravel()[0])
+            intercept = float(arrays['intercept'].ravel()[0])
+            return lambda X: _sigmoid((X.astype(np.float32) @ coef) * scale + intercept)
+        if kind == 'pickle':
+            estimator = pickle.loads(arrays['estimator'].tobytes())
+            if hasattr(estimator, 'n_jobs'):
+                # Thread pool startup dominates single-epoch scoring
+                estimator.n_jobs = 1
+            if hasattr(estimator, 'predict_proba'):
+                return lambda X: estimator.predict_proba(X)[:, 1]
+            return lambda X: _sigmoid(estimator.decision_function(X))
+        raise ValueError(f"Unknown model kind '{kind}'")
+
+    def transform(self, X: np.ndarray) -> np.ndarray:
+        """Apply the feature stage and scaler."""
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim == 1:
+            X = X[np.newaxis, :]
+        if self._feature_fn is not None:
+            X = self._feature_fn(X)
+        if self._mean is not None:
+            X = (X - self._mean) * self._inv_scale
+        return X
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        """Predict class probabilities, shape (n_epochs, 2)."""
+        proba_pos = self._score_fn(self.transform(X))
+        return np.column_stack([1 - proba_pos, proba_pos])
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        """Predict labels using the stored decision threshold."""
+        return (self._score_fn(self.transform(X)) >= self.threshold).astype(int)
+
+    def score_epoch(self, epoch: np.ndarray) -> float:
+        """Seizure probability for a single epoch, e.g. shape (n_channels, n_times)."""
+        return float(self._score_fn(self.transform(np.ravel(epoch)))[0])
+
+
+def load_artifact(path_or_name: Union[str, Path], version: int = None,
+                  models_dir: Path = None) -> InferenceModel:
+    """
+    Load an exported detector.
+
+    Args:
+        path_or_name: Path to an .npz artifact, or an artifact name in models_dir
+        version: Version to load when a name is given (latest if None)
+        models_dir: Defaults to Config.MODELS_DIR
+
+    Returns:
+        InferenceModel ready to score epochs
+    """
+    path = Path(path_or_name)
+    if path.suffix != '.npz':
+        path = artifact_path(str(path_or_name), version=version, models_dir=models_dir)
+
+    with np.load(path, allow_pickle=False) as data:
+        arrays = {key: data[key] for key in data.files}
+    header = json.loads(arrays.pop('__header__').tobytes().decode('utf-8'))
+    return InferenceModel(header, arrays)
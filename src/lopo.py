@@ -0,0 +1,346 @@
+"""
+Leave-one-patient-out cross-validation with shared preprocessing.
+
+Every patient is the test patient of one fold, validated on the next
+Config.LOPO_VAL_PATIENTS patients of a fixed shuffled order and trained on
+the rest. Run through cross_validate_patients, each of the n folds would
+stack almost all patients, fit a scaler on the stack and transform it,
+i.e. O(n^2) passes over the data. Instead, work shared by all folds is
+done once:
+    moments   each patient's (n, mean, M2) is computed once; a fold's
+              scaler is merged from its training patients' moments
+              (binning.scaler_from_moments) without touching the data
+    assembly  each fold's scaled train/val/test matrices are written in
+              one pass into preallocated arrays, instead of stacking,
+              fitting and transforming copies
+    binned    binned models (binned_input) reuse per-patient quantile
+              sketches from one BinnedPatientCache built before the folds
+A feature_stage is still refitted per fold on its training patients.
+
+Folds run in a process pool. With the 'fork' start method workers share
+the parent's data and statistics without copying them; with 'spawn' they
+are sent once per worker. Pool workers fit single-threaded
+(models.single_threaded), so n_jobs=-1 models do not start a thread per
+core in every worker; a sequential run (n_workers=1) keeps their
+parallelism. Each finished fold is appended to
+<results_dir>/folds.jsonl and its test predictions written to
+<results_dir>/<patient>.npz, so an interrupted run resumes with the
+remaining patients.
+"""
+import contextlib
+import hashlib
+import json
+import logging
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+try:
+    from .binning import scaler_from_moments
+    from .config import Config
+    from .profiling import profile_stage
+except ImportError:
+    from binning import scaler_from_moments
+    from config import Config
+    from profiling import profile_stage
+
+logger = logging.getLogger(__name__)
+
+RECORDS_NAME = 'folds.jsonl'
+
+# Data shared with the fold runner (set in each pool worker by _init_worker)
+_SHARED: Dict[str, Any] = {}
+
+
+class PatientStatistics:
+    """
+    Per-patient moments of the feature matrices, computed once.
+
+    scaler() of any set of patients equals a StandardScaler fitted on
+    their stacked rows.
+    """
+
+    def __init__(self, patient_data: Dict[str, Tuple[np.ndarray, np.ndarray]]):
+        self.moments = {}
+        for patient_id, (X, _) in patient_data.items():
+            with profile_stage('moments', X):
+                mean = X.mean(axis=0)
+                self.moments[patient_id] = (len(X), mean, ((X - mean) ** 2).sum(axis=0))
+
+    def scaler(self, patient_ids: List[str]):
+        """StandardScaler of the given patients, from their moments."""
+        moments = [self.moments[p] for p in patient_ids if p in self.moments]
+        if not moments:
+            raise ValueError(f"No data found for patients: {patient_ids}")
+        return scaler_from_moments(moments)
+
+    @staticmethod
+    def assemble(patient_data: Dict[str, Tuple[np.ndarray, np.ndarray]], patient_ids: List[str],
+                 scaler) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Scaled, stacked (X, y) of the given patients, written in one pass
+        (the same rows as scaler.transform of _combine_patient_data).
+        """
+        present = [p for p in patient_ids if p in patient_data]
+        if not present:
+            raise ValueError(f"No data found for patients: {patient_ids}")
+        first = patient_data[present[0]][0]
+        dtype = first.dtype if np.issubdtype(first.dtype, np.floating) else np.float64
+        n_rows = sum(len(patient_data[p][0]) for p in present)
+        X = np.empty((n_rows, first.shape[1]), dtype=dtype)
+        mean, scale = scaler.mean_.astype(dtype), scaler.scale_.astype(dtype)
+        start = 0
+        for patient_id in present:
+            rows = X[start:start + len(patient_data[patient_id][0])]
+            np.subtract(patient_data[patient_id][0], mean, out=rows)
+            rows /= scale
+            start += len(rows)
+        y = np.concatenate([patient_data[p][1] for p in present])
+        return X, y
+
+
+def lopo_folds(patient_ids: List[str], n_val: int = None, random_state: int = None) -> List[Dict[str, List[str]]]:
+    """
+    One train/val/test split per patient.
+
+    Patients are shuffled once; the test patient's validation patients are
+    the n_val patients following it in that order (wrapping around).
+    """
+    n_val = Config.LOPO_VAL_PATIENTS if n_val is None else n_val
+    if len(patient_ids) < n_val + 2:
+        raise ValueError(f"Leave-one-patient-out with {n_val} validation patients needs at least "
+                         f"{n_val + 2} patients, got {len(patient_ids)}")
+    order = np.random.RandomState(random_state or Config.RANDOM_STATE) \
+        .permutation(sorted(patient_ids)).tolist()
+    folds = []
+    for i, test_patient in enumerate(order):
+        val = [order[(i + k) % len(order)] for k in range(1, n_val + 1)]
+        folds.append({'train': [p for p in order if p != test_patient and p not in val],
+                      'val': val, 'test': [test_patient]})
+    return folds
+
+
+def _init_worker(shared: Dict[str, Any]):
+    """Pool initializer: make the shared data available to run_fold."""
+    _SHARED.clear()
+    _SHARED.update(shared)
+
+
+def run_fold(splits: Dict[str, List[str]]) -> Tuple[Dict[str, Any], Dict[str, np.ndarray]]:
+    """
+    Validate one fold with the shared data (runs in a pool worker).
+
+    Returns:
+        (record, test predictions); the record has status 'trained' or 'failed'
+    """
+    try:
+        from .models import single_threaded
+    except ImportError:
+        from models import single_threaded
+
+    test_patient = splits['test'][0]
+    start = time.perf_counter()
+    try:
+        validator = _SHARED['validator']
+        with single_threaded() if _SHARED.get('single_threaded') else contextlib.nullcontext():
+            results = validator.validate_model(
+                _SHARED['model_class'], _SHARED['patient_data'], splits, _SHARED['model_params'],
+                apply_smote=_SHARED['apply_smote'], feature_stage=_SHARED['feature_stage'],
+                patient_metadata=_SHARED['patient_metadata'], patient_stats=_SHARED['stats']
+            )
+        validator.results_history.clear()
+    except Exception as e:
+        logger.warning(f"[lopo] {test_patient} failed: {type(e).__name__}: {e}")
+        return {'patient_id': test_patient, 'status': 'failed', 'error': f"{type(e).__name__}: {e}"}, {}
+
+    predictions = results['predictions']['test']
+    record = {
+        'patient_id': test_patient,
+        'status': 'trained',
+        'val_patients': splits['val'],
+        'n_train_patients': len(splits['train']),
+        'test': {k: float(v) for k, v in results['test'].items()},
+        'val': {k: float(v) for k, v in results['val'].items()},
+        'events': (results.get('events') or {}).get('test'),
+        'seconds': round(time.perf_counter() - start, 2)
+    }
+    arrays = {'y_true': predictions['y_true'], 'y_pred': predictions['y_pred']}
+    if predictions['proba'] is not None:
+        arrays['proba'] = predictions['proba']
+    return record, arrays
+
+
+class LeaveOnePatientOut:
+    """
+    Leave-one-patient-out cross-validation of one model, in parallel,
+    streaming per-patient results to results_dir.
+
+    Records carry a fingerprint of the run's inputs; on a rerun, patients
+    with a 'trained' record of the same fingerprint are not redone.
+    """
+
+    def __init__(self, model_class, results_dir: Path, model_params: Dict = None,
+                 feature_stage=None, apply_smote: bool = True, n_val: int = None,
+                 n_workers: int = None, random_state: int = None):
+        self.model_class = model_class
+        self.results_dir = Path(results_dir)
+        self.model_params = model_params or {}
+        self.feature_stage = feature_stage
+        self.apply_smote = apply_smote
+        self.n_val = Config.LOPO_VAL_PATIENTS if n_val is None else n_val
+        self.n_workers = n_workers or multiprocessing.cpu_count()
+        self.random_state = random_state or Config.RANDOM_STATE
+
+    def run_key(self, patient_data: Dict[str, Tuple[np.ndarray, np.ndarray]]) -> str:
+        """Fingerprint of everything that determines the fold results."""
+        inputs = {
+            'model': self.model_class.__name__, 'params': self.model_params,
+            'feature_stage': type(self.feature_stage).__name__ if self.feature_stage else None,
+            'apply_smote': self.apply_smote, 'smote_ratio': Config.SMOTE_RATIO,
+            'n_val': self.n_val, 'random_state': self.random_state,
+            'patients': {pid: [list(X.shape), int(np.sum(y))] for pid, (X, y) in sorted(patient_data.items())}
+        }
+        payload = json.dumps(inputs, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:16]
+
+    # ----------------------------------------------------------------- records
+    def records_path(self) -> Path:
+        return self.results_dir / RECORDS_NAME
+
+    def load_records(self, key: str = None) -> Dict[str, Dict[str, Any]]:
+        """Latest record per patient (of this fingerprint, if given)."""
+        records = {}
+        if self.records_path().exists():
+            with open(self.records_path(), 'r') as f:
+                for line in f:
+                    if line.strip():
+                        record = json.loads(line)
+                        if key is None or record.get('key') == key:
+                            records[record['patient_id']] = record
+        return records
+
+    def _write(self, key: str, record: Dict[str, Any], arrays: Dict[str, np.ndarray]):
+        """Predictions first, then the record line that marks the fold as done."""
+        self.results_dir.mkdir(parents=True, exist_ok=True)
+        if arrays:
+            tmp = self.results_dir / f"{record['patient_id']}.tmp.npz"
+            np.savez_compressed(tmp, **arrays)
+            tmp.replace(self.results_dir / f"{record['patient_id']}.npz")
+        with open(self.records_path(), 'a') as f:
+            f.write(json.dumps(dict(record, key=key), default=_json_default) + '\n')
+        if record['status'] == 'trained':
+            logger.info(f"[lopo] {record['patient_id']}: test F1 {record['test'].get('f1', np.nan):.3f} "
+                        f"({record['seconds']}s)")
+
+    # --------------------------------------------------------------------- run
+    def run(self, patient_data: Dict[str, Tuple[np.ndarray, np.ndarray]],
+            patient_metadata: Dict[str, Dict] = None, n_bootstrap: int = None,
+            key: str = None) -> Dict[str, Any]:
+        """
+        Run the folds not yet on disk and aggregate all of them.
+
+        Args:
+            patient_data: Dict patient_id -> (X, y)
+            patient_metadata: Optional per-patient 'epoch_times' and
+                'seizure_intervals' for event-level metrics
+            n_bootstrap: Patient bootstrap replicates (Config.N_BOOTSTRAP)
+            key: Fingerprint of the inputs (default: run_key(patient_data),
+                which only sees the data's shapes and seizure counts)
+
+        Returns:
+            cross_validate_patients-style results over the per-patient
+            folds, plus 'pooled' metrics of all test predictions and
+            'events' pooled over patients (with patient_metadata)
+        """
+        try:
+            from .validation import PatientIndependentValidator
+        except ImportError:
+            from validation import PatientIndependentValidator
+
+        key = key or self.run_key(patient_data)
+        folds = lopo_folds(list(patient_data), self.n_val, self.random_state)
+        done = {pid for pid, r in self.load_records(key).items() if r['status'] == 'trained'}
+        todo = [splits for splits in folds if splits['test'][0] not in done]
+        if done:
+            logger.info(f"[lopo] {len(done)} patients already done, {len(todo)} to run")
+
+        if todo:
+            validator = PatientIndependentValidator(random_state=self.random_state)
+            binned = getattr(self.model_class, 'binned_input', False) and self.feature_stage is None
+            with profile_stage('lopo_shared'):
+                stats = None if binned or self.feature_stage is not None else PatientStatistics(patient_data)
+                if binned:
+                    validator.bin_cache.precompute(patient_data)
+            shared = {'validator': validator, 'model_class': self.model_class,
+                      'model_params': self.model_params, 'feature_stage': self.feature_stage,
+                      'apply_smote': self.apply_smote, 'patient_data': patient_data,
+                      'patient_metadata': patient_metadata, 'stats': stats}
+
+            if self.n_workers == 1 or len(todo) == 1:
+                _init_worker(dict(shared, single_threaded=False))
+                try:
+                    for splits in todo:
+                        self._write(key, *run_fold(splits))
+                finally:
+                    _SHARED.clear()
+            else:
+                methods = multiprocessing.get_all_start_methods()
+                context = multiprocessing.get_context('fork' if 'fork' in methods else 'spawn')
+                with ProcessPoolExecutor(max_workers=min(self.n_workers, len(todo)), mp_context=context,
+                                         initializer=_init_worker,
+                                         initargs=(dict(shared, single_threaded=True),)) as pool:
+                    futures = [pool.submit(run_fold, splits) for splits in todo]
+                    for future in as_completed(futures):
+                        self._write(key, *future.result())
+
+        return self.aggregate(key, n_bootstrap)
+
+    def aggregate(self, key: str, n_bootstrap: int = None) -> Dict[str, Any]:
+        """Aggregate the stored folds of one run."""
+        try:
+            from .patient_specific import PatientSpecificTrainer
+            from .validation import PatientIndependentValidator
+        except ImportError:
+            from patient_specific import PatientSpecificTrainer
+            from validation import PatientIndependentValidator
+
+        records = self.load_records(key)
+        trained = [records[pid] for pid in sorted(records) if records[pid]['status'] == 'trained']
+        validator = PatientIndependentValidator(random_state=self.random_state)
+        if not trained:
+            return {'n_folds': 0, 'warning': 'No leave-one-patient-out folds completed',
+                    'failed': {pid: r.get('error') for pid, r in records.items()}}
+
+        fold_results = []
+        for record in trained:
+            with np.load(self.results_dir / f"{record['patient_id']}.npz") as arrays:
+                predictions = {'y_true': arrays['y_true'], 'y_pred': arrays['y_pred'],
+                               'proba': arrays['proba'] if 'proba' in arrays.files else None}
+            predictions['patient_sizes'] = np.array([len(predictions['y_true'])], dtype=np.int64)
+            fold_results.append({'test': record['test'], 'predictions': {'test': predictions},
+                                 'metadata': {'test_patients': [record['patient_id']]}})
+
+        aggregated = validator._aggregate_cv_results(fold_results, n_bootstrap)
+        pooled = [r['predictions']['test'] for r in fold_results]
+        with_proba = all(p['proba'] is not None for p in pooled)
+        aggregated['pooled'] = validator._calculate_metrics(
+            np.concatenate([p['y_true'] for p in pooled]), np.concatenate([p['y_pred'] for p in pooled]),
+            np.concatenate([p['proba'] for p in pooled]) if with_proba else None)
+        events = PatientSpecificTrainer.aggregate(trained).get('events')
+        if events:
+            aggregated['events'] = events
+        aggregated['failed'] = {pid: r.get('error') for pid, r in records.items() if r['status'] != 'trained'}
+        aggregated['lopo'] = True
+        return aggregated
+
+
+def _json_default(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    raise TypeError(f"Not JSON serializable: {type(value).__name__}")
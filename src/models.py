@@ -6,51 +6,123 @@ FIXES:
 2. Proper hyperparameter tuning
 3. No data leakage in model selection
 4. Realistic performance expectations
+
+scikit-learn and pandas are imported where they are used, so importing this
+module stays cheap for inference and CLI processes.
 """
 import numpy as np
-import pandas as pd
-from sklearn.neighbors import KNeighborsClassifier
-from sklearn.linear_model import LogisticRegression
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.svm import SVC
-from sklearn.model_selection import GridSearchCV
-from sklearn.base import BaseEstimator, ClassifierMixin
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Tuple
+from pathlib import Path
+from datetime import datetime
 import logging
+import pickle
+from contextlib import contextmanager
 
 try:
     from .config import Config
+    from .profiling import profile_stage
 except ImportError:
     from config import Config
+    from profiling import profile_stage
 
 logger = logging.getLogger(__name__)
 
-class SeizureDetectionModel(BaseEstimator, ClassifierMixin):
+# Display names of the models compared by compare_models()
+MODEL_DISPLAY_NAMES = {
+    'knn': 'KNN',
+    'logistic': 'Logistic Regression',
+    'random_forest': 'Random Forest',
+    'svm': 'SVM',
+    'gradient_boosting': 'Gradient Boosting'
+}
+
+class SeizureDetectionModel:
     """
     Base class for seizure detection models with consistent interface.
+    
+    Provides the parts of the scikit-learn estimator API the project uses
+    (get_params/set_params/score) itself rather than subclassing
+    BaseEstimator/ClassifierMixin, which would import scikit-learn with
+    this module. is_classifier() and the classification scorers still
+    recognize the models through _estimator_type (scikit-learn < 1.6) and
+    __sklearn_tags__.
     """
     
+    _estimator_type = 'classifier'
+    
     def __init__(self, random_state: int = None):
         self.random_state = random_state or Config.RANDOM_STATE
         self.model = None
         self.is_fitted = False
+        # Probability cut-off for predict(); None keeps the estimator's own rule
+        self.decision_threshold = None
+        
+    def get_params(self, deep: bool = True) -> Dict[str, Any]:
+        """Constructor parameters of this model."""
+        import inspect
+        names = [name for name, param in inspect.signature(type(self).__init__).parameters.items()
+                 if name != 'self' and param.kind != param.VAR_KEYWORD]
+        return {name: getattr(self, name, None) for name in names}
+        
+    def __sklearn_tags__(self):
+        from sklearn.utils import ClassifierTags, Tags, TargetTags
+        return Tags(estimator_type='classifier', target_tags=TargetTags(required=True),
+                    classifier_tags=ClassifierTags())
+        
+    def set_params(self, **params):
+        """
+        Rebuild the model with updated constructor parameters.
+        
+        The estimator is recreated unfitted (is_fitted is reset, so fit()
+        must be called again, as with sklearn.base.clone); decision_threshold
+        is kept. Other attributes set after construction are discarded.
+        """
+        decision_threshold = self.decision_threshold
+        self.__init__(**dict(self.get_params(), **params))
+        self.decision_threshold = decision_threshold
+        return self
+        
+    def score(self, X: np.ndarray, y: np.ndarray) -> float:
+        """Mean accuracy on the given data."""
+        return float(np.mean(self.predict(X) == np.asarray(y)))
+        
+    def __repr__(self) -> str:
+        params = ', '.join(f'{k}={v!r}' for k, v in self.get_params().items())
+        return f'{type(self).__name__}({params})'
         
     def fit(self, X: np.ndarray, y: np.ndarray):
         """Fit the model to training data."""
-        self.model.fit(X, y)
+        with profile_stage(f'{type(self).__name__}.fit', X):
+            self.model.fit(X, y)
         self.is_fitted = True
         return self
         
     def predict(self, X: np.ndarray) -> np.ndarray:
-        """Make predictions."""
+        """Make predictions, applying decision_threshold when one is set."""
         if not self.is_fitted:
             raise ValueError("Model must be fitted before prediction")
-        return self.model.predict(X)
+        if self.decision_threshold is not None:
+            return (self.predict_proba(X)[:, 1] >= self.decision_threshold).astype(int)
+        with profile_stage(f'{type(self).__name__}.predict', X):
+            return self.model.predict(X)
+        
+    def set_threshold(self, threshold: float):
+        """
+        Use a tuned probability cut-off for predict() and exported artifacts
+        (see ThresholdAnalyzer in validation.py). No refitting is needed.
+        """
+        self.decision_threshold = None if threshold is None else float(threshold)
+        return self
         
     def predict_proba(self, X: np.ndarray) -> np.ndarray:
         """Predict class probabilities if supported."""
         if not self.is_fitted:
             raise ValueError("Model must be fitted before prediction")
+        with profile_stage(f'{type(self).__name__}.predict_proba', X):
+            return self._predict_proba(X)
+            
+    def _predict_proba(self, X: np.ndarray) -> np.ndarray:
+        """Probabilities from the wrapped estimator."""
         if hasattr(self.model, 'predict_proba'):
             return self.model.predict_proba(X)
         else:
@@ -62,6 +134,71 @@ class SeizureDetectionModel(BaseEstimator, ClassifierMixin):
                 return np.column_stack([1 - proba_pos, proba_pos])
             else:
                 raise NotImplementedError("Model doesn't support probability prediction")
+    
+    def _export_params(self) -> Tuple[str, Dict[str, np.ndarray]]:
+        """
+        Describe the fitted model for the inference runtime.
+        
+        Returns:
+            (kind, arrays): 'linear' with coef/intercept, or 'pickle' with
+            the pickled estimator bytes
+        """
+        payload = pickle.dumps(self.model, protocol=pickle.HIGHEST_PROTOCOL)
+        return 'pickle', {'estimator': np.frombuffer(payload, dtype=np.uint8)}
+        
+    def export(self, name: str, scaler=None, feature_stage=None,
+               models_dir: Path = None) -> Path:
+        """
+        Serialize the fitted model with its preprocessing into a versioned
+        inference artifact.
+        
+        Args:
+            name: Artifact name; saved as <models_dir>/<name>-v<N>.npz
+            scaler: Fitted StandardScaler used on the model's inputs
+            feature_stage: Fitted transformer applied before the scaler
+            models_dir: Defaults to Config.MODELS_DIR
+            
+        Returns:
+            Path of the written artifact
+        """
+        if not self.is_fitted:
+            raise ValueError("Model must be fitted before export")
+            
+        try:
+            from . import inference
+        except ImportError:
+            import inference
+            
+        kind, arrays = self._export_params()
+        header = {
+            'name': name,
+            'model_class': type(self).__name__,
+            'kind': kind,
+            'params': {k: v for k, v in vars(self).items()
+                       if isinstance(v, (int, float, str, bool, type(None)))},
+            'threshold': 0.5 if self.decision_threshold is None else self.decision_threshold,
+            'created': datetime.now().isoformat(timespec='seconds')
+        }
+        path = inference.next_artifact_path(name, models_dir)
+        inference.save_artifact(path, header, arrays, scaler=scaler, feature_stage=feature_stage)
+        logger.info(f"Exported {type(self).__name__} to {path}")
+        return path
+    
+    @staticmethod
+    def load(path_or_name, version: int = None, models_dir: Path = None):
+        """
+        Load an exported artifact into a lightweight InferenceModel.
+        
+        Args:
+            path_or_name: Artifact path or name in models_dir
+            version: Version to load when a name is given (latest if None)
+            models_dir: Defaults to Config.MODELS_DIR
+        """
+        try:
+            from .inference import load_artifact
+        except ImportError:
+            from inference import load_artifact
+        return load_artifact(path_or_name, version=version, models_dir=models_dir)
 
 class ImprovedKNNClassifier(SeizureDetectionModel):
     """
@@ -77,6 +214,7 @@ class ImprovedKNNClassifier(SeizureDetectionModel):
         self.weights = weights
         self.metric = metric
         
+        from sklearn.neighbors import KNeighborsClassifier
         self.model = KNeighborsClassifier(
             n_neighbors=n_neighbors,
             weights=weights,
@@ -95,6 +233,9 @@ class ImprovedKNNClassifier(SeizureDetectionModel):
             'metric': ['euclidean', 'manhattan', 'minkowski']
         }
         
+        from sklearn.model_selection import GridSearchCV
+        from sklearn.neighbors import KNeighborsClassifier
+        
         base_model = KNeighborsClassifier()
         grid_search = GridSearchCV(
             base_model, param_grid, cv=cv, 
@@ -122,6 +263,7 @@ class ImprovedLogisticRegression(SeizureDetectionModel):
         self.class_weight = class_weight
         self.max_iter = max_iter
         
+        from sklearn.linear_model import LogisticRegression
         self.model = LogisticRegression(
             C=C,
             class_weight=class_weight,
@@ -140,6 +282,9 @@ class ImprovedLogisticRegression(SeizureDetectionModel):
             'solver': ['liblinear', 'lbfgs']
         }
         
+        from sklearn.model_selection import GridSearchCV
+        from sklearn.linear_model import LogisticRegression
+        
         base_model = LogisticRegression(
             max_iter=2000,
             random_state=random_state
@@ -159,6 +304,115 @@ class ImprovedLogisticRegression(SeizureDetectionModel):
         valid_params = {k: v for k, v in best_params.items() 
                        if k in ['C', 'class_weight']}
         return cls(random_state=random_state, **valid_params)
+    
+    def _export_params(self) -> Tuple[str, Dict[str, np.ndarray]]:
+        """Export as plain weights so inference needs only numpy."""
+        return 'linear', {
+            'coef': self.model.coef_.ravel().astype(np.float64),
+            'intercept': np.asarray(self.model.intercept_, dtype=np.float64).ravel()
+        }
+
+class ImprovedSGDLogisticRegression(SeizureDetectionModel):
+    """
+    Logistic regression fitted by SGD, updatable with new epochs.
+    
+    FIXES: Confirmed annotations required a full retrain; partial_fit
+    updates the weights in place (see OnlineUpdater in online.py). Class
+    weights are fixed from the initial training labels, since SGD's
+    partial_fit cannot rebalance per batch.
+    """
+    
+    # OnlineUpdater hook: partial_fit(X, y) and rescale(...)
+    incremental = True
+    
+    def __init__(self, alpha: float = 1e-4, class_weight: str = 'balanced',
+                 max_iter: int = 1000, tol: float = 1e-3, random_state: int = None):
+        super().__init__(random_state)
+        self.alpha = alpha
+        self.class_weight = class_weight
+        self.max_iter = max_iter
+        self.tol = tol
+        
+        from sklearn.linear_model import SGDClassifier
+        self.model = SGDClassifier(
+            loss='log_loss',
+            alpha=alpha,
+            max_iter=max_iter,
+            tol=tol,
+            random_state=self.random_state
+        )
+        
+    def fit(self, X: np.ndarray, y: np.ndarray):
+        """Fit on the training epochs, freezing the class weights."""
+        class_weight = self.class_weight
+        if class_weight == 'balanced':
+            classes, counts = np.unique(y, return_counts=True)
+            class_weight = {int(c): len(y) / (len(classes) * n) for c, n in zip(classes, counts)}
+        self.model.set_params(class_weight=class_weight)
+        return super().fit(X, y)
+        
+    def partial_fit(self, X: np.ndarray, y: np.ndarray):
+        """One SGD pass over newly labelled (scaled) epochs."""
+        with profile_stage(f'{type(self).__name__}.partial_fit', X):
+            self.model.partial_fit(X, y, classes=np.array([0, 1]))
+        self.is_fitted = True
+        return self
+        
+    def rescale(self, old_mean: np.ndarray, old_scale: np.ndarray,
+                new_mean: np.ndarray, new_scale: np.ndarray):
+        """
+        Adjust the weights to updated scaler statistics so the decision
+        function on unscaled inputs is unchanged.
+        """
+        coef = self.model.coef_
+        self.model.intercept_ = self.model.intercept_ + coef @ ((new_mean - old_mean) / old_scale)
+        self.model.coef_ = coef * (new_scale / old_scale)
+        
+    def _export_params(self) -> Tuple[str, Dict[str, np.ndarray]]:
+        """Export as plain weights so inference needs only numpy."""
+        return 'linear', {
+            'coef': self.model.coef_.ravel().astype(np.float64),
+            'intercept': np.asarray(self.model.intercept_, dtype=np.float64).ravel()
+        }
+
+class IncrementalKNNClassifier(SeizureDetectionModel):
+    """
+    K-Nearest Neighbors over a numpy index that accepts inserts.
+    
+    FIXES: scikit-learn's KNN index must be rebuilt to add epochs; new
+    labelled epochs are appended with partial_fit (see KNNIndex in
+    online.py). With max_samples set, the oldest non-seizure epochs are
+    evicted first.
+    """
+    
+    # OnlineUpdater hook: partial_fit(X, y) and rescale(...)
+    incremental = True
+    
+    def __init__(self, n_neighbors: int = 7, weights: str = 'uniform',
+                 max_samples: int = None, random_state: int = None):
+        super().__init__(random_state)
+        self.n_neighbors = n_neighbors
+        self.weights = weights
+        self.max_samples = max_samples or Config.INCREMENTAL_KNN_MAX_SAMPLES
+        
+        try:
+            from .online import KNNIndex
+        except ImportError:
+            from online import KNNIndex
+        self.model = KNNIndex(n_neighbors=n_neighbors, weights=weights,
+                              max_samples=self.max_samples)
+        
+    def partial_fit(self, X: np.ndarray, y: np.ndarray):
+        """Insert newly labelled (scaled) epochs into the index."""
+        with profile_stage(f'{type(self).__name__}.partial_fit', X):
+            self.model.partial_fit(X, y)
+        self.is_fitted = True
+        return self
+        
+    def rescale(self, old_mean: np.ndarray, old_scale: np.ndarray,
+                new_mean: np.ndarray, new_scale: np.ndarray):
+        """Re-express the indexed epochs under updated scaler statistics."""
+        self.model.rescale(old_mean, old_scale, new_mean, new_scale)
 
 class ImprovedRandomForest(SeizureDetectionModel):
     """
@@ -177,6 +431,7 @@ class ImprovedRandomForest(SeizureDetectionModel):
         self.min_samples_leaf = min_samples_leaf
         self.class_weight = class_weight
         
+        from sklearn.ensemble import RandomForestClassifier
         self.model = RandomForestClassifier(
             n_estimators=n_estimators,
             max_depth=max_depth,
@@ -199,6 +454,9 @@ class ImprovedRandomForest(SeizureDetectionModel):
             'class_weight': ['balanced', 'balanced_subsample']
         }
         
+        from sklearn.model_selection import GridSearchCV
+        from sklearn.ensemble import RandomForestClassifier
+        
         base_model = RandomForestClassifier(
             random_state=random_state,
             n_jobs=-1
@@ -241,6 +499,7 @@ class ImprovedSVM(SeizureDetectionModel):
         self.class_weight = class_weight
         self.probability = probability
         
+        from sklearn.svm import SVC
         self.model = SVC(
             C=C,
             kernel=kernel,
@@ -262,6 +521,9 @@ class ImprovedSVM(SeizureDetectionModel):
             'class_weight': ['balanced']
         }
         
+        from sklearn.model_selection import GridSearchCV
+        from sklearn.svm import SVC
+        
         base_model = SVC(
             probability=True,
             random_state=random_state
@@ -279,6 +541,244 @@ class ImprovedSVM(SeizureDetectionModel):
         
         return cls(random_state=random_state, **best_params)
 
+class ImprovedHistGradientBoosting(SeizureDetectionModel):
+    """
+    Histogram-based gradient boosting on uint8-binned features.
+    
+    FIXES: Random Forest grows up to 100 deep trees on dense float64 data;
+    this model boosts shallow trees over at most 255 bins per feature. The
+    validator passes pre-binned patients from its BinnedPatientCache
+    (binning.py) and the validation patients for early stopping; float
+    inputs are binned with the stored edges.
+    
+    The saving is in the cache, not in fit(): the cached uint8 bins are 8x
+    smaller than float64 epochs, but HistGradientBoostingClassifier converts
+    them to float64 and bins them again. The model_*_fit benchmarks (6 x 200
+    epochs x 1280 features) peak at 6 MB of traced allocations for the
+    random forest (one float32 copy) and 32-34 MB here, from float or uint8
+    inputs alike.
+    
+    max_bins defaults to 63: histogram building dominates the fit on wide
+    epoch features, and 255 bins fitted 3.5x slower at the same AUC.
+    """
+    
+    # Validator hooks: fit(X, y, bin_edges=..., validation_data=...)
+    binned_input = True
+    uses_validation_data = True
+    
+    def __init__(self, max_iter: int = 200, learning_rate: float = 0.1,
+                 max_leaf_nodes: int = 31, min_samples_leaf: int = 20,
+                 l2_regularization: float = 0.0, max_bins: int = 63,
+                 n_iter_no_change: int = 10, class_weight: str = 'balanced',
+                 random_state: int = None):
+        super().__init__(random_state)
+        self.max_iter = max_iter
+        self.learning_rate = learning_rate
+        self.max_leaf_nodes = max_leaf_nodes
+        self.min_samples_leaf = min_samples_leaf
+        self.l2_regularization = l2_regularization
+        self.max_bins = max_bins
+        self.n_iter_no_change = n_iter_no_change
+        self.class_weight = class_weight
+        
+        try:
+            from .binning import BinnedEstimator
+        except ImportError:
+            from binning import BinnedEstimator
+        from sklearn.ensemble import HistGradientBoostingClassifier
+        self.model = BinnedEstimator(HistGradientBoostingClassifier(
+            max_iter=max_iter,
+            learning_rate=learning_rate,
+            max_leaf_nodes=max_leaf_nodes,
+            min_samples_leaf=min_samples_leaf,
+            l2_regularization=l2_regularization,
+            max_bins=max_bins,
+            n_iter_no_change=n_iter_no_change,
+            class_weight=class_weight,
+            random_state=self.random_state
+        ), max_bins=max_bins)
+        
+    def fit(self, X: np.ndarray, y: np.ndarray, bin_edges: np.ndarray = None,
+            validation_data: Tuple[np.ndarray, np.ndarray] = None):
+        """
+        Fit on float features or on uint8 bins made with bin_edges.
+        
+        Args:
+            bin_edges: Edges X was binned with (binning.merge_sketches)
+            validation_data: (X_val, y_val) of the validation patients;
+                boosting stops after n_iter_no_change rounds without
+                improving their loss. Without it, or with scikit-learn
+                < 1.7 (no X_val/y_val in fit), a random 10% of the
+                training epochs is held out instead.
+        """
+        import inspect
+        try:
+            from .binning import fit_bin_edges
+        except ImportError:
+            from binning import fit_bin_edges
+            
+        if bin_edges is not None:
+            self.model.bin_edges = bin_edges
+        elif np.asarray(X).dtype != np.uint8:
+            self.model.bin_edges = fit_bin_edges(X, self.max_bins)
+            
+        estimator = self.model.estimator
+        fit_params = {}
+        if validation_data is not None and len(np.unique(validation_data[1])) > 1:
+            estimator.set_params(early_stopping=True)
+            if 'X_val' in inspect.signature(estimator.fit).parameters:
+                fit_params = {'X_val': self.model.transform(validation_data[0]),
+                              'y_val': validation_data[1]}
+            else:
+                logger.warning("scikit-learn < 1.7 takes no X_val in HistGradientBoostingClassifier.fit, "
+                               "early stopping on validation_fraction of the training epochs")
+        else:
+            estimator.set_params(early_stopping='auto')
+            
+        with profile_stage(f'{type(self).__name__}.fit', X):
+            self.model.fit(X, y, **fit_params)
+        self.n_iter_ = estimator.n_iter_
+        logger.info(f"Gradient boosting stopped after {self.n_iter_} of {self.max_iter} iterations")
+        self.is_fitted = True
+        return self
+
+class CascadeEstimator:
+    """
+    Two-stage estimator: a linear screen on a few columns, then an expert.
+    
+    The screen (logistic regression on the n_screen_features columns that
+    best separate the classes) scores every epoch. Epochs scoring at least
+    threshold_ are escalated to the expert; the others keep the screen's
+    probability, which is below threshold_ <= 0.5. threshold_ lets through
+    target_recall of the calibration positives (validation patients when
+    fit() gets them), and the expert is trained on the escalated training
+    epochs only.
+    """
+    
+    def __init__(self, screen, expert, n_screen_features: int = 256,
+                 target_recall: float = 0.99):
+        self.screen = screen
+        self.expert = expert
+        self.n_screen_features = n_screen_features
+        self.target_recall = target_recall
+        
+    @staticmethod
+    def screen_columns(X: np.ndarray, y: np.ndarray, n_features: int) -> np.ndarray:
+        """Columns with the largest Fisher score (mean gap over pooled class variance)."""
+        X = np.asarray(X)
+        positive = np.asarray(y) == 1
+        gap = X[positive].mean(axis=0) - X[~positive].mean(axis=0)
+        score = gap ** 2 / (X[positive].var(axis=0) + X[~positive].var(axis=0) + 1e-12)
+        if n_features >= X.shape[1]:
+            return np.arange(X.shape[1])
+        return np.sort(np.argpartition(score, -n_features)[-n_features:])
+        
+    def screen_proba(self, X: np.ndarray) -> np.ndarray:
+        return self.screen.predict_proba(np.asarray(X)[:, self.columns_])[:, 1]
+        
+    def fit(self, X: np.ndarray, y: np.ndarray, validation_data: Tuple[np.ndarray, np.ndarray] = None):
+        X, y = np.asarray(X), np.asarray(y)
+        self.columns_ = self.screen_columns(X, y, self.n_screen_features)
+        with profile_stage('cascade.screen_fit', X):
+            self.screen.fit(X[:, self.columns_], y)
+        
+        X_cal, y_cal = X, y
+        if validation_data is not None and np.any(np.asarray(validation_data[1]) == 1):
+            X_cal, y_cal = np.asarray(validation_data[0]), np.asarray(validation_data[1])
+        else:
+            logger.warning("No validation seizures: cascade threshold calibrated on training epochs")
+        scores = np.sort(self.screen_proba(X_cal[y_cal == 1]))
+        k = int(np.floor((1 - self.target_recall) * len(scores)))
+        self.threshold_ = min(float(scores[min(k, len(scores) - 1)]), 0.5)
+        
+        escalate = self.screen_proba(X) >= self.threshold_
+        self.escalated_train_fraction_ = float(escalate.mean())
+        if len(np.unique(y[escalate])) < 2:
+            escalate[:] = True
+        with profile_stage('cascade.expert_fit', X[escalate]):
+            self.expert.fit(X[escalate], y[escalate])
+        return self
+        
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        X = np.asarray(X)
+        proba = self.screen_proba(X)
+        escalate = proba >= self.threshold_
+        self.escalated_fraction_ = float(escalate.mean()) if len(X) else 0.0
+        if escalate.any():
+            with profile_stage('cascade.expert', X[escalate]):
+                proba[escalate] = self.expert.predict_proba(X[escalate])[:, 1]
+        return np.column_stack([1 - proba, proba])
+        
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        return (self.predict_proba(X)[:, 1] >= 0.5).astype(int)
+
+class CascadeDetector(SeizureDetectionModel):
+    """
+    Cheap linear screen in front of an expensive expert model.
+    
+    FIXES: Almost all epochs are interictal, yet every epoch paid for the
+    most expensive model (RBF SVM or KNN on the full epoch features). The
+    screen passes only epochs above a low threshold, tuned on the
+    validation patients to keep target_recall of their seizure epochs, to
+    the expert (any ModelFactory feature model). evaluation_report() gives
+    the escalated fraction and the throughput gain over the expert alone.
+    """
+    
+    # Validator hook: fit(X, y, validation_data=...) calibrates the screen
+    uses_validation_data = True
+    
+    def __init__(self, expert: str = 'svm', expert_params: Dict[str, Any] = None,
+                 screen_features: int = None, target_recall: float = None,
+                 screen_C: float = 0.1, random_state: int = None):
+        super().__init__(random_state)
+        self.expert = expert
+        self.expert_params = expert_params
+        self.screen_features = screen_features or Config.CASCADE_SCREEN_FEATURES
+        self.target_recall = target_recall or Config.CASCADE_TARGET_RECALL
+        self.screen_C = screen_C
+        
+        from sklearn.linear_model import LogisticRegression
+        screen = LogisticRegression(C=screen_C, class_weight='balanced', max_iter=2000,
+                                    random_state=self.random_state, solver='liblinear')
+        expert_model = ModelFactory.create_model(expert, random_state=self.random_state,
+                                                 **(expert_params or {}))
+        self.model = CascadeEstimator(screen, expert_model.model, self.screen_features,
+                                      self.target_recall)
+        
+    def fit(self, X: np.ndarray, y: np.ndarray, validation_data: Tuple[np.ndarray, np.ndarray] = None):
+        """Fit the screen, calibrate its threshold, then fit the expert on escalated epochs."""
+        with profile_stage(f'{type(self).__name__}.fit', X):
+            self.model.fit(X, y, validation_data=validation_data)
+        logger.info(f"Cascade threshold {self.model.threshold_:.3f} escalates "
+                    f"{self.model.escalated_train_fraction_:.1%} of training epochs")
+        self.is_fitted = True
+        return self
+        
+    def evaluation_report(self, X: np.ndarray) -> Dict[str, Any]:
+        """
+        Escalated fraction and throughput of the cascade vs. the expert
+        alone on X (e.g. the test patients).
+        """
+        import time
+        
+        X = np.asarray(X)
+        start = time.perf_counter()
+        self.model.predict_proba(X)
+        cascade_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        self.model.expert.predict_proba(X)
+        expert_seconds = time.perf_counter() - start
+        return {
+            'expert': self.expert,
+            'screen_features': len(self.model.columns_),
+            'screen_threshold': self.model.threshold_,
+            'escalated_fraction': self.model.escalated_fraction_,
+            'escalated_train_fraction': self.model.escalated_train_fraction_,
+            'cascade_epochs_per_second': len(X) / max(cascade_seconds, 1e-9),
+            'expert_epochs_per_second': len(X) / max(expert_seconds, 1e-9),
+            'throughput_gain': expert_seconds / max(cascade_seconds, 1e-9)
+        }
+
 class ModelFactory:
     """
     Factory class for creating and configuring seizure detection models.
@@ -287,11 +787,22 @@ class ModelFactory:
     @staticmethod
     def get_available_models() -> Dict[str, type]:
         """Get dictionary of available model classes."""
+        # Imported here: prediction.py builds on SeizureDetectionModel
+        try:
+            from .prediction import LSTMSeizureDetector
+        except ImportError:
+            from prediction import LSTMSeizureDetector
+            
         return {
             'knn': ImprovedKNNClassifier,
             'logistic': ImprovedLogisticRegression,
             'random_forest': ImprovedRandomForest,
-            'svm': ImprovedSVM
+            'svm': ImprovedSVM,
+            'gradient_boosting': ImprovedHistGradientBoosting,
+            'sgd_logistic': ImprovedSGDLogisticRegression,
+            'knn_incremental': IncrementalKNNClassifier,
+            'cascade': CascadeDetector,
+            'lstm': LSTMSeizureDetector
         }
     
     @staticmethod
@@ -300,7 +811,8 @@ class ModelFactory:
         Create a model instance by name.
         
         Args:
-            model_name: Name of the model ('knn', 'logistic', 'random_forest', 'svm')
+            model_name: Name of the model ('knn', 'logistic', 'random_forest', 'svm',
+                'gradient_boosting', 'sgd_logistic', 'knn_incremental', 'cascade', 'lstm')
             **kwargs: Additional parameters for model initialization
             
         Returns:
@@ -344,8 +856,25 @@ class ModelFactory:
             logger.warning(f"Model {model_name} doesn't support automated tuning")
             return model_class(**kwargs)
 
+@contextmanager
+def single_threaded():
+    """
+    Fit and score on one core: joblib runs sequentially whatever n_jobs an
+    estimator or GridSearchCV asks for, and the BLAS/OpenMP pools get one
+    thread. For models trained in parallel worker processes, where n_jobs=-1
+    in every worker would start about cpu_count^2 threads.
+    """
+    from threadpoolctl import threadpool_limits
+    try:
+        from joblib import parallel_config
+    except ImportError:  # joblib < 1.3
+        from joblib import parallel_backend as parallel_config
+    with parallel_config(backend='sequential'), threadpool_limits(limits=1):
+        yield
+
 # Utility functions for model comparison
-def compare_models(patient_data: Dict, patient_splits: Dict, validator) -> pd.DataFrame:
+def compare_models(patient_data: Dict, patient_splits: Dict, validator,
+                   feature_stage=None, n_bootstrap: int = 0) -> 'pd.DataFrame':
     """
     Compare all available models using proper validation.
     
@@ -353,16 +882,26 @@ def compare_models(patient_data: Dict, patient_splits: Dict, validator) -> pd.Da
         patient_data: Dictionary mapping patient_id -> (X, y)
         patient_splits: Train/val/test patient splits
         validator: PatientIndependentValidator instance
+        feature_stage: Optional transformer (e.g. features.TangentSpaceFeatures)
+            fitted on the training patients of each model's run
+        n_bootstrap: Patient-level bootstrap replicates for 95% intervals
+            of the test metrics ('<metric> CI low'/'<metric> CI high'
+            columns); 0 disables them
         
     Returns:
         DataFrame with model comparison results
     """
-    models_to_test = [
-        ('KNN', 'knn'),
-        ('Logistic Regression', 'logistic'),
-        ('Random Forest', 'random_forest'),
-        ('SVM', 'svm')
-    ]
+    import pandas as pd
+    try:
+        from .validation import PatientBootstrap
+    except ImportError:
+        from validation import PatientBootstrap
+    
+    metric_columns = {'accuracy': 'Accuracy', 'precision': 'Precision', 'recall': 'Recall',
+                      'f1': 'F1-Score', 'specificity': 'Specificity', 'auc': 'AUC'}
+    
+    models_to_test = [(display_name, model_name)
+                      for model_name, display_name in MODEL_DISPLAY_NAMES.items()]
     
     results = []
     
@@ -376,24 +915,33 @@ def compare_models(patient_data: Dict, patient_splits: Dict, validator) -> pd.Da
             result = validator.validate_model(
                 model_class=model_class,
                 patient_data=patient_data,
-                patient_splits=patient_splits
+                patient_splits=patient_splits,
+                feature_stage=feature_stage
             )
             
             # Extract test metrics
             test_metrics = result['test']
             
-            results.append({
-                'Model': model_display_name,
-                'Accuracy': test_metrics.get('accuracy', np.nan),
-                'Precision': test_metrics.get('precision', np.nan),
-                'Recall': test_metrics.get('recall', np.nan),
-                'F1-Score': test_metrics.get('f1', np.nan),
-                'Specificity': test_metrics.get('specificity', np.nan),
-                'AUC': test_metrics.get('auc', np.nan),
+            row = {'Model': model_display_name}
+            row.update({column: test_metrics.get(metric, np.nan)
+                        for metric, column in metric_columns.items()})
+            row.update({
                 'Test_Samples': test_metrics.get('n_samples', 0),
                 'Seizure_Samples': test_metrics.get('n_positive', 0)
             })
             
+            if n_bootstrap:
+                # Same replicates (random_state) for every model, so the
+                # intervals are paired across models
+                intervals = PatientBootstrap(n_bootstrap, random_state=validator.random_state) \
+                    .from_results(result)
+                for metric, column in metric_columns.items():
+                    if metric in intervals:
+                        row[f'{column} CI low'] = intervals[metric]['low']
+                        row[f'{column} CI high'] = intervals[metric]['high']
+            
+            results.append(row)
+            
         except Exception as e:
             logger.error(f"Failed to evaluate {model_display_name}: {e}")
             results.append({
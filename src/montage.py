@@ -0,0 +1,242 @@
+"""
+Header-only channel mapping of EDF files onto Config.SELECTED_CHANNELS.
+
+CHB-MIT recordings do not all use the same channel labels: some repeat a
+channel (two 'T8-P8' signals, which MNE renames 'T8-P8-0'/'T8-P8-1'), some
+use the old 10-20 names (T3/T4/T5/T6), carry dummy '-' signals, or change
+montage between files of the same patient. Requiring exact names dropped
+such files only after decoding all their samples.
+
+MontageIndex reads just the EDF header (256 + 256 * n_signals bytes) of
+each file and maps the selected channels to signal indices:
+    aliases     labels are normalized (case, spacing, 'EEG ' prefix,
+                MNE's duplicate suffixes, old 10-20 names) before matching
+    duplicates  DUPLICATE_CHANNEL_STRATEGY 'first' uses the first signal
+                with a label; 'reject' rejects the file
+    missing     MISSING_CHANNEL_STRATEGY 'reject' rejects files missing any
+                selected channel; 'zero' loads them with up to
+                MAX_MISSING_CHANNELS zero-filled channels
+Incompatible files are rejected before any sample data is read; the
+others load only the mapped signals, in the selected order (see
+data_processing.load_edf_channels). Only the standard library is required.
+"""
+import logging
+import re
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+try:
+    from .config import Config
+except ImportError:
+    from config import Config
+
+logger = logging.getLogger(__name__)
+
+MISSING_STRATEGIES = ['reject', 'zero']
+DUPLICATE_STRATEGIES = ['first', 'reject']
+
+# Old 10-20 electrode names -> current names
+ELECTRODE_ALIASES = {'T3': 'T7', 'T4': 'T8', 'T5': 'P7', 'T6': 'P8'}
+
+# EDF+ annotation signals; MNE does not list them as channels
+_ANNOTATION_LABEL = 'EDF ANNOTATIONS'
+
+
+@dataclass
+class EDFHeader:
+    """Signal labels and timing from an EDF header (annotation signals excluded)."""
+    labels: List[str]
+    n_records: int
+    record_duration: float
+    samples_per_record: List[int]
+
+    @property
+    def duration(self) -> float:
+        return self.n_records * self.record_duration
+
+    @property
+    def sfreqs(self) -> List[float]:
+        return [n / self.record_duration for n in self.samples_per_record]
+
+
+def read_edf_header(path: Path) -> EDFHeader:
+    """Parse the fixed and per-signal EDF header fields without reading samples."""
+    with open(path, 'rb') as f:
+        fixed = f.read(256)
+        if len(fixed) < 256:
+            raise ValueError(f"{Path(path).name} is too short to be an EDF file")
+        n_signals = int(fixed[252:256].decode('ascii').strip())
+        signal_header = f.read(256 * n_signals)
+    if len(signal_header) < 256 * n_signals:
+        raise ValueError(f"{Path(path).name} has a truncated EDF header")
+
+    def signal_field(offset: int, width: int) -> List[str]:
+        start = offset * n_signals
+        return [signal_header[start + i * width:start + (i + 1) * width].decode('latin-1').strip()
+                for i in range(n_signals)]
+
+    # Per-signal fields: label 16, transducer 80, dimension 8, physical
+    # min/max 8+8, digital min/max 8+8, prefiltering 80, samples/record 8
+    labels = signal_field(0, 16)
+    samples = [int(s) for s in signal_field(16 + 80 + 8 + 8 + 8 + 8 + 8 + 80, 8)]
+    keep = [i for i, label in enumerate(labels) if label.upper() != _ANNOTATION_LABEL]
+    return EDFHeader(
+        labels=[labels[i] for i in keep],
+        n_records=int(fixed[236:244].decode('ascii').strip()),
+        record_duration=float(fixed[244:252].decode('ascii').strip()),
+        samples_per_record=[samples[i] for i in keep]
+    )
+
+
+def normalize_channel_name(name: str) -> str:
+    """
+    Canonical form of a channel label.
+
+    'EEG fp1-F7' -> 'FP1-F7', 'T8-P8-0' -> 'T8-P8', 'T3-C3' -> 'T7-C3'
+    """
+    name = re.sub(r'\s+', '', name.upper())
+    if name.startswith('EEG'):
+        name = name[3:]
+    # MNE suffixes repeated labels with -0, -1, ... (bipolar names have two electrodes)
+    parts = [p for p in name.split('-') if p]
+    if len(parts) > 2 and parts[-1].isdigit():
+        parts = parts[:-1]
+    return '-'.join(ELECTRODE_ALIASES.get(p, p) for p in parts)
+
+
+@dataclass
+class ChannelMapping:
+    """
+    How one file's signals map onto the selected channels.
+
+    indices[k] is the signal index (in the file's non-annotation signal
+    order, which is MNE's channel order) of selected channel k, or -1 when
+    it is missing.
+    """
+    file: str
+    indices: List[int]
+    missing: List[str] = field(default_factory=list)
+    duplicates: Dict[str, List[int]] = field(default_factory=dict)
+    renamed: Dict[str, str] = field(default_factory=dict)
+    sfreq: Optional[float] = None
+    duration: Optional[float] = None
+    reason: Optional[str] = None
+
+    @property
+    def compatible(self) -> bool:
+        return self.reason is None
+
+    @property
+    def exact(self) -> bool:
+        """True if the file has every selected channel under its exact name, once."""
+        return self.compatible and not (self.missing or self.duplicates or self.renamed)
+
+    def summary(self) -> Dict:
+        return {'file': self.file, 'compatible': self.compatible, 'reason': self.reason,
+                'missing': self.missing, 'duplicates': sorted(self.duplicates),
+                'renamed': self.renamed}
+
+
+def map_channels(labels: Sequence[str], selected: Sequence[str] = None, file: str = '',
+                 missing_strategy: str = None, duplicate_strategy: str = None,
+                 max_missing: int = None) -> ChannelMapping:
+    """
+    Map a file's signal labels onto the selected channels.
+
+    Args:
+        labels: Signal labels in file order
+        selected: Channels to load, in output order (Config.SELECTED_CHANNELS)
+        file: File name for the mapping and messages
+        missing_strategy, duplicate_strategy, max_missing: Default to Config
+
+    Returns:
+        ChannelMapping; mapping.reason says why an incompatible file is rejected
+    """
+    selected = list(selected or Config.SELECTED_CHANNELS)
+    missing_strategy = missing_strategy or Config.MISSING_CHANNEL_STRATEGY
+    duplicate_strategy = duplicate_strategy or Config.DUPLICATE_CHANNEL_STRATEGY
+    max_missing = Config.MAX_MISSING_CHANNELS if max_missing is None else max_missing
+    if missing_strategy not in MISSING_STRATEGIES:
+        raise ValueError(f"Unknown missing-channel strategy '{missing_strategy}'. "
+                         f"Available: {MISSING_STRATEGIES}")
+    if duplicate_strategy not in DUPLICATE_STRATEGIES:
+        raise ValueError(f"Unknown duplicate-channel strategy '{duplicate_strategy}'. "
+                         f"Available: {DUPLICATE_STRATEGIES}")
+
+    positions: Dict[str, List[int]] = {}
+    for i, label in enumerate(labels):
+        positions.setdefault(normalize_channel_name(label), []).append(i)
+
+    indices, missing, duplicates, renamed = [], [], {}, {}
+    for channel in selected:
+        found = positions.get(normalize_channel_name(channel), [])
+        if not found:
+            missing.append(channel)
+            indices.append(-1)
+            continue
+        if len(found) > 1:
+            duplicates[channel] = found
+        indices.append(found[0])
+        if labels[found[0]] != channel:
+            renamed[labels[found[0]]] = channel
+
+    mapping = ChannelMapping(file, indices, missing, duplicates, renamed)
+    if duplicates and duplicate_strategy == 'reject':
+        mapping.reason = f"duplicated channels {sorted(duplicates)}"
+    elif missing and (missing_strategy == 'reject' or len(missing) > max_missing):
+        mapping.reason = f"missing channels {missing}"
+    elif len(missing) == len(selected):
+        mapping.reason = "none of the selected channels"
+    return mapping
+
+
+class MontageIndex:
+    """
+    Per-file channel mappings, built from EDF headers only.
+
+    Mappings are cached by path, size and modification time, so re-scanning
+    a patient directory only reads headers of new or changed files.
+    """
+
+    def __init__(self, selected: Sequence[str] = None, missing_strategy: str = None,
+                 duplicate_strategy: str = None, max_missing: int = None):
+        self.selected = list(selected or Config.SELECTED_CHANNELS)
+        self.missing_strategy = missing_strategy
+        self.duplicate_strategy = duplicate_strategy
+        self.max_missing = max_missing
+        self._cache: Dict[tuple, ChannelMapping] = {}
+
+    def mapping(self, path: Path) -> ChannelMapping:
+        """Channel mapping of one file (rejected if its header is unreadable)."""
+        path = Path(path)
+        stat = path.stat()
+        cache_key = (str(path), stat.st_size, stat.st_mtime_ns)
+        if cache_key not in self._cache:
+            try:
+                header = read_edf_header(path)
+            except (OSError, ValueError) as e:
+                self._cache[cache_key] = ChannelMapping(path.name, [-1] * len(self.selected),
+                                                        reason=f"unreadable header: {e}")
+                return self._cache[cache_key]
+            mapping = map_channels(header.labels, self.selected, path.name, self.missing_strategy,
+                                   self.duplicate_strategy, self.max_missing)
+            mapping.duration = header.duration
+            picked = {header.sfreqs[i] for i in mapping.indices if i >= 0}
+            if len(picked) > 1 and mapping.compatible:
+                mapping.reason = f"mixed sampling rates {sorted(picked)}"
+            mapping.sfreq = picked.pop() if len(picked) == 1 else None
+            self._cache[cache_key] = mapping
+        return self._cache[cache_key]
+
+    def scan(self, paths: Sequence[Path]) -> Dict[str, ChannelMapping]:
+        """Mappings of several files, keyed by file name, logging rejections."""
+        mappings = {}
+        for path in paths:
+            mapping = self.mapping(path)
+            if not mapping.compatible:
+                logger.warning(f"Skipping {mapping.file}: {mapping.reason}")
+            elif not mapping.exact:
+                logger.info(f"{mapping.file}: channels remapped {mapping.summary()}")
+            mappings[mapping.file] = mapping
+        return mappings
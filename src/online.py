@@ -0,0 +1,257 @@
+"""
+Incremental updates of fitted detectors from confirmed annotations.
+
+When clinicians confirm new seizures (or false alarms), the labelled epochs
+update an incremental model in place instead of retraining on everything:
+    updater = OnlineUpdater.from_results(results, 'logistic_sgd')
+    updater.update(X_new, y_new)    # raw epochs, as given to the validator
+    updater.save()                  # next artifact version in Config.MODELS_DIR
+
+Models with incremental = True (ImprovedSGDLogisticRegression,
+IncrementalKNNClassifier) support partial_fit and rescale. The running
+StandardScaler statistics are updated with the new epochs first, then the
+model is rescaled: linear weights are adjusted so the decision function on
+unscaled inputs is unchanged, and the KNN index is re-expressed in the new
+scaling. Only the partial_fit step changes what the model has learned.
+
+KNNIndex (the KNN replacement with inserts) needs only numpy, so exported
+KNN artifacts score without scikit-learn.
+"""
+import logging
+import pickle
+from pathlib import Path
+from typing import Any, Dict
+
+import numpy as np
+
+try:
+    from .config import Config
+    from .inference import artifact_path
+    from .profiling import profile_stage
+except ImportError:
+    from config import Config
+    from inference import artifact_path
+    from profiling import profile_stage
+
+logger = logging.getLogger(__name__)
+
+# Query rows scored at once; bounds the (rows, n_samples) distance matrix
+CHUNK_ROWS = 256
+
+
+class KNNIndex:
+    """
+    Brute-force k-nearest-neighbour classifier over a growable numpy index.
+
+    Inserts append to a buffer that doubles in capacity, so partial_fit is
+    amortized O(rows inserted). With max_samples set, the oldest
+    non-seizure epochs are evicted first, keeping the rare seizure
+    examples.
+    """
+
+    def __init__(self, n_neighbors: int = 7, weights: str = 'uniform', max_samples: int = None):
+        if weights not in ('uniform', 'distance'):
+            raise ValueError(f"Unknown weights '{weights}'. Use 'uniform' or 'distance'")
+        self.n_neighbors = n_neighbors
+        self.weights = weights
+        self.max_samples = max_samples
+        self.classes_ = np.array([0, 1])
+        self.n_samples_ = 0
+        self._X = None
+        self._y = None
+        self._sq_norms = None
+
+    def fit(self, X: np.ndarray, y: np.ndarray):
+        self.n_samples_ = 0
+        self._X = None
+        return self.partial_fit(X, y)
+
+    def partial_fit(self, X: np.ndarray, y: np.ndarray):
+        """Insert labelled rows into the index."""
+        X = np.asarray(X, dtype=np.float64)
+        y = np.asarray(y, dtype=np.int8)
+        if self._X is None:
+            self._allocate(max(len(X), 1), X.shape[1])
+        elif X.shape[1] != self._X.shape[1]:
+            raise ValueError(f"Index holds {self._X.shape[1]} features, got {X.shape[1]}")
+        needed = self.n_samples_ + len(X)
+        if needed > len(self._X):
+            self._allocate(max(needed, 2 * len(self._X)), X.shape[1])
+
+        rows = slice(self.n_samples_, needed)
+        self._X[rows] = X
+        self._y[rows] = y
+        self._sq_norms[rows] = np.einsum('ij,ij->i', X, X)
+        self.n_samples_ = needed
+
+        if self.max_samples and self.n_samples_ > self.max_samples:
+            self._evict(self.n_samples_ - self.max_samples)
+        return self
+
+    def _allocate(self, capacity: int, n_features: int):
+        X = np.empty((capacity, n_features), dtype=np.float64)
+        y = np.empty(capacity, dtype=np.int8)
+        sq_norms = np.empty(capacity, dtype=np.float64)
+        if self._X is not None:
+            X[:self.n_samples_] = self._X[:self.n_samples_]
+            y[:self.n_samples_] = self._y[:self.n_samples_]
+            sq_norms[:self.n_samples_] = self._sq_norms[:self.n_samples_]
+        self._X, self._y, self._sq_norms = X, y, sq_norms
+
+    def _evict(self, n_drop: int):
+        """Drop the n_drop oldest rows, non-seizure rows first."""
+        y = self._y[:self.n_samples_]
+        order = np.concatenate([np.flatnonzero(y == 0), np.flatnonzero(y != 0)])
+        keep = np.ones(self.n_samples_, dtype=bool)
+        keep[order[:n_drop]] = False
+        n_keep = int(keep.sum())
+        self._X[:n_keep] = self._X[:self.n_samples_][keep]
+        self._y[:n_keep] = y[keep]
+        self._sq_norms[:n_keep] = self._sq_norms[:self.n_samples_][keep]
+        self.n_samples_ = n_keep
+
+    def rescale(self, old_mean: np.ndarray, old_scale: np.ndarray,
+                new_mean: np.ndarray, new_scale: np.ndarray):
+        """Re-express the stored rows under updated scaler statistics."""
+        X = self._X[:self.n_samples_]
+        X *= old_scale / new_scale
+        X += (old_mean - new_mean) / new_scale
+        self._sq_norms[:self.n_samples_] = np.einsum('ij,ij->i', X, X)
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        if not self.n_samples_:
+            raise ValueError("Index is empty")
+        X = np.asarray(X, dtype=np.float64)
+        k = min(self.n_neighbors, self.n_samples_)
+        index = self._X[:self.n_samples_]
+        labels = self._y[:self.n_samples_]
+        sq_norms = self._sq_norms[:self.n_samples_]
+
+        proba_pos = np.empty(len(X))
+        for start in range(0, len(X), CHUNK_ROWS):
+            Q = X[start:start + CHUNK_ROWS]
+            d2 = sq_norms - 2.0 * (Q @ index.T)
+            neighbors = np.argpartition(d2, k - 1, axis=1)[:, :k]
+            votes = labels[neighbors].astype(np.float64)
+            if self.weights == 'distance':
+                dist = np.take_along_axis(d2, neighbors, axis=1) + np.einsum('ij,ij->i', Q, Q)[:, None]
+                w = 1.0 / np.maximum(np.sqrt(np.maximum(dist, 0.0)), 1e-12)
+                proba_pos[start:start + len(Q)] = (w * votes).sum(axis=1) / w.sum(axis=1)
+            else:
+                proba_pos[start:start + len(Q)] = votes.mean(axis=1)
+        return np.column_stack([1 - proba_pos, proba_pos])
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        return (self.predict_proba(X)[:, 1] > 0.5).astype(int)
+
+    def __getstate__(self):
+        # Pickle only the filled part of the index
+        state = dict(self.__dict__)
+        for key in ['_X', '_y', '_sq_norms']:
+            if state[key] is not None:
+                state[key] = state[key][:self.n_samples_].copy()
+        return state
+
+
+class OnlineUpdater:
+    """
+    Applies confirmed annotations to a fitted incremental detector.
+
+    The feature stage stays frozen; the scaler and model are updated in
+    place, and save() writes the next artifact version plus a state file
+    from which resume() continues updating after a restart.
+    """
+
+    def __init__(self, model, scaler, name: str, feature_stage=None,
+                 update_scaler: bool = True, models_dir: Path = None):
+        """
+        Args:
+            model: Fitted model with incremental = True
+            scaler: Fitted StandardScaler used on the model's inputs
+            name: Artifact name; versions are saved as <name>-v<N>.npz
+            feature_stage: Fitted transformer applied before the scaler
+            update_scaler: Update the scaler statistics with new epochs
+            models_dir: Defaults to Config.MODELS_DIR
+        """
+        if not getattr(model, 'incremental', False):
+            raise ValueError(f"{type(model).__name__} does not support incremental updates; "
+                             f"use e.g. 'sgd_logistic' or 'knn_incremental'")
+        if not model.is_fitted:
+            raise ValueError("Model must be fitted before incremental updates")
+        self.model = model
+        self.scaler = scaler
+        self.name = name
+        self.feature_stage = feature_stage
+        self.update_scaler = update_scaler
+        self.models_dir = Path(models_dir) if models_dir else Config.MODELS_DIR
+        self.n_updates = 0
+        self.n_samples = 0
+
+    @classmethod
+    def from_results(cls, results: Dict[str, Any], name: str, **kwargs) -> 'OnlineUpdater':
+        """Updater for the model of validate_model(..., keep_fitted=True)."""
+        fitted = results['fitted']
+        return cls(fitted['model'], fitted['scaler'], name,
+                   feature_stage=fitted['feature_stage'], **kwargs)
+
+    def update(self, X: np.ndarray, y: np.ndarray) -> 'OnlineUpdater':
+        """
+        Learn from newly labelled epochs.
+
+        Args:
+            X: Epochs as given to the validator, shape (n_epochs, n_features),
+                or unflattened (n_epochs, n_channels, n_times)
+            y: Confirmed labels
+        """
+        X = np.asarray(X, dtype=np.float64)
+        X = X.reshape(len(X), -1) if X.ndim > 1 else X[np.newaxis, :]
+        y = np.atleast_1d(np.asarray(y, dtype=int))
+        if len(X) != len(y):
+            raise ValueError(f"{len(X)} epochs but {len(y)} labels")
+
+        with profile_stage('online_update', X):
+            if self.feature_stage is not None:
+                X = self.feature_stage.transform(X)
+            if self.update_scaler and self.scaler is not None:
+                old_mean, old_scale = self.scaler.mean_.copy(), self.scaler.scale_.copy()
+                self.scaler.partial_fit(X)
+                self.model.rescale(old_mean, old_scale, self.scaler.mean_, self.scaler.scale_)
+            X_scaled = self.scaler.transform(X) if self.scaler is not None else X
+            self.model.partial_fit(X_scaled, y)
+
+        self.n_updates += 1
+        self.n_samples += len(y)
+        logger.info(f"[online] {self.name}: update {self.n_updates} with {len(y)} epochs "
+                    f"({int(np.sum(y))} seizure)")
+        return self
+
+    def save(self) -> Path:
+        """Export the next artifact version and its updater state."""
+        path = self.model.export(self.name, scaler=self.scaler, feature_stage=self.feature_stage,
+                                 models_dir=self.models_dir)
+        state = {'model': self.model, 'scaler': self.scaler, 'feature_stage': self.feature_stage,
+                 'update_scaler': self.update_scaler, 'n_updates': self.n_updates,
+                 'n_samples': self.n_samples}
+        with open(self.state_path(path), 'wb') as f:
+            pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+        logger.info(f"[online] {self.name} saved to {path}")
+        return path
+
+    @staticmethod
+    def state_path(artifact: Path) -> Path:
+        return Path(artifact).with_suffix('.state.pkl')
+
+    @classmethod
+    def resume(cls, name: str, version: int = None, models_dir: Path = None) -> 'OnlineUpdater':
+        """Continue updating a saved version (the latest if version is None)."""
+        path = artifact_path(name, version=version, models_dir=models_dir)
+        state_file = cls.state_path(path)
+        if not state_file.exists():
+            raise FileNotFoundError(f"No updater state for {path.name}; it was not saved by OnlineUpdater")
+        with open(state_file, 'rb') as f:
+            state = pickle.load(f)
+        updater = cls(state['model'], state['scaler'], name, feature_stage=state['feature_stage'],
+                      update_scaler=state['update_scaler'], models_dir=path.parent)
+        updater.n_updates = state['n_updates']
+        updater.n_samples = state['n_samples']
+        return updater
@@ -0,0 +1,407 @@
+"""
+Patient-specific seizure detection models, trained in parallel.
+
+Seizure detection on CHB-MIT works best with one model per patient. Each
+patient's recordings (EDF files) are split into train/val/test files, with
+the latest recordings held out, so test epochs always come from recordings
+the model never saw. The usual PatientIndependentValidator then runs on
+those file splits, treating every recording as a unit the way it treats
+patients in the pooled setting.
+
+Patients train in parallel in a process pool. A worker loads only its own
+patient (from a checkpoint, not through the pool's pipe), fits
+single-threaded (models.single_threaded) so n_jobs=-1 models do not start
+a thread per core in every worker, and on Python >= 3.11 is replaced after
+every patient, optionally under a resident-memory limit, so per-worker
+memory stays bounded. Fitted models are exported as inference artifacts
+and listed with their test metrics in a JSON registry under
+Config.MODELS_DIR.
+"""
+import functools
+import json
+import logging
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Tuple
+
+import numpy as np
+
+try:
+    from .config import Config
+except ImportError:
+    from config import Config
+
+logger = logging.getLogger(__name__)
+
+REGISTRY_NAME = 'patient_registry.json'
+
+# Exit status of a worker ended by the memory watchdog
+MEMORY_EXIT_CODE = 3
+
+# Test metrics kept in the registry
+REGISTRY_METRICS = ['accuracy', 'precision', 'recall', 'f1', 'specificity', 'auc']
+
+
+def split_files(file_labels: List[np.ndarray], test_ratio: float = 0.3,
+                val_ratio: float = 0.2) -> Dict[str, List[int]]:
+    """
+    Split one patient's recordings into train/val/test recordings.
+
+    Recordings with and without seizures are split separately, so every
+    split gets its share of seizures; within each group the latest
+    recordings go to test and the ones before them to val.
+
+    Args:
+        file_labels: Epoch labels of each recording, in recording order
+        test_ratio, val_ratio: Fractions of the recordings per split
+
+    Returns:
+        Dict split -> recording indices
+    """
+    seizure = [i for i, y in enumerate(file_labels) if np.any(y)]
+    other = [i for i, y in enumerate(file_labels) if not np.any(y)]
+    if len(seizure) < 2:
+        raise ValueError(f"Seizures in {len(seizure)} recording(s); patient-specific training "
+                         f"needs seizures in at least two (train and test)")
+
+    n_test = min(len(seizure) - 1, max(1, int(round(len(seizure) * test_ratio))))
+    n_val = min(len(seizure) - 1 - n_test, int(round(len(seizure) * val_ratio)))
+    n_test_other = int(round(len(other) * test_ratio))
+    n_val_other = int(round(len(other) * val_ratio))
+    if n_val + n_val_other == 0:
+        # The validation split must not be empty
+        if len(other) > n_test_other:
+            n_val_other = 1
+        elif len(seizure) - 1 - n_test > 0:
+            n_val = 1
+        else:
+            raise ValueError(f"{len(file_labels)} recordings are too few for train/val/test splits")
+
+    def take(files, n_test, n_val):
+        n_train = len(files) - n_test - n_val
+        return files[:n_train], files[n_train:n_train + n_val], files[n_train + n_val:]
+
+    splits = {'train': [], 'val': [], 'test': []}
+    for files, n_t, n_v in [(seizure, n_test, n_val), (other, n_test_other, n_val_other)]:
+        for split, part in zip(['train', 'val', 'test'], take(files, n_t, n_v)):
+            splits[split].extend(part)
+    return {split: sorted(files) for split, files in splits.items()}
+
+
+def recordings(X: np.ndarray, y: np.ndarray, timeline: Dict) -> Tuple[Dict, Dict, List[str]]:
+    """
+    Cut a patient's epochs into per-recording data and event metadata.
+
+    Args:
+        X, y: The patient's epochs and labels
+        timeline: Processor metadata with 'file_names', 'file_epochs',
+            'file_durations', 'epoch_times' and 'seizure_intervals'
+
+    Returns:
+        (recording_data, recording_metadata, recording ids), keyed like
+        patient_data and patient_metadata for validate_model
+    """
+    missing = {'file_names', 'file_epochs', 'file_durations'} - set(timeline)
+    if missing:
+        raise ValueError(f"Timeline has no per-recording information ({sorted(missing)}); "
+                         f"re-run the features stage")
+
+    bounds = np.concatenate([[0], np.cumsum(timeline['file_epochs'])]).astype(int)
+    starts = np.concatenate([[0.0], np.cumsum(timeline['file_durations'])])
+    if bounds[-1] != len(y):
+        raise ValueError(f"Recordings hold {bounds[-1]} epochs, but the patient has {len(y)}")
+    seizures = np.asarray(timeline['seizure_intervals'], dtype=np.float64).reshape(-1, 2)
+
+    data, metadata, ids = {}, {}, []
+    for k, name in enumerate(timeline['file_names']):
+        recording_id = f"{k:03d}:{name}"
+        rows = slice(bounds[k], bounds[k + 1])
+        in_file = (seizures[:, 0] >= starts[k]) & (seizures[:, 0] < starts[k + 1])
+        data[recording_id] = (X[rows], y[rows])
+        metadata[recording_id] = {'epoch_times': timeline['epoch_times'][rows],
+                                  'seizure_intervals': seizures[in_file]}
+        ids.append(recording_id)
+    return data, metadata, ids
+
+
+def load_checkpoint(store_root: Path, patient_id: str) -> Tuple[np.ndarray, np.ndarray, Dict]:
+    """Loader for workers: one patient's features and timeline checkpoints."""
+    try:
+        from .pipeline import CheckpointStore
+    except ImportError:
+        from pipeline import CheckpointStore
+    store = CheckpointStore(store_root)
+    X, y = store.load('features', patient_id)
+    return X, y, store.load('timeline', patient_id)
+
+
+def _in_memory(X: np.ndarray, y: np.ndarray, timeline: Dict) -> Tuple[np.ndarray, np.ndarray, Dict]:
+    return X, y, timeline
+
+
+def _rss_mb() -> float:
+    """Resident memory of this process (peak RSS where /proc is unavailable)."""
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2 ** 20
+    except (OSError, ValueError, AttributeError):
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 2 ** 20 if sys.platform == 'darwin' else peak / 2 ** 10
+
+
+def _watch_memory(max_memory_mb: float, interval: float):
+    while True:
+        rss = _rss_mb()
+        if rss > max_memory_mb:
+            logger.error(f"Worker {os.getpid()} uses {rss:.0f} MB (limit {max_memory_mb} MB), exiting")
+            os._exit(MEMORY_EXIT_CODE)
+        time.sleep(interval)
+
+
+def _limit_worker_memory(max_memory_mb: int, interval: float = 0.2):
+    """
+    Pool initializer: end the worker when its resident memory exceeds the
+    limit. (An address-space rlimit is unreliable here: numpy and BLAS
+    reserve far more virtual memory than they use.)
+    """
+    if max_memory_mb:
+        threading.Thread(target=_watch_memory, args=(max_memory_mb, interval), daemon=True).start()
+
+
+def train_patient(patient_id: str, loader: Callable, model_name: str, model_params: Dict = None,
+                  feature_stage=None, test_ratio: float = 0.3, val_ratio: float = 0.2,
+                  models_dir: Path = None, random_state: int = None,
+                  one_thread: bool = False) -> Dict[str, Any]:
+    """
+    Fit, evaluate and export one patient's model (runs in a pool worker).
+
+    one_thread fits and scores on one core (set for pool workers).
+
+    Returns:
+        Registry record: artifact path, recordings per split, test metrics
+        and event-level test metrics
+    """
+    try:
+        from .models import ModelFactory, single_threaded
+        from .validation import PatientIndependentValidator
+    except ImportError:
+        from models import ModelFactory, single_threaded
+        from validation import PatientIndependentValidator
+
+    if one_thread:
+        with single_threaded():
+            return train_patient(patient_id, loader, model_name, model_params, feature_stage,
+                                 test_ratio, val_ratio, models_dir, random_state)
+
+    start = time.perf_counter()
+    X, y, timeline = loader()
+    data, metadata, ids = recordings(X, y, timeline)
+    del X, y
+    file_splits = split_files([data[r][1] for r in ids], test_ratio, val_ratio)
+    splits = {split: [ids[k] for k in files] for split, files in file_splits.items()}
+
+    results = PatientIndependentValidator(random_state=random_state).validate_model(
+        model_class=ModelFactory.get_available_models()[model_name],
+        patient_data=data,
+        patient_splits=splits,
+        model_params=model_params,
+        keep_fitted=True,
+        feature_stage=feature_stage,
+        patient_metadata=metadata
+    )
+    fitted = results['fitted']
+    artifact = fitted['model'].export(f"{model_name}_{patient_id}", scaler=fitted['scaler'],
+                                      feature_stage=fitted['feature_stage'], models_dir=models_dir)
+
+    events = (results.get('events') or {}).get('test')
+    return {
+        'patient_id': patient_id,
+        'status': 'trained',
+        'artifact': str(artifact),
+        'recordings': {split: [r.split(':', 1)[1] for r in rs] for split, rs in splits.items()},
+        'n_epochs': {split: int(results[split]['n_samples']) for split in ['val', 'test']},
+        'test': {m: float(results['test'][m]) for m in REGISTRY_METRICS if m in results['test']},
+        'events': events,
+        'seconds': round(time.perf_counter() - start, 2)
+    }
+
+
+class PatientSpecificTrainer:
+    """
+    Trains one model per patient across a process pool and keeps a registry.
+
+    Workers use the 'spawn' start method, so they do not inherit the
+    parent's arrays, and train single-threaded. On Python >= 3.11 each
+    worker handles a single patient before it is replaced; older versions
+    have no max_tasks_per_child, so a worker is reused for several patients
+    and keeps the memory it has grown to. max_worker_memory_mb caps a
+    worker's resident memory; a patient exceeding it is recorded as failed
+    instead of taking the machine down. With n_workers=1 patients train in
+    this process and models keep their own parallelism.
+    """
+
+    def __init__(self, model_name: str = 'random_forest', model_params: Dict = None,
+                 feature_stage=None, n_workers: int = None, max_worker_memory_mb: int = None,
+                 test_ratio: float = 0.3, val_ratio: float = 0.2, models_dir: Path = None,
+                 random_state: int = None):
+        self.model_name = model_name
+        self.model_params = model_params or {}
+        self.feature_stage = feature_stage
+        self.n_workers = n_workers or multiprocessing.cpu_count()
+        self.max_worker_memory_mb = max_worker_memory_mb
+        self.test_ratio = test_ratio
+        self.val_ratio = val_ratio
+        self.models_dir = Path(models_dir) if models_dir else Config.MODELS_DIR
+        self.random_state = random_state or Config.RANDOM_STATE
+
+    def _task(self, patient_id: str, loader: Callable) -> functools.partial:
+        return functools.partial(
+            train_patient, patient_id, loader, self.model_name, self.model_params,
+            self.feature_stage, self.test_ratio, self.val_ratio, self.models_dir, self.random_state,
+            self.n_workers > 1
+        )
+
+    def train(self, loaders: Dict[str, Callable]) -> Dict[str, Any]:
+        """
+        Train all patients and write the registry.
+
+        Args:
+            loaders: Dict patient_id -> picklable zero-argument callable
+                returning (X, y, timeline), e.g.
+                functools.partial(load_checkpoint, store_root, patient_id)
+
+        Returns:
+            The registry (see save_registry)
+        """
+        records = {}
+        if self.n_workers == 1:
+            for patient_id, loader in loaders.items():
+                records[patient_id] = self._run(patient_id, self._task(patient_id, loader))
+        else:
+            broken = self._run_pool(loaders, records, self.n_workers)
+            # A worker killed (e.g. at the memory limit) breaks the whole pool;
+            # retry its pool mates one by one so only the culprit fails
+            for patient_id in broken:
+                self._run_pool({patient_id: loaders[patient_id]}, records, 1, retry=False)
+
+        registry = {
+            'model_name': self.model_name,
+            'model_params': self.model_params,
+            'feature_stage': type(self.feature_stage).__name__ if self.feature_stage else None,
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'patients': {pid: records[pid] for pid in sorted(records)},
+            'aggregate': self.aggregate(records.values())
+        }
+        self.save_registry(registry)
+        return registry
+
+    def train_in_memory(self, patient_data: Dict[str, Tuple[np.ndarray, np.ndarray]],
+                        patient_metadata: Dict[str, Dict]) -> Dict[str, Any]:
+        """train() for data already in memory (it is pickled to the workers)."""
+        return self.train({pid: functools.partial(_in_memory, X, y, patient_metadata[pid])
+                           for pid, (X, y) in patient_data.items()})
+
+    def _run_pool(self, loaders: Dict[str, Callable], records: Dict[str, Dict], n_workers: int,
+                  retry: bool = True) -> List[str]:
+        """Train in a fresh pool; returns patients lost to a broken pool (if retry)."""
+        pool_kwargs = {'max_workers': min(n_workers, max(len(loaders), 1)),
+                       'mp_context': multiprocessing.get_context('spawn'),
+                       'initializer': _limit_worker_memory,
+                       'initargs': (self.max_worker_memory_mb,)}
+        if sys.version_info >= (3, 11):
+            pool_kwargs['max_tasks_per_child'] = 1
+        broken = []
+        with ProcessPoolExecutor(**pool_kwargs) as pool:
+            futures = {pool.submit(self._task(pid, loader)): pid for pid, loader in loaders.items()}
+            for future in as_completed(futures):
+                patient_id = futures[future]
+                if retry and isinstance(future.exception(), BrokenProcessPool):
+                    broken.append(patient_id)
+                else:
+                    records[patient_id] = self._run(patient_id, future.result)
+        return broken
+
+    @staticmethod
+    def _run(patient_id: str, fn: Callable) -> Dict[str, Any]:
+        try:
+            record = fn()
+            logger.info(f"[patients] {patient_id}: test F1 {record['test'].get('f1', np.nan):.3f} "
+                        f"({record['seconds']}s)")
+            return record
+        except Exception as e:
+            logger.warning(f"[patients] {patient_id} failed: {type(e).__name__}: {e}")
+            return {'patient_id': patient_id, 'status': 'failed', 'error': f"{type(e).__name__}: {e}"}
+
+    @staticmethod
+    def aggregate(records) -> Dict[str, Any]:
+        """
+        Pool event-level results over patients and average epoch metrics.
+
+        Seizure sensitivity and false alarms per hour are computed from the
+        summed counts (every seizure and interictal hour weighs the same);
+        epoch-level metrics are means over patients.
+        """
+        records = list(records)
+        trained = [r for r in records if r['status'] == 'trained']
+        aggregate = {'n_patients': len(trained), 'n_failed': len(records) - len(trained)}
+        for metric in REGISTRY_METRICS:
+            values = [r['test'][metric] for r in trained
+                      if metric in r['test'] and not np.isnan(r['test'][metric])]
+            aggregate[f'{metric}_mean'] = float(np.mean(values)) if values else np.nan
+
+        events = [r['events'] for r in trained if r.get('events')]
+        if events:
+            n_seizures = sum(e['n_seizures'] for e in events)
+            detected = sum(e['seizures_detected'] for e in events)
+            false_alarms = sum(e['false_alarms'] for e in events)
+            hours = sum(e['interictal_hours'] for e in events)
+            latencies = [(e['latency_mean'], e['seizures_detected']) for e in events
+                         if e['seizures_detected'] > 0]
+            aggregate['events'] = {
+                'n_patients': len(events),
+                'n_seizures': n_seizures,
+                'seizures_detected': detected,
+                'sensitivity': detected / n_seizures if n_seizures else np.nan,
+                'false_alarms': false_alarms,
+                'interictal_hours': hours,
+                'fa_per_hour': false_alarms / hours if hours > 0 else np.nan,
+                'latency_mean': (sum(l * n for l, n in latencies) / sum(n for _, n in latencies)
+                                 if latencies else np.nan)
+            }
+        return aggregate
+
+    def registry_path(self) -> Path:
+        return self.models_dir / REGISTRY_NAME
+
+    def save_registry(self, registry: Dict[str, Any]) -> Path:
+        """Write the registry JSON next to the exported artifacts."""
+        path = self.registry_path()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix('.json.tmp')
+        with open(tmp, 'w') as f:
+            json.dump(registry, f, indent=2, default=_json_default)
+        tmp.replace(path)
+        logger.info(f"Patient model registry written to {path}")
+        return path
+
+    @staticmethod
+    def load_registry(models_dir: Path = None) -> Dict[str, Any]:
+        path = Path(models_dir or Config.MODELS_DIR) / REGISTRY_NAME
+        with open(path, 'r') as f:
+            return json.load(f)
+
+
+def _json_default(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    raise TypeError(f"Not JSON serializable: {type(value).__name__}")
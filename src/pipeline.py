@@ -0,0 +1,521 @@
+"""
+Staged seizure detection pipeline with on-disk checkpoints.
+
+Stages (each runnable on its own):
+    ingest    EDF files -> per-patient epochs and labels
+    features  epochs -> per-patient feature matrices
+    compare   patient-independent comparison of all models
+    cv        patient-independent cross-validation of one model
+    analyze   detailed validation and red-flag analysis of one model
+
+Patient-specific models (one per patient, trained on its own recordings)
+are a separate command built on the features stage (patients()).
+
+Every stage writes its outputs under Config.OUTPUT_DIR/checkpoints together
+with a fingerprint of its inputs. A stage whose fingerprint is unchanged is
+loaded instead of recomputed, so a crashed run resumes where it stopped.
+Ingestion is checkpointed per patient; the epochs go to a compressed epoch
+archive (epoch_archive.py) next to the checkpoint. Every validation run is
+also recorded in an experiment store (experiments.py) under
+checkpoints/experiments, which answers identical reruns and model/patient
+queries across stages.
+"""
+import functools
+import hashlib
+import json
+import logging
+import os
+import pickle
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+try:
+    from .config import Config
+    from .data_processing import CHBMITDataProcessor, PatientIndependentSplitter
+    from .epoch_archive import EpochArchive, EpochArchiveWriter
+    from .profiling import profile_stage
+except ImportError:
+    from config import Config
+    from data_processing import CHBMITDataProcessor, PatientIndependentSplitter
+    from epoch_archive import EpochArchive, EpochArchiveWriter
+    from profiling import profile_stage
+
+logger = logging.getLogger(__name__)
+
+STAGES = ['ingest', 'features', 'compare', 'cv', 'analyze']
+
+# Feature sets for the model stages: flattened epochs, covariance
+# tangent-space features (features.py), SPoC/ICA spatially filtered
+# epochs (spatial_filters.py) or band-power/spectral features computed per
+# recording in the features stage (spectral.py); fitted stages are fitted
+# per training split
+FEATURE_SETS = ['flatten', 'tangent', 'spoc', 'ica', 'spectral']
+
+
+def _to_builtin(value):
+    """JSON fallback for numpy scalars/arrays and paths."""
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, Path):
+        return str(value)
+    raise TypeError(f"Not JSON serializable: {type(value).__name__}")
+
+
+def fingerprint(inputs: Any) -> str:
+    """Stable hash of a JSON-serializable description of stage inputs."""
+    payload = json.dumps(inputs, sort_keys=True, default=_to_builtin)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:16]
+
+
+def config_fingerprint() -> Dict[str, Any]:
+    """Config settings that change the content of ingested epochs."""
+    return {
+        'sampling_rate': Config.SAMPLING_RATE,
+        'target_sampling_rate': Config.TARGET_SAMPLING_RATE,
+        'epoch_length': Config.EPOCH_LENGTH,
+        'epoch_overlap': Config.EPOCH_OVERLAP,
+        'channels': list(Config.SELECTED_CHANNELS),
+        'montage': {key: getattr(Config, key) for key in
+                    ['MISSING_CHANNEL_STRATEGY', 'MAX_MISSING_CHANNELS', 'DUPLICATE_CHANNEL_STRATEGY']},
+        'artifacts': {key: getattr(Config, key) for key in dir(Config) if key.startswith('ARTIFACT_')},
+        'archive_dtype': Config.ARCHIVE_DTYPE
+    }
+
+
+class CheckpointStore:
+    """
+    Stage outputs on disk: <root>/<stage>/<name>.<ext> plus a
+    <name>.json manifest holding the input fingerprint.
+
+    Files are written to a temporary name and renamed, so an interrupted
+    write never leaves a checkpoint that looks valid.
+    """
+
+    def __init__(self, root: Path = None):
+        self.root = Path(root) if root else Config.OUTPUT_DIR / 'checkpoints'
+
+    def _paths(self, stage: str, name: str) -> Tuple[Path, Path]:
+        stage_dir = self.root / stage
+        return stage_dir / f"{name}.pkl", stage_dir / f"{name}.json"
+
+    def archive_path(self, stage: str, name: str) -> Path:
+        """Epoch archive stored alongside a checkpoint (written before it)."""
+        return self.root / stage / f"{name}.epochs"
+
+    def is_valid(self, stage: str, name: str, key: str) -> bool:
+        """Whether a checkpoint exists for exactly these inputs."""
+        data_path, manifest_path = self._paths(stage, name)
+        if not (data_path.exists() and manifest_path.exists()):
+            return False
+        with open(manifest_path, 'r') as f:
+            return json.load(f).get('key') == key
+
+    def key(self, stage: str, name: str) -> Optional[str]:
+        """Fingerprint of the stored checkpoint, if any."""
+        _, manifest_path = self._paths(stage, name)
+        if not manifest_path.exists():
+            return None
+        with open(manifest_path, 'r') as f:
+            return json.load(f).get('key')
+
+    def save(self, stage: str, name: str, key: str, data: Any, summary: Dict = None):
+        """Store a checkpoint; the manifest is written last."""
+        data_path, manifest_path = self._paths(stage, name)
+        data_path.parent.mkdir(parents=True, exist_ok=True)
+
+        tmp = data_path.with_suffix('.pkl.tmp')
+        with open(tmp, 'wb') as f:
+            pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, data_path)
+
+        tmp = manifest_path.with_suffix('.json.tmp')
+        with open(tmp, 'w') as f:
+            json.dump({'stage': stage, 'name': name, 'key': key, 'summary': summary or {}},
+                      f, indent=2, default=_to_builtin)
+        os.replace(tmp, manifest_path)
+
+    def load(self, stage: str, name: str) -> Any:
+        data_path, _ = self._paths(stage, name)
+        with open(data_path, 'rb') as f:
+            return pickle.load(f)
+
+
+class StagedPipeline:
+    """
+    Runs the pipeline stages with checkpointing.
+
+    Each stage method returns its result and the fingerprint of that result,
+    which downstream stages fold into their own fingerprints.
+    """
+
+    def __init__(self, data_root: str = None, store: CheckpointStore = None,
+                 force: bool = False, random_state: int = None, feature_set: str = 'flatten'):
+        if feature_set not in FEATURE_SETS:
+            raise ValueError(f"Unknown feature set '{feature_set}'. Available: {FEATURE_SETS}")
+        self.processor = CHBMITDataProcessor(data_root)
+        self.store = store or CheckpointStore()
+        self.force = force
+        self.random_state = random_state or Config.RANDOM_STATE
+        self.feature_set = feature_set
+
+    def _cached(self, stage: str, name: str, key: str) -> bool:
+        if not self.force and self.store.is_valid(stage, name, key):
+            logger.info(f"[{stage}] {name}: inputs unchanged, using checkpoint")
+            return True
+        return False
+
+    def _split_params(self, test_ratio: float, val_ratio: float) -> Dict[str, Any]:
+        return {'test_ratio': test_ratio, 'val_ratio': val_ratio,
+                'random_state': self.random_state, 'smote_ratio': Config.SMOTE_RATIO,
+                'feature_set': self.feature_set}
+
+    def _feature_stage(self):
+        """Transformer fitted inside each validation run, or None for flattened epochs."""
+        if self.feature_set == 'tangent':
+            try:
+                from .features import TangentSpaceFeatures
+            except ImportError:
+                from features import TangentSpaceFeatures
+            return TangentSpaceFeatures()
+        if self.feature_set in ('spoc', 'ica'):
+            try:
+                from .spatial_filters import SpatialFilter
+            except ImportError:
+                from spatial_filters import SpatialFilter
+            return SpatialFilter(method=self.feature_set, random_state=self.random_state)
+        return None
+
+    def _validator(self):
+        """Validator recording its runs in the experiment store next to the checkpoints."""
+        try:
+            from .experiments import ExperimentStore
+            from .validation import PatientIndependentValidator
+        except ImportError:
+            from experiments import ExperimentStore
+            from validation import PatientIndependentValidator
+        return PatientIndependentValidator(random_state=self.random_state,
+                                           store=ExperimentStore(self.store.root / 'experiments'),
+                                           reuse_stored=not self.force)
+
+    def _name(self, name: str) -> str:
+        return name if self.feature_set == 'flatten' else f"{name}_{self.feature_set}"
+
+    def _features_name(self, patient_id: str) -> str:
+        """Checkpoint name of a patient's features (and timeline)."""
+        return self._name(patient_id) if self.feature_set == 'spectral' else patient_id
+
+    # ------------------------------------------------------------------ ingest
+    def _ingest_key(self, patient_id: str) -> str:
+        info = self.processor.get_patient_files(patient_id)
+        files = [(f.name, f.stat().st_size, f.stat().st_mtime_ns)
+                 for f in [info['summary_file']] + info['edf_files']]
+        return fingerprint({'patient': patient_id, 'files': files, 'config': config_fingerprint()})
+
+    def ingest(self, patient_ids: List[str]) -> Dict[str, str]:
+        """
+        Process EDF files into epochs, one checkpoint per patient.
+
+        Patients that fail are logged and skipped.
+
+        Returns:
+            Dict mapping patient_id -> ingest fingerprint
+        """
+        keys = {}
+        for patient_id in patient_ids:
+            try:
+                key = self._ingest_key(patient_id)
+            except FileNotFoundError as e:
+                logger.warning(f"[ingest] {patient_id}: {e}")
+                continue
+
+            if not self._cached('ingest', patient_id, key):
+                logger.info(f"[ingest] Processing patient {patient_id}...")
+                try:
+                    with profile_stage('ingest'):
+                        epochs, labels, metadata = self.processor.process_patient_data(patient_id)
+                except Exception as e:
+                    logger.warning(f"[ingest] Failed to process {patient_id}: {e}")
+                    continue
+                archive = self.store.archive_path('ingest', patient_id)
+                with profile_stage('write_archive', epochs):
+                    with EpochArchiveWriter(archive, sfreq=Config.TARGET_SAMPLING_RATE,
+                                            channels=Config.SELECTED_CHANNELS) as writer:
+                        self.processor.write_epochs(writer, patient_id, epochs, labels, metadata)
+                self.store.save('ingest', patient_id, key,
+                                {'archive': archive.name, 'labels': labels, 'metadata': metadata},
+                                summary={'total_epochs': metadata['total_epochs'],
+                                         'seizure_epochs': metadata['seizure_epochs'],
+                                         'epochs_rejected': metadata.get('artifact_rejection', {})
+                                         .get('n_rejected', 0)})
+            keys[patient_id] = key
+        return keys
+
+    def load_epochs(self, patient_id: str) -> Tuple[np.ndarray, np.ndarray, Dict]:
+        """A patient's ingested (float32) epochs, labels and metadata."""
+        ingest = self.store.load('ingest', patient_id)
+        with EpochArchive(self.store.archive_path('ingest', patient_id)) as archive:
+            epochs = archive.read()
+        return epochs, ingest['labels'], ingest['metadata']
+
+    # ---------------------------------------------------------------- features
+    def features(self, ingest_keys: Dict[str, str]) -> Dict[str, str]:
+        """
+        Feature matrices for the classical models: flattened epochs, or
+        spectral features computed once per recording for the 'spectral'
+        feature set.
+
+        Returns:
+            Dict mapping patient_id -> features fingerprint
+        """
+        spectral = self.feature_set == 'spectral'
+        mode = {'mode': 'spectral', 'window': Config.SPECTRAL_WINDOW, 'hop': Config.SPECTRAL_HOP,
+                'bands': Config.SPECTRAL_BANDS} if spectral else {'mode': 'flatten'}
+        keys = {}
+        for patient_id, ingest_key in ingest_keys.items():
+            key = fingerprint(dict(mode, ingest=ingest_key, timeline='recordings'))
+            name = self._features_name(patient_id)
+            if not self._cached('features', name, key):
+                epochs, labels, metadata = self.load_epochs(patient_id)
+                n_epochs = epochs.shape[0]
+                if spectral:
+                    try:
+                        from .spectral import SpectralFeatures
+                    except ImportError:
+                        from spectral import SpectralFeatures
+                    stage = SpectralFeatures(n_channels=epochs.shape[1])
+                    with profile_stage('spectral_features', epochs):
+                        if 'epoch_times' in metadata:
+                            X = stage.from_recording(epochs, metadata['epoch_times'][:, 0])
+                        else:
+                            X = stage.transform(epochs)
+                else:
+                    X = epochs.reshape(n_epochs, -1)
+                self.store.save('features', name, key, (X, labels),
+                                summary={'shape': list(X.shape)})
+                if 'epoch_times' in metadata:
+                    # Small side checkpoint so analyze can compute event-level metrics
+                    # (per-recording sizes for patient-specific file splits)
+                    files = metadata.get('file_details', [])
+                    self.store.save('timeline', name, key, {
+                        'epoch_times': metadata['epoch_times'],
+                        'seizure_intervals': metadata['seizure_intervals'],
+                        'file_names': [f['filename'] for f in files],
+                        'file_epochs': [f['total_epochs'] for f in files],
+                        'file_durations': [f['duration'] for f in files]
+                    })
+            keys[patient_id] = key
+        return keys
+
+    def load_timelines(self, feature_keys: Dict[str, str]) -> Optional[Dict[str, Dict]]:
+        """Epoch times and seizure intervals per patient, or None if any are missing."""
+        if not all(self.store.is_valid('timeline', self._features_name(pid), key)
+                   for pid, key in feature_keys.items()):
+            return None
+        return {pid: self.store.load('timeline', self._features_name(pid)) for pid in feature_keys}
+
+    def load_features(self, feature_keys: Dict[str, str]) -> Dict[str, Tuple[np.ndarray, np.ndarray]]:
+        return {pid: self.store.load('features', self._features_name(pid)) for pid in feature_keys}
+
+    def split(self, patient_ids: List[str], test_ratio: float = 0.3,
+              val_ratio: float = 0.2) -> Dict[str, List[str]]:
+        """Patient-independent split (deterministic for a given patient list)."""
+        return PatientIndependentSplitter.split_patients(
+            sorted(patient_ids), test_ratio=test_ratio, val_ratio=val_ratio,
+            random_state=self.random_state
+        )
+
+    # ----------------------------------------------------------------- compare
+    def compare(self, feature_keys: Dict[str, str], test_ratio: float = 0.3,
+                val_ratio: float = 0.2, n_bootstrap: int = None) -> Tuple[Any, str]:
+        """
+        Compare all models on a patient-independent split, with
+        patient-level bootstrap intervals (n_bootstrap defaults to
+        Config.N_BOOTSTRAP, 0 disables them).
+
+        Returns:
+            (comparison DataFrame, fingerprint)
+        """
+        try:
+            from .models import compare_models
+        except ImportError:
+            from models import compare_models
+
+        n_bootstrap = Config.N_BOOTSTRAP if n_bootstrap is None else n_bootstrap
+        patient_splits = self.split(list(feature_keys), test_ratio, val_ratio)
+        key = fingerprint({'features': feature_keys, 'splits': patient_splits,
+                           'params': self._split_params(test_ratio, val_ratio),
+                           'n_bootstrap': n_bootstrap})
+
+        name = self._name('comparison')
+
+        if not self._cached('compare', name, key):
+            patient_data = self.load_features(feature_keys)
+            validator = self._validator()
+            with profile_stage('compare'):
+                comparison_df = compare_models(patient_data, patient_splits, validator,
+                                               feature_stage=self._feature_stage(),
+                                               n_bootstrap=n_bootstrap)
+            self.store.save('compare', name, key,
+                            {'comparison': comparison_df, 'patient_splits': patient_splits})
+
+        return self.store.load('compare', name)['comparison'], key
+
+    def best_model(self, comparison_df) -> str:
+        """ModelFactory key of the model with the best test F1-score."""
+        try:
+            from .models import MODEL_DISPLAY_NAMES
+        except ImportError:
+            from models import MODEL_DISPLAY_NAMES
+
+        best_idx = comparison_df['F1-Score'].idxmax()
+        display_to_key = {v: k for k, v in MODEL_DISPLAY_NAMES.items()}
+        return display_to_key[comparison_df.loc[best_idx, 'Model']]
+
+    # ---------------------------------------------------------------------- cv
+    def cv(self, feature_keys: Dict[str, str], model_name: str,
+           n_folds: int = None, n_bootstrap: int = None) -> Tuple[Dict, str]:
+        """
+        Patient-independent cross-validation of one model.
+
+        Returns:
+            (aggregated CV results, fingerprint)
+        """
+        try:
+            from .models import ModelFactory
+        except ImportError:
+            from models import ModelFactory
+
+        n_folds = n_folds or min(Config.N_FOLDS, len(feature_keys))
+        n_bootstrap = Config.N_BOOTSTRAP if n_bootstrap is None else n_bootstrap
+        key = fingerprint({'features': feature_keys, 'model': model_name, 'n_folds': n_folds,
+                           'random_state': self.random_state, 'smote_ratio': Config.SMOTE_RATIO,
+                           'feature_set': self.feature_set, 'n_bootstrap': n_bootstrap})
+        name = self._name(f"cv_{model_name}")
+
+        if not self._cached('cv', name, key):
+            validator = self._validator()
+            with profile_stage('cv'):
+                cv_results = validator.cross_validate_patients(
+                    model_class=ModelFactory.get_available_models()[model_name],
+                    patient_data=self.load_features(feature_keys),
+                    n_folds=n_folds,
+                    feature_stage=self._feature_stage(),
+                    n_bootstrap=n_bootstrap
+                )
+            self.store.save('cv', name, key, cv_results)
+
+        return self.store.load('cv', name), key
+
+    def lopo(self, feature_keys: Dict[str, str], model_name: str, n_workers: int = None,
+             n_bootstrap: int = None) -> Tuple[Dict, str]:
+        """
+        Leave-one-patient-out cross-validation of one model (see lopo.py).
+
+        Folds run in a process pool with preprocessing shared across folds;
+        each finished patient is written under <checkpoints>/lopo/<name>/,
+        so an interrupted run resumes with the remaining patients.
+
+        Returns:
+            (aggregated results, fingerprint)
+        """
+        try:
+            from .lopo import LeaveOnePatientOut
+            from .models import ModelFactory
+        except ImportError:
+            from lopo import LeaveOnePatientOut
+            from models import ModelFactory
+
+        n_bootstrap = Config.N_BOOTSTRAP if n_bootstrap is None else n_bootstrap
+        fold_key = fingerprint({'features': feature_keys, 'model': model_name,
+                                'random_state': self.random_state, 'smote_ratio': Config.SMOTE_RATIO,
+                                'feature_set': self.feature_set, 'n_val': Config.LOPO_VAL_PATIENTS})
+        key = fingerprint({'folds': fold_key, 'n_bootstrap': n_bootstrap})
+        name = self._name(f"lopo_{model_name}")
+
+        if not self._cached('lopo', name, key):
+            runner = LeaveOnePatientOut(ModelFactory.get_available_models()[model_name],
+                                        self.store.root / 'lopo' / name,
+                                        feature_stage=self._feature_stage(), n_workers=n_workers,
+                                        random_state=self.random_state)
+            with profile_stage('lopo'):
+                results = runner.run(self.load_features(feature_keys), self.load_timelines(feature_keys),
+                                     n_bootstrap, key=fold_key)
+            self.store.save('lopo', name, key, results)
+
+        return self.store.load('lopo', name), key
+
+    # ----------------------------------------------------------------- analyze
+    def patients(self, feature_keys: Dict[str, str], model_name: str, n_workers: int = None,
+                 max_worker_memory_mb: int = None, test_ratio: float = 0.3,
+                 val_ratio: float = 0.2) -> Tuple[Dict, str]:
+        """
+        One model per patient, trained on that patient's own recordings
+        split by file (see patient_specific.py), in a process pool.
+
+        Returns:
+            (registry, fingerprint)
+        """
+        try:
+            from .patient_specific import PatientSpecificTrainer, load_checkpoint
+        except ImportError:
+            from patient_specific import PatientSpecificTrainer, load_checkpoint
+
+        key = fingerprint({'features': feature_keys, 'model': model_name,
+                           'params': self._split_params(test_ratio, val_ratio)})
+        name = self._name(f"patients_{model_name}")
+
+        if not self._cached('patients', name, key):
+            trainer = PatientSpecificTrainer(
+                model_name, feature_stage=self._feature_stage(), n_workers=n_workers,
+                max_worker_memory_mb=max_worker_memory_mb, test_ratio=test_ratio,
+                val_ratio=val_ratio, random_state=self.random_state
+            )
+            loaders = {pid: functools.partial(load_checkpoint, self.store.root, self._features_name(pid))
+                       for pid in feature_keys}
+            with profile_stage('patients'):
+                registry = trainer.train(loaders)
+            self.store.save('patients', name, key, registry,
+                            summary={'n_patients': registry['aggregate']['n_patients']})
+
+        return self.store.load('patients', name), key
+
+    def analyze(self, feature_keys: Dict[str, str], model_name: str,
+                test_ratio: float = 0.3, val_ratio: float = 0.2) -> Tuple[Dict, str]:
+        """
+        Detailed validation of one model with red-flag analysis.
+
+        Returns:
+            ({'results': ..., 'analysis': ...}, fingerprint)
+        """
+        try:
+            from .models import ModelFactory
+            from .validation import RealisticPerformanceAnalyzer
+        except ImportError:
+            from models import ModelFactory
+            from validation import RealisticPerformanceAnalyzer
+
+        patient_splits = self.split(list(feature_keys), test_ratio, val_ratio)
+        key = fingerprint({'features': feature_keys, 'splits': patient_splits, 'model': model_name,
+                           'params': self._split_params(test_ratio, val_ratio)})
+        name = self._name(f"analysis_{model_name}")
+
+        if not self._cached('analyze', name, key):
+            validator = self._validator()
+            with profile_stage('analyze'):
+                results = validator.validate_model(
+                    model_class=ModelFactory.get_available_models()[model_name],
+                    patient_data=self.load_features(feature_keys),
+                    patient_splits=patient_splits,
+                    apply_smote=True,
+                    feature_stage=self._feature_stage(),
+                    patient_metadata=self.load_timelines(feature_keys)
+                )
+            analysis = RealisticPerformanceAnalyzer.analyze_results(results)
+            self.store.save('analyze', name, key, {'results': results, 'analysis': analysis},
+                            summary={'is_realistic': analysis['is_realistic']})
+
+        return self.store.load('analyze', name), key
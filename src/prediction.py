@@ -0,0 +1,477 @@
+"""
+Hybrid BiLSTM seizure prediction model with a CPU-tuned training pipeline.
+
+Ported from the "Seizure Prediction Code - LSTM" notebook export.
+
+FIXES:
+1. Importable module instead of notebook cells
+2. TensorFlow is optional and only imported when a model is built
+3. No plotting side effects during evaluation
+4. CPU training mode: thread pools, mixed precision, large batches with
+   an LR schedule, optional XLA compilation
+"""
+import logging
+import os
+from datetime import datetime
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+try:
+    from .config import Config
+    from .models import SeizureDetectionModel
+    from .profiling import profile_stage
+except ImportError:
+    from config import Config
+    from models import SeizureDetectionModel
+    from profiling import profile_stage
+
+logger = logging.getLogger(__name__)
+
+_tf = None
+
+
+def _import_tensorflow():
+    """Import TensorFlow on first use (it takes seconds to load)."""
+    global _tf
+    if _tf is None:
+        try:
+            import tensorflow as tf
+        except ImportError:
+            raise ImportError("TensorFlow is required for LSTM models. Install with: pip install tensorflow")
+        _tf = tf
+    return _tf
+
+
+def cpu_supports_bfloat16() -> bool:
+    """Check whether the CPU has native bfloat16 instructions (AVX512-BF16 or AMX)."""
+    try:
+        with open('/proc/cpuinfo', 'r') as f:
+            flags = f.read()
+    except OSError:
+        return False
+    return 'avx512_bf16' in flags or 'amx_bf16' in flags
+
+
+def configure_cpu_training(intra_op_threads: int = None, inter_op_threads: int = None,
+                           mixed_precision: str = 'auto') -> Dict[str, object]:
+    """
+    Configure TensorFlow for CPU-only training.
+
+    Must be called before TensorFlow executes any operation, otherwise the
+    thread pool sizes can no longer be changed.
+
+    Args:
+        intra_op_threads: Threads used inside a single op (default: all cores)
+        inter_op_threads: Ops executed concurrently (default: Config.LSTM_INTER_OP_THREADS)
+        mixed_precision: 'auto' (bfloat16 when the CPU supports it), 'bfloat16' or 'off'
+
+    Returns:
+        Dictionary describing the applied settings
+    """
+    tf = _import_tensorflow()
+
+    intra_op_threads = intra_op_threads or os.cpu_count() or 1
+    inter_op_threads = inter_op_threads or Config.LSTM_INTER_OP_THREADS
+
+    try:
+        tf.config.threading.set_intra_op_parallelism_threads(intra_op_threads)
+        tf.config.threading.set_inter_op_parallelism_threads(inter_op_threads)
+    except RuntimeError as e:
+        logger.warning(f"Thread pools already initialized, keeping defaults: {e}")
+
+    use_bf16 = (mixed_precision == 'bfloat16' or
+                (mixed_precision == 'auto' and cpu_supports_bfloat16()))
+    policy = 'mixed_bfloat16' if use_bf16 else 'float32'
+    tf.keras.mixed_precision.set_global_policy(policy)
+
+    settings = {
+        'intra_op_threads': tf.config.threading.get_intra_op_parallelism_threads(),
+        'inter_op_threads': tf.config.threading.get_inter_op_parallelism_threads(),
+        'precision_policy': policy
+    }
+    logger.info(f"CPU training configuration: {settings}")
+    return settings
+
+
+def focal_loss(gamma: float = 2., alpha: float = .25):
+    """Focal loss to handle class imbalance."""
+    tf = _import_tensorflow()
+
+    def focal_loss_fixed(y_true, y_pred):
+        y_true = tf.cast(y_true, y_pred.dtype)
+        pt_1 = tf.where(tf.equal(y_true, 1), y_pred, tf.ones_like(y_pred))
+        pt_0 = tf.where(tf.equal(y_true, 0), y_pred, tf.zeros_like(y_pred))
+        return -tf.reduce_mean(
+            alpha * tf.pow(1. - pt_1, gamma) * tf.math.log(pt_1 + 1e-7) +
+            (1 - alpha) * tf.pow(pt_0, gamma) * tf.math.log(1. - pt_0 + 1e-7)
+        )
+    return focal_loss_fixed
+
+
+def epochs_to_sequences(X: np.ndarray, n_channels: int, n_steps: int) -> np.ndarray:
+    """
+    Reshape flattened epochs into LSTM sequences.
+
+    Each epoch (n_channels * n_times,) is cut into n_steps consecutive
+    windows; a step holds all channels of one window.
+
+    Returns:
+        Array of shape (n_epochs, n_steps, n_channels * n_times // n_steps)
+    """
+    n_epochs = X.shape[0]
+    n_times = X.shape[1] // n_channels
+    step_len = n_times // n_steps
+    if step_len == 0:
+        raise ValueError(f"Cannot split {n_times} samples into {n_steps} steps")
+
+    epochs = X.reshape(n_epochs, n_channels, n_times)[:, :, :n_steps * step_len]
+    sequences = epochs.reshape(n_epochs, n_channels, n_steps, step_len).transpose(0, 2, 1, 3)
+    return np.ascontiguousarray(sequences.reshape(n_epochs, n_steps, n_channels * step_len),
+                                dtype=np.float32)
+
+
+def epoch_features(X: np.ndarray, n_channels: int) -> np.ndarray:
+    """
+    Engineered features for the feature branch: per-channel log-variance
+    and line length.
+    """
+    epochs = X.reshape(X.shape[0], n_channels, -1)
+    log_var = np.log(epochs.var(axis=2) + 1e-12)
+    line_length = np.abs(np.diff(epochs, axis=2)).mean(axis=2)
+    return np.hstack([log_var, line_length]).astype(np.float32)
+
+
+class SeizurePredictor:
+    """
+    Hybrid model: BiLSTM over EEG sequences combined with engineered features.
+    """
+
+    def __init__(self,
+                 sequence_shape: Tuple[int, ...],
+                 feature_shape: Tuple[int, ...],
+                 lstm_units: List[int] = None,
+                 dense_units: List[int] = None,
+                 dropout_rate: float = 0.3):
+        """
+        Initialize seizure prediction model.
+
+        Args:
+            sequence_shape: Shape of EEG sequences (n_steps, n_step_features)
+            feature_shape: Shape of engineered features
+            lstm_units: List of units in LSTM layers
+            dense_units: List of units in Dense layers
+            dropout_rate: Dropout rate for regularization
+        """
+        self.sequence_shape = tuple(sequence_shape)
+        self.feature_shape = tuple(feature_shape)
+        self.lstm_units = lstm_units or [64, 32]
+        self.dense_units = dense_units or [32]
+        self.dropout_rate = dropout_rate
+        self.model = self._build_model()
+
+    def _build_model(self):
+        """Build the hybrid LSTM model."""
+        tf = _import_tensorflow()
+        layers = tf.keras.layers
+
+        # Sequence input branch
+        seq_input = layers.Input(shape=self.sequence_shape, name='sequence_input')
+        x = seq_input
+
+        for i, units in enumerate(self.lstm_units):
+            return_sequences = i < len(self.lstm_units) - 1
+            x = layers.Bidirectional(layers.LSTM(units, return_sequences=return_sequences))(x)
+            x = layers.BatchNormalization()(x)
+            x = layers.Dropout(self.dropout_rate)(x)
+
+        # Feature input branch
+        feature_input = layers.Input(shape=self.feature_shape, name='feature_input')
+
+        combined = layers.concatenate([x, feature_input])
+
+        for units in self.dense_units:
+            combined = layers.Dense(units, activation='relu')(combined)
+            combined = layers.BatchNormalization()(combined)
+            combined = layers.Dropout(self.dropout_rate)(combined)
+
+        # Keep the output in float32 for numerical stability under mixed precision
+        output = layers.Dense(1, activation='sigmoid', dtype='float32')(combined)
+
+        return tf.keras.Model(inputs=[seq_input, feature_input], outputs=output)
+
+    def compile_model(self, learning_rate=0.001, jit_compile: bool = False):
+        """
+        Compile the model with focal loss and metrics.
+
+        Args:
+            learning_rate: Float or a Keras LearningRateSchedule
+            jit_compile: Compile the train step with XLA
+        """
+        tf = _import_tensorflow()
+
+        self.model.compile(
+            optimizer=tf.keras.optimizers.Adam(learning_rate=learning_rate),
+            loss=focal_loss(),
+            metrics=['accuracy',
+                     tf.keras.metrics.Precision(),
+                     tf.keras.metrics.Recall(),
+                     tf.keras.metrics.AUC()],
+            jit_compile=jit_compile
+        )
+
+    def create_callbacks(self, patience: int = 10, reduce_lr: bool = True,
+                         checkpoint: bool = True, tensorboard: bool = False) -> List:
+        """
+        Create training callbacks.
+
+        Args:
+            patience: Number of epochs to wait for improvement
+            reduce_lr: Add ReduceLROnPlateau (not usable with an LR schedule)
+            checkpoint: Save best weights under Config.MODELS_DIR
+            tensorboard: Write TensorBoard logs under Config.LOGS_DIR
+        """
+        tf = _import_tensorflow()
+        callbacks = tf.keras.callbacks
+
+        result = [
+            callbacks.EarlyStopping(
+                monitor='val_loss',
+                patience=patience,
+                restore_best_weights=True
+            )
+        ]
+
+        if checkpoint:
+            Config.MODELS_DIR.mkdir(parents=True, exist_ok=True)
+            result.append(callbacks.ModelCheckpoint(
+                str(Config.MODELS_DIR / 'best_lstm.weights.h5'),
+                monitor='val_loss',
+                save_best_only=True,
+                save_weights_only=True
+            ))
+
+        if reduce_lr:
+            result.append(callbacks.ReduceLROnPlateau(
+                monitor='val_loss',
+                factor=0.5,
+                patience=max(1, patience // 2),
+                min_lr=1e-6
+            ))
+
+        if tensorboard:
+            log_dir = Config.LOGS_DIR / 'fit' / datetime.now().strftime("%Y%m%d-%H%M%S")
+            result.append(callbacks.TensorBoard(log_dir=str(log_dir)))
+
+        return result
+
+
+class TrainingPipeline:
+    """
+    Training pipeline for SeizurePredictor.
+
+    With cpu_optimized=True the pipeline uses a large batch, a warmup +
+    cosine learning-rate schedule scaled with the batch size and a
+    prefetching tf.data input pipeline. The train step always runs as a
+    compiled graph; XLA (jit_compile) is opt-in because XLA-lowered LSTM
+    loops were slower than the fused TensorFlow kernels on CPU.
+    Thread pools and mixed precision are process-wide and set by
+    configure_cpu_training(), which must run before the predictor is built.
+    """
+
+    def __init__(self, predictor: SeizurePredictor, cpu_optimized: bool = False,
+                 jit_compile: bool = None):
+        self.predictor = predictor
+        self.cpu_optimized = cpu_optimized
+        self.jit_compile = Config.LSTM_JIT_COMPILE if jit_compile is None else jit_compile
+
+    def _make_dataset(self, X_seq, X_features, y, batch_size, shuffle):
+        """Build a batched, prefetching tf.data pipeline."""
+        tf = _import_tensorflow()
+        dataset = tf.data.Dataset.from_tensor_slices(
+            ((X_seq.astype(np.float32), X_features.astype(np.float32)), y.astype(np.float32))
+        )
+        if shuffle:
+            dataset = dataset.shuffle(min(len(y), 10000), seed=Config.RANDOM_STATE,
+                                      reshuffle_each_iteration=True)
+        return dataset.batch(batch_size).prefetch(tf.data.AUTOTUNE)
+
+    def _learning_rate(self, n_samples: int, batch_size: int, epochs: int):
+        """Linear-scaling rule with warmup and cosine decay."""
+        tf = _import_tensorflow()
+        peak_lr = Config.LSTM_LEARNING_RATE * batch_size / Config.LSTM_BATCH_SIZE
+        steps_per_epoch = max(1, int(np.ceil(n_samples / batch_size)))
+        total_steps = steps_per_epoch * epochs
+        warmup_steps = min(steps_per_epoch * Config.LSTM_WARMUP_EPOCHS, total_steps // 2)
+
+        return tf.keras.optimizers.schedules.CosineDecay(
+            initial_learning_rate=Config.LSTM_LEARNING_RATE,
+            decay_steps=max(1, total_steps - warmup_steps),
+            alpha=0.01,
+            warmup_target=peak_lr,
+            warmup_steps=warmup_steps
+        )
+
+    def train(self,
+              X_train_seq, X_train_features, y_train,
+              X_val_seq, X_val_features, y_val,
+              batch_size: int = None,
+              epochs: int = 100,
+              class_weights: Dict = None,
+              patience: int = 10,
+              checkpoint: bool = True,
+              verbose: int = 1):
+        """
+        Train the model.
+
+        Args:
+            X_train_seq: Training sequences
+            X_train_features: Training features
+            y_train: Training labels
+            X_val_seq: Validation sequences
+            X_val_features: Validation features
+            y_val: Validation labels
+            batch_size: Defaults to Config.LSTM_CPU_BATCH_SIZE in CPU mode
+            epochs: Maximum number of epochs
+            class_weights: Weights for different classes
+            checkpoint: Save best weights under Config.MODELS_DIR
+        """
+        if batch_size is None:
+            batch_size = Config.LSTM_CPU_BATCH_SIZE if self.cpu_optimized else Config.LSTM_BATCH_SIZE
+
+        if self.cpu_optimized:
+            learning_rate = self._learning_rate(len(y_train), batch_size, epochs)
+            self.predictor.compile_model(learning_rate=learning_rate, jit_compile=self.jit_compile)
+            callbacks = self.predictor.create_callbacks(patience=patience, reduce_lr=False,
+                                                        checkpoint=checkpoint)
+        else:
+            self.predictor.compile_model(learning_rate=Config.LSTM_LEARNING_RATE,
+                                         jit_compile=self.jit_compile)
+            callbacks = self.predictor.create_callbacks(patience=patience, checkpoint=checkpoint)
+
+        train_ds = self._make_dataset(X_train_seq, X_train_features, y_train, batch_size, shuffle=True)
+        val_ds = self._make_dataset(X_val_seq, X_val_features, y_val, batch_size, shuffle=False)
+
+        history = self.predictor.model.fit(
+            train_ds,
+            validation_data=val_ds,
+            epochs=epochs,
+            shuffle=False,  # tf.data pipeline already shuffles
+            class_weight=class_weights,
+            callbacks=callbacks,
+            verbose=verbose
+        )
+
+        return history
+
+    def predict_proba(self, X_seq, X_features, batch_size: int = None) -> np.ndarray:
+        """Predict seizure probabilities."""
+        batch_size = batch_size or Config.LSTM_CPU_BATCH_SIZE
+        proba = self.predictor.model.predict(
+            [X_seq.astype(np.float32), X_features.astype(np.float32)],
+            batch_size=batch_size, verbose=0
+        )
+        return proba.ravel()
+
+    def evaluate(self, X_test_seq, X_test_features, y_test) -> Dict:
+        """
+        Evaluate the model.
+
+        Returns:
+            Dictionary with probabilities, predictions and classification report
+        """
+        from sklearn.metrics import classification_report, confusion_matrix
+
+        y_pred_prob = self.predict_proba(X_test_seq, X_test_features)
+        y_pred = (y_pred_prob > 0.5).astype(int)
+
+        return {
+            'y_pred_proba': y_pred_prob,
+            'y_pred': y_pred,
+            'classification_report': classification_report(y_test, y_pred, zero_division=0),
+            'confusion_matrix': confusion_matrix(y_test, y_pred, labels=[0, 1])
+        }
+
+
+class LSTMSeizureDetector(SeizureDetectionModel):
+    """
+    SeizurePredictor wrapped in the SeizureDetectionModel interface so it can
+    be used with ModelFactory and PatientIndependentValidator.
+
+    Works on flattened epochs (n_channels * n_times); sequences and
+    engineered features are derived internally.
+    """
+
+    def __init__(self, n_channels: int = None, n_steps: int = 40,
+                 lstm_units: List[int] = None, dense_units: List[int] = None,
+                 dropout_rate: float = 0.3, epochs: int = 30, batch_size: int = None,
+                 cpu_optimized: bool = True, validation_fraction: float = 0.1,
+                 random_state: int = None):
+        super().__init__(random_state)
+        self.n_channels = n_channels or len(Config.SELECTED_CHANNELS)
+        self.n_steps = n_steps
+        self.lstm_units = lstm_units
+        self.dense_units = dense_units
+        self.dropout_rate = dropout_rate
+        self.epochs = epochs
+        self.batch_size = batch_size
+        self.cpu_optimized = cpu_optimized
+        self.validation_fraction = validation_fraction
+        self.pipeline = None
+
+    def _inputs(self, X: np.ndarray):
+        return (epochs_to_sequences(X, self.n_channels, self.n_steps),
+                epoch_features(X, self.n_channels))
+
+    def fit(self, X: np.ndarray, y: np.ndarray):
+        """Fit the model, holding out a stratified fraction for early stopping."""
+        tf = _import_tensorflow()
+        tf.keras.utils.set_random_seed(self.random_state)
+
+        with profile_stage('sequences', X) as stage:
+            X_seq, X_feat = self._inputs(X)
+            stage.record_arrays(X_seq, X_feat)
+        y = np.asarray(y, dtype=np.float32)
+
+        rng = np.random.RandomState(self.random_state)
+        val_mask = np.zeros(len(y), dtype=bool)
+        for label in np.unique(y):
+            idx = np.flatnonzero(y == label)
+            n_val = int(len(idx) * self.validation_fraction)
+            val_mask[rng.choice(idx, n_val, replace=False)] = True
+
+        self.model = SeizurePredictor(
+            sequence_shape=X_seq.shape[1:],
+            feature_shape=X_feat.shape[1:],
+            lstm_units=self.lstm_units,
+            dense_units=self.dense_units,
+            dropout_rate=self.dropout_rate
+        )
+        self.pipeline = TrainingPipeline(self.model, cpu_optimized=self.cpu_optimized)
+        with profile_stage(f'{type(self).__name__}.fit', X_seq, X_feat):
+            self.pipeline.train(
+                X_seq[~val_mask], X_feat[~val_mask], y[~val_mask],
+                X_seq[val_mask], X_feat[val_mask], y[val_mask],
+                batch_size=self.batch_size, epochs=self.epochs, checkpoint=False, verbose=0
+            )
+        self.is_fitted = True
+        return self
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        """Predict class probabilities."""
+        if not self.is_fitted:
+            raise ValueError("Model must be fitted before prediction")
+        X_seq, X_feat = self._inputs(X)
+        with profile_stage(f'{type(self).__name__}.predict_proba', X_seq, X_feat):
+            proba_pos = self.pipeline.predict_proba(X_seq, X_feat)
+        return np.column_stack([1 - proba_pos, proba_pos])
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        """Make predictions."""
+        threshold = 0.5 if self.decision_threshold is None else self.decision_threshold
+        return (self.predict_proba(X)[:, 1] >= threshold).astype(int)
+
+    def _export_params(self):
+        # The numpy inference runtime has no recurrent layers
+        raise TypeError("LSTM models are not exportable as inference artifacts; "
+                        "save them with SeizurePredictor.model.save_weights()")
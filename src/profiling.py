@@ -0,0 +1,236 @@
+"""
+Lightweight stage timing and memory instrumentation.
+
+Code marks stages with profile_stage(); nothing is recorded unless a
+StageProfiler is active, in which case each stage records wall time, CPU
+time, peak RSS and the bytes of arrays passed to it.
+
+A stage's peak RSS is the larger of the resident memory sampled at its
+entry and exit (/proc/self/statm), or the process high-water mark
+(ru_maxrss) when that rose during the stage, so a stage running after the
+process peak does not inherit it. rss_delta_mb is the largest change in
+resident memory over one call. Stages nest, and the
+profiler can emit folded stacks for flame-graph tools (flamegraph.pl,
+speedscope, inferno).
+
+Usage:
+    profiler = StageProfiler()
+    with profiling(profiler):
+        with profile_stage('fit', X) as stage:
+            model.fit(X, y)
+    profiler.summary()
+    profiler.write_collapsed('profile.folded')
+
+When no profiler is active, profile_stage() returns a shared no-op object,
+so instrumented code pays one function call per stage.
+"""
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+_state = threading.local()
+
+
+def _rss_mb() -> Optional[float]:
+    """Current resident set size of this process (None without /proc)."""
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2 ** 20
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def _peak_rss_mb() -> Optional[float]:
+    """Peak resident set size of this process so far."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return peak / 2 ** 20 if sys.platform == 'darwin' else peak / 2 ** 10
+
+
+def _stage_memory(rss_in, rss_out, peak_in, peak_out) -> Tuple[Optional[float], Optional[float]]:
+    """(peak RSS, RSS change) of one stage call from its entry and exit samples."""
+    if peak_in is not None and peak_out is not None and peak_out > peak_in:
+        peak = peak_out
+    elif rss_in is not None and rss_out is not None:
+        peak = max(rss_in, rss_out)
+    else:
+        peak = peak_out
+    delta = rss_out - rss_in if rss_in is not None and rss_out is not None else None
+    return peak, delta
+
+
+def _nbytes(arrays) -> int:
+    return sum(getattr(a, 'nbytes', 0) for a in arrays)
+
+
+def _empty_stats() -> Dict[str, float]:
+    return {'calls': 0, 'wall_s': 0.0, 'cpu_s': 0.0, 'array_mb': 0.0, 'peak_rss_mb': None,
+            'rss_delta_mb': None}
+
+
+def _max(a: Optional[float], b: Optional[float]) -> Optional[float]:
+    return b if a is None else a if b is None else max(a, b)
+
+
+class _NullStage:
+    """Stage returned when profiling is disabled."""
+
+    path = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def record_arrays(self, *arrays):
+        pass
+
+
+_NULL_STAGE = _NullStage()
+
+
+class _Stage:
+    """One timed execution of a named stage."""
+
+    __slots__ = ('profiler', 'path', 'array_bytes', '_wall', '_cpu', '_rss', '_peak')
+
+    def __init__(self, profiler: 'StageProfiler', name: str, arrays):
+        self.profiler = profiler
+        self.path = profiler._current_path() + (name,)
+        self.array_bytes = _nbytes(arrays)
+
+    def __enter__(self):
+        self.profiler._stack.append(self.path)
+        self._rss = _rss_mb()
+        self._peak = _peak_rss_mb()
+        self._cpu = time.process_time()
+        self._wall = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        wall = time.perf_counter() - self._wall
+        cpu = time.process_time() - self._cpu
+        self.profiler._stack.pop()
+        memory = _stage_memory(self._rss, _rss_mb(), self._peak, _peak_rss_mb())
+        self.profiler._record(self.path, wall, cpu, self.array_bytes, *memory)
+        return False
+
+    def record_arrays(self, *arrays):
+        """Add the size of arrays produced inside the stage."""
+        self.array_bytes += _nbytes(arrays)
+
+
+class StageProfiler:
+    """
+    Aggregates stage records by call path.
+
+    A stage's path is the tuple of enclosing stage names, so the same
+    function called from different places is reported separately.
+    """
+
+    def __init__(self):
+        self._stack: List[Tuple[str, ...]] = []
+        self._stats: Dict[Tuple[str, ...], Dict[str, float]] = {}
+
+    def _current_path(self) -> Tuple[str, ...]:
+        return self._stack[-1] if self._stack else ()
+
+    def _record(self, path, wall, cpu, array_bytes, peak_rss_mb=None, rss_delta_mb=None):
+        stats = self._stats.setdefault(path, _empty_stats())
+        stats['calls'] += 1
+        stats['wall_s'] += wall
+        stats['cpu_s'] += cpu
+        stats['array_mb'] += array_bytes / 2 ** 20
+        stats['peak_rss_mb'] = _max(stats['peak_rss_mb'], peak_rss_mb)
+        stats['rss_delta_mb'] = _max(stats['rss_delta_mb'], rss_delta_mb)
+
+    def stage(self, name: str, *arrays) -> _Stage:
+        return _Stage(self, name, arrays)
+
+    def merge(self, other: 'StageProfiler', under: Tuple[str, ...] = None):
+        """Add another profiler's records below a path (default: current stage)."""
+        under = self._current_path() if under is None else tuple(under)
+        for path, stats in other._stats.items():
+            target = self._stats.setdefault(under + path, _empty_stats())
+            for field in ['calls', 'wall_s', 'cpu_s', 'array_mb']:
+                target[field] += stats[field]
+            for field in ['peak_rss_mb', 'rss_delta_mb']:
+                target[field] = _max(target[field], stats[field])
+
+    def _self_wall(self, path) -> float:
+        """Wall time of a path excluding its direct children."""
+        children = sum(s['wall_s'] for p, s in self._stats.items()
+                       if len(p) == len(path) + 1 and p[:len(path)] == path)
+        return max(0.0, self._stats[path]['wall_s'] - children)
+
+    def summary(self, prefix: Tuple[str, ...] = ()) -> Dict[str, Dict[str, float]]:
+        """
+        Per-stage statistics, keyed by '/'-joined path.
+
+        Args:
+            prefix: Only report stages under this path, relative to it
+        """
+        result = {}
+        for path in sorted(self._stats):
+            if path[:len(prefix)] != prefix or len(path) == len(prefix):
+                continue
+            stats = dict(self._stats[path], self_wall_s=self._self_wall(path))
+            result['/'.join(path[len(prefix):])] = stats
+        return result
+
+    def to_collapsed(self) -> str:
+        """Folded stacks ('a;b;c <self microseconds>') for flame-graph tools."""
+        lines = []
+        for path in sorted(self._stats):
+            micros = int(round(self._self_wall(path) * 1e6))
+            if micros > 0:
+                lines.append(f"{';'.join(path)} {micros}")
+        return '\n'.join(lines) + '\n'
+
+    def write_collapsed(self, path) -> Path:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(self.to_collapsed())
+        return path
+
+
+def active_profiler() -> Optional[StageProfiler]:
+    return getattr(_state, 'profiler', None)
+
+
+def profile_stage(name: str, *arrays):
+    """
+    Context manager timing a stage when a profiler is active.
+
+    Args:
+        name: Stage name
+        *arrays: Input arrays whose nbytes are recorded
+    """
+    profiler = getattr(_state, 'profiler', None)
+    if profiler is None:
+        return _NULL_STAGE
+    return profiler.stage(name, *arrays)
+
+
+@contextmanager
+def profiling(profiler: Optional[StageProfiler]):
+    """Activate a profiler for the current thread (None leaves profiling off)."""
+    previous = active_profiler()
+    if profiler is not None:
+        _state.profiler = profiler
+    try:
+        yield profiler
+    finally:
+        _state.profiler = previous
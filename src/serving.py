@@ -0,0 +1,553 @@
+"""
+Multi-stream seizure detection server.
+
+One asyncio process serves many concurrent EEG streams (beds). Each stream
+pushes chunks of samples at Config.TARGET_SAMPLING_RATE into its own ring
+buffer, which cuts epochs of Config.EPOCH_LENGTH seconds every
+EPOCH_LENGTH - EPOCH_OVERLAP seconds, exactly like the offline epoching.
+Epochs that become ready across streams are micro-batched into a single
+vectorized predict_proba call: a batch is scored as soon as it holds
+max_batch_size epochs or its oldest epoch has waited max_latency seconds.
+
+Streams connect either in-process (DetectionServer.push) or over TCP
+(DetectionServer.serve / StreamClient). The wire protocol is one stream
+per connection:
+    client -> server  4-byte big-endian header length, JSON header
+                      {'stream_id': str, 'n_samples': int}, then
+                      n_channels * n_samples little-endian float32 samples
+                      (channel-major); n_samples == 0 closes the stream
+    server -> client  one JSON detection per line; a connection for a
+                      stream_id that is already open gets one
+                      {'stream_id', 'error'} line and is closed
+
+run_load_test() replays synthetic or EDF recordings from many streams at
+once and reports p50/p99 scoring latency per stream count.
+
+Usage:
+    model = load_artifact('logistic')
+    results = asyncio.run(latency_vs_streams(model, [1, 10, 100], seconds=120))
+"""
+import asyncio
+import functools
+import json
+import logging
+import struct
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Deque, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+try:
+    from .config import Config
+except ImportError:
+    from config import Config
+
+logger = logging.getLogger(__name__)
+
+_HEADER = struct.Struct('>I')
+_SAMPLE_DTYPE = np.dtype('<f4')
+
+
+class StreamBuffer:
+    """
+    Ring buffer of one stream's samples that cuts overlapping epochs.
+
+    Epoch k covers samples [k * step_samples, k * step_samples + epoch_samples)
+    of the stream. The buffer holds one epoch plus one step, so memory is
+    constant however long the stream runs.
+    """
+
+    def __init__(self, n_channels: int, epoch_samples: int, step_samples: int):
+        if not 0 < step_samples <= epoch_samples:
+            raise ValueError(f"Step ({step_samples}) must be in (0, epoch length {epoch_samples}]")
+        self.n_channels = n_channels
+        self.epoch_samples = epoch_samples
+        self.step_samples = step_samples
+        self.capacity = epoch_samples + step_samples
+        self._buffer = np.zeros((n_channels, self.capacity), dtype=np.float64)
+        self.n_seen = 0      # samples received so far
+        self.next_start = 0  # first sample of the next epoch
+
+    def push(self, samples: np.ndarray) -> List[Tuple[int, np.ndarray]]:
+        """
+        Append samples, shape (n_channels, n_samples).
+
+        Returns:
+            (start sample, epoch of shape (n_channels, epoch_samples)) for
+            every epoch completed by these samples
+        """
+        samples = np.asarray(samples)
+        if samples.ndim != 2 or samples.shape[0] != self.n_channels:
+            raise ValueError(f"Expected samples of shape ({self.n_channels}, n), got {samples.shape}")
+
+        epochs = []
+        done = 0
+        while done < samples.shape[1]:
+            free = self.capacity - (self.n_seen - self.next_start)
+            piece = samples[:, done:done + free]
+            self._write(piece)
+            done += piece.shape[1]
+            while self.n_seen - self.next_start >= self.epoch_samples:
+                epochs.append((self.next_start, self._read(self.next_start)))
+                self.next_start += self.step_samples
+        return epochs
+
+    def _write(self, piece: np.ndarray):
+        n = piece.shape[1]
+        pos = self.n_seen % self.capacity
+        first = min(n, self.capacity - pos)
+        self._buffer[:, pos:pos + first] = piece[:, :first]
+        self._buffer[:, :n - first] = piece[:, first:]
+        self.n_seen += n
+
+    def _read(self, start: int) -> np.ndarray:
+        pos = start % self.capacity
+        end = pos + self.epoch_samples
+        if end <= self.capacity:
+            return self._buffer[:, pos:end].copy()
+        return np.concatenate([self._buffer[:, pos:], self._buffer[:, :end - self.capacity]], axis=1)
+
+
+@dataclass
+class _PendingEpoch:
+    stream_id: str
+    start: int
+    data: np.ndarray
+    ready: float  # perf_counter() when the completing chunk arrived
+    results: asyncio.Queue  # the stream's queue, kept if the stream closes before scoring
+
+
+class DetectionServer:
+    """
+    Scores epochs from many streams with micro-batched predict_proba calls.
+
+    Scoring runs in a single worker thread, so the event loop keeps
+    accepting samples while a batch is scored. Detections go to each
+    stream's results queue and to on_result, if given.
+    """
+
+    def __init__(self, model, n_channels: int = None, sfreq: int = None,
+                 epoch_length: float = None, epoch_overlap: float = None,
+                 max_batch_size: int = None, max_latency: float = None,
+                 artifact_rejector=None, on_result: Callable[[Dict], None] = None):
+        """
+        Args:
+            model: Anything with predict_proba(X) on flattened epochs,
+                e.g. an InferenceModel from load_artifact()
+            n_channels: Defaults to len(Config.SELECTED_CHANNELS)
+            sfreq: Stream sampling rate; defaults to Config.TARGET_SAMPLING_RATE
+            epoch_length, epoch_overlap: Seconds; default to Config
+            max_batch_size: Most epochs per predict_proba call
+            max_latency: Seconds the oldest epoch may wait for a batch to fill
+            artifact_rejector: Optional artifacts.ArtifactRejector; epochs it
+                drops are reported with artifact=True instead of scored
+            on_result: Callback receiving every detection dict
+        """
+        self.model = model
+        self.n_channels = n_channels or len(Config.SELECTED_CHANNELS)
+        self.sfreq = sfreq or Config.TARGET_SAMPLING_RATE
+        epoch_length = epoch_length or Config.EPOCH_LENGTH
+        epoch_overlap = Config.EPOCH_OVERLAP if epoch_overlap is None else epoch_overlap
+        self.epoch_samples = int(epoch_length * self.sfreq)
+        self.step_samples = int((epoch_length - epoch_overlap) * self.sfreq)
+        self.max_batch_size = max_batch_size or Config.SERVING_MAX_BATCH_SIZE
+        self.max_latency = Config.SERVING_MAX_LATENCY if max_latency is None else max_latency
+        self.threshold = getattr(model, 'threshold', 0.5)
+        self.artifact_rejector = artifact_rejector
+        self.on_result = on_result
+
+        self.streams: Dict[str, StreamBuffer] = {}
+        self.results: Dict[str, asyncio.Queue] = {}
+        # Latest Config.SERVING_STATS_WINDOW values; a long-running server stays bounded
+        self.latencies: Deque[float] = deque(maxlen=Config.SERVING_STATS_WINDOW)
+        self.batch_sizes: Deque[int] = deque(maxlen=Config.SERVING_STATS_WINDOW)
+        self.n_epochs = 0
+        self.n_batches = 0
+        self._ready: Optional[asyncio.Queue] = None
+        self._batcher: Optional[asyncio.Task] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    async def start(self):
+        """Start the batching task (must run inside the event loop)."""
+        if self._batcher is None:
+            self._ready = asyncio.Queue()
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='scoring')
+            self._batcher = asyncio.create_task(self._batch_loop())
+
+    async def stop(self):
+        """Score the epochs still waiting, then stop the batching task."""
+        if self._batcher is None:
+            return
+        await self.drain()
+        self._batcher.cancel()
+        try:
+            await self._batcher
+        except asyncio.CancelledError:
+            pass
+        self._executor.shutdown(wait=True)
+        self._batcher = None
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.stop()
+        return False
+
+    def open_stream(self, stream_id: str) -> asyncio.Queue:
+        """Register a stream; returns the queue its detections are put on."""
+        if stream_id in self.streams:
+            raise ValueError(f"Stream '{stream_id}' is already open")
+        self.streams[stream_id] = StreamBuffer(self.n_channels, self.epoch_samples, self.step_samples)
+        self.results[stream_id] = asyncio.Queue()
+        return self.results[stream_id]
+
+    def close_stream(self, stream_id: str):
+        """
+        Forget a stream's buffer and results queue. Detections already on
+        the queue, and those of epochs still waiting to be scored, still
+        reach the queue returned by open_stream().
+        """
+        self.streams.pop(stream_id, None)
+        self.results.pop(stream_id, None)
+
+    def push(self, stream_id: str, samples: np.ndarray) -> int:
+        """
+        Add a chunk of samples, shape (n_channels, n_samples), to a stream.
+
+        Returns:
+            Number of epochs the chunk queued for scoring
+        """
+        if self._ready is None:
+            raise RuntimeError("Server is not started")
+        now = time.perf_counter()
+        results = self.results[stream_id]
+        epochs = self.streams[stream_id].push(samples)
+        if epochs and self.artifact_rejector is not None:
+            screened, keep, _ = self.artifact_rejector.apply(np.stack([data for _, data in epochs]))
+            screened = iter(screened)
+            epochs = [(start, next(screened)) if kept else (start, None)
+                      for (start, _), kept in zip(epochs, keep)]
+        for start, data in epochs:
+            if data is None:
+                # Rejected as an artifact: reported, never scored
+                self._deliver(results, stream_id, start, np.nan, 0.0, artifact=True)
+            else:
+                self._ready.put_nowait(_PendingEpoch(stream_id, start, data, now, results))
+        return sum(data is not None for _, data in epochs)
+
+    async def drain(self):
+        """Wait until every queued epoch has been scored."""
+        await self._ready.join()
+
+    async def _batch_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._ready.get()]
+            deadline = loop.time() + self.max_latency - (time.perf_counter() - batch[0].ready)
+            while len(batch) < self.max_batch_size:
+                if not self._ready.empty():
+                    batch.append(self._ready.get_nowait())
+                    continue
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._ready.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            try:
+                await self._score(loop, batch)
+            except Exception as e:
+                logger.error(f"Scoring a batch of {len(batch)} epochs failed: {e}")
+            finally:
+                for _ in batch:
+                    self._ready.task_done()
+
+    async def _score(self, loop, batch: List[_PendingEpoch]):
+        X = np.stack([epoch.data for epoch in batch]).reshape(len(batch), -1)
+        proba = await loop.run_in_executor(self._executor, self.model.predict_proba, X)
+        done = time.perf_counter()
+        self.batch_sizes.append(len(batch))
+        self.n_batches += 1
+        self.n_epochs += len(batch)
+        for epoch, p in zip(batch, proba[:, 1]):
+            latency = done - epoch.ready
+            self.latencies.append(latency)
+            self._deliver(epoch.results, epoch.stream_id, epoch.start, p, latency)
+
+    def _deliver(self, results: asyncio.Queue, stream_id: str, start: int, probability: float,
+                 latency: float, artifact: bool = False):
+        detection = {
+            'stream_id': stream_id,
+            'epoch_start': start / self.sfreq,
+            'epoch_end': (start + self.epoch_samples) / self.sfreq,
+            'probability': None if artifact else float(probability),
+            'alarm': bool(not artifact and probability >= self.threshold),
+            'artifact': artifact,
+            'latency_ms': latency * 1e3
+        }
+        results.put_nowait(detection)
+        if self.on_result is not None:
+            self.on_result(detection)
+
+    def stats(self) -> Dict[str, float]:
+        """
+        Epochs and batches scored so far; latency percentiles and the mean
+        batch size over the latest Config.SERVING_STATS_WINDOW of them.
+        """
+        latencies = np.asarray(self.latencies) * 1e3
+        return {
+            'epochs': self.n_epochs,
+            'batches': self.n_batches,
+            'batch_size_mean': float(np.mean(self.batch_sizes)) if self.batch_sizes else np.nan,
+            'latency_p50_ms': float(np.percentile(latencies, 50)) if len(latencies) else np.nan,
+            'latency_p99_ms': float(np.percentile(latencies, 99)) if len(latencies) else np.nan,
+            'latency_max_ms': float(latencies.max()) if len(latencies) else np.nan
+        }
+
+    async def serve(self, host: str = '127.0.0.1', port: int = None) -> asyncio.AbstractServer:
+        """Start accepting streams over TCP (see the module docstring)."""
+        await self.start()
+        port = Config.SERVING_PORT if port is None else port
+        server = await asyncio.start_server(self._handle_connection, host, port)
+        logger.info(f"Detection server listening on "
+                    f"{', '.join(str(s.getsockname()) for s in server.sockets)}")
+        return server
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        stream_id = None
+        results = sender = None
+        try:
+            while True:
+                header, payload = await read_frame(reader, self.n_channels)
+                if stream_id is None:
+                    stream_id = str(header['stream_id'])
+                    if stream_id in self.streams:
+                        # Another connection owns this stream: refuse, leave it untouched
+                        logger.warning(f"Rejected a second connection for open stream {stream_id}")
+                        writer.write(json.dumps({'stream_id': stream_id,
+                                                 'error': f"Stream '{stream_id}' is already open"})
+                                     .encode('utf-8') + b'\n')
+                        await writer.drain()
+                        break
+                    results = self.open_stream(stream_id)
+                    sender = asyncio.create_task(self._send_results(results, writer))
+                if payload is None:
+                    break
+                self.push(stream_id, payload)
+        except (asyncio.IncompleteReadError, ConnectionError) as e:
+            logger.warning(f"Stream {stream_id} disconnected: {type(e).__name__}")
+        except (ValueError, KeyError) as e:
+            logger.warning(f"Stream {stream_id} sent an invalid frame: {e}")
+        finally:
+            # Only clean up the stream this connection opened
+            if sender is not None:
+                self.close_stream(stream_id)
+                await self.drain()
+                results.put_nowait(None)
+                await sender
+            writer.close()
+
+    @staticmethod
+    async def _send_results(queue: asyncio.Queue, writer: asyncio.StreamWriter):
+        while True:
+            detection = await queue.get()
+            if detection is None:
+                break
+            writer.write(json.dumps(detection).encode('utf-8') + b'\n')
+            try:
+                await writer.drain()
+            except ConnectionError:
+                break
+
+
+def encode_frame(stream_id: str, samples: Optional[np.ndarray]) -> bytes:
+    """Frame a chunk of samples (None ends the stream)."""
+    n_samples = 0 if samples is None else samples.shape[1]
+    header = json.dumps({'stream_id': stream_id, 'n_samples': n_samples}).encode('utf-8')
+    payload = b'' if samples is None else np.ascontiguousarray(samples, dtype=_SAMPLE_DTYPE).tobytes()
+    return _HEADER.pack(len(header)) + header + payload
+
+
+async def read_frame(reader: asyncio.StreamReader, n_channels: int) -> Tuple[Dict, Optional[np.ndarray]]:
+    """Read one frame; the samples are None for the end-of-stream frame."""
+    (length,) = _HEADER.unpack(await reader.readexactly(_HEADER.size))
+    header = json.loads(await reader.readexactly(length))
+    n_samples = int(header['n_samples'])
+    if n_samples == 0:
+        return header, None
+    data = await reader.readexactly(n_channels * n_samples * _SAMPLE_DTYPE.itemsize)
+    return header, np.frombuffer(data, dtype=_SAMPLE_DTYPE).reshape(n_channels, n_samples)
+
+
+class StreamClient:
+    """Sends one EEG stream to a DetectionServer over TCP."""
+
+    def __init__(self, stream_id: str):
+        self.stream_id = stream_id
+        self.detections: List[Dict] = []
+        self.error: Optional[str] = None
+        self._reader = None
+        self._writer = None
+        self._receiver = None
+
+    async def connect(self, host: str = '127.0.0.1', port: int = None):
+        port = Config.SERVING_PORT if port is None else port
+        self._reader, self._writer = await asyncio.open_connection(host, port)
+        self._receiver = asyncio.create_task(self._receive())
+        return self
+
+    async def _receive(self):
+        async for line in self._reader:
+            message = json.loads(line)
+            if 'error' in message:
+                self.error = message['error']
+            else:
+                self.detections.append(message)
+
+    async def send(self, samples: np.ndarray):
+        self._writer.write(encode_frame(self.stream_id, samples))
+        await self._writer.drain()
+
+    async def close(self) -> List[Dict]:
+        """End the stream and wait for its remaining detections."""
+        try:
+            await self.send(None)
+        except ConnectionError:
+            pass  # the server already closed the connection (see self.error)
+        await self._receiver
+        self._writer.close()
+        return self.detections
+
+
+def synthetic_recordings(n_recordings: int, seconds: float, n_channels: int = None,
+                         sfreq: int = None, seed: int = None) -> List[np.ndarray]:
+    """EEG-like recordings in volts, shape (n_channels, n_samples) each."""
+    n_channels = n_channels or len(Config.SELECTED_CHANNELS)
+    sfreq = sfreq or Config.TARGET_SAMPLING_RATE
+    rng = np.random.RandomState(Config.RANDOM_STATE if seed is None else seed)
+    t = np.arange(int(seconds * sfreq)) / sfreq
+    # ~20 uV background noise plus a 10 Hz alpha rhythm
+    return [(20 * rng.randn(n_channels, len(t)) + 10 * np.sin(2 * np.pi * 10 * t)) * 1e-6
+            for _ in range(n_recordings)]
+
+
+def load_edf_recording(path: Path) -> np.ndarray:
+    """Config.SELECTED_CHANNELS of an EDF file at Config.TARGET_SAMPLING_RATE."""
+    try:
+        from .data_processing import load_edf_channels
+        from .montage import MontageIndex
+    except ImportError:
+        from data_processing import load_edf_channels
+        from montage import MontageIndex
+    data, _ = load_edf_channels(path, MontageIndex().mapping(path), Config.TARGET_SAMPLING_RATE)
+    return data
+
+
+async def _replay(send: Callable, recording: np.ndarray, chunk_samples: int, period: float,
+                  delay: float):
+    """Send a recording in chunks on a fixed schedule (no drift from slow sends)."""
+    loop = asyncio.get_running_loop()
+    start = loop.time() + delay
+    for k, offset in enumerate(range(0, recording.shape[1], chunk_samples)):
+        wait = start + k * period - loop.time()
+        if wait > 0:
+            await asyncio.sleep(wait)
+        result = send(recording[:, offset:offset + chunk_samples])
+        if asyncio.iscoroutine(result):
+            await result
+
+
+async def run_load_test(model, n_streams: int, recordings: Sequence[np.ndarray], sfreq: int,
+                        chunk_seconds: float = 1.0, speed: float = 1.0,
+                        address: Tuple[str, int] = None, seed: int = None,
+                        **server_kwargs) -> Dict[str, float]:
+    """
+    Replay recordings from n_streams concurrent streams and measure latency.
+
+    Stream i replays recordings[i % len(recordings)] in chunks of
+    chunk_seconds, speed times faster than real time, starting at a random
+    offset within the first chunk period so streams are not in lockstep.
+
+    Args:
+        model: Detector with predict_proba
+        n_streams: Concurrent streams
+        recordings: Arrays of shape (n_channels, n_samples)
+        sfreq: Sampling rate of the recordings; the server runs at this rate
+        chunk_seconds: Seconds of EEG per pushed chunk
+        speed: Replay speed relative to real time
+        address: (host, port) to stream over TCP through a local server on
+            that address (port 0 picks a free port); in-process pushes if None
+        **server_kwargs: DetectionServer options (max_batch_size, ...)
+
+    Returns:
+        DetectionServer.stats() plus the load parameters
+    """
+    if not sfreq or sfreq <= 0:
+        raise ValueError(f"Invalid sampling rate {sfreq}: pass the recordings' sfreq")
+    server = DetectionServer(model, n_channels=recordings[0].shape[0], sfreq=sfreq, **server_kwargs)
+    chunk_samples = int(chunk_seconds * server.sfreq)
+    period = chunk_seconds / speed
+    delays = np.random.RandomState(Config.RANDOM_STATE if seed is None else seed).uniform(0, period, n_streams)
+
+    start = time.perf_counter()
+    async with server:
+        if address is None:
+            stream_ids = [f'stream_{i:04d}' for i in range(n_streams)]
+            for stream_id in stream_ids:
+                server.open_stream(stream_id)
+            await asyncio.gather(*[
+                _replay(functools.partial(server.push, stream_id), recordings[i % len(recordings)],
+                        chunk_samples, period, delays[i])
+                for i, stream_id in enumerate(stream_ids)
+            ])
+        else:
+            tcp = await server.serve(*address)
+            host, port = tcp.sockets[0].getsockname()[:2]
+            clients = [await StreamClient(f'stream_{i:04d}').connect(host, port) for i in range(n_streams)]
+            await asyncio.gather(*[
+                _replay(client.send, recordings[i % len(recordings)], chunk_samples, period, delays[i])
+                for i, client in enumerate(clients)
+            ])
+            await asyncio.gather(*[client.close() for client in clients])
+            tcp.close()
+            await tcp.wait_closed()
+        await server.drain()
+
+    elapsed = time.perf_counter() - start
+    stats = server.stats()
+    stats.update(n_streams=n_streams, seconds=elapsed, epochs_per_second=stats['epochs'] / elapsed,
+                 transport='tcp' if address else 'local')
+    return stats
+
+
+async def latency_vs_streams(model, stream_counts: Sequence[int], seconds: float = 120.0,
+                             edf_files: Sequence[Path] = None, **kwargs) -> List[Dict[str, float]]:
+    """
+    run_load_test() for each stream count on the same recordings.
+
+    Args:
+        model: Detector with predict_proba
+        stream_counts: Numbers of concurrent streams to test
+        seconds: Length of the synthetic recordings (ignored for EDF replay)
+        edf_files: Replay these recordings instead of synthetic data
+        **kwargs: Passed to run_load_test
+    """
+    if edf_files:
+        recordings = [load_edf_recording(path) for path in edf_files]
+    else:
+        recordings = synthetic_recordings(min(max(stream_counts), 16), seconds)
+    results = []
+    for n_streams in stream_counts:
+        stats = await run_load_test(model, n_streams, recordings, Config.TARGET_SAMPLING_RATE, **kwargs)
+        logger.info(f"[serve] {n_streams} streams: p50 {stats['latency_p50_ms']:.1f} ms, "
+                    f"p99 {stats['latency_p99_ms']:.1f} ms, "
+                    f"mean batch {stats['batch_size_mean']:.1f}")
+        results.append(stats)
+    return results
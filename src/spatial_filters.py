@@ -0,0 +1,180 @@
+"""
+Fitted spatial filters (SPoC, ICA) for EEG epochs.
+
+Replaces the notebook's spoc() and ica_on_epochs(), which ran MNE on the
+whole concatenated Epochs object and plotted as a side effect. Here the
+filters are learned from training epochs only, stored with the model via
+export_arrays(), and applied as one batched matrix multiply over the
+(n_epochs, n_channels, n_times) tensor, reducing n_channels to
+n_components before the models see the data. Only numpy is required.
+"""
+from typing import Dict, Tuple
+
+import numpy as np
+
+try:
+    from .config import Config
+    from .features import CHUNK_SIZE, as_epoch_tensor, covariances, powm
+    from .profiling import profile_stage
+except ImportError:
+    from config import Config
+    from features import CHUNK_SIZE, as_epoch_tensor, covariances, powm
+    from profiling import profile_stage
+
+METHODS = ['spoc', 'ica']
+
+
+def spoc_filters(epochs: np.ndarray, target: np.ndarray, n_components: int) -> np.ndarray:
+    """
+    SPoC filters: directions whose power co-varies most with the target.
+
+    Solves the generalized eigenproblem Cz w = lambda C w, where C is the
+    mean covariance and Cz the target-weighted mean covariance, by
+    whitening with C^(-1/2). Both are accumulated over CHUNK_SIZE epochs at
+    a time, so the per-epoch covariances are never held at once.
+
+    Args:
+        epochs: Training epochs, shape (n_epochs, n_channels, n_times)
+        target: Per-epoch target (e.g. seizure labels)
+        n_components: Number of filters to keep (largest |lambda|)
+
+    Returns:
+        Filters of shape (n_components, n_channels)
+    """
+    target = np.asarray(target, dtype=np.float64)
+    std = target.std()
+    if std == 0:
+        raise ValueError("SPoC needs a target that varies across training epochs")
+    z = (target - target.mean()) / std
+
+    n_channels = epochs.shape[1]
+    mean = np.zeros((n_channels, n_channels))
+    weighted = np.zeros((n_channels, n_channels))
+    for start in range(0, len(epochs), CHUNK_SIZE):
+        covs = covariances(epochs[start:start + CHUNK_SIZE])
+        mean += covs.sum(axis=0)
+        weighted += np.einsum('n,nij->ij', z[start:start + CHUNK_SIZE], covs)
+    whitener = powm(mean / len(z), -0.5)
+    weighted /= len(z)
+    eigvals, eigvecs = np.linalg.eigh(whitener @ weighted @ whitener)
+    order = np.argsort(np.abs(eigvals))[::-1][:n_components]
+    return (whitener @ eigvecs[:, order]).T
+
+
+def _sym_decorrelate(W: np.ndarray) -> np.ndarray:
+    """W <- (W W^T)^(-1/2) W"""
+    return powm(W @ W.T, -0.5) @ W
+
+
+def fastica(data: np.ndarray, n_components: int, max_iter: int = 200, tol: float = 1e-4,
+            random_state: int = None) -> np.ndarray:
+    """
+    Symmetric FastICA with the logcosh contrast (as sklearn's FastICA).
+
+    Args:
+        data: Centered signals, shape (n_channels, n_samples)
+        n_components: Number of independent components
+        max_iter: Maximum fixed-point iterations
+        tol: Convergence tolerance on the change of the unmixing matrix
+
+    Returns:
+        Unmixing matrix of shape (n_components, n_channels)
+    """
+    n_samples = data.shape[1]
+    eigvals, eigvecs = np.linalg.eigh(data @ data.T / n_samples)
+    top = np.argsort(eigvals)[::-1][:n_components]
+    whitening = (eigvecs[:, top] / np.sqrt(eigvals[top])).T
+    white = whitening @ data
+
+    rng = np.random.RandomState(random_state)
+    W = _sym_decorrelate(rng.randn(n_components, n_components))
+    for _ in range(max_iter):
+        sources = np.tanh(W @ white)
+        W_new = sources @ white.T / n_samples - (1 - sources ** 2).mean(axis=1)[:, None] * W
+        W_new = _sym_decorrelate(W_new)
+        converged = np.max(np.abs(np.abs(np.einsum('ij,ij->i', W_new, W)) - 1)) < tol
+        W = W_new
+        if converged:
+            break
+    return W @ whitening
+
+
+def spatial_filter_stage(arrays: Dict[str, np.ndarray], X: np.ndarray) -> np.ndarray:
+    """Inference-runtime feature stage for an exported SpatialFilter."""
+    epochs = as_epoch_tensor(X, int(arrays['n_channels']))
+    return _apply(arrays['filters'], arrays['offset'], epochs, str(arrays['output']))
+
+
+def _apply(filters: np.ndarray, offset: np.ndarray, epochs: np.ndarray, output: str) -> np.ndarray:
+    sources = np.matmul(filters, epochs)
+    sources -= offset[:, None]
+    if output == 'log_power':
+        return np.log(sources.var(axis=-1) + np.finfo(np.float64).tiny)
+    return sources.reshape(len(sources), -1)
+
+
+class SpatialFilter:
+    """
+    Flattened epochs -> spatially filtered epochs with fewer channels.
+
+    Fit on training epochs only (SPoC also needs their labels). The output
+    is the flattened component signals, or with output='log_power' one
+    log-variance feature per component as in MNE's SPoC.
+    """
+
+    def __init__(self, method: str = 'spoc', n_components: int = None, n_channels: int = None,
+                 output: str = 'signals', max_samples: int = 200000, random_state: int = None):
+        if method not in METHODS:
+            raise ValueError(f"Unknown spatial filter '{method}'. Available: {METHODS}")
+        if output not in ('signals', 'log_power'):
+            raise ValueError(f"Unknown output '{output}'. Use 'signals' or 'log_power'")
+        self.method = method
+        self.n_components = n_components or Config.SPATIAL_FILTER_COMPONENTS
+        self.n_channels = n_channels or len(Config.SELECTED_CHANNELS)
+        self.output = output
+        self.max_samples = max_samples
+        self.random_state = random_state or Config.RANDOM_STATE
+        self.filters_ = None
+        self.offset_ = None
+
+    def fit(self, X: np.ndarray, y: np.ndarray = None):
+        """Learn the filters from training epochs."""
+        epochs = as_epoch_tensor(X, self.n_channels)
+        if self.n_components > self.n_channels:
+            raise ValueError(f"n_components={self.n_components} exceeds {self.n_channels} channels")
+
+        with profile_stage(f'SpatialFilter.fit[{self.method}]', epochs):
+            if self.method == 'spoc':
+                if y is None:
+                    raise ValueError("SPoC needs the training labels")
+                self.filters_ = spoc_filters(epochs, y, self.n_components)
+                self.offset_ = np.zeros(self.n_components)
+            else:
+                # ICA on (a random subset of) all training samples
+                data = epochs.transpose(1, 0, 2).reshape(self.n_channels, -1)
+                if data.shape[1] > self.max_samples:
+                    rng = np.random.RandomState(self.random_state)
+                    data = data[:, rng.choice(data.shape[1], self.max_samples, replace=False)]
+                mean = data.mean(axis=1)
+                self.filters_ = fastica(data - mean[:, None], self.n_components,
+                                        random_state=self.random_state)
+                self.offset_ = self.filters_ @ mean
+        return self
+
+    def transform(self, X: np.ndarray) -> np.ndarray:
+        """Filtered epochs, shape (n_epochs, n_components * n_times) or (n_epochs, n_components)."""
+        if self.filters_ is None:
+            raise ValueError("SpatialFilter must be fitted before transform")
+        with profile_stage('SpatialFilter.transform', X):
+            return _apply(self.filters_, self.offset_, as_epoch_tensor(X, self.n_channels), self.output)
+
+    def fit_transform(self, X: np.ndarray, y: np.ndarray = None) -> np.ndarray:
+        return self.fit(X, y).transform(X)
+
+    def export_arrays(self) -> Tuple[str, Dict[str, np.ndarray]]:
+        """Arrays for the inference runtime (see inference.FEATURE_STAGES)."""
+        if self.filters_ is None:
+            raise ValueError("SpatialFilter must be fitted before export")
+        return 'spatial_filter', {'filters': self.filters_, 'offset': self.offset_,
+                                  'n_channels': np.array(self.n_channels),
+                                  'output': np.array(self.output)}
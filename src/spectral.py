@@ -0,0 +1,180 @@
+"""
+Band-power and spectral features from a shared sub-window spectrogram.
+
+Consecutive epochs overlap (EPOCH_OVERLAP, and much more with the small
+hops of real-time detection), so computing a spectrum per epoch repeats
+the same FFTs. Here every epoch is split into sub-windows of
+Config.SPECTRAL_WINDOW seconds every Config.SPECTRAL_HOP seconds; each
+distinct sub-window of a recording is transformed once, and an epoch's
+Welch PSD is the mean of its sub-window spectra, taken as a difference of
+cumulative sums. The per-epoch cost is then independent of the overlap.
+
+Features per channel: log band powers and relative band powers for
+Config.SPECTRAL_BANDS, spectral entropy and the 90% spectral edge
+frequency. Only numpy is required.
+"""
+from typing import Dict, Tuple
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+try:
+    from .config import Config
+    from .features import as_epoch_tensor
+    from .profiling import profile_stage
+except ImportError:
+    from config import Config
+    from features import as_epoch_tensor
+    from profiling import profile_stage
+
+# Fraction of spectral power below the spectral edge frequency
+EDGE_FRACTION = 0.9
+
+
+def subwindow_psd(segments: np.ndarray, sfreq: float) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    One-sided Hann-windowed periodograms (as in scipy.signal.welch).
+
+    Args:
+        segments: Array of shape (..., window_samples)
+
+    Returns:
+        (freqs, psd of shape (..., n_freqs)) in units^2 / Hz
+    """
+    n = segments.shape[-1]
+    window = np.hanning(n + 1)[:-1]  # periodic Hann, like scipy's 'hann'
+    segments = segments - segments.mean(axis=-1, keepdims=True)
+    psd = np.abs(np.fft.rfft(segments * window, axis=-1)) ** 2 / (sfreq * np.sum(window ** 2))
+    psd[..., 1:(n + 1) // 2] *= 2
+    return np.fft.rfftfreq(n, 1.0 / sfreq), psd
+
+
+def shared_epoch_psd(epochs: np.ndarray, epoch_starts: np.ndarray, sfreq: float,
+                     window: float = None, hop: float = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Welch PSD of every epoch, transforming each distinct sub-window once.
+
+    Args:
+        epochs: Array of shape (n_epochs, n_channels, n_times)
+        epoch_starts: Start time of each epoch in seconds on one timeline
+            (e.g. the processor's epoch_times[:, 0]); epochs sharing
+            samples share sub-windows. Non-overlapping epochs work too.
+        sfreq: Sampling rate of the epochs
+        window, hop: Sub-window length and hop in seconds
+
+    Returns:
+        (freqs, psd of shape (n_epochs, n_channels, n_freqs))
+    """
+    window_samples = int(round((window or Config.SPECTRAL_WINDOW) * sfreq))
+    hop_samples = int(round((hop or Config.SPECTRAL_HOP) * sfreq))
+    n_epochs, n_channels, n_times = epochs.shape
+    if window_samples > n_times:
+        raise ValueError(f"Sub-window ({window_samples} samples) is longer than the epochs ({n_times})")
+
+    # Sub-window starts of every epoch, in samples on the shared timeline
+    offsets = np.arange(0, n_times - window_samples + 1, hop_samples)
+    n_sub = len(offsets)
+    starts = np.round(np.asarray(epoch_starts, dtype=np.float64) * sfreq).astype(np.int64)
+    sub_starts = starts[:, None] + offsets
+    unique, first = np.unique(sub_starts.ravel(), return_index=True)
+
+    with profile_stage('spectrogram', epochs) as stage:
+        windows = sliding_window_view(epochs, window_samples, axis=-1)[:, :, ::hop_samples]
+        segments = windows[first // n_sub, :, first % n_sub]  # (n_unique, n_channels, window)
+        freqs, sub_psd = subwindow_psd(segments, sfreq)
+        stage.record_arrays(sub_psd)
+
+    with profile_stage('epoch_psd'):
+        index = np.searchsorted(unique, sub_starts)
+        if np.all(index[:, -1] - index[:, 0] == n_sub - 1):
+            # An epoch's sub-windows are consecutive in the spectrogram
+            cumulative = np.concatenate([np.zeros((1,) + sub_psd.shape[1:]), np.cumsum(sub_psd, axis=0)])
+            psd = (cumulative[index[:, 0] + n_sub] - cumulative[index[:, 0]]) / n_sub
+        else:
+            # Epochs off the hop grid of their neighbours: sum explicitly
+            psd = sub_psd[index].mean(axis=1)
+    return freqs, psd
+
+
+def spectral_features(freqs: np.ndarray, psd: np.ndarray, bands: Dict[str, Tuple[float, float]] = None) -> np.ndarray:
+    """
+    Per-channel spectral features of epoch PSDs.
+
+    Args:
+        freqs: Frequencies of the PSD bins
+        psd: Array of shape (n_epochs, n_channels, n_freqs)
+        bands: Dict name -> (low, high) Hz; defaults to Config.SPECTRAL_BANDS
+
+    Returns:
+        Array of shape (n_epochs, n_channels * (2 * n_bands + 2)): per
+        channel, log band powers, relative band powers, spectral entropy
+        and spectral edge frequency
+    """
+    bands = bands or Config.SPECTRAL_BANDS
+    df = freqs[1] - freqs[0]
+    tiny = np.finfo(np.float64).tiny
+    band_power = np.stack([psd[..., (freqs >= low) & (freqs < high)].sum(axis=-1) * df
+                           for low, high in bands.values()], axis=-1)
+    relative = band_power / np.maximum(band_power.sum(axis=-1, keepdims=True), tiny)
+
+    total = np.maximum(psd.sum(axis=-1, keepdims=True), tiny)
+    p = psd / total
+    entropy = -np.sum(p * np.log(np.maximum(p, tiny)), axis=-1) / np.log(psd.shape[-1])
+    edge = freqs[np.argmax(np.cumsum(p, axis=-1) >= EDGE_FRACTION, axis=-1)]
+
+    features = np.concatenate([np.log(band_power + tiny), relative,
+                               entropy[..., None], edge[..., None]], axis=-1)
+    return features.reshape(len(psd), -1)
+
+
+def spectral_stage(arrays: Dict[str, np.ndarray], X: np.ndarray) -> np.ndarray:
+    """Inference-runtime feature stage for an exported SpectralFeatures."""
+    bands = {str(i): tuple(band) for i, band in enumerate(arrays['bands'])}
+    stage = SpectralFeatures(int(arrays['n_channels']), float(arrays['sfreq']),
+                             float(arrays['window']), float(arrays['hop']), bands)
+    return stage.transform(X)
+
+
+class SpectralFeatures:
+    """
+    Epochs -> band-power and spectral features.
+
+    Stateless (fit does nothing), so it can run in the features stage on
+    whole recordings, where from_recording() shares sub-window FFTs across
+    overlapping epochs, or as the validator's / inference runtime's
+    feature_stage on independent epochs. Both give the same features.
+    """
+
+    def __init__(self, n_channels: int = None, sfreq: float = None, window: float = None,
+                 hop: float = None, bands: Dict[str, Tuple[float, float]] = None):
+        self.n_channels = n_channels or len(Config.SELECTED_CHANNELS)
+        self.sfreq = sfreq or Config.TARGET_SAMPLING_RATE
+        self.window = window or Config.SPECTRAL_WINDOW
+        self.hop = hop or Config.SPECTRAL_HOP
+        self.bands = dict(bands or Config.SPECTRAL_BANDS)
+
+    def from_recording(self, epochs: np.ndarray, epoch_starts: np.ndarray) -> np.ndarray:
+        """Features of overlapping epochs, sharing their sub-window spectra."""
+        epochs = as_epoch_tensor(epochs, self.n_channels)
+        with profile_stage('SpectralFeatures.transform', epochs):
+            freqs, psd = shared_epoch_psd(epochs, epoch_starts, self.sfreq, self.window, self.hop)
+            return spectral_features(freqs, psd, self.bands)
+
+    def fit(self, X: np.ndarray, y: np.ndarray = None):
+        return self
+
+    def transform(self, X: np.ndarray) -> np.ndarray:
+        """Features of independent (flattened or 3-D) epochs."""
+        epochs = as_epoch_tensor(X, self.n_channels)
+        # Spacing epochs one epoch length apart means no sub-window is shared
+        starts = np.arange(len(epochs)) * (epochs.shape[-1] / self.sfreq)
+        return self.from_recording(epochs, starts)
+
+    def fit_transform(self, X: np.ndarray, y: np.ndarray = None) -> np.ndarray:
+        return self.transform(X)
+
+    def export_arrays(self) -> Tuple[str, Dict[str, np.ndarray]]:
+        """Arrays for the inference runtime (see inference.FEATURE_STAGES)."""
+        return 'spectral', {'n_channels': np.array(self.n_channels), 'sfreq': np.array(self.sfreq),
+                            'window': np.array(self.window), 'hop': np.array(self.hop),
+                            'bands': np.array(list(self.bands.values()), dtype=np.float64)}
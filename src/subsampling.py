@@ -0,0 +1,185 @@
+"""
+Interictal subsampling and hard-negative mining of training sets.
+
+validate_model trained on every interictal epoch of every training patient
+and then grew the set further with SMOTE. InterictalSubsampler keeps every
+ictal epoch and a budget of interictal ones instead (negative_ratio per
+ictal epoch):
+    stratified  most of the budget, spread over the training patients in
+                proportion to their interictal epochs and, within a
+                patient, evenly over n_strata consecutive stretches of its
+                recording (rows are in time order), so no patient or part
+                of a night dominates
+    hard        the rest, mined in n_rounds: a cheap linear model (SGD
+                logistic regression) is fitted on the current set and the
+                unselected interictal epochs it scores highest (its false
+                positives first) are added
+
+Pass it to validate_model(subsampler=...) in place of SMOTE;
+compare_training_sets() reports fit time and test metrics of the full,
+SMOTE-balanced and subsampled training sets side by side. Only numpy is
+required; scikit-learn is imported for the mining model.
+"""
+import logging
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+try:
+    from .config import Config
+except ImportError:
+    from config import Config
+
+logger = logging.getLogger(__name__)
+
+# Rows scored at once when mining; bounds the copy of X
+CHUNK_ROWS = 4096
+
+
+def allocate(budget: int, sizes) -> np.ndarray:
+    """
+    Split budget over groups in proportion to their sizes (largest
+    remainder), never exceeding a group's size.
+    """
+    sizes = np.asarray(sizes, dtype=np.int64)
+    budget = min(int(budget), int(sizes.sum()))
+    if budget <= 0:
+        return np.zeros(len(sizes), dtype=np.int64)
+    share = budget * sizes / sizes.sum()
+    counts = np.floor(share).astype(np.int64)
+    for i in np.argsort(counts - share, kind='stable'):
+        if counts.sum() == budget:
+            break
+        if counts[i] < sizes[i]:
+            counts[i] += 1
+    return counts
+
+
+class InterictalSubsampler:
+    """
+    All ictal epochs plus a stratified and hard-mined interictal budget.
+
+    fit_resample() has the imbalanced-learn signature (plus optional
+    per-row patient groups); report_ describes the last reduction.
+    """
+
+    def __init__(self, negative_ratio: float = None, max_negatives: int = None,
+                 n_strata: int = None, hard_fraction: float = None, n_rounds: int = None,
+                 random_state: int = None):
+        self.negative_ratio = negative_ratio or Config.SUBSAMPLE_NEGATIVE_RATIO
+        self.max_negatives = max_negatives
+        self.n_strata = n_strata or Config.SUBSAMPLE_TIME_STRATA
+        self.hard_fraction = Config.SUBSAMPLE_HARD_FRACTION if hard_fraction is None else hard_fraction
+        if not 0 <= self.hard_fraction < 1:
+            # The first round's stratified sample is what the miner is fitted on
+            raise ValueError(f"hard_fraction must be in [0, 1), got {self.hard_fraction}")
+        self.n_rounds = n_rounds or Config.SUBSAMPLE_HARD_ROUNDS
+        self.random_state = random_state or Config.RANDOM_STATE
+
+    def budget(self, n_positive: int, n_negative: int) -> int:
+        """Interictal epochs to keep."""
+        budget = int(np.ceil(self.negative_ratio * max(n_positive, 1)))
+        if self.max_negatives is not None:
+            budget = min(budget, self.max_negatives)
+        return min(budget, n_negative)
+
+    def stratified(self, negatives: np.ndarray, groups: np.ndarray, budget: int,
+                   rng: np.random.RandomState) -> np.ndarray:
+        """Rows of a patient- and time-stratified sample of the negatives."""
+        patients = [negatives[groups[negatives] == g] for g in np.unique(groups[negatives])]
+        chosen = []
+        for rows, n_patient in zip(patients, allocate(budget, [len(r) for r in patients])):
+            strata = np.array_split(rows, min(self.n_strata, len(rows)))
+            for stratum, n in zip(strata, allocate(n_patient, [len(s) for s in strata])):
+                chosen.append(rng.choice(stratum, n, replace=False))
+        return np.sort(np.concatenate(chosen)) if chosen else np.empty(0, dtype=np.int64)
+
+    def mine(self, X: np.ndarray, y: np.ndarray, positives: np.ndarray, selected: np.ndarray,
+             pool: np.ndarray, budget: int) -> np.ndarray:
+        """Negatives from pool that a linear model fitted on the current set scores highest."""
+        from sklearn.linear_model import SGDClassifier
+
+        mined = []
+        # Budget split evenly over the rounds
+        for n in np.diff(np.linspace(0, budget, self.n_rounds + 1).round().astype(int)):
+            if n == 0 or len(pool) == 0:
+                continue
+            keep = np.sort(np.concatenate([positives, selected] + mined))
+            model = SGDClassifier(loss='log_loss', class_weight='balanced', max_iter=20, tol=1e-3,
+                                  random_state=self.random_state)
+            model.fit(X[keep], y[keep])
+            scores = np.concatenate([model.decision_function(X[pool[start:start + CHUNK_ROWS]])
+                                     for start in range(0, len(pool), CHUNK_ROWS)])
+            n = min(n, len(pool))
+            top = np.argpartition(-scores, n - 1)[:n]
+            mined.append(pool[top])
+            pool = np.delete(pool, top)
+        return np.concatenate(mined) if mined else np.empty(0, dtype=np.int64)
+
+    def fit_resample(self, X: np.ndarray, y: np.ndarray,
+                     groups: np.ndarray = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Reduced training set, in the original row order.
+
+        Args:
+            X, y: Training epochs (rows of each patient in time order)
+            groups: Patient index of every row (default: one patient)
+        """
+        y = np.asarray(y)
+        groups = np.zeros(len(y), dtype=np.int64) if groups is None else np.asarray(groups)
+        rng = np.random.RandomState(self.random_state)
+        positives = np.flatnonzero(y == 1)
+        negatives = np.flatnonzero(y != 1)
+        budget = self.budget(len(positives), len(negatives))
+
+        if len(positives) == 0 or budget >= len(negatives):
+            logger.warning("Nothing to subsample, using the full training set")
+            keep, n_hard = np.arange(len(y)), 0
+        else:
+            n_hard = int(round(self.hard_fraction * budget))
+            selected = self.stratified(negatives, groups, budget - n_hard, rng)
+            pool = np.setdiff1d(negatives, selected, assume_unique=True)
+            hard = self.mine(X, y, positives, selected, pool, n_hard)
+            keep = np.sort(np.concatenate([positives, selected, hard]))
+            n_hard = len(hard)
+
+        self.report_ = {
+            'n_before': len(y),
+            'n_after': len(keep),
+            'n_positive': len(positives),
+            'n_negative_kept': len(keep) - len(positives),
+            'n_hard_negatives': n_hard,
+            'kept_fraction': len(keep) / max(len(y), 1)
+        }
+        logger.info(f"Subsampled training set: {len(y)} -> {len(keep)} epochs "
+                    f"({len(positives)} ictal, {n_hard} hard negatives)")
+        return X[keep], y[keep]
+
+
+def compare_training_sets(validator, model_class, patient_data: Dict, patient_splits: Dict[str, List[str]],
+                          subsampler: InterictalSubsampler = None,
+                          model_params: Dict = None) -> 'pd.DataFrame':
+    """
+    Fit time and test metrics of one model trained on the full, the
+    SMOTE-balanced and the subsampled training set of the same split.
+
+    Returns:
+        DataFrame with one row per training set
+    """
+    import pandas as pd
+
+    subsampler = subsampler or InterictalSubsampler(random_state=validator.random_state)
+    runs = {'full': {'apply_smote': False}, 'smote': {'apply_smote': True},
+            'subsampled': {'subsampler': subsampler}}
+    rows = []
+    for name, options in runs.items():
+        results = validator.validate_model(model_class, patient_data, patient_splits, model_params,
+                                           **options)
+        metadata = results['metadata']
+        row = {'Training set': name,
+               'Train epochs': sum(metadata['class_distribution']['train_balanced'].values()),
+               'Fit seconds': metadata['fit_seconds']}
+        row.update({metric: results['test'].get(metric, np.nan)
+                    for metric in ['precision', 'recall', 'f1', 'specificity', 'auc']})
+        rows.append(row)
+    return pd.DataFrame(rows)
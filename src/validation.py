@@ -6,25 +6,27 @@ FIXES:
 2. Proper statistical testing
 3. No data leakage from preprocessing
 4. Realistic performance evaluation
+5. Event-level metrics (seizure sensitivity, false alarms per hour, latency)
+6. Operating-point selection on validation patients only
+7. Patient-level bootstrap confidence intervals
+8. Optional persistent experiment store (experiments.ExperimentStore)
+
+scikit-learn, imbalanced-learn and scipy are imported where they are used,
+so importing this module stays cheap.
 """
 import numpy as np
-import pandas as pd
-from sklearn.model_selection import StratifiedKFold
-from sklearn.metrics import (
-    accuracy_score, precision_score, recall_score, f1_score,
-    roc_auc_score, classification_report, confusion_matrix
-)
-from sklearn.preprocessing import StandardScaler
-from imblearn.over_sampling import SMOTE
-from typing import Dict, List, Tuple, Any
+from collections import deque
+from typing import Dict, List, Optional, Tuple, Any
 import logging
-from scipy import stats
+import time
 import warnings
 
 try:
     from .config import Config
+    from .profiling import StageProfiler, active_profiler, profile_stage, profiling
 except ImportError:
     from config import Config
+    from profiling import StageProfiler, active_profiler, profile_stage, profiling
 
 logger = logging.getLogger(__name__)
 
@@ -36,16 +38,29 @@ class PatientIndependentValidator:
     both training and testing sets.
     """
     
-    def __init__(self, random_state: int = None):
+    def __init__(self, random_state: int = None, profile: bool = None, store=None,
+                 reuse_stored: bool = True):
         self.random_state = random_state or Config.RANDOM_STATE
-        self.results_history = []
+        self.profile = Config.PROFILE_STAGES if profile is None else profile
+        self.profiler = None  # StageProfiler of the last profiled validate_model call
+        # experiments.ExperimentStore: records every run and (with
+        # reuse_stored) answers repeated ones
+        self.store = store
+        self.reuse_stored = reuse_stored
+        self.results_history = deque(maxlen=Config.RESULTS_HISTORY_SIZE)
+        self._bin_cache = None  # BinnedPatientCache, created for the first binned model
         
     def validate_model(self, 
                       model_class,
                       patient_data: Dict[str, Tuple[np.ndarray, np.ndarray]],
                       patient_splits: Dict[str, List[str]],
                       model_params: Dict = None,
-                      apply_smote: bool = True) -> Dict[str, Any]:
+                      apply_smote: bool = True,
+                      keep_fitted: bool = False,
+                      feature_stage=None,
+                      patient_metadata: Dict[str, Dict] = None,
+                      patient_stats=None,
+                      subsampler=None) -> Dict[str, Any]:
         """
         Perform patient-independent validation.
         
@@ -55,56 +70,175 @@ class PatientIndependentValidator:
             patient_splits: Train/val/test patient splits
             model_params: Parameters for model initialization
             apply_smote: Whether to apply SMOTE for class balancing
+            keep_fitted: Return the fitted model, scaler and feature stage
+                under results['fitted'] (e.g. to export them)
+            feature_stage: Optional transformer with fit_transform/transform
+                (e.g. features.TangentSpaceFeatures), fitted on the training
+                patients only and applied before scaling
+            patient_metadata: Optional dict patient_id -> processor metadata
+                with 'epoch_times' (and 'seizure_intervals'); adds
+                event-level val/test metrics under results['events']
+            patient_stats: Optional lopo.PatientStatistics of patient_data;
+                the scaler is then merged from the training patients'
+                moments and each split is scaled in one pass (ignored with
+                a feature_stage or a binned model)
+            subsampler: Optional subsampling.InterictalSubsampler; the
+                training set is reduced to all ictal and a budget of
+                interictal epochs instead of being grown by SMOTE
+            
+        Models with binned_input (e.g. ImprovedHistGradientBoosting) get
+        uint8-binned patients from the validator's per-patient cache instead
+        of scaled float data, and no SMOTE (they weight classes instead).
+        Models with uses_validation_data also receive the validation
+        patients for early stopping.
+        
+        With a store, results of an identical earlier run (same model,
+        parameters, splits, data and Config settings) are loaded instead of
+        recomputed, except with keep_fitted; new results are recorded.
             
         Returns:
-            Comprehensive validation results
+            Comprehensive validation results. With profiling enabled (the
+            validator's profile flag or an active StageProfiler),
+            results['metadata']['profile'] holds per-stage timings.
         """
         model_params = model_params or {}
         
-        # Prepare data splits
-        train_data = self._combine_patient_data(patient_data, patient_splits['train'])
-        val_data = self._combine_patient_data(patient_data, patient_splits['val'])
-        test_data = self._combine_patient_data(patient_data, patient_splits['test'])
-        
-        logger.info(f"Train: {len(patient_splits['train'])} patients, {len(train_data[0])} epochs")
-        logger.info(f"Val: {len(patient_splits['val'])} patients, {len(val_data[0])} epochs")
-        logger.info(f"Test: {len(patient_splits['test'])} patients, {len(test_data[0])} epochs")
-        
-        # Fit preprocessing on training data only
-        scaler = StandardScaler()
-        X_train_scaled = scaler.fit_transform(train_data[0])
-        X_val_scaled = scaler.transform(val_data[0])
-        X_test_scaled = scaler.transform(test_data[0])
-        
-        # Apply SMOTE only to training data
-        if apply_smote:
-            X_train_balanced, y_train_balanced = self._apply_smote_safely(
-                X_train_scaled, train_data[1]
+        experiment = None
+        if self.store is not None:
+            experiment = self._experiment(
+                'validate', model_class, model_params, patient_data, patient_splits, feature_stage,
+                patient_metadata, apply_smote=apply_smote, subsampler=subsampler
             )
-        else:
-            X_train_balanced, y_train_balanced = X_train_scaled, train_data[1]
-            
-        # Train model
-        model = model_class(**model_params)
-        model.fit(X_train_balanced, y_train_balanced)
+            if experiment is not None and not keep_fitted:
+                stored = self._stored(experiment)
+                if stored is not None:
+                    return stored
+        start = time.perf_counter()
         
-        # Evaluate on all splits
-        results = {}
+        # Profile into a fresh profiler so results only hold this run's stages;
+        # an enclosing profiler receives them afterwards
+        outer = active_profiler()
+        profiler = StageProfiler() if (self.profile or outer is not None) else None
+        self.profiler = profiler
         
-        # Training performance (on balanced data)
-        train_pred = model.predict(X_train_balanced)
-        train_proba = model.predict_proba(X_train_balanced)[:, 1] if hasattr(model, 'predict_proba') else None
-        results['train'] = self._calculate_metrics(y_train_balanced, train_pred, train_proba)
-        
-        # Validation performance
-        val_pred = model.predict(X_val_scaled)
-        val_proba = model.predict_proba(X_val_scaled)[:, 1] if hasattr(model, 'predict_proba') else None
-        results['val'] = self._calculate_metrics(val_data[1], val_pred, val_proba)
+        model = model_class(**model_params)
+        binned = getattr(model, 'binned_input', False) and feature_stage is None
+        prescaled = patient_stats is not None and feature_stage is None and not binned
+        apply_smote = apply_smote and not binned and subsampler is None
+        fit_params = {}
         
-        # Test performance (most important)
-        test_pred = model.predict(X_test_scaled)
-        test_proba = model.predict_proba(X_test_scaled)[:, 1] if hasattr(model, 'predict_proba') else None
-        results['test'] = self._calculate_metrics(test_data[1], test_pred, test_proba)
+        with profiling(profiler), profile_stage('validate_model'):
+            # Prepare data splits
+            if binned:
+                with profile_stage('bin') as stage:
+                    train_data, val_data, test_data, scaler, fit_params['bin_edges'] = \
+                        self.bin_cache.prepare(patient_data, patient_splits, model.max_bins)
+                    stage.record_arrays(train_data[0], val_data[0], test_data[0])
+            elif prescaled:
+                with profile_stage('combine_scaled') as stage:
+                    scaler = patient_stats.scaler(patient_splits['train'])
+                    train_data, val_data, test_data = [
+                        patient_stats.assemble(patient_data, patient_splits[split], scaler)
+                        for split in ['train', 'val', 'test']
+                    ]
+                    stage.record_arrays(train_data[0], val_data[0], test_data[0])
+            else:
+                with profile_stage('combine') as stage:
+                    train_data = self._combine_patient_data(patient_data, patient_splits['train'])
+                    val_data = self._combine_patient_data(patient_data, patient_splits['val'])
+                    test_data = self._combine_patient_data(patient_data, patient_splits['test'])
+                    stage.record_arrays(train_data[0], val_data[0], test_data[0])
+            
+            logger.info(f"Train: {len(patient_splits['train'])} patients, {len(train_data[0])} epochs")
+            logger.info(f"Val: {len(patient_splits['val'])} patients, {len(val_data[0])} epochs")
+            logger.info(f"Test: {len(patient_splits['test'])} patients, {len(test_data[0])} epochs")
+            
+            if feature_stage is not None:
+                with profile_stage('features', train_data[0], val_data[0], test_data[0]):
+                    train_data = (feature_stage.fit_transform(train_data[0], train_data[1]), train_data[1])
+                    val_data = (feature_stage.transform(val_data[0]), val_data[1])
+                    test_data = (feature_stage.transform(test_data[0]), test_data[1])
+            
+            from sklearn.preprocessing import StandardScaler
+            
+            # Fit preprocessing on training data only
+            if binned or prescaled:
+                # Bins are scale-invariant, and prescaled splits are already
+                # scaled; the scaler (from the training patients' moments)
+                # is kept for export
+                X_train_scaled, X_val_scaled, X_test_scaled = train_data[0], val_data[0], test_data[0]
+            else:
+                with profile_stage('scale', train_data[0], val_data[0], test_data[0]):
+                    scaler = StandardScaler()
+                    X_train_scaled = scaler.fit_transform(train_data[0])
+                    X_val_scaled = scaler.transform(val_data[0])
+                    X_test_scaled = scaler.transform(test_data[0])
+            
+            # Reduce or balance the training data only
+            if subsampler is not None:
+                with profile_stage('subsample', X_train_scaled) as stage:
+                    sizes = self._patient_sizes(patient_data, patient_splits['train'])
+                    groups = np.repeat(np.arange(len(sizes)), sizes)
+                    X_train_balanced, y_train_balanced = subsampler.fit_resample(
+                        X_train_scaled, train_data[1], groups
+                    )
+                    stage.record_arrays(X_train_balanced)
+            elif apply_smote:
+                with profile_stage('smote', X_train_scaled) as stage:
+                    X_train_balanced, y_train_balanced = self._apply_smote_safely(
+                        X_train_scaled, train_data[1]
+                    )
+                    stage.record_arrays(X_train_balanced)
+            else:
+                X_train_balanced, y_train_balanced = X_train_scaled, train_data[1]
+                
+            # Train model
+            if getattr(model, 'uses_validation_data', False):
+                fit_params['validation_data'] = (X_val_scaled, val_data[1])
+            with profile_stage('train'):
+                fit_start = time.perf_counter()
+                model.fit(X_train_balanced, y_train_balanced, **fit_params)
+                fit_seconds = time.perf_counter() - fit_start
+            
+            # Evaluate on all splits
+            results = {}
+            splits = {
+                # Training performance (on balanced data)
+                'train': (X_train_balanced, y_train_balanced),
+                'val': (X_val_scaled, val_data[1]),
+                # Test performance (most important)
+                'test': (X_test_scaled, test_data[1])
+            }
+            preds, probas = {}, {}
+            for split, (X_split, y_split) in splits.items():
+                with profile_stage(f'evaluate_{split}'):
+                    pred = model.predict(X_split)
+                    proba = model.predict_proba(X_split)[:, 1] if hasattr(model, 'predict_proba') else None
+                    results[split] = self._calculate_metrics(y_split, pred, proba)
+                    preds[split], probas[split] = pred, proba
+            
+            # Model-specific test-set statistics (e.g. CascadeDetector throughput)
+            if hasattr(model, 'evaluation_report'):
+                with profile_stage('evaluation_report'):
+                    results['model_report'] = model.evaluation_report(X_test_scaled)
+            
+            # Stored for threshold tuning and bootstrap intervals without
+            # refitting (ThresholdAnalyzer.tune, PatientBootstrap.from_results)
+            results['predictions'] = {
+                split: {'y_true': np.asarray(splits[split][1], dtype=np.int8),
+                        'y_pred': np.asarray(preds[split], dtype=np.int8),
+                        'proba': probas[split],
+                        'patient_sizes': self._patient_sizes(patient_data, patient_splits[split])}
+                for split in ['val', 'test']
+            }
+            
+            if patient_metadata is not None:
+                with profile_stage('event_metrics'):
+                    results['events'] = {
+                        split: self._event_metrics(patient_data, patient_metadata,
+                                                   patient_splits[split], probas[split])
+                        for split in ['val', 'test']
+                    }
         
         # Add metadata
         results['metadata'] = {
@@ -114,6 +248,9 @@ class PatientIndependentValidator:
             'val_patients': patient_splits['val'],
             'test_patients': patient_splits['test'],
             'smote_applied': apply_smote,
+            'subsampling': subsampler.report_ if subsampler is not None else None,
+            'fit_seconds': round(fit_seconds, 3),
+            'feature_stage': type(feature_stage).__name__ if feature_stage is not None else None,
             'class_distribution': {
                 'train_original': dict(zip(*np.unique(train_data[1], return_counts=True))),
                 'train_balanced': dict(zip(*np.unique(y_train_balanced, return_counts=True))),
@@ -121,22 +258,57 @@ class PatientIndependentValidator:
             }
         }
         
+        if profiler is not None:
+            results['metadata']['profile'] = profiler.summary()
+            if outer is not None:
+                outer.merge(profiler)
+        
         self.results_history.append(results)
+        if experiment is not None:
+            self._record(experiment, results, time.perf_counter() - start)
+        
+        if keep_fitted:
+            # Not kept in results_history to avoid holding fitted models in memory
+            results = dict(results, fitted={'model': model, 'scaler': scaler,
+                                            'feature_stage': feature_stage})
+            
         return results
     
     def cross_validate_patients(self,
                               model_class,
                               patient_data: Dict[str, Tuple[np.ndarray, np.ndarray]],
                               n_folds: int = 5,
-                              model_params: Dict = None) -> Dict[str, Any]:
+                              model_params: Dict = None,
+                              feature_stage=None,
+                              n_bootstrap: int = None) -> Dict[str, Any]:
         """
         Perform patient-independent cross-validation.
         
-        CRITICAL: Each fold has completely different patients.
+        CRITICAL: Each fold has completely different patients. A feature_stage
+        is refitted on each fold's training patients.
+        
+        The test patients of all folds are disjoint, so their pooled
+        predictions also give patient-level bootstrap intervals
+        ('{metric}_ci_bootstrap'); n_bootstrap defaults to
+        Config.N_BOOTSTRAP, 0 disables them.
+        
+        With a store, the aggregated results are stored and reused like
+        validate_model results (and so is each fold).
         """
         model_params = model_params or {}
         patient_ids = list(patient_data.keys())
         
+        experiment = None
+        if self.store is not None:
+            experiment = self._experiment(
+                'cv', model_class, model_params, patient_data, {'all': patient_ids}, feature_stage,
+                n_folds=n_folds, n_bootstrap=Config.N_BOOTSTRAP if n_bootstrap is None else n_bootstrap
+            )
+            stored = self._stored(experiment) if experiment is not None else None
+            if stored is not None:
+                return stored
+        start = time.perf_counter()
+        
         if len(patient_ids) < n_folds:
             logger.warning(f"Only {len(patient_ids)} patients available for {n_folds}-fold CV")
             n_folds = len(patient_ids)
@@ -176,7 +348,8 @@ class PatientIndependentValidator:
             
             # Validate this fold
             fold_result = self.validate_model(
-                model_class, patient_data, patient_splits, model_params
+                model_class, patient_data, patient_splits, model_params,
+                feature_stage=feature_stage
             )
             fold_results.append(fold_result)
             
@@ -190,9 +363,62 @@ class PatientIndependentValidator:
                 'warning': 'Insufficient data for cross-validation'
             }
         
-        aggregated = self._aggregate_cv_results(fold_results)
+        aggregated = self._aggregate_cv_results(fold_results, n_bootstrap)
+        if experiment is not None:
+            self._record(experiment, aggregated, time.perf_counter() - start)
         return aggregated
     
+    def _experiment(self, kind: str, model_class, model_params: Dict, patient_data: Dict,
+                    patient_splits: Dict[str, List[str]], feature_stage, patient_metadata: Dict = None,
+                    **settings) -> Optional[Dict[str, Any]]:
+        """
+        Store key and index fields of a validate_model / cross_validate_patients
+        run, or None when its inputs cannot be keyed (the run is not stored).
+        """
+        try:
+            from .experiments import config_hash, describe
+        except ImportError:
+            from experiments import config_hash, describe
+        
+        patient_ids = [p for ids in patient_splits.values() for p in ids]
+        settings = {name: describe(value) if hasattr(value, '__dict__') else value
+                    for name, value in settings.items()}
+        fields = {
+            'kind': kind,
+            'model': model_class.__name__,
+            'params': model_params,
+            'splits': {split: list(ids) for split, ids in patient_splits.items()},
+            'feature_stage': describe(feature_stage),
+            'data_hash': self.store.data_hash(patient_data, patient_ids)
+        }
+        events = self.store.metadata_hash(patient_metadata, patient_ids)
+        try:
+            key = self.store.experiment_key(random_state=self.random_state, settings=settings,
+                                            events=events, config=config_hash(), **fields)
+        except TypeError as e:
+            logger.info(f"{model_class.__name__} {kind} run is not stored: {e}")
+            return None
+        return dict(fields, key=key)
+    
+    def _stored(self, experiment: Dict[str, Any]):
+        """Stored results of the experiment, or None."""
+        experiment_id = self.store.lookup(experiment['key']) if self.reuse_stored else None
+        if experiment_id is None:
+            return None
+        logger.info(f"Loaded {experiment['model']} {experiment['kind']} results "
+                    f"from the experiment store (#{experiment_id})")
+        results = self.store.load(experiment_id)
+        if experiment['kind'] == 'validate':
+            self.results_history.append(results)
+        return results
+    
+    def _record(self, experiment: Dict[str, Any], results: Dict[str, Any], seconds: float):
+        try:
+            self.store.record(results=results, seconds=round(seconds, 3), **experiment)
+        except Exception as e:
+            # The store is a cache; a failed write must not lose the results
+            logger.warning(f"Could not record {experiment['model']} results: {type(e).__name__}: {e}")
+    
     def _combine_patient_data(self, patient_data: Dict, patient_ids: List[str]) -> Tuple[np.ndarray, np.ndarray]:
         """Combine data from multiple patients."""
         X_list = []
@@ -212,8 +438,27 @@ class PatientIndependentValidator:
         
         return X_combined, y_combined
     
+    @property
+    def bin_cache(self):
+        """Per-patient uint8 bins shared by all validate_model calls (see binning.py)."""
+        if self._bin_cache is None:
+            try:
+                from .binning import BinnedPatientCache
+            except ImportError:
+                from binning import BinnedPatientCache
+            self._bin_cache = BinnedPatientCache()
+        return self._bin_cache
+    
+    @staticmethod
+    def _patient_sizes(patient_data: Dict, patient_ids: List[str]) -> np.ndarray:
+        """Epochs per patient, in the order _combine_patient_data stacks them."""
+        return np.array([len(patient_data[p][1]) for p in patient_ids if p in patient_data],
+                        dtype=np.int64)
+    
     def _apply_smote_safely(self, X: np.ndarray, y: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
         """Apply SMOTE with proper error handling."""
+        from imblearn.over_sampling import SMOTE
+        
         try:
             # Check if we have both classes
             unique_classes = np.unique(y)
@@ -244,6 +489,10 @@ class PatientIndependentValidator:
     def _calculate_metrics(self, y_true: np.ndarray, y_pred: np.ndarray, 
                           y_proba: np.ndarray = None) -> Dict[str, float]:
         """Calculate comprehensive evaluation metrics."""
+        from sklearn.metrics import (
+            accuracy_score, precision_score, recall_score, f1_score, roc_auc_score
+        )
+        
         metrics = {
             'accuracy': accuracy_score(y_true, y_pred),
             'precision': precision_score(y_true, y_pred, zero_division=0),
@@ -263,13 +512,45 @@ class PatientIndependentValidator:
                 
         return metrics
     
+    def _event_metrics(self, patient_data: Dict, patient_metadata: Dict[str, Dict],
+                       patient_ids: List[str], proba: np.ndarray) -> Dict[str, float]:
+        """Event-level metrics of one split at the default alarm settings."""
+        if proba is None:
+            return None
+        times, seizures = [], []
+        for patient_id in patient_ids:
+            if patient_id not in patient_data:
+                continue
+            meta = patient_metadata.get(patient_id) or {}
+            if 'epoch_times' not in meta:
+                logger.warning(f"No epoch times for {patient_id}, skipping event-level metrics")
+                return None
+            times.append(meta['epoch_times'])
+            if 'seizure_intervals' in meta:
+                seizures.append(meta['seizure_intervals'])
+            else:
+                seizures.append(EventLevelEvaluator.seizure_intervals_from_labels(
+                    patient_data[patient_id][1], meta['epoch_times']))
+                
+        timeline, seizure_intervals = EventLevelEvaluator.concatenate_timelines(times, seizures)
+        if len(timeline) != len(proba):
+            logger.warning(f"{len(timeline)} epoch times for {len(proba)} epochs, "
+                           f"skipping event-level metrics")
+            return None
+        evaluator = EventLevelEvaluator()
+        return evaluator.operating_point(evaluator.evaluate(proba, timeline, seizure_intervals))
+    
     def _calculate_specificity(self, y_true: np.ndarray, y_pred: np.ndarray) -> float:
         """Calculate specificity (true negative rate)."""
+        from sklearn.metrics import confusion_matrix
+        
         tn, fp, fn, tp = confusion_matrix(y_true, y_pred).ravel()
         return tn / (tn + fp) if (tn + fp) > 0 else 0.0
     
-    def _aggregate_cv_results(self, fold_results: List[Dict]) -> Dict[str, Any]:
+    def _aggregate_cv_results(self, fold_results: List[Dict], n_bootstrap: int = None) -> Dict[str, Any]:
         """Aggregate cross-validation results with statistical analysis."""
+        from scipy import stats
+        
         # Extract test metrics from each fold
         test_metrics = [result['test'] for result in fold_results]
         
@@ -299,12 +580,495 @@ class PatientIndependentValidator:
                                             scale=stats.sem(values))
                         aggregated[f'{metric}_ci'] = ci
         
+        # Patient-level bootstrap over the pooled test predictions; the
+        # t-interval above only sees n_folds means
+        n_bootstrap = Config.N_BOOTSTRAP if n_bootstrap is None else n_bootstrap
+        if n_bootstrap > 0 and all('predictions' in fold for fold in fold_results):
+            bootstrap = PatientBootstrap(n_bootstrap, random_state=self.random_state)
+            intervals = bootstrap.from_results(fold_results)
+            for metric in PatientBootstrap.METRICS:
+                if metric in intervals:
+                    aggregated[f'{metric}_ci_bootstrap'] = (intervals[metric]['low'],
+                                                            intervals[metric]['high'])
+            aggregated['bootstrap'] = intervals
+        
         # Add fold details
         aggregated['fold_results'] = fold_results
         aggregated['n_folds'] = len(fold_results)
         
         return aggregated
 
+class EventLevelEvaluator:
+    """
+    Seizure-level evaluation of per-epoch probabilities on a timeline.
+    
+    Alarms are epochs whose probability reaches the threshold, raised at the
+    epoch's end time. Alarms closer than the refractory period (or one epoch
+    step, whichever is larger) merge into one event. An event starting
+    outside every seizure window [onset, offset + collar] is a false alarm;
+    a seizure is detected when any alarm falls in its window, with latency
+    measured from onset to the first such alarm.
+    
+    All thresholds and refractory periods are evaluated together: epochs
+    are matched to seizures once with a sorted sweep, and events and
+    detections are computed for the whole grid with array operations.
+    """
+    
+    # Separation between concatenated recordings; longer than any refractory period
+    TIMELINE_GAP = 24 * 3600.0
+    
+    def __init__(self, detection_collar: float = None, max_block: int = 2 ** 25):
+        self.detection_collar = Config.DETECTION_COLLAR if detection_collar is None else detection_collar
+        self.max_block = max_block
+        
+    @staticmethod
+    def seizure_intervals_from_labels(labels: np.ndarray, epoch_times: np.ndarray) -> np.ndarray:
+        """
+        Seizure intervals spanned by runs of consecutive positive epochs.
+        
+        Args:
+            labels: Per-epoch labels in time order
+            epoch_times: Array (n_epochs, 2) of epoch start/end times
+            
+        Returns:
+            Array (n_seizures, 2) of onset/offset times
+        """
+        labels = np.asarray(labels).astype(bool)
+        epoch_times = np.asarray(epoch_times, dtype=np.float64).reshape(-1, 2)
+        edges = np.diff(np.concatenate([[False], labels, [False]]).astype(np.int8))
+        first = np.flatnonzero(edges == 1)
+        last = np.flatnonzero(edges == -1) - 1
+        return np.column_stack([epoch_times[first, 0], epoch_times[last, 1]])
+        
+    @classmethod
+    def concatenate_timelines(cls, epoch_times: List[np.ndarray],
+                              seizures: List[np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Place recordings (or patients) one after another on a single timeline.
+        
+        Consecutive recordings are separated by TIMELINE_GAP so that alarms
+        never merge across them.
+        """
+        all_times, all_seizures = [], []
+        offset = 0.0
+        for times, recording_seizures in zip(epoch_times, seizures):
+            times = np.asarray(times, dtype=np.float64).reshape(-1, 2)
+            if len(times) == 0:
+                continue
+            shift = offset - times[:, 0].min()
+            all_times.append(times + shift)
+            all_seizures.append(np.asarray(recording_seizures, dtype=np.float64).reshape(-1, 2) + shift)
+            offset = times[:, 1].max() + shift + cls.TIMELINE_GAP
+        if not all_times:
+            return np.empty((0, 2)), np.empty((0, 2))
+        return np.concatenate(all_times), np.concatenate(all_seizures)
+        
+    @staticmethod
+    def _covered_hours(epoch_times: np.ndarray) -> float:
+        """Length of the union of the (sorted) epoch intervals, in hours."""
+        if len(epoch_times) == 0:
+            return 0.0
+        starts, ends = epoch_times[:, 0], epoch_times[:, 1]
+        reach = np.concatenate([[-np.inf], np.maximum.accumulate(ends)[:-1]])
+        return float(np.sum(np.maximum(0.0, ends - np.maximum(starts, reach)))) / 3600
+        
+    def evaluate(self, proba: np.ndarray, epoch_times: np.ndarray, seizures: np.ndarray,
+                 thresholds=0.5, refractory_periods=None) -> Dict[str, Any]:
+        """
+        Event-level metrics for every threshold / refractory period pair.
+        
+        Args:
+            proba: Per-epoch seizure probabilities
+            epoch_times: Array (n_epochs, 2) of epoch start/end times in seconds
+            seizures: Array (n_seizures, 2) of non-overlapping seizure onset/offset times
+            thresholds: Alarm threshold(s), shape (k,)
+            refractory_periods: Refractory period(s) in seconds, shape (m,)
+                (default Config.ALARM_REFRACTORY_PERIOD)
+                
+        Returns:
+            Dict with 'sensitivity', 'latency_mean', 'latency_median' (k,),
+            'detected' (k, n_seizures), and 'n_events', 'false_alarms',
+            'fa_per_hour' (k, m)
+        """
+        if refractory_periods is None:
+            refractory_periods = Config.ALARM_REFRACTORY_PERIOD
+        thresholds = np.atleast_1d(np.asarray(thresholds, dtype=np.float64))
+        refractory = np.atleast_1d(np.asarray(refractory_periods, dtype=np.float64))
+        epoch_times = np.asarray(epoch_times, dtype=np.float64).reshape(-1, 2)
+        seizures = np.asarray(seizures, dtype=np.float64).reshape(-1, 2)
+        seizures = seizures[np.argsort(seizures[:, 0], kind='stable')]
+        
+        order = np.argsort(epoch_times[:, 1], kind='stable')
+        epoch_times = epoch_times[order]
+        alarm_time = epoch_times[:, 1]
+        proba = np.asarray(proba, dtype=np.float64)[order]
+        n_epochs, n_seizures = len(alarm_time), len(seizures)
+        
+        # Seizure window containing each alarm time (-1 for none): one sorted sweep
+        idx = np.searchsorted(seizures[:, 0], alarm_time, side='right') - 1
+        window_end = seizures[np.maximum(idx, 0), 1] + self.detection_collar if n_seizures else alarm_time
+        seizure_id = np.where((idx >= 0) & (alarm_time <= window_end), idx, -1)
+        outside = seizure_id < 0
+        
+        alarms = proba[None, :] >= thresholds[:, None]                          # (k, n)
+        
+        # Seconds since the previous alarm, per threshold
+        previous = np.maximum.accumulate(np.where(alarms, alarm_time, -np.inf), axis=1)
+        gap = alarm_time - np.concatenate([np.full((len(thresholds), 1), -np.inf), previous[:, :-1]], axis=1)
+        
+        # Consecutive alarm epochs always merge, whatever the refractory period
+        step = np.median(np.diff(alarm_time)) if n_epochs > 1 else 0.0
+        merge_within = np.maximum(refractory, step)
+        
+        n_events = np.zeros((len(thresholds), len(refractory)), dtype=np.int64)
+        false_alarms = np.zeros_like(n_events)
+        block = max(1, self.max_block // max(1, n_epochs * len(refractory)))
+        for start in range(0, len(thresholds), block):
+            rows = slice(start, start + block)
+            event_start = alarms[rows, None, :] & (gap[rows, None, :] > merge_within[None, :, None])
+            n_events[rows] = event_start.sum(axis=2)
+            false_alarms[rows] = (event_start & outside).sum(axis=2)
+        
+        # First alarm inside each seizure window; windows are contiguous runs
+        # of the sorted epochs, so one reduceat covers all of them
+        first_alarm = np.full((len(thresholds), n_seizures), np.inf)
+        inside = np.flatnonzero(~outside)
+        if inside.size:
+            inside_id = seizure_id[inside]
+            bounds = np.flatnonzero(np.concatenate([[True], inside_id[1:] != inside_id[:-1]]))
+            alarm_inside = np.where(alarms[:, inside], alarm_time[inside], np.inf)
+            first_alarm[:, inside_id[bounds]] = np.minimum.reduceat(alarm_inside, bounds, axis=1)
+        detected = np.isfinite(first_alarm)
+        latency = np.where(detected, first_alarm - seizures[:, 0], np.nan)
+        
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', RuntimeWarning)  # all-NaN rows: nothing detected
+            latency_mean = np.nanmean(latency, axis=1) if n_seizures else np.full(len(thresholds), np.nan)
+            latency_median = np.nanmedian(latency, axis=1) if n_seizures else np.full(len(thresholds), np.nan)
+        
+        seizure_hours = float(np.sum(seizures[:, 1] - seizures[:, 0])) / 3600
+        interictal_hours = max(self._covered_hours(epoch_times) - seizure_hours, 0.0)
+        fa_per_hour = (false_alarms / interictal_hours if interictal_hours > 0
+                       else np.full(false_alarms.shape, np.nan))
+        
+        return {
+            'thresholds': thresholds,
+            'refractory_periods': refractory,
+            'n_seizures': n_seizures,
+            'interictal_hours': interictal_hours,
+            'detected': detected,
+            'sensitivity': detected.mean(axis=1) if n_seizures else np.full(len(thresholds), np.nan),
+            'latency_mean': latency_mean,
+            'latency_median': latency_median,
+            'n_events': n_events,
+            'false_alarms': false_alarms,
+            'fa_per_hour': fa_per_hour
+        }
+        
+    @staticmethod
+    def operating_point(event_results: Dict[str, Any], threshold_index: int = 0,
+                        refractory_index: int = 0) -> Dict[str, float]:
+        """Scalar metrics for one threshold / refractory period pair."""
+        i, j = threshold_index, refractory_index
+        return {
+            'threshold': float(event_results['thresholds'][i]),
+            'refractory_period': float(event_results['refractory_periods'][j]),
+            'n_seizures': int(event_results['n_seizures']),
+            'seizures_detected': int(event_results['detected'][i].sum()),
+            'sensitivity': float(event_results['sensitivity'][i]),
+            'false_alarms': int(event_results['false_alarms'][i, j]),
+            'fa_per_hour': float(event_results['fa_per_hour'][i, j]),
+            'latency_mean': float(event_results['latency_mean'][i]),
+            'latency_median': float(event_results['latency_median'][i]),
+            'interictal_hours': float(event_results['interictal_hours'])
+        }
+
+class ThresholdAnalyzer:
+    """
+    Operating-point selection from stored probabilities, without refitting.
+    
+    The confusion counts at every distinct threshold come from one
+    descending sort and cumulative sums (O(n log n)), so curves over
+    millions of epochs are cheap. Thresholds are chosen on validation
+    patients and then applied to the test patients.
+    """
+    
+    OBJECTIVES = ['f1', 'precision', 'recall', 'specificity', 'balanced_accuracy']
+    
+    @staticmethod
+    def _rates(tp, fp, fn, tn) -> Dict[str, np.ndarray]:
+        with np.errstate(divide='ignore', invalid='ignore'):
+            tp, fp, fn, tn = (np.asarray(c, dtype=np.float64) for c in (tp, fp, fn, tn))
+            precision = np.where(tp + fp > 0, tp / (tp + fp), 0.0)
+            recall = tp / (tp + fn)
+            specificity = tn / (tn + fp)
+            return {
+                'precision': precision,
+                'recall': recall,
+                'specificity': specificity,
+                'f1': np.where(tp > 0, 2 * tp / (2 * tp + fp + fn), 0.0),
+                'balanced_accuracy': (recall + specificity) / 2,
+                'accuracy': (tp + tn) / (tp + fp + fn + tn)
+            }
+    
+    @staticmethod
+    def curve(y_true: np.ndarray, proba: np.ndarray) -> Dict[str, np.ndarray]:
+        """
+        Metrics for every distinct threshold (predict positive if proba >= threshold).
+        
+        Returns:
+            Dict of arrays ordered by decreasing threshold; the first entry
+            (threshold=inf) predicts no seizures. Includes 'auc' (ROC AUC).
+        """
+        y_true = np.asarray(y_true).astype(bool).ravel()
+        proba = np.asarray(proba, dtype=np.float64).ravel()
+        n = len(proba)
+        
+        order = np.argsort(proba, kind='stable')[::-1]
+        sorted_proba = proba[order]
+        # Last position of each run of equal probabilities
+        ends = np.concatenate([np.flatnonzero(np.diff(sorted_proba)), [n - 1]]) if n else np.empty(0, dtype=np.int64)
+        tp = np.concatenate([[0], np.cumsum(y_true[order], dtype=np.int64)[ends]])
+        fp = np.concatenate([[0], ends + 1]) - tp
+        n_pos = int(tp[-1])
+        fn, tn = n_pos - tp, (n - n_pos) - fp
+        
+        curve = {'thresholds': np.concatenate([[np.inf], sorted_proba[ends]]),
+                 'tp': tp, 'fp': fp, 'fn': fn, 'tn': tn}
+        curve.update(ThresholdAnalyzer._rates(tp, fp, fn, tn))
+        if 0 < n_pos < n:
+            fpr, tpr = fp / (n - n_pos), tp / n_pos
+            curve['auc'] = float(np.sum(np.diff(fpr) * (tpr[1:] + tpr[:-1]) / 2))
+        else:
+            curve['auc'] = np.nan
+        return curve
+    
+    @staticmethod
+    def select(curve: Dict[str, np.ndarray], objective: str = 'f1', min_recall: float = None,
+               min_precision: float = None, min_specificity: float = None) -> Dict[str, float]:
+        """
+        Best threshold on a curve under optional constraints.
+        
+        Args:
+            curve: Output of curve()
+            objective: Metric to maximize (one of OBJECTIVES)
+            min_recall/min_precision/min_specificity: Constraints the
+                operating point must satisfy
+                
+        Returns:
+            Metrics at the chosen threshold (ties go to the highest threshold)
+        """
+        if objective not in ThresholdAnalyzer.OBJECTIVES:
+            raise ValueError(f"Unknown objective '{objective}'. Available: {ThresholdAnalyzer.OBJECTIVES}")
+        
+        feasible = np.ones(len(curve['thresholds']), dtype=bool)
+        for metric, minimum in [('recall', min_recall), ('precision', min_precision),
+                                ('specificity', min_specificity)]:
+            if minimum is not None:
+                feasible &= np.nan_to_num(curve[metric], nan=-np.inf) >= minimum
+        if not feasible.any():
+            raise ValueError(f"No threshold satisfies min_recall={min_recall}, "
+                             f"min_precision={min_precision}, min_specificity={min_specificity}")
+            
+        score = np.where(feasible, np.nan_to_num(curve[objective], nan=-np.inf), -np.inf)
+        best = int(np.argmax(score))
+        chosen = {key: (values[best].item() if isinstance(values, np.ndarray) else values)
+                  for key, values in curve.items() if key != 'auc'}
+        chosen['threshold'] = chosen.pop('thresholds')
+        return chosen
+    
+    @staticmethod
+    def apply(y_true: np.ndarray, proba: np.ndarray, threshold: float) -> Dict[str, float]:
+        """Metrics of a fixed threshold on new probabilities (e.g. the test patients)."""
+        y_true = np.asarray(y_true).astype(bool).ravel()
+        pred = np.asarray(proba).ravel() >= threshold
+        tp = int(np.count_nonzero(pred & y_true))
+        fp = int(np.count_nonzero(pred)) - tp
+        fn = int(np.count_nonzero(y_true)) - tp
+        tn = len(y_true) - tp - fp - fn
+        metrics = {key: value.item() for key, value in ThresholdAnalyzer._rates(tp, fp, fn, tn).items()}
+        metrics.update(threshold=float(threshold), tp=tp, fp=fp, fn=fn, tn=tn)
+        return metrics
+    
+    @staticmethod
+    def tune(results: Dict[str, Any], objective: str = 'f1', min_recall: float = None,
+             min_precision: float = None, min_specificity: float = None) -> Dict[str, Any]:
+        """
+        Choose a threshold on the validation patients of a validate_model()
+        result and evaluate it on the test patients.
+        
+        Apply the returned threshold to a fitted model with
+        model.set_threshold(tuning['threshold']).
+        """
+        predictions = results.get('predictions')
+        if not predictions or predictions['val']['proba'] is None:
+            raise ValueError("Results hold no stored probabilities (model without predict_proba?)")
+        val, test = predictions['val'], predictions['test']
+        chosen = ThresholdAnalyzer.select(
+            ThresholdAnalyzer.curve(val['y_true'], val['proba']), objective,
+            min_recall=min_recall, min_precision=min_precision, min_specificity=min_specificity
+        )
+        return {
+            'threshold': chosen['threshold'],
+            'objective': objective,
+            'constraints': {'min_recall': min_recall, 'min_precision': min_precision,
+                            'min_specificity': min_specificity},
+            'val': chosen,
+            'test': ThresholdAnalyzer.apply(test['y_true'], test['proba'], chosen['threshold'])
+        }
+
+class PatientBootstrap:
+    """
+    Patient-level (cluster) bootstrap confidence intervals.
+    
+    Epochs of one patient are strongly correlated, so patients rather than
+    epochs are resampled. Each patient is reduced once to its confusion
+    counts and to histograms of its seizure/non-seizure probabilities over
+    shared bins. A replicate is then a row of patient multiplicities, and
+    all replicates follow from two matrix products (multiplicities @
+    per-patient counts), with no per-replicate pass over the epochs.
+    
+    AUC is exact when the probabilities take at most n_bins distinct values;
+    otherwise they are binned at quantiles and scores within a bin count as
+    ties.
+    """
+    
+    METRICS = ['accuracy', 'precision', 'recall', 'f1', 'specificity', 'auc']
+    
+    def __init__(self, n_bootstrap: int = None, confidence: float = 0.95, n_bins: int = 1024,
+                 random_state: int = None, max_block: int = 2 ** 24):
+        self.n_bootstrap = n_bootstrap or Config.N_BOOTSTRAP
+        self.confidence = confidence
+        self.n_bins = n_bins
+        self.random_state = random_state or Config.RANDOM_STATE
+        self.max_block = max_block  # bound on replicate x bin elements held at once
+    
+    def _bin_indices(self, proba: np.ndarray) -> Tuple[np.ndarray, int]:
+        """Bin of every probability; bins are ordered by increasing score."""
+        values = np.unique(proba)
+        if len(values) > self.n_bins:
+            values = np.unique(np.quantile(proba, np.linspace(0, 1, self.n_bins + 1)))
+        # cuts[k] is the lowest score of bin k + 1
+        cuts = values[1:]
+        return np.searchsorted(cuts, proba, side='right'), len(cuts) + 1
+    
+    def patient_statistics(self, y_true: np.ndarray, y_pred: np.ndarray, proba: np.ndarray,
+                           patient_sizes: np.ndarray) -> Dict[str, np.ndarray]:
+        """
+        Per-patient sufficient statistics.
+        
+        Args:
+            y_true, y_pred: Labels and predictions of the stacked patients
+            proba: Seizure probabilities (or None to skip AUC)
+            patient_sizes: Epochs per patient, in stacking order
+            
+        Returns:
+            'counts' (n_patients, 4) with columns tp, fp, fn, tn, and with
+            proba 'pos_hist'/'neg_hist' (n_patients, n_bins)
+        """
+        y_true = np.asarray(y_true).astype(bool).ravel()
+        y_pred = np.asarray(y_pred).astype(bool).ravel()
+        sizes = np.asarray(patient_sizes, dtype=np.int64)
+        if sizes.sum() != len(y_true):
+            raise ValueError(f"Patient sizes sum to {sizes.sum()}, but there are {len(y_true)} epochs")
+        n_patients = len(sizes)
+        groups = np.repeat(np.arange(n_patients), sizes)
+        
+        # code 0..3 = tp, fp, fn, tn
+        code = np.where(y_pred, np.where(y_true, 0, 1), np.where(y_true, 2, 3))
+        stats = {'counts': np.bincount(groups * 4 + code, minlength=n_patients * 4)
+                 .reshape(n_patients, 4).astype(np.float64)}
+        
+        if proba is not None:
+            bins, n_bins = self._bin_indices(np.asarray(proba, dtype=np.float64).ravel())
+            flat = groups * n_bins + bins
+            size = n_patients * n_bins
+            stats['pos_hist'] = np.bincount(flat[y_true], minlength=size).reshape(n_patients, n_bins)
+            stats['neg_hist'] = np.bincount(flat[~y_true], minlength=size).reshape(n_patients, n_bins)
+        return stats
+    
+    def resample_weights(self, n_patients: int) -> np.ndarray:
+        """(n_bootstrap, n_patients) multiplicities of patients drawn with replacement."""
+        rng = np.random.RandomState(self.random_state)
+        draws = rng.randint(0, n_patients, size=(self.n_bootstrap, n_patients))
+        offsets = np.arange(self.n_bootstrap)[:, None] * n_patients
+        return np.bincount((draws + offsets).ravel(), minlength=self.n_bootstrap * n_patients) \
+            .reshape(self.n_bootstrap, n_patients).astype(np.float64)
+    
+    def metric_replicates(self, stats: Dict[str, np.ndarray], weights: np.ndarray) -> Dict[str, np.ndarray]:
+        """Metrics for every row of patient weights (NaN where undefined)."""
+        tp, fp, fn, tn = (weights @ stats['counts']).T
+        rates = ThresholdAnalyzer._rates(tp, fp, fn, tn)
+        replicates = {metric: rates[metric] for metric in self.METRICS if metric in rates}
+        
+        if 'pos_hist' in stats:
+            pos_hist, neg_hist = stats['pos_hist'], stats['neg_hist']
+            block = max(1, self.max_block // pos_hist.shape[1])
+            auc = np.empty(len(weights))
+            for start in range(0, len(weights), block):
+                w = weights[start:start + block]
+                pos, neg = w @ pos_hist, w @ neg_hist
+                # P(score_pos > score_neg) + P(tie) / 2 over bins ordered by score
+                neg_below = np.cumsum(neg, axis=1) - neg
+                pairs = pos.sum(axis=1) * neg.sum(axis=1)
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    auc[start:start + block] = np.where(
+                        pairs > 0, np.sum(pos * (neg_below + 0.5 * neg), axis=1) / pairs, np.nan)
+            replicates['auc'] = auc
+        return replicates
+    
+    def confidence_intervals(self, y_true: np.ndarray, y_pred: np.ndarray, proba: np.ndarray,
+                             patient_sizes: np.ndarray) -> Dict[str, Any]:
+        """
+        Percentile bootstrap intervals of every metric.
+        
+        Returns:
+            Dict metric -> {'estimate', 'low', 'high', 'std', 'n_valid'}
+            (n_valid: replicates where the metric is defined, e.g. with at
+            least one seizure patient for recall), plus 'n_bootstrap' and
+            'n_patients'
+        """
+        stats = self.patient_statistics(y_true, y_pred, proba, patient_sizes)
+        n_patients = len(stats['counts'])
+        estimate = self.metric_replicates(stats, np.ones((1, n_patients)))
+        replicates = self.metric_replicates(stats, self.resample_weights(n_patients))
+        
+        tail = (1 - self.confidence) / 2 * 100
+        intervals = {'n_bootstrap': self.n_bootstrap, 'n_patients': n_patients,
+                     'confidence': self.confidence}
+        for metric, values in replicates.items():
+            valid = values[np.isfinite(values)]
+            low, high = np.percentile(valid, [tail, 100 - tail]) if len(valid) else (np.nan, np.nan)
+            intervals[metric] = {
+                'estimate': float(estimate[metric][0]),
+                'low': float(low),
+                'high': float(high),
+                'std': float(valid.std()) if len(valid) else np.nan,
+                'n_valid': int(len(valid))
+            }
+        return intervals
+    
+    def from_results(self, results, split: str = 'test') -> Dict[str, Any]:
+        """
+        Intervals from the stored predictions of validate_model() results.
+        
+        Args:
+            results: One result, or a list of results with disjoint
+                patients (e.g. cross-validation folds), which are pooled
+            split: 'val' or 'test'
+        """
+        results = results if isinstance(results, list) else [results]
+        predictions = [r.get('predictions', {}).get(split) for r in results]
+        if any(p is None for p in predictions):
+            raise ValueError(f"Results hold no stored '{split}' predictions")
+        with_proba = all(p['proba'] is not None for p in predictions)
+        return self.confidence_intervals(
+            np.concatenate([p['y_true'] for p in predictions]),
+            np.concatenate([p['y_pred'] for p in predictions]),
+            np.concatenate([p['proba'] for p in predictions]) if with_proba else None,
+            np.concatenate([p['patient_sizes'] for p in predictions])
+        )
+
 class RealisticPerformanceAnalyzer:
     """
     Analyzes whether reported performance is realistic for medical ML.
@@ -0,0 +1,56 @@
+"""
+Shared fixtures: synthetic patients in the validator's patient_data format.
+"""
+import numpy as np
+import pytest
+
+SPLITS = {'train': ['p0', 'p1', 'p2'], 'val': ['p3'], 'test': ['p4']}
+
+
+def synthetic_patients(n_patients: int = 5, n_epochs: int = 80, n_features: int = 12,
+                       seizure_rate: float = 0.2, n_ictal: int = 3, shift: float = 1.5,
+                       gain: float = 1.0, n_informative: int = None, patient_scale: bool = False,
+                       patient_offset: bool = False, discrete_feature: bool = False,
+                       id_format: str = 'p{i}', seed: int = 0):
+    """
+    {patient_id: (X, y)} with standard normal features.
+
+    Args:
+        seizure_rate: Probability of an epoch being ictal; the first
+            n_ictal epochs of every patient always are
+        shift: Added to the first n_informative features (all by default)
+            of ictal epochs
+        gain: Factor on the amplitude of ictal epochs
+        patient_scale: Scale patient i's features by i + 1
+        patient_offset: Add i to patient i's features
+        discrete_feature: Replace feature 0 by integers 0-2
+    """
+    rng = np.random.RandomState(seed)
+    data = {}
+    for i in range(n_patients):
+        y = (rng.rand(n_epochs) < seizure_rate).astype(int)
+        y[:n_ictal] = 1
+        X = rng.randn(n_epochs, n_features)
+        if patient_scale:
+            X *= i + 1
+        if patient_offset:
+            X += i
+        X[:, :n_informative] += shift * y[:, None]
+        if gain != 1.0:
+            X *= np.where(y, gain, 1.0)[:, None]
+        if discrete_feature:
+            X[:, 0] = rng.randint(0, 3, n_epochs)
+        data[id_format.format(i=i)] = (X, y)
+    return data
+
+
+@pytest.fixture
+def make_patients():
+    """Factory fixture: make_patients(**options) -> synthetic_patients(**options)."""
+    return synthetic_patients
+
+
+@pytest.fixture
+def splits():
+    """Three training, one validation and one test patient of make_patients()."""
+    return {name: list(ids) for name, ids in SPLITS.items()}
@@ -0,0 +1,69 @@
+"""
+Tests for vectorized artifact screening of epochs.
+"""
+import numpy as np
+import sys
+import os
+
+# Add src to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from artifacts import ArtifactRejector, epoch_statistics, merge_summaries
+
+
+def _epochs(n_epochs=40, n_channels=4, n_times=256, seed=0):
+    """Clean ~20 uV epochs with one artifact type injected per marked epoch."""
+    rng = np.random.RandomState(seed)
+    epochs = 20e-6 * rng.randn(n_epochs, n_channels, n_times)
+    epochs[3, 1] = 0.0                                   # disconnected channel
+    epochs[7, 2, 100:110] += 5e-3                        # electrode pop
+    epochs[11, 0] = np.clip(epochs[11, 0] * 20, -1e-4, 1e-4)  # clipped channel
+    epochs[15, 3] *= 30                                  # high-variance outlier
+    return epochs
+
+
+def test_statistics_match_per_channel_loop():
+    epochs = _epochs()
+    stats = epoch_statistics(epochs, flat_tolerance=1e-8)
+
+    for i in [0, 3, 11]:
+        for c in range(epochs.shape[1]):
+            x = epochs[i, c]
+            assert np.isclose(stats['ptp'][i, c], np.ptp(x))
+            assert np.isclose(stats['flat_fraction'][i, c], np.mean(np.abs(np.diff(x)) <= 1e-8))
+
+
+def test_screen_flags_each_artifact_type():
+    flags = ArtifactRejector().screen(_epochs())
+
+    assert np.flatnonzero(flags['bad_epochs']).tolist() == [3, 7, 11, 15]
+    assert flags['flat'][3, 1] and flags['flat'][11, 0]
+    assert flags['amplitude'][7, 2]
+    assert flags['variance'][15, 3]
+
+
+def test_drop_mask_and_protect():
+    epochs = _epochs()
+    protect = np.zeros(len(epochs), dtype=bool)
+    protect[7] = True
+
+    kept, keep, summary = ArtifactRejector(mode='drop').apply(epochs, protect)
+    assert len(kept) == len(epochs) - 3 and keep[7]
+    assert summary['n_rejected'] == 3 and summary['n_protected'] == 1
+    assert summary['reasons']['flat'] == 2
+
+    masked, keep, summary = ArtifactRejector(mode='mask').apply(epochs)
+    assert keep.all() and summary['n_masked_channels'] >= 4
+    assert np.all(masked[15, 3] == 0) and np.array_equal(masked[0], epochs[0])
+
+    total = merge_summaries([summary, None, summary])
+    assert total['n_screened'] == 2 * len(epochs)
+
+
+def test_fitted_reference_screens_single_epochs():
+    """A fitted rejector applies the variance criterion to one epoch at a time."""
+    epochs = _epochs()
+    rejector = ArtifactRejector().fit(epochs[20:])
+
+    assert rejector.screen(epochs[15:16])['bad_epochs'][0]
+    assert not rejector.screen(epochs[16:17])['bad_epochs'][0]
@@ -0,0 +1,95 @@
+"""
+Tests for uint8 feature binning and the histogram gradient-boosting model.
+"""
+import numpy as np
+import pytest
+import sys
+import os
+import functools
+
+# Add src to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from binning import BinnedPatientCache, apply_bins, fit_bin_edges, scaler_from_moments
+from models import ImprovedHistGradientBoosting, ModelFactory
+from validation import PatientIndependentValidator
+
+
+@pytest.fixture
+def patients(make_patients):
+    return functools.partial(make_patients, seizure_rate=0.25, shift=2.0, patient_scale=True,
+                             discrete_feature=True)
+
+
+def test_bins_match_digitize_and_pad_discrete_features(patients):
+    X = np.concatenate([X for X, _ in patients().values()])
+    edges = fit_bin_edges(X, max_bins=16)
+
+    assert edges.shape == (X.shape[1], 15)
+    assert all(np.all(np.diff(row[np.isfinite(row)]) > 0) for row in edges)
+    assert np.array_equal(edges[0][np.isfinite(edges[0])], [1, 2])  # values 0, 1, 2
+    binned = apply_bins(X, edges)
+    assert binned.dtype == np.uint8
+    for j in range(X.shape[1]):
+        assert np.array_equal(binned[:, j], np.digitize(X[:, j], edges[j][np.isfinite(edges[j])]))
+
+
+def test_scaler_from_moments_matches_stacked_fit(patients):
+    from sklearn.preprocessing import StandardScaler
+
+    patient_data = patients()
+    cache = BinnedPatientCache()
+    moments = [cache._entry(p, X)['moments'] for p, (X, _) in patient_data.items()]
+    scaler = scaler_from_moments(moments)
+    expected = StandardScaler().fit(np.concatenate([X for X, _ in patient_data.values()]))
+    assert np.allclose(scaler.mean_, expected.mean_)
+    assert np.allclose(scaler.scale_, expected.scale_)
+
+
+def test_cache_reuses_binned_patients_and_scaled_edges_agree(patients):
+    patient_data = patients()
+    splits = {'train': ['p0', 'p1', 'p2'], 'val': ['p3'], 'test': ['p4']}
+    cache = BinnedPatientCache()
+
+    train, val, test, scaler, edges = cache.prepare(patient_data, splits)
+    versions = cache._entries['p4']['binned']
+    cached = next(iter(versions.values()))
+    again = cache.prepare(patient_data, splits)
+    assert len(versions) == 1 and next(iter(versions.values())) is cached
+    assert np.array_equal(again[2][0], test[0])
+
+    # Binning scaled floats with the scaled edges reproduces the cached bins
+    assert np.array_equal(apply_bins(scaler.transform(patient_data['p4'][0]), edges), test[0])
+
+
+def test_validate_model_trains_on_bins_with_early_stopping(patients):
+    patient_data = patients(n_epochs=150)
+    splits = {'train': ['p0', 'p1', 'p2'], 'val': ['p3'], 'test': ['p4']}
+
+    assert ModelFactory.get_available_models()['gradient_boosting'] is ImprovedHistGradientBoosting
+    validator = PatientIndependentValidator()
+    results = validator.validate_model(ImprovedHistGradientBoosting, patient_data, splits,
+                                       model_params={'max_iter': 300}, keep_fitted=True)
+    model, scaler = results['fitted']['model'], results['fitted']['scaler']
+
+    assert results['metadata']['smote_applied'] is False
+    assert model.n_iter_ < 300
+    # Scaled float inputs give the same probabilities as the cached bins
+    proba = model.predict_proba(scaler.transform(patient_data['p4'][0]))[:, 1]
+    assert np.allclose(proba, results['predictions']['test']['proba'])
+
+
+def test_early_stopping_without_x_val_support(patients):
+    """scikit-learn < 1.7 fit() takes no X_val: fall back to validation_fraction."""
+    from sklearn.ensemble import HistGradientBoostingClassifier
+
+    class OldHistGradientBoosting(HistGradientBoostingClassifier):
+        def fit(self, X, y, sample_weight=None):
+            return super().fit(X, y, sample_weight=sample_weight)
+
+    X, y = patients(1, n_epochs=300)['p0']
+    model = ImprovedHistGradientBoosting(max_iter=300)
+    model.model.estimator = OldHistGradientBoosting(**model.model.estimator.get_params())
+    model.fit(X, y, validation_data=(X[:50], y[:50]))
+    assert model.model.estimator.early_stopping is True
+    assert model.n_iter_ < 300
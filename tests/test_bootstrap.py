@@ -0,0 +1,73 @@
+"""
+Tests for patient-level bootstrap confidence intervals.
+"""
+import numpy as np
+import sys
+import os
+
+# Add src to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from models import ImprovedLogisticRegression
+from validation import PatientBootstrap, PatientIndependentValidator
+
+
+def _stacked_patients(n_patients=8, seed=0, decimals=2):
+    rng = np.random.RandomState(seed)
+    sizes = rng.randint(20, 60, size=n_patients)
+    y_true = (rng.rand(sizes.sum()) < 0.2).astype(int)
+    proba = np.round(np.clip(rng.rand(len(y_true)) * 0.7 + 0.3 * y_true, 0, 1), decimals)
+    return y_true, (proba >= 0.5).astype(int), proba, sizes
+
+
+def test_replicates_match_sklearn_on_resampled_patients():
+    from sklearn.metrics import f1_score, precision_score, recall_score, roc_auc_score
+
+    y_true, y_pred, proba, sizes = _stacked_patients()
+    bootstrap = PatientBootstrap(n_bootstrap=20, random_state=3)
+    stats = bootstrap.patient_statistics(y_true, y_pred, proba, sizes)
+    weights = bootstrap.resample_weights(len(sizes))
+    replicates = bootstrap.metric_replicates(stats, weights)
+
+    assert np.all(weights.sum(axis=1) == len(sizes))
+    bounds = np.concatenate([[0], np.cumsum(sizes)])
+    for b, row in enumerate(weights.astype(int)):
+        idx = np.concatenate([np.tile(np.arange(bounds[p], bounds[p + 1]), row[p])
+                              for p in range(len(sizes))])
+        t, pr, pb = y_true[idx], y_pred[idx], proba[idx]
+        if t.min() == t.max():
+            continue
+        assert np.isclose(replicates['precision'][b], precision_score(t, pr, zero_division=0))
+        assert np.isclose(replicates['recall'][b], recall_score(t, pr))
+        assert np.isclose(replicates['f1'][b], f1_score(t, pr))
+        assert np.isclose(replicates['auc'][b], roc_auc_score(t, pb))
+
+
+def test_estimates_and_interval_bounds():
+    from sklearn.metrics import accuracy_score, roc_auc_score
+
+    y_true, y_pred, proba, sizes = _stacked_patients(decimals=6)
+    intervals = PatientBootstrap(n_bootstrap=500, n_bins=64).confidence_intervals(
+        y_true, y_pred, proba, sizes)
+
+    assert intervals['n_patients'] == len(sizes)
+    assert np.isclose(intervals['accuracy']['estimate'], accuracy_score(y_true, y_pred))
+    # More distinct scores than bins: binned AUC is close to the exact one
+    assert abs(intervals['auc']['estimate'] - roc_auc_score(y_true, proba)) < 0.01
+    for metric in PatientBootstrap.METRICS:
+        assert intervals[metric]['low'] <= intervals[metric]['high']
+
+
+def test_intervals_from_cross_validation_folds():
+    rng = np.random.RandomState(1)
+    patient_data = {}
+    for i in range(6):
+        y = (rng.rand(60) < 0.25).astype(int)
+        y[:2] = 1
+        patient_data[f'p{i}'] = (rng.randn(60, 5) + y[:, None], y)
+
+    cv = PatientIndependentValidator().cross_validate_patients(
+        ImprovedLogisticRegression, patient_data, n_folds=3, n_bootstrap=200)
+    assert cv['bootstrap']['n_patients'] == 6
+    low, high = cv['f1_ci_bootstrap']
+    assert low <= cv['bootstrap']['f1']['estimate'] <= high
@@ -0,0 +1,47 @@
+"""
+Tests for the two-stage cascade detector.
+"""
+import numpy as np
+import pytest
+import sys
+import os
+import functools
+
+# Add src to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from models import CascadeDetector, CascadeEstimator
+from validation import PatientIndependentValidator
+
+
+@pytest.fixture
+def patients(make_patients):
+    """Seizure epochs shift the first 10 features."""
+    return functools.partial(make_patients, n_epochs=200, n_features=400, seizure_rate=0.1, shift=2.0,
+                             n_informative=10)
+
+
+def test_screen_columns_pick_informative_features(patients):
+    X, y = patients(1)['p0']
+    columns = CascadeEstimator.screen_columns(X, y, 10)
+    assert columns.tolist() == list(range(10))
+
+
+def test_screen_keeps_validation_recall_and_escalates_few(patients):
+    data = patients()
+    splits = {'train': ['p0', 'p1', 'p2'], 'val': ['p3'], 'test': ['p4']}
+    results = PatientIndependentValidator().validate_model(
+        CascadeDetector, data, splits, {'expert': 'knn', 'screen_features': 32, 'target_recall': 0.95},
+        apply_smote=False, keep_fitted=True)
+
+    model = results['fitted']['model']
+    X_val, y_val = data['p3']
+    X_val = results['fitted']['scaler'].transform(X_val)
+    passed = model.model.screen_proba(X_val[y_val == 1]) >= model.model.threshold_
+    assert passed.mean() >= 0.95
+    assert model.model.threshold_ <= 0.5
+
+    report = results['model_report']
+    assert 0 < report['escalated_fraction'] < 0.5
+    assert report['screen_features'] == 32 and report['throughput_gain'] > 0
+    assert results['test']['recall'] > 0.5
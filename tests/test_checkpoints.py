@@ -0,0 +1,94 @@
+"""
+Tests for the staged pipeline and its checkpoints.
+"""
+import numpy as np
+import pytest
+import sys
+import os
+
+# Add src to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from config import Config
+from pipeline import StagedPipeline, CheckpointStore
+
+
+@pytest.fixture
+def staged(tmp_path, monkeypatch):
+    """StagedPipeline over fake patient folders with a counting processor."""
+    data_root = tmp_path / 'data'
+    for i in range(4):
+        patient_dir = data_root / f'chb{i:02d}'
+        patient_dir.mkdir(parents=True)
+        (patient_dir / f'chb{i:02d}-summary.txt').write_text('')
+        (patient_dir / f'chb{i:02d}_01.edf').write_bytes(b'0')
+
+    pipeline = StagedPipeline(data_root=str(data_root),
+                              store=CheckpointStore(tmp_path / 'checkpoints'))
+    calls = []
+
+    def fake_process(patient_id):
+        calls.append(patient_id)
+        rng = np.random.RandomState(len(patient_id) + int(patient_id[-2:]))
+        epochs = rng.randn(30, 2, 8)
+        labels = (rng.rand(30) < 0.2).astype(int)
+        labels[:2] = 1
+        return epochs, labels, {'total_epochs': 30, 'seizure_epochs': int(labels.sum())}
+
+    monkeypatch.setattr(pipeline.processor, 'process_patient_data', fake_process)
+    return pipeline, calls
+
+
+def test_ingest_skips_unchanged_patients(staged, monkeypatch):
+    pipeline, calls = staged
+    patients = pipeline.processor.discover_patients()
+
+    first = pipeline.ingest(patients)
+    second = pipeline.ingest(patients)
+
+    assert first == second
+    assert calls == patients  # processed once
+
+    # Changing an epoching parameter invalidates every patient
+    monkeypatch.setattr(Config, 'EPOCH_OVERLAP', Config.EPOCH_OVERLAP + 1)
+    pipeline.ingest(patients)
+    assert calls == patients * 2
+
+
+def test_ingest_resumes_after_crash(staged):
+    pipeline, calls = staged
+    patients = pipeline.processor.discover_patients()
+    process = pipeline.processor.process_patient_data
+
+    def crash_on_third(patient_id):
+        if patient_id == patients[2]:
+            raise KeyboardInterrupt
+        return process(patient_id)
+
+    pipeline.processor.process_patient_data = crash_on_third
+    with pytest.raises(KeyboardInterrupt):
+        pipeline.ingest(patients)
+
+    pipeline.processor.process_patient_data = process
+    pipeline.ingest(patients)
+
+    # The two patients finished before the crash are not redone
+    assert calls == patients[:2] + patients[2:]
+
+
+def test_downstream_stages_use_checkpoints(staged, monkeypatch):
+    pipeline, _ = staged
+    feature_keys = pipeline.features(pipeline.ingest(pipeline.processor.discover_patients()))
+
+    X, y = pipeline.store.load('features', 'chb00')
+    assert X.shape == (30, 16)
+
+    comparison, key = pipeline.compare(feature_keys)
+    assert 'F1-Score' in comparison.columns
+
+    import models
+    monkeypatch.setattr(models, 'compare_models',
+                        lambda *a, **k: pytest.fail("compare recomputed"))
+    cached, cached_key = pipeline.compare(feature_keys)
+    assert cached_key == key
+    assert cached.equals(comparison)
@@ -0,0 +1,59 @@
+"""
+Tests for compressed model variants.
+"""
+import numpy as np
+import pytest
+import sys
+import os
+import functools
+
+# Add src to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from compression import CompressedModel, compare_compressed, quantize_int8
+from inference import load_artifact
+from models import ImprovedLogisticRegression
+from validation import PatientIndependentValidator
+
+
+@pytest.fixture
+def patients(make_patients):
+    return functools.partial(make_patients, n_epochs=120)
+
+
+def test_int8_quantization_error_is_bounded():
+    w = np.random.RandomState(0).randn(64, 16)
+    q, scale = quantize_int8(w, axis=-1)
+    assert q.dtype == np.int8 and scale.shape == (1, 16)
+    assert np.all(np.abs(q * scale - w) <= scale / 2 + 1e-7)
+
+
+def test_int8_logistic_matches_full_precision_and_exports(tmp_path, patients, splits):
+    data = patients()
+    X, y = np.vstack([data[p][0] for p in splits['train']]), np.concatenate([data[p][1] for p in splits['train']])
+    full = ImprovedLogisticRegression().fit(X, y)
+    compressed = CompressedModel(base='logistic', method='int8').fit(X, y)
+
+    np.testing.assert_allclose(compressed.predict_proba(X), full.predict_proba(X), atol=0.02)
+    runtime = load_artifact(compressed.export('int8', models_dir=tmp_path))
+    assert runtime.header['kind'] == 'linear_int8'
+    np.testing.assert_allclose(runtime.predict_proba(X)[:, 1], compressed.predict_proba(X)[:, 1], atol=1e-5)
+
+
+def test_quantized_lstm_export_is_rejected(tmp_path):
+    compressed = CompressedModel(base='lstm', method='int8')
+    compressed.is_fitted = True
+    with pytest.raises(TypeError, match='not exportable'):
+        compressed.export('lstm_int8', models_dir=tmp_path)
+
+
+def test_compare_reports_size_latency_and_deltas(patients, splits):
+    variants = [('logistic', 'int8', {}), ('random_forest', 'prune', {'n_trees': 10}),
+                ('random_forest', 'distill', {'max_depth': 4})]
+    table = compare_compressed(PatientIndependentValidator(), patients(), splits, variants,
+                               apply_smote=False, repeats=3)
+
+    assert table['Method'].tolist() == ['none', 'int8', 'none', 'prune', 'distill']
+    compressed = table[table['Method'] != 'none']
+    assert (compressed['Size ratio'] < 1).all()
+    assert (compressed['f1 delta'].abs() <= 1).all() and (table['Latency ms'] > 0).all()
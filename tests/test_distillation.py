@@ -0,0 +1,71 @@
+"""
+Tests for distilling a teacher model into a fast feature student.
+
+The LSTM teacher test is skipped when TensorFlow is not installed; the
+other tests use a random forest teacher.
+"""
+import numpy as np
+import pytest
+import sys
+import os
+import functools
+
+# Add src to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from distillation import DistilledModel, compare_distilled, soft_fit
+from validation import PatientIndependentValidator
+
+
+@pytest.fixture
+def patients(make_patients):
+    """Two channels of 80 samples; seizure epochs have three times the amplitude."""
+    return functools.partial(make_patients, n_features=2 * 80, seizure_rate=0.25, shift=0.0, gain=3.0)
+
+
+def test_soft_fit_follows_target_probabilities():
+    from sklearn.linear_model import LogisticRegression
+
+    rng = np.random.RandomState(1)
+    X = rng.randn(500, 1)
+    target = 1 / (1 + np.exp(-2 * X[:, 0]))
+    model = soft_fit(LogisticRegression(C=100), X, target)
+    np.testing.assert_allclose(model.coef_.ravel(), [2.0], atol=0.3)
+
+
+def test_student_learns_from_teacher_through_validate_model(patients, splits):
+    results = PatientIndependentValidator().validate_model(
+        DistilledModel, patients(), splits,
+        {'teacher': 'random_forest', 'teacher_params': {'n_estimators': 20}, 'n_channels': 2},
+        apply_smote=False, keep_fitted=True)
+
+    student = results['fitted']['model']
+    assert student.teacher_model is None
+    # Training epochs only: the validation patient stays out of the transfer set
+    assert student.n_transfer_ == 3 * 80
+    assert results['test']['auc'] > 0.9
+
+
+def test_unlabeled_epochs_join_the_transfer_set(patients):
+    from sklearn.ensemble import RandomForestClassifier
+
+    data = patients()
+    X, y = np.concatenate([data['p0'][0], data['p1'][0]]), np.concatenate([data['p0'][1], data['p1'][1]])
+    teacher = RandomForestClassifier(n_estimators=20, random_state=0).fit(X, y)
+    student = DistilledModel(teacher_model=teacher, n_channels=2).fit(X, y, unlabeled=data['p2'][0])
+    assert student.n_transfer_ == 3 * 80
+    assert student.predict_proba(data['p4'][0]).shape == (80, 2)
+
+
+def test_lstm_distillation_reports_retention_and_speedup(patients, splits):
+    pytest.importorskip('tensorflow')
+
+    table = compare_distilled(
+        PatientIndependentValidator(), patients(), splits, students=['logistic'],
+        teacher_params={'n_channels': 2, 'n_steps': 8, 'lstm_units': [8], 'dense_units': [8],
+                        'epochs': 2, 'batch_size': 16},
+        apply_smote=False)
+
+    student = table.iloc[1]
+    assert student['Model'] == 'logistic (student)'
+    assert student['speedup'] > 1 and 'f1 retention' in table
@@ -0,0 +1,84 @@
+"""
+Tests for the chunked, compressed epoch archive.
+"""
+import numpy as np
+import pytest
+import sys
+import os
+
+# Add src to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from epoch_archive import EpochArchive, EpochArchiveWriter
+
+
+def _epochs(n_epochs, n_channels=3, n_times=128, seed=0):
+    rng = np.random.RandomState(seed)
+    t = np.arange(n_times) / 64
+    return 20e-6 * rng.randn(n_epochs, n_channels, n_times) + 10e-6 * np.sin(2 * np.pi * 10 * t)
+
+
+def _write(path, dtype='float32', chunk_epochs=16):
+    """Two patients, three files of different lengths."""
+    parts = [('chb01', 'chb01_01.edf', _epochs(20, seed=1)),
+             ('chb01', 'chb01_02.edf', _epochs(7, seed=2)),
+             ('chb02', 'chb02_01.edf', _epochs(30, seed=3))]
+    with EpochArchiveWriter(path, dtype=dtype, chunk_epochs=chunk_epochs) as writer:
+        for patient, file, epochs in parts:
+            starts = np.arange(len(epochs)) * 2.0
+            writer.append(epochs, labels=np.arange(len(epochs)) % 5 == 0,
+                          times=np.column_stack([starts, starts + 2.0]), patient=patient, file=file)
+    return np.concatenate([epochs for _, _, epochs in parts])
+
+
+def test_float32_round_trip_and_random_access(tmp_path):
+    path = tmp_path / 'all.epochs'
+    expected = _write(path).astype(np.float32)
+
+    with EpochArchive(path) as archive:
+        assert archive.shape == expected.shape
+        np.testing.assert_array_equal(archive.read(), expected)
+        # Ranges across chunk boundaries, channel subsets, single epochs
+        np.testing.assert_array_equal(archive.read(13, 35, channels=[2, 0]), expected[13:35][:, [2, 0]])
+        np.testing.assert_array_equal(archive[40], expected[40])
+        np.testing.assert_array_equal(archive[50:60:3], expected[50:60:3])
+        rows = [55, 3, 17, 18]
+        np.testing.assert_array_equal(archive.take(rows), expected[rows])
+        with pytest.raises(IndexError):
+            archive[len(expected)]
+
+
+def test_int16_is_close_and_smaller(tmp_path):
+    expected = _write(tmp_path / 'f32.epochs')
+    _write(tmp_path / 'i16.epochs', dtype='int16')
+
+    with EpochArchive(tmp_path / 'f32.epochs') as f32, EpochArchive(tmp_path / 'i16.epochs') as i16:
+        peak = np.abs(expected).max()
+        np.testing.assert_allclose(i16.read(), expected, atol=peak / 32767)
+        assert i16.nbytes() < 0.75 * f32.nbytes()
+        assert f32.nbytes() < 0.6 * expected.nbytes
+
+
+def test_row_index(tmp_path):
+    path = tmp_path / 'all.epochs'
+    expected = _write(path)
+
+    with EpochArchive(path) as archive:
+        assert archive.patients() == ['chb01', 'chb02']
+        assert archive.rows(patient='chb01').tolist() == list(range(27))
+        assert archive.rows(file='chb01_02.edf').tolist() == list(range(20, 27))
+        # Epochs overlapping 10-14 s of chb02_01 (2 s epochs every 2 s)
+        assert archive.rows(file='chb02_01.edf', start_time=10, end_time=14).tolist() == [32, 33]
+
+        epochs, labels = archive.patient('chb02')
+        np.testing.assert_allclose(epochs, expected[27:], rtol=1e-6)
+        assert labels.tolist() == [int(i % 5 == 0) for i in range(30)]
+
+
+def test_interrupted_write_leaves_no_archive(tmp_path):
+    path = tmp_path / 'all.epochs'
+    with pytest.raises(RuntimeError):
+        with EpochArchiveWriter(path) as writer:
+            writer.append(_epochs(5))
+            raise RuntimeError("crash")
+    assert not path.exists() and not (tmp_path / 'all.epochs.tmp').exists()
@@ -0,0 +1,94 @@
+"""
+Tests for event-level (seizure-level) evaluation.
+"""
+import numpy as np
+import sys
+import os
+
+# Add src to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from models import ImprovedLogisticRegression
+from validation import EventLevelEvaluator, PatientIndependentValidator
+
+STEP, LENGTH = 16.0, 20.0
+
+
+def _timeline(n_epochs):
+    starts = np.arange(n_epochs) * STEP
+    return np.column_stack([starts, starts + LENGTH])
+
+
+def _brute_force(proba, times, seizures, threshold, refractory):
+    """Loop reference: events, false alarms and detected seizures."""
+    n_events = false_alarms = 0
+    last = -np.inf
+    for p, t in zip(proba, times[:, 1]):
+        if p >= threshold:
+            if t - last > max(refractory, STEP):
+                n_events += 1
+                false_alarms += not any(s <= t <= e for s, e in seizures)
+            last = t
+    detected = [any(p >= threshold and s <= t <= e for p, t in zip(proba, times[:, 1]))
+                for s, e in seizures]
+    return n_events, false_alarms, np.mean(detected)
+
+
+def test_hand_built_timeline():
+    times = _timeline(225)  # one hour
+    proba = np.zeros(len(times))
+    alarm_at = lambda t: np.flatnonzero(times[:, 1] == t)[0]
+    for t in [1012, 1028, 1044]:  # during the seizure
+        proba[alarm_at(t)] = 0.9
+    proba[alarm_at(2004)] = 0.8   # isolated false alarm
+    proba[alarm_at(3012)] = 0.7   # two false alarms 32 s apart
+    proba[alarm_at(3044)] = 0.7
+
+    results = EventLevelEvaluator(detection_collar=0).evaluate(
+        proba, times, [[1000, 1060]], thresholds=[0.5, 0.75, 0.95], refractory_periods=[0, 60])
+
+    np.testing.assert_array_equal(results['sensitivity'], [1, 1, 0])
+    assert results['latency_mean'][0] == 1012 - 1000
+    np.testing.assert_array_equal(results['false_alarms'], [[3, 2], [1, 1], [0, 0]])
+    np.testing.assert_array_equal(results['n_events'], [[4, 3], [2, 2], [0, 0]])
+
+    point = EventLevelEvaluator.operating_point(results, 0, 1)
+    assert point['seizures_detected'] == 1
+    assert np.isclose(point['fa_per_hour'], 2 / point['interictal_hours'])
+
+
+def test_grid_matches_brute_force():
+    rng = np.random.RandomState(0)
+    times = _timeline(3000)
+    proba = rng.rand(len(times))
+    onsets = np.sort(rng.choice(290, 12, replace=False)) * 10 * STEP
+    seizures = np.column_stack([onsets, onsets + 60])
+    thresholds, refractory = np.linspace(0.9, 0.99, 7), np.array([0, 60, 300])
+
+    results = EventLevelEvaluator(detection_collar=0).evaluate(proba, times, seizures, thresholds, refractory)
+    for i, threshold in enumerate(thresholds):
+        for j, period in enumerate(refractory):
+            n_events, false_alarms, sensitivity = _brute_force(proba, times, seizures, threshold, period)
+            assert results['n_events'][i, j] == n_events
+            assert results['false_alarms'][i, j] == false_alarms
+            assert np.isclose(results['sensitivity'][i], sensitivity)
+
+
+def test_validate_model_reports_events():
+    rng = np.random.RandomState(1)
+    patient_data, metadata = {}, {}
+    for i in range(5):
+        y = np.zeros(120, dtype=int)
+        y[40:44] = 1
+        y[90:93] = 1
+        X = rng.randn(120, 8) + 2 * y[:, None]
+        patient_data[f'p{i}'] = (X, y)
+        metadata[f'p{i}'] = {'epoch_times': _timeline(120)}
+    splits = {'train': ['p0', 'p1', 'p2'], 'val': ['p3'], 'test': ['p4']}
+
+    results = PatientIndependentValidator().validate_model(
+        ImprovedLogisticRegression, patient_data, splits, patient_metadata=metadata)
+    events = results['events']['test']
+    assert events['n_seizures'] == 2
+    assert events['sensitivity'] == 1.0
+    assert events['latency_mean'] >= 0
@@ -0,0 +1,113 @@
+"""
+Tests for the persistent experiment store.
+"""
+import numpy as np
+import pytest
+import sys
+import os
+import functools
+
+# Add src to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from experiments import ExperimentStore
+from models import ImprovedLogisticRegression
+from validation import PatientIndependentValidator
+
+
+class CountingLogisticRegression(ImprovedLogisticRegression):
+    fits = 0
+
+    def fit(self, X, y, **kwargs):
+        CountingLogisticRegression.fits += 1
+        return super().fit(X, y, **kwargs)
+
+
+@pytest.fixture
+def patients(make_patients):
+    return functools.partial(make_patients, n_ictal=2, shift=1.0, n_features=6)
+
+
+def test_identical_run_is_loaded_from_store(tmp_path, patients, splits):
+    data = patients()
+    CountingLogisticRegression.fits = 0
+    first = PatientIndependentValidator(store=ExperimentStore(tmp_path)).validate_model(
+        CountingLogisticRegression, data, splits, apply_smote=False)
+
+    # A new validator and store on the same directory (e.g. a new process)
+    validator = PatientIndependentValidator(store=ExperimentStore(tmp_path))
+    second = validator.validate_model(CountingLogisticRegression, data, splits, apply_smote=False)
+
+    assert CountingLogisticRegression.fits == 1
+    assert second['test'] == first['test']
+    np.testing.assert_array_equal(second['predictions']['test']['proba'], first['predictions']['test']['proba'])
+    assert validator.results_history[-1] is second
+
+    # Different data or parameters are recomputed
+    data['p0'] = (data['p0'][0] + 0.1, data['p0'][1])
+    validator.validate_model(CountingLogisticRegression, data, splits, apply_smote=False)
+    validator.validate_model(CountingLogisticRegression, data, splits, {'C': 0.1}, apply_smote=False)
+    assert CountingLogisticRegression.fits == 3
+    assert len(validator.store) == 3
+
+
+class NotedLogisticRegression(ImprovedLogisticRegression):
+    def __init__(self, note=None, **kwargs):
+        super().__init__(**kwargs)
+        self.note = note
+
+
+def test_event_metadata_and_object_params_are_keyed_by_value(tmp_path, patients, splits):
+    data = patients()
+    metadata = {p: {'epoch_times': np.column_stack([np.arange(len(y)) * 2.0, np.arange(len(y)) * 2.0 + 2]),
+                    'seizure_intervals': np.array([[0.0, 6.0]])} for p, (_, y) in data.items()}
+    CountingLogisticRegression.fits = 0
+    validator = PatientIndependentValidator(store=ExperimentStore(tmp_path))
+    for _ in range(2):
+        validator.validate_model(CountingLogisticRegression, data, splits, apply_smote=False,
+                                 patient_metadata=metadata)
+    assert CountingLogisticRegression.fits == 1
+
+    # Changed seizure intervals are a new experiment, not stale event metrics
+    metadata['p4'] = dict(metadata['p4'], seizure_intervals=np.array([[20.0, 30.0]]))
+    validator.validate_model(CountingLogisticRegression, data, splits, apply_smote=False,
+                             patient_metadata=metadata)
+    assert CountingLogisticRegression.fits == 2
+
+    # Objects have no value-based key: the run is not stored
+    with pytest.raises(TypeError):
+        ExperimentStore.experiment_key(params={'teacher_model': object()})
+    validator.validate_model(NotedLogisticRegression, data, splits, {'note': object()},
+                             apply_smote=False)
+    assert len(validator.store) == 2
+
+
+def test_queries_by_model_and_patient(tmp_path, patients, splits):
+    data = patients()
+    validator = PatientIndependentValidator(store=ExperimentStore(tmp_path))
+    validator.validate_model(ImprovedLogisticRegression, data, splits, apply_smote=False)
+    other = {'train': ['p1', 'p2', 'p3'], 'val': ['p4'], 'test': ['p0']}
+    validator.validate_model(ImprovedLogisticRegression, data, other, apply_smote=False)
+    cv = validator.cross_validate_patients(ImprovedLogisticRegression, data, n_folds=5, n_bootstrap=0)
+
+    store = ExperimentStore(tmp_path)
+    assert len(store.query(kind='cv')) == 1
+    assert store.query(kind='cv')[0]['f1_mean'] == cv['f1_mean']
+    tested = store.query(model='ImprovedLogisticRegression', patient='p0', split='test', kind='validate')
+    # The second split and the CV fold that tested p0
+    assert len(tested) == 2 and all(row['splits']['test'] == ['p0'] for row in tested)
+    assert store.query(model='ImprovedRandomForest') == []
+
+    # A repeated CV run is answered from the store
+    assert validator.cross_validate_patients(ImprovedLogisticRegression, data, n_folds=5,
+                                             n_bootstrap=0)['f1_values'] == cv['f1_values']
+    assert len(store.query(kind='cv')) == 1
+
+
+def test_results_history_is_bounded(monkeypatch, patients, splits):
+    from config import Config
+    monkeypatch.setattr(Config, 'RESULTS_HISTORY_SIZE', 2)
+    validator = PatientIndependentValidator()
+    for _ in range(3):
+        validator.validate_model(ImprovedLogisticRegression, patients(), splits, apply_smote=False)
+    assert len(validator.results_history) == 2
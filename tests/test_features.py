@@ -0,0 +1,74 @@
+"""
+Tests for the covariance / tangent-space feature engine.
+"""
+import numpy as np
+import pytest
+import sys
+import os
+
+# Add src to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from features import TangentSpaceFeatures, covariances, logm, riemannian_mean, powm
+from models import ImprovedLogisticRegression
+from validation import PatientIndependentValidator
+
+
+def _epochs(n=20, n_channels=4, n_times=64, seed=0):
+    rng = np.random.RandomState(seed)
+    mixing = rng.randn(n_channels, n_channels)
+    return np.einsum('cd,ndt->nct', mixing, rng.randn(n, n_channels, n_times)) + rng.randn(n, n_channels, 1)
+
+
+def test_covariances_match_ledoit_wolf():
+    from sklearn.covariance import ledoit_wolf
+
+    epochs = _epochs()
+    covs = covariances(epochs)
+    for epoch, cov in zip(epochs, covs):
+        expected, _ = ledoit_wolf(epoch.T)
+        np.testing.assert_allclose(cov, expected, atol=1e-10)
+
+    unshrunk = covariances(epochs, shrinkage=0.0)
+    np.testing.assert_allclose(unshrunk[0], np.cov(epochs[0], bias=True), atol=1e-10)
+
+
+def test_riemannian_mean_centres_tangent_space():
+    covs = covariances(_epochs(n=30))
+    mean = riemannian_mean(covs)
+    whitener = powm(mean, -0.5)
+    tangent = logm(whitener @ covs @ whitener).mean(axis=0)
+    assert np.abs(tangent).max() < 1e-6
+
+
+def test_tangent_features_in_validation_and_export(tmp_path):
+    from inference import load_artifact
+
+    rng = np.random.RandomState(1)
+    patient_data = {}
+    for i in range(5):
+        y = (rng.rand(40) < 0.3).astype(int)
+        y[:2] = 1
+        epochs = _epochs(n=40, seed=i)
+        epochs[y == 1, 0] *= 3  # seizure power on one channel
+        patient_data[f'p{i}'] = (epochs.reshape(40, -1), y)
+    splits = {'train': ['p0', 'p1', 'p2'], 'val': ['p3'], 'test': ['p4']}
+
+    results = PatientIndependentValidator().validate_model(
+        ImprovedLogisticRegression, patient_data, splits,
+        feature_stage=TangentSpaceFeatures(n_channels=4), keep_fitted=True)
+    assert results['metadata']['feature_stage'] == 'TangentSpaceFeatures'
+    assert results['test']['auc'] > 0.9
+
+    fitted = results['fitted']
+    path = fitted['model'].export('tangent', scaler=fitted['scaler'],
+                                  feature_stage=fitted['feature_stage'], models_dir=tmp_path)
+    X_test = patient_data['p4'][0]
+    expected = fitted['model'].predict_proba(
+        fitted['scaler'].transform(fitted['feature_stage'].transform(X_test)))
+    np.testing.assert_allclose(load_artifact(path).predict_proba(X_test), expected, atol=1e-10)
+
+
+def test_unfitted_transform_raises():
+    with pytest.raises(ValueError):
+        TangentSpaceFeatures(n_channels=4).transform(np.zeros((2, 8)))
@@ -0,0 +1,111 @@
+"""
+Tests for model export and the lightweight inference runtime.
+"""
+import numpy as np
+import subprocess
+import sys
+import os
+
+# Add src to path for imports
+SRC = os.path.join(os.path.dirname(__file__), '..', 'src')
+sys.path.insert(0, SRC)
+
+from sklearn.preprocessing import StandardScaler
+from models import ModelFactory, SeizureDetectionModel
+from validation import PatientIndependentValidator
+from inference import load_artifact
+
+
+def _fitted(model_name, n_epochs=120, n_features=40):
+    np.random.seed(42)
+    X = np.random.randn(n_epochs, n_features) * 3 + 1
+    y = np.random.choice([0, 1], size=n_epochs, p=[0.8, 0.2])
+    X[y == 1] += 1.0
+    scaler = StandardScaler().fit(X)
+    model = ModelFactory.create_model(model_name, random_state=42)
+    model.fit(scaler.transform(X), y)
+    return model, scaler, X
+
+
+def test_linear_export_matches_live_model(tmp_path):
+    """Exported logistic regression scores like the live model."""
+    model, scaler, X = _fitted('logistic')
+    path = model.export('logistic', scaler=scaler, models_dir=tmp_path)
+
+    runtime = SeizureDetectionModel.load(path)
+
+    assert runtime.header['kind'] == 'linear'
+    np.testing.assert_allclose(runtime.predict_proba(X),
+                               model.predict_proba(scaler.transform(X)), atol=1e-10)
+    np.testing.assert_array_equal(runtime.predict(X), model.predict(scaler.transform(X)))
+    assert abs(runtime.score_epoch(X[0]) - runtime.predict_proba(X[:1])[0, 1]) < 1e-12
+
+
+def test_pickled_export_and_versioning(tmp_path):
+    """Non-linear models round-trip pickled; re-exports bump the version."""
+    model, scaler, X = _fitted('random_forest')
+    first = model.export('rf', scaler=scaler, models_dir=tmp_path)
+    second = model.export('rf', scaler=scaler, models_dir=tmp_path)
+
+    assert first.name == 'rf-v1.npz'
+    assert second.name == 'rf-v2.npz'
+
+    runtime = load_artifact('rf', models_dir=tmp_path)
+    assert runtime.header['kind'] == 'pickle'
+    np.testing.assert_allclose(runtime.predict_proba(X),
+                               model.predict_proba(scaler.transform(X)))
+
+
+def test_linear_inference_does_not_import_sklearn(tmp_path):
+    """Scoring a linear artifact only needs numpy."""
+    model, scaler, X = _fitted('logistic')
+    path = model.export('logistic', scaler=scaler, models_dir=tmp_path)
+
+    code = (f"import sys; sys.path.insert(0, {SRC!r}); import numpy as np; "
+            f"from inference import load_artifact; "
+            f"m = load_artifact({str(path)!r}); m.score_epoch(np.zeros({X.shape[1]})); "
+            f"assert 'sklearn' not in sys.modules, 'sklearn imported'")
+    subprocess.run([sys.executable, '-c', code], check=True)
+
+
+def test_validate_model_keep_fitted():
+    """validate_model can hand back the fitted model and scaler for export."""
+    np.random.seed(0)
+    patient_data = {f'p{i}': (np.random.randn(40, 10), np.random.choice([0, 1], 40, p=[0.8, 0.2]))
+                    for i in range(4)}
+    splits = {'train': ['p0', 'p1'], 'val': ['p2'], 'test': ['p3']}
+
+    validator = PatientIndependentValidator(random_state=42)
+    results = validator.validate_model(ModelFactory.get_available_models()['logistic'],
+                                       patient_data, splits, apply_smote=False, keep_fitted=True)
+
+    assert results['fitted']['model'].is_fitted
+    assert hasattr(results['fitted']['scaler'], 'mean_')
+    assert 'fitted' not in validator.results_history[-1]
+
+
+def test_set_params_resets_fit_and_keeps_threshold():
+    """set_params rebuilds an unfitted estimator but keeps decision_threshold."""
+    np.random.seed(0)
+    X, y = np.random.randn(60, 5), np.random.choice([0, 1], 60)
+    model = ModelFactory.create_model('logistic', random_state=42).fit(X, y)
+    model.decision_threshold = 0.3
+
+    assert model.set_params(C=0.5) is model
+    assert model.get_params()['C'] == 0.5 and model.model.C == 0.5
+    assert not model.is_fitted and model.decision_threshold == 0.3
+    assert model.fit(X, y).is_fitted
+
+    from sklearn.base import is_classifier
+    assert is_classifier(model)
+
+
+def test_imports_do_not_load_heavy_dependencies():
+    """Importing the package modules must not pull in the ML/EEG stacks."""
+    code = (f"import sys; sys.path.insert(0, {SRC!r}); "
+            f"import config, data_processing, models, validation, inference, prediction; "
+            f"heavy = [m for m in ('sklearn', 'imblearn', 'scipy', 'pandas', 'mne', 'tensorflow') "
+            f"if m in sys.modules]; "
+            f"assert not heavy, heavy; "
+            f"assert isinstance(data_processing.MNE_AVAILABLE, bool)")
+    subprocess.run([sys.executable, '-c', code], check=True)
@@ -0,0 +1,100 @@
+"""
+Tests for leave-one-patient-out cross-validation with shared preprocessing.
+"""
+import numpy as np
+import pytest
+import sys
+import os
+import functools
+
+# Add src to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from sklearn.preprocessing import StandardScaler
+
+import lopo
+from lopo import LeaveOnePatientOut, PatientStatistics, lopo_folds
+from models import ImprovedLogisticRegression
+
+
+class SingleThreadedLogisticRegression(ImprovedLogisticRegression):
+    """Fails unless joblib runs sequentially (models.single_threaded)."""
+
+    def fit(self, X, y, **kwargs):
+        from joblib.parallel import get_active_backend
+        backend = type(get_active_backend()[0]).__name__
+        if backend != 'SequentialBackend':
+            raise RuntimeError(f"fitted with {backend}")
+        return super().fit(X, y, **kwargs)
+
+
+@pytest.fixture
+def patients(make_patients):
+    return functools.partial(make_patients, n_patients=6, n_epochs=60, n_features=10,
+                             patient_scale=True, patient_offset=True, id_format='p{i:02d}')
+
+
+def test_assembled_splits_match_stacked_scaler(patients):
+    data = patients()
+    stats = PatientStatistics(data)
+    train = ['p01', 'p03', 'p04']
+
+    scaler = stats.scaler(train)
+    X_train, y_train = stats.assemble(data, train, scaler)
+    stacked = np.vstack([data[p][0] for p in train])
+    reference = StandardScaler().fit(stacked)
+
+    np.testing.assert_allclose(scaler.mean_, reference.mean_)
+    np.testing.assert_allclose(scaler.scale_, reference.scale_)
+    np.testing.assert_allclose(X_train, reference.transform(stacked), atol=1e-12)
+    assert y_train.tolist() == np.concatenate([data[p][1] for p in train]).tolist()
+
+
+def test_folds_test_every_patient_once():
+    patients = [f'p{i:02d}' for i in range(7)]
+    folds = lopo_folds(patients, n_val=2, random_state=1)
+
+    assert sorted(f['test'][0] for f in folds) == patients
+    for fold in folds:
+        assert len(fold['val']) == 2 and fold['test'][0] not in fold['val']
+        assert sorted(fold['train'] + fold['val'] + fold['test']) == patients
+
+
+def test_results_stream_to_disk_and_resume(tmp_path, monkeypatch, patients):
+    data = patients()
+    runner = LeaveOnePatientOut(ImprovedLogisticRegression, tmp_path, n_workers=1, random_state=1)
+    results = runner.run(data, n_bootstrap=50)
+
+    assert results['n_folds'] == len(data) and results['lopo']
+    assert results['n_samples_total'] == sum(len(y) for _, y in data.values())
+    assert 0 <= results['pooled']['f1'] <= 1 and 'f1_ci_bootstrap' in results
+    assert sorted(runner.load_records()) == sorted(data)
+
+    # Drop one patient's record: a rerun only redoes that patient
+    lines = runner.records_path().read_text().splitlines()
+    runner.records_path().write_text('\n'.join(lines[:-1]) + '\n')
+    ran = []
+    run_fold = lopo.run_fold
+    monkeypatch.setattr(lopo, 'run_fold', lambda splits: ran.append(splits['test'][0]) or run_fold(splits))
+    resumed = runner.run(data, n_bootstrap=50)
+
+    assert len(ran) == 1
+    assert resumed['f1_mean'] == results['f1_mean']
+
+
+def test_parallel_folds_match_sequential(tmp_path, patients):
+    data = patients()
+    sequential = LeaveOnePatientOut(ImprovedLogisticRegression, tmp_path / 'seq', n_workers=1,
+                                    random_state=1).run(data, n_bootstrap=0)
+    parallel = LeaveOnePatientOut(ImprovedLogisticRegression, tmp_path / 'par', n_workers=2,
+                                  random_state=1).run(data, n_bootstrap=0)
+
+    assert parallel['n_folds'] == sequential['n_folds']
+    np.testing.assert_allclose(parallel['f1_values'], sequential['f1_values'])
+
+
+def test_pool_workers_fit_single_threaded(tmp_path, patients):
+    data = patients()
+    results = LeaveOnePatientOut(SingleThreadedLogisticRegression, tmp_path, n_workers=2,
+                                 random_state=1).run(data, n_bootstrap=0)
+    assert results['n_folds'] == len(data) and not results['failed']
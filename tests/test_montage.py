@@ -0,0 +1,81 @@
+"""
+Tests for header-only channel mapping of EDF files.
+"""
+import sys
+import os
+
+# Add src to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import pytest
+from montage import MontageIndex, map_channels, normalize_channel_name, read_edf_header
+
+SELECTED = ['FP1-F7', 'F7-T7', 'T7-P7', 'T8-P8']
+
+
+def _write_edf_header(path, labels, samples_per_record=256, n_records=3600, record_duration=1):
+    """An EDF header without data records (enough for the header scan)."""
+    def pad(value, width):
+        return str(value).ljust(width)[:width].encode('ascii')
+
+    n = len(labels)
+    fixed = (pad(0, 8) + pad('patient', 80) + pad('recording', 80) + pad('01.01.01', 8)
+             + pad('00.00.00', 8) + pad(256 * (n + 1), 8) + pad('', 44) + pad(n_records, 8)
+             + pad(record_duration, 8) + pad(n, 4))
+    rates = samples_per_record if isinstance(samples_per_record, list) else [samples_per_record] * n
+    fields = [labels, [''] * n, ['uV'] * n, [-3200] * n, [3200] * n, [-32768] * n, [32767] * n,
+              [''] * n, rates, [''] * n]
+    widths = [16, 80, 8, 8, 8, 8, 8, 80, 8, 32]
+    signal_header = b''.join(pad(value, width) for values, width in zip(fields, widths) for value in values)
+    path.write_bytes(fixed + signal_header)
+    return path
+
+
+def test_normalize_channel_name():
+    assert normalize_channel_name('EEG fp1-F7') == 'FP1-F7'
+    assert normalize_channel_name('T8-P8-0') == 'T8-P8'
+    assert normalize_channel_name('T4-T6') == 'T8-P8'
+    assert normalize_channel_name('F7-T7') == 'F7-T7'
+
+
+def test_map_channels_aliases_and_duplicates():
+    labels = ['FP1-F7', '-', 'T3-T5', 'F7-T7', 'T8-P8', 'T8-P8']
+    mapping = map_channels(labels, SELECTED, 'a.edf', 'reject', 'first')
+
+    assert mapping.compatible and not mapping.exact
+    assert mapping.indices == [0, 3, 2, 4]
+    assert mapping.duplicates == {'T8-P8': [4, 5]}
+    assert mapping.renamed == {'T3-T5': 'T7-P7'}
+
+    assert not map_channels(labels, SELECTED, 'a.edf', 'reject', 'reject').compatible
+
+
+def test_missing_channel_strategies():
+    labels = ['FP1-F7', 'F7-T7', 'T8-P8']
+    rejected = map_channels(labels, SELECTED, 'b.edf', 'reject', 'first')
+    assert not rejected.compatible and rejected.missing == ['T7-P7']
+
+    zeroed = map_channels(labels, SELECTED, 'b.edf', 'zero', 'first', max_missing=1)
+    assert zeroed.compatible and zeroed.indices == [0, 1, -1, 2]
+    assert not map_channels(labels[:2], SELECTED, 'b.edf', 'zero', 'first', max_missing=1).compatible
+
+    with pytest.raises(ValueError):
+        map_channels(labels, SELECTED, 'b.edf', 'interpolate', 'first')
+
+
+def test_header_scan(tmp_path):
+    """The index maps files from headers alone and skips annotation signals."""
+    good = _write_edf_header(tmp_path / 'good.edf', ['FP1-F7', 'EDF Annotations', 'F7-T7', 'T7-P7', 'T8-P8'])
+    header = read_edf_header(good)
+    assert header.labels == ['FP1-F7', 'F7-T7', 'T7-P7', 'T8-P8']
+    assert header.duration == 3600 and header.sfreqs == [256.0] * 4
+
+    mixed = _write_edf_header(tmp_path / 'mixed.edf', SELECTED, samples_per_record=[256, 256, 512, 256])
+    broken = tmp_path / 'broken.edf'
+    broken.write_bytes(b'0' * 100)
+
+    mappings = MontageIndex(SELECTED, 'reject', 'first').scan([good, mixed, broken])
+    assert mappings['good.edf'].exact and mappings['good.edf'].sfreq == 256.0
+    assert mappings['good.edf'].indices == [0, 1, 2, 3]
+    assert 'sampling rates' in mappings['mixed.edf'].reason
+    assert not mappings['broken.edf'].compatible
@@ -0,0 +1,109 @@
+"""
+Tests for incremental model updates from confirmed annotations.
+"""
+import numpy as np
+import pytest
+import sys
+import os
+
+# Add src to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from sklearn.neighbors import KNeighborsClassifier
+from sklearn.preprocessing import StandardScaler
+from inference import load_artifact
+from models import ModelFactory
+from online import KNNIndex, OnlineUpdater
+
+
+def _data(n_epochs=200, n_features=12, seed=0, shift=0.0):
+    rng = np.random.RandomState(seed)
+    y = (rng.rand(n_epochs) < 0.2).astype(int)
+    X = rng.randn(n_epochs, n_features) * 2 + 3 + shift
+    X[y == 1] += 1.5
+    return X, y
+
+
+def _fitted(model_name, X, y):
+    scaler = StandardScaler().fit(X)
+    model = ModelFactory.create_model(model_name, random_state=42).fit(scaler.transform(X), y)
+    return model, scaler
+
+
+@pytest.mark.parametrize('weights', ['uniform', 'distance'])
+def test_knn_index_matches_sklearn(weights):
+    """Inserting in batches gives the same probabilities as sklearn's KNN."""
+    X, y = _data()
+    index = KNNIndex(n_neighbors=5, weights=weights)
+    for rows in np.array_split(np.arange(150), 4):
+        index.partial_fit(X[rows], y[rows])
+
+    reference = KNeighborsClassifier(n_neighbors=5, weights=weights).fit(X[:150], y[:150])
+    np.testing.assert_allclose(index.predict_proba(X[150:]), reference.predict_proba(X[150:]))
+
+
+def test_knn_index_evicts_interictal_first():
+    """A full index drops its oldest non-seizure epochs and keeps seizures."""
+    X, y = _data()
+    index = KNNIndex(max_samples=100).partial_fit(X, y)
+
+    assert index.n_samples_ == 100
+    assert int(index._y[:100].sum()) == int(y.sum())
+
+
+def _update_scaler(model, scaler, X_new):
+    old_mean, old_scale = scaler.mean_.copy(), scaler.scale_.copy()
+    scaler.partial_fit(X_new)
+    model.rescale(old_mean, old_scale, scaler.mean_, scaler.scale_)
+
+
+def test_scaler_update_preserves_linear_predictions():
+    """Updating scaler statistics alone does not change SGD's outputs."""
+    X, y = _data()
+    model, scaler = _fitted('sgd_logistic', X, y)
+    before = model.predict_proba(scaler.transform(X))
+
+    _update_scaler(model, scaler, _data(50, seed=1, shift=2.0)[0])
+
+    np.testing.assert_allclose(model.predict_proba(scaler.transform(X)), before, atol=1e-8)
+
+
+def test_scaler_update_reindexes_knn():
+    """After a scaler update the KNN index equals one built in the new scaling."""
+    X, y = _data()
+    model, scaler = _fitted('knn_incremental', X, y)
+
+    _update_scaler(model, scaler, _data(50, seed=1, shift=2.0)[0])
+
+    n = model.model.n_samples_
+    np.testing.assert_allclose(model.model._X[:n], scaler.transform(X), atol=1e-10)
+    rebuilt = KNNIndex(n_neighbors=7).fit(scaler.transform(X), y)
+    np.testing.assert_allclose(model.predict_proba(scaler.transform(X)),
+                               rebuilt.predict_proba(scaler.transform(X)))
+
+
+def test_updater_versions_and_resumes(tmp_path):
+    """Updates are exported as new versions and can be continued later."""
+    X, y = _data()
+    model, scaler = _fitted('sgd_logistic', X, y)
+    updater = OnlineUpdater(model, scaler, 'sgd', models_dir=tmp_path)
+    first = updater.save()
+
+    X_new, y_new = _data(40, seed=2, shift=1.0)
+    second = updater.update(X_new, y_new).save()
+
+    assert (first.name, second.name) == ('sgd-v1.npz', 'sgd-v2.npz')
+    runtime = load_artifact(second)
+    np.testing.assert_allclose(runtime.predict_proba(X)[:, 1],
+                               model.predict_proba(scaler.transform(X))[:, 1], atol=1e-10)
+
+    resumed = OnlineUpdater.resume('sgd', models_dir=tmp_path)
+    assert resumed.n_updates == 1 and resumed.n_samples == 40
+    assert resumed.update(X_new, y_new).save().name == 'sgd-v3.npz'
+
+
+def test_updater_rejects_batch_models():
+    X, y = _data()
+    model, scaler = _fitted('random_forest', X, y)
+    with pytest.raises(ValueError):
+        OnlineUpdater(model, scaler, 'rf')
@@ -0,0 +1,86 @@
+"""
+Tests for patient-specific models trained per recording split.
+"""
+import numpy as np
+import pytest
+import sys
+import os
+
+# Add src to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from models import SeizureDetectionModel
+from patient_specific import PatientSpecificTrainer, recordings, split_files
+
+
+def _patient(seed, n_files=6, n_epochs=40, n_features=8, seizure_files=(0, 2, 3, 5)):
+    """Recordings laid end to end with one 5-epoch seizure in some of them."""
+    rng = np.random.RandomState(seed)
+    X, y, times, seizures, durations = [], [], [], [], []
+    offset = 0.0
+    for k in range(n_files):
+        labels = np.zeros(n_epochs, dtype=int)
+        if k in seizure_files:
+            labels[10:15] = 1
+            seizures.append((offset + 10 * 16, offset + 14 * 16 + 20))
+        X.append(rng.randn(n_epochs, n_features) + 1.5 * labels[:, None])
+        y.append(labels)
+        starts = offset + 16.0 * np.arange(n_epochs)
+        times.append(np.column_stack([starts, starts + 20]))
+        durations.append(16.0 * n_epochs + 4)
+        offset += durations[-1]
+    timeline = {'epoch_times': np.concatenate(times), 'seizure_intervals': np.array(seizures),
+                'file_names': [f'rec_{k:02d}.edf' for k in range(n_files)],
+                'file_epochs': [n_epochs] * n_files, 'file_durations': durations}
+    return np.concatenate(X), np.concatenate(y), timeline
+
+
+def test_split_files_holds_out_latest_recordings_with_seizures():
+    labels = [np.array([k in (0, 2, 3, 5, 7)]) for k in range(10)]
+    splits = split_files(labels, test_ratio=0.3, val_ratio=0.2)
+
+    assert sorted(sum(splits.values(), [])) == list(range(10))
+    for split in ['train', 'val', 'test']:
+        assert any(labels[k].any() for k in splits[split])
+    assert max(splits['train']) < max(splits['test'])
+
+    with pytest.raises(ValueError):
+        split_files([np.array([1]), np.array([0]), np.array([0])])
+
+
+def test_recordings_cut_epochs_and_seizures_per_file():
+    X, y, timeline = _patient(0)
+    data, metadata, ids = recordings(X, y, timeline)
+
+    assert ids[0] == '000:rec_00.edf' and len(ids) == 6
+    assert sum(len(data[r][1]) for r in ids) == len(y)
+    assert [len(metadata[r]['seizure_intervals']) for r in ids] == [1, 0, 1, 1, 0, 1]
+
+
+def test_parallel_training_writes_registry(tmp_path):
+    patients = {f'chb{i:02d}': _patient(i) for i in range(2)}
+    trainer = PatientSpecificTrainer('logistic', n_workers=2, models_dir=tmp_path)
+    registry = trainer.train_in_memory({pid: (X, y) for pid, (X, y, _) in patients.items()},
+                                       {pid: t for pid, (_, _, t) in patients.items()})
+
+    assert registry == PatientSpecificTrainer.load_registry(tmp_path)
+    assert registry['aggregate']['n_patients'] == 2
+    for pid, record in registry['patients'].items():
+        assert record['status'] == 'trained'
+        assert not set(record['recordings']['train']) & set(record['recordings']['test'])
+        X, _, _ = patients[pid]
+        assert SeizureDetectionModel.load(record['artifact']).predict_proba(X[:5]).shape == (5, 2)
+    events = registry['aggregate']['events']
+    assert events['n_seizures'] == sum(r['events']['n_seizures'] for r in registry['patients'].values())
+
+
+def test_pool_workers_train_single_threaded():
+    from joblib import effective_n_jobs
+    from threadpoolctl import threadpool_info
+    from models import single_threaded
+
+    with single_threaded():
+        assert effective_n_jobs(-1) == 1
+        assert all(pool['num_threads'] == 1 for pool in threadpool_info())
+    assert PatientSpecificTrainer(n_workers=2)._task('chb00', None).args[-1] is True
+    assert PatientSpecificTrainer(n_workers=1)._task('chb00', None).args[-1] is False
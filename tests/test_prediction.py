@@ -0,0 +1,72 @@
+"""
+Tests for the LSTM prediction module.
+TensorFlow-dependent tests are skipped when TensorFlow is not installed.
+"""
+import numpy as np
+import pytest
+import sys
+import os
+
+# Add src to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from models import ModelFactory
+from prediction import LSTMSeizureDetector, epochs_to_sequences, epoch_features
+
+
+def test_epochs_to_sequences_layout():
+    """Each step should hold one window of every channel, in time order."""
+    n_channels, n_times, n_steps = 3, 8, 4
+    epochs = np.arange(2 * n_channels * n_times, dtype=float).reshape(2, n_channels, n_times)
+    X = epochs.reshape(2, -1)
+
+    sequences = epochs_to_sequences(X, n_channels, n_steps)
+
+    assert sequences.shape == (2, n_steps, n_channels * 2)
+    assert sequences.dtype == np.float32
+    # Second step, second channel -> samples 2:4 of channel 1
+    np.testing.assert_array_equal(sequences[0, 1, 2:4], epochs[0, 1, 2:4])
+
+
+def test_epoch_features_shape():
+    """Feature branch gets two features per channel."""
+    X = np.random.randn(5, 4 * 64)
+    features = epoch_features(X, n_channels=4)
+    assert features.shape == (5, 8)
+    assert np.all(np.isfinite(features))
+
+
+def test_lstm_registered_in_factory():
+    """LSTM detector is created through ModelFactory without loading TensorFlow."""
+    model = ModelFactory.create_model('lstm', random_state=42)
+    assert isinstance(model, LSTMSeizureDetector)
+    assert not model.is_fitted
+
+
+def test_lstm_export_is_rejected(tmp_path):
+    """LSTM models have no inference artifact format."""
+    model = LSTMSeizureDetector(n_channels=2, n_steps=8)
+    model.is_fitted = True
+    with pytest.raises(TypeError, match='not exportable'):
+        model.export('lstm', models_dir=tmp_path)
+    assert not list(tmp_path.iterdir())
+
+
+def test_lstm_fit_predict():
+    """Small end-to-end fit on synthetic epochs."""
+    pytest.importorskip('tensorflow')
+
+    np.random.seed(42)
+    X = np.random.randn(64, 2 * 80)
+    y = np.zeros(64)
+    y[:16] = 1
+    X[y == 1] *= 3
+
+    model = LSTMSeizureDetector(n_channels=2, n_steps=8, lstm_units=[8], dense_units=[8],
+                                epochs=2, batch_size=16, random_state=42)
+    model.fit(X, y)
+    proba = model.predict_proba(X)
+
+    assert proba.shape == (64, 2)
+    np.testing.assert_allclose(proba.sum(axis=1), 1.0, rtol=1e-5)
+    assert set(np.unique(model.predict(X))) <= {0, 1}
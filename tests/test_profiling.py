@@ -0,0 +1,83 @@
+"""
+Tests for stage timing instrumentation.
+"""
+import numpy as np
+import pytest
+import sys
+import os
+import functools
+
+# Add src to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from models import ImprovedLogisticRegression
+from profiling import StageProfiler, profile_stage, profiling
+from validation import PatientIndependentValidator
+
+
+@pytest.fixture
+def patients(make_patients):
+    return functools.partial(make_patients, n_epochs=40, seizure_rate=0.3, n_ictal=2, shift=1.0)
+
+
+def test_disabled_profiling_records_nothing(patients, splits):
+    stage = profile_stage('anything', np.zeros(10))
+    with stage:
+        stage.record_arrays(np.zeros(10))
+    assert profile_stage('other') is stage  # shared no-op object
+
+    results = PatientIndependentValidator(profile=False).validate_model(
+        ImprovedLogisticRegression, patients(), splits)
+    assert 'profile' not in results['metadata']
+
+
+def test_validate_model_profile(patients, splits):
+    validator = PatientIndependentValidator(profile=True)
+    results = validator.validate_model(ImprovedLogisticRegression, patients(), splits)
+    profile = results['metadata']['profile']
+
+    for stage in ['validate_model', 'validate_model/combine', 'validate_model/scale',
+                  'validate_model/smote', 'validate_model/train/ImprovedLogisticRegression.fit',
+                  'validate_model/evaluate_test']:
+        assert profile[stage]['calls'] == 1
+        assert profile[stage]['wall_s'] >= 0
+    total = profile['validate_model']
+    assert total['wall_s'] >= profile['validate_model/train']['wall_s']
+    assert profile['validate_model/scale']['array_mb'] > 0
+
+
+def test_outer_profiler_collects_nested_runs(patients, splits):
+    profiler = StageProfiler()
+    validator = PatientIndependentValidator(profile=False)
+    with profiling(profiler):
+        with profile_stage('compare'):
+            for _ in range(2):
+                results = validator.validate_model(
+                    ImprovedLogisticRegression, patients(), splits)
+
+    # Each result holds only its own run; the outer profiler holds both
+    assert results['metadata']['profile']['validate_model']['calls'] == 1
+    summary = profiler.summary()
+    assert summary['compare/validate_model']['calls'] == 2
+
+    folded = profiler.to_collapsed().splitlines()
+    stacks = {line.rsplit(' ', 1)[0] for line in folded}
+    assert 'compare;validate_model;train;ImprovedLogisticRegression.fit' in stacks
+    assert all(int(line.rsplit(' ', 1)[1]) > 0 for line in folded)
+
+
+def test_peak_rss_is_per_stage():
+    """A stage after the process peak does not report that peak."""
+    if not os.path.exists('/proc/self/statm'):
+        return
+    profiler = StageProfiler()
+    with profiling(profiler):
+        with profile_stage('big'):
+            block = np.ones(2 ** 24)  # 128 MB, touched
+        del block
+        with profile_stage('small'):
+            np.zeros(10)
+
+    summary = profiler.summary()
+    assert summary['big']['peak_rss_mb'] > summary['small']['peak_rss_mb'] + 64
+    assert abs(summary['small']['rss_delta_mb']) < 16
@@ -0,0 +1,151 @@
+"""
+Tests for the multi-stream detection server.
+"""
+import asyncio
+import numpy as np
+import sys
+import os
+
+# Add src to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from serving import DetectionServer, StreamBuffer, StreamClient, run_load_test, synthetic_recordings
+
+
+class _MeanModel:
+    """Deterministic detector that records its batch sizes."""
+
+    threshold = 0.5
+
+    def __init__(self):
+        self.calls = []
+
+    def predict_proba(self, X):
+        self.calls.append(len(X))
+        p = 1 / (1 + np.exp(-X.mean(axis=1) * 1e3))
+        return np.column_stack([1 - p, p])
+
+
+def test_stream_buffer_matches_offline_epoching():
+    """Epochs cut from arbitrary chunk sizes equal direct slicing."""
+    rng = np.random.RandomState(0)
+    signal = rng.randn(3, 1000)
+    buffer = StreamBuffer(3, epoch_samples=100, step_samples=80)
+
+    epochs, offset = [], 0
+    for size in rng.randint(1, 250, size=100):
+        epochs.extend(buffer.push(signal[:, offset:offset + size]))
+        offset += size
+        if offset >= signal.shape[1]:
+            break
+
+    starts = list(range(0, signal.shape[1] - 100 + 1, 80))
+    assert [start for start, _ in epochs] == starts
+    for start, epoch in epochs:
+        np.testing.assert_array_equal(epoch, signal[:, start:start + 100])
+
+
+def test_concurrent_streams_are_micro_batched():
+    """Epochs ready at the same time across streams share one predict_proba call."""
+    model = _MeanModel()
+    recordings = synthetic_recordings(8, seconds=2, n_channels=2, sfreq=10, seed=1)
+
+    async def run():
+        async with DetectionServer(model, n_channels=2, sfreq=10, epoch_length=1, epoch_overlap=0,
+                                   max_batch_size=64, max_latency=0.05) as server:
+            queues = [server.open_stream(f's{i}') for i in range(8)]
+            for i, recording in enumerate(recordings):
+                server.push(f's{i}', recording[:, :10])
+            await server.drain()
+            return [queue.get_nowait() for queue in queues]
+
+    detections = asyncio.run(run())
+
+    assert model.calls == [8]
+    for recording, detection in zip(recordings, detections):
+        expected = model.predict_proba(recording[:, :10].reshape(1, -1))[0, 1]
+        assert abs(detection['probability'] - expected) < 1e-12
+        assert detection['epoch_start'] == 0 and detection['epoch_end'] == 1
+
+
+def test_tcp_streams_receive_their_detections():
+    """Streams sent over TCP get one detection per epoch, in order."""
+    model = _MeanModel()
+    recording = synthetic_recordings(1, seconds=5, n_channels=2, sfreq=10, seed=2)[0]
+
+    async def run():
+        async with DetectionServer(model, n_channels=2, sfreq=10, epoch_length=2,
+                                   epoch_overlap=1) as server:
+            tcp = await server.serve('127.0.0.1', 0)
+            port = tcp.sockets[0].getsockname()[1]
+            clients = [await StreamClient(f'bed{i}').connect('127.0.0.1', port) for i in range(3)]
+            for offset in range(0, 50, 7):
+                for client in clients:
+                    await client.send(recording[:, offset:offset + 7])
+            results = await asyncio.gather(*[client.close() for client in clients])
+            tcp.close()
+            await tcp.wait_closed()
+            return results
+
+    for detections in asyncio.run(run()):
+        assert [d['epoch_start'] for d in detections] == [0, 1, 2, 3]
+        assert len({d['stream_id'] for d in detections}) == 1
+
+
+def test_load_test_reports_latency():
+    """The load generator scores every epoch of every stream."""
+    recordings = synthetic_recordings(2, seconds=4, n_channels=2, sfreq=10)
+    stats = asyncio.run(run_load_test(_MeanModel(), 5, recordings, sfreq=10, chunk_seconds=1.0, speed=50.0,
+                                      epoch_length=2, epoch_overlap=1, max_latency=0.01))
+
+    assert stats['epochs'] == 5 * 3
+    assert stats['latency_p50_ms'] <= stats['latency_p99_ms']
+    assert stats['n_streams'] == 5
+
+
+def test_duplicate_stream_id_is_rejected_without_breaking_the_open_stream():
+    """A second connection for an open stream gets an error; the first keeps streaming."""
+    model = _MeanModel()
+    recording = synthetic_recordings(1, seconds=4, n_channels=2, sfreq=10, seed=3)[0]
+
+    async def run():
+        async with DetectionServer(model, n_channels=2, sfreq=10, epoch_length=2,
+                                   epoch_overlap=1) as server:
+            tcp = await server.serve('127.0.0.1', 0)
+            port = tcp.sockets[0].getsockname()[1]
+            first = await StreamClient('bed').connect('127.0.0.1', port)
+            await first.send(recording[:, :20])
+            duplicate = await StreamClient('bed').connect('127.0.0.1', port)
+            await duplicate.send(recording[:, :20])
+            rejected = await duplicate.close()
+            open_after_rejection = 'bed' in server.streams
+            await first.send(recording[:, 20:])
+            detections = await first.close()
+            tcp.close()
+            await tcp.wait_closed()
+            return server, first, duplicate, rejected, open_after_rejection, detections
+
+    server, first, duplicate, rejected, open_after_rejection, detections = asyncio.run(run())
+    assert rejected == [] and 'already open' in duplicate.error
+    assert open_after_rejection and first.error is None
+    assert [d['epoch_start'] for d in detections] == [0, 1, 2]
+    assert server.streams == {} and server.results == {}
+
+
+def test_latency_statistics_are_bounded(monkeypatch):
+    from config import Config
+    monkeypatch.setattr(Config, 'SERVING_STATS_WINDOW', 4)
+    recordings = synthetic_recordings(8, seconds=1, n_channels=2, sfreq=10, seed=4)
+
+    async def run():
+        async with DetectionServer(_MeanModel(), n_channels=2, sfreq=10, epoch_length=1, epoch_overlap=0,
+                                   max_batch_size=2, max_latency=0.01) as server:
+            for i, recording in enumerate(recordings):
+                server.open_stream(f's{i}')
+                server.push(f's{i}', recording)
+            await server.drain()
+            return server
+
+    server = asyncio.run(run())
+    assert len(server.latencies) == 4 and server.stats()['epochs'] == 8
+    assert server.stats()['batches'] == 4
@@ -0,0 +1,85 @@
+"""
+Tests for the SPoC/ICA spatial filtering stage.
+"""
+import numpy as np
+import pytest
+import sys
+import os
+
+# Add src to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from models import ImprovedLogisticRegression
+from spatial_filters import SpatialFilter
+from validation import PatientIndependentValidator
+
+N_CHANNELS, N_TIMES = 6, 128
+
+
+def _mixed_epochs(n=200, seed=0, laplace=False):
+    """Epochs mixing independent sources; source 0 is stronger during seizures."""
+    rng = np.random.RandomState(seed)
+    y = (rng.rand(n) < 0.3).astype(int)
+    y[:2] = 1
+    sample = rng.laplace if laplace else rng.normal
+    sources = sample(size=(n, N_CHANNELS, N_TIMES))
+    sources[:, 0] *= (1 + 2 * y)[:, None]
+    mixing = np.random.RandomState(42).randn(N_CHANNELS, N_CHANNELS)
+    epochs = np.einsum('cd,ndt->nct', mixing, sources)
+    return epochs.reshape(n, -1), y, mixing
+
+
+def test_spoc_recovers_seizure_source():
+    X, y, _ = _mixed_epochs()
+    spoc = SpatialFilter('spoc', n_components=2, n_channels=N_CHANNELS, output='log_power')
+    power = spoc.fit_transform(X, y)
+    assert power.shape == (len(X), 2)
+    assert abs(np.corrcoef(power[:, 0], y)[0, 1]) > 0.9
+
+    signals = SpatialFilter('spoc', n_components=2, n_channels=N_CHANNELS).fit(X, y).transform(X)
+    assert signals.shape == (len(X), 2 * N_TIMES)
+
+
+def test_spoc_chunked_covariances_match_single_pass(monkeypatch):
+    import spatial_filters
+    X, y, _ = _mixed_epochs()
+    whole = SpatialFilter('spoc', n_components=2, n_channels=N_CHANNELS).fit(X, y).filters_
+    monkeypatch.setattr(spatial_filters, 'CHUNK_SIZE', 32)
+    chunked = SpatialFilter('spoc', n_components=2, n_channels=N_CHANNELS).fit(X, y).filters_
+    np.testing.assert_allclose(chunked, whole, atol=1e-10)
+
+
+def test_ica_unmixes_sources():
+    X, _, mixing = _mixed_epochs(laplace=True)
+    ica = SpatialFilter('ica', n_components=N_CHANNELS, n_channels=N_CHANNELS, random_state=0).fit(X)
+    gain = np.abs(ica.filters_ @ mixing)
+    # Each component picks up essentially one source
+    assert np.all(gain.max(axis=1) / gain.sum(axis=1) > 0.9)
+
+
+def test_spatial_filter_in_validation_and_export(tmp_path):
+    from inference import load_artifact
+
+    patient_data = {}
+    for i in range(5):
+        X, y, _ = _mixed_epochs(n=60, seed=i)
+        patient_data[f'p{i}'] = (X, y)
+    splits = {'train': ['p0', 'p1', 'p2'], 'val': ['p3'], 'test': ['p4']}
+
+    stage = SpatialFilter('spoc', n_components=2, n_channels=N_CHANNELS, output='log_power')
+    results = PatientIndependentValidator().validate_model(
+        ImprovedLogisticRegression, patient_data, splits, feature_stage=stage, keep_fitted=True)
+    assert results['test']['auc'] > 0.9
+
+    fitted = results['fitted']
+    path = fitted['model'].export('spoc', scaler=fitted['scaler'], feature_stage=stage,
+                                  models_dir=tmp_path)
+    X_test = patient_data['p4'][0]
+    expected = fitted['model'].predict_proba(fitted['scaler'].transform(stage.transform(X_test)))
+    np.testing.assert_allclose(load_artifact(path).predict_proba(X_test), expected, atol=1e-10)
+
+
+def test_spoc_requires_labels():
+    X, _, _ = _mixed_epochs(n=20)
+    with pytest.raises(ValueError):
+        SpatialFilter('spoc', n_channels=N_CHANNELS).fit(X)
@@ -0,0 +1,76 @@
+"""
+Tests for spectral features from a shared sub-window spectrogram.
+"""
+import numpy as np
+import sys
+import os
+
+# Add src to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from scipy.signal import welch
+from sklearn.preprocessing import StandardScaler
+from inference import load_artifact
+from models import ModelFactory
+from spectral import SpectralFeatures, shared_epoch_psd
+
+SFREQ = 64
+
+
+def _recording_epochs(seconds=120, n_channels=3, epoch=20, step=4, seed=0):
+    """Overlapping epochs cut from one synthetic recording."""
+    rng = np.random.RandomState(seed)
+    t = np.arange(seconds * SFREQ) / SFREQ
+    data = rng.randn(n_channels, len(t)) + np.sin(2 * np.pi * 10 * t)
+    starts = np.arange(0, len(t) - epoch * SFREQ + 1, step * SFREQ)
+    epochs = np.stack([data[:, s:s + epoch * SFREQ] for s in starts])
+    return epochs, starts / SFREQ
+
+
+def test_epoch_psd_matches_welch():
+    epochs, starts = _recording_epochs()
+    freqs, psd = shared_epoch_psd(epochs, starts, SFREQ, window=2.0, hop=1.0)
+
+    ref_freqs, ref_psd = welch(epochs[5], fs=SFREQ, window='hann', nperseg=128, noverlap=64,
+                               detrend='constant', average='mean')
+    np.testing.assert_allclose(freqs, ref_freqs)
+    np.testing.assert_allclose(psd[5], ref_psd, rtol=1e-8)
+
+
+def test_shared_spectrogram_matches_per_epoch_features():
+    """Sharing sub-windows across overlapping epochs does not change the features."""
+    epochs, starts = _recording_epochs()
+    stage = SpectralFeatures(n_channels=3, sfreq=SFREQ)
+
+    shared = stage.from_recording(epochs, starts)
+    independent = stage.transform(epochs.reshape(len(epochs), -1))
+
+    assert shared.shape == (len(epochs), 3 * (2 * len(stage.bands) + 2))
+    np.testing.assert_allclose(shared, independent, rtol=1e-6, atol=1e-9)
+
+
+def test_epochs_off_the_hop_grid():
+    """Epoch steps that are not a multiple of the hop fall back to explicit sums."""
+    epochs, starts = _recording_epochs(step=3)
+    stage = SpectralFeatures(n_channels=3, sfreq=SFREQ, hop=2.0)
+
+    np.testing.assert_allclose(stage.from_recording(epochs, starts), stage.transform(epochs),
+                               rtol=1e-6, atol=1e-9)
+
+
+def test_spectral_stage_exports(tmp_path):
+    """A model exported with the spectral stage scores raw epochs."""
+    epochs, _ = _recording_epochs()
+    X = epochs.reshape(len(epochs), -1)
+    y = (np.arange(len(X)) % 4 == 0).astype(int)
+    stage = SpectralFeatures(n_channels=3, sfreq=SFREQ)
+    features = stage.transform(X)
+    scaler = StandardScaler().fit(features)
+    model = ModelFactory.create_model('logistic', random_state=42).fit(scaler.transform(features), y)
+
+    runtime = load_artifact(model.export('spectral', scaler=scaler, feature_stage=stage,
+                                         models_dir=tmp_path))
+
+    assert runtime.header['feature_stage'] == 'spectral'
+    np.testing.assert_allclose(runtime.predict_proba(X),
+                               model.predict_proba(scaler.transform(features)), atol=1e-10)
@@ -0,0 +1,79 @@
+"""
+Tests for interictal subsampling and hard-negative mining.
+"""
+import numpy as np
+import pytest
+import sys
+import os
+import functools
+
+# Add src to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from models import ImprovedLogisticRegression
+from subsampling import InterictalSubsampler, allocate, compare_training_sets
+from validation import PatientIndependentValidator
+
+
+@pytest.fixture
+def patients(make_patients):
+    return functools.partial(make_patients, n_epochs=400, n_features=8, seizure_rate=0.03, n_ictal=2)
+
+
+def test_allocate_is_proportional_and_capped():
+    counts = allocate(10, [30, 10, 0, 60])
+    assert counts.sum() == 10 and counts.tolist() == [3, 1, 0, 6]
+    assert allocate(100, [3, 4]).tolist() == [3, 4]
+
+
+def test_keeps_ictal_and_spreads_budget():
+    rng = np.random.RandomState(1)
+    y = np.zeros(2000, dtype=int)
+    y[rng.choice(2000, 20, replace=False)] = 1
+    X = rng.randn(2000, 5) + y[:, None]
+    groups = np.repeat([0, 1], [1500, 500])
+
+    subsampler = InterictalSubsampler(negative_ratio=10, n_strata=5, hard_fraction=0.0)
+    X_small, y_small = subsampler.fit_resample(X, y, groups)
+    assert y_small.sum() == 20 and len(y_small) == 220
+    assert subsampler.report_['n_hard_negatives'] == 0
+
+    # Patient and time strata get their share of the 200 negatives
+    kept = np.flatnonzero(np.isin(X[:, 0], X_small[:, 0]) & (y == 0))
+    assert abs(np.sum(kept < 1500) - 150) <= 2
+    assert all(np.sum((kept >= start) & (kept < start + 300)) >= 25 for start in range(0, 1500, 300))
+
+
+def test_hard_negatives_are_high_scoring():
+    rng = np.random.RandomState(2)
+    y = (rng.rand(3000) < 0.02).astype(int)
+    X = rng.randn(3000, 4) + 2 * y[:, None]
+
+    subsampler = InterictalSubsampler(negative_ratio=5, hard_fraction=0.5, n_rounds=2, random_state=3)
+    X_small, y_small = subsampler.fit_resample(X, y)
+    budget = subsampler.budget(int(y.sum()), int((y == 0).sum()))
+    assert subsampler.report_['n_hard_negatives'] == round(0.5 * budget)
+    # Mined negatives sit closer to the ictal class than interictal epochs overall
+    assert X_small[y_small == 0].sum(axis=1).mean() > X[y == 0].sum(axis=1).mean()
+
+    # The miner needs a stratified first round of interictal epochs to fit on
+    for hard_fraction in (1.0, -0.1):
+        with pytest.raises(ValueError):
+            InterictalSubsampler(hard_fraction=hard_fraction)
+
+
+def test_validate_model_uses_subsampler_instead_of_smote(patients):
+    data = patients()
+    splits = {'train': ['p0', 'p1', 'p2'], 'val': ['p3'], 'test': ['p4']}
+    results = PatientIndependentValidator().validate_model(
+        ImprovedLogisticRegression, data, splits, subsampler=InterictalSubsampler(negative_ratio=5))
+
+    metadata = results['metadata']
+    assert not metadata['smote_applied']
+    n_positive = sum(int(data[p][1].sum()) for p in splits['train'])
+    assert metadata['subsampling']['n_after'] == n_positive * 6
+    assert metadata['fit_seconds'] >= 0
+
+    table = compare_training_sets(PatientIndependentValidator(), ImprovedLogisticRegression, data, splits)
+    assert table['Training set'].tolist() == ['full', 'smote', 'subsampled']
+    assert table['Train epochs'].iloc[2] < table['Train epochs'].iloc[0]
@@ -0,0 +1,72 @@
+"""
+Tests for threshold sweeps and operating-point selection.
+"""
+import numpy as np
+import pytest
+import sys
+import os
+
+# Add src to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from models import ImprovedLogisticRegression
+from validation import PatientIndependentValidator, ThresholdAnalyzer
+
+
+def _scores(n=3000, seed=0):
+    rng = np.random.RandomState(seed)
+    y = rng.rand(n) < 0.1
+    proba = np.round(rng.rand(n) * 0.6 + 0.4 * y, 3)  # rounded to create ties
+    return y, proba
+
+
+def test_curve_matches_per_threshold_counts():
+    from sklearn.metrics import roc_auc_score
+
+    y, proba = _scores()
+    curve = ThresholdAnalyzer.curve(y, proba)
+
+    assert curve['thresholds'][0] == np.inf and curve['tp'][0] == 0 and curve['fp'][0] == 0
+    assert curve['tp'][-1] == y.sum() and curve['fp'][-1] == (~y).sum()
+    for i in [1, 10, 200, len(curve['thresholds']) - 1]:
+        expected = ThresholdAnalyzer.apply(y, proba, curve['thresholds'][i])
+        for key in ['tp', 'fp', 'precision', 'recall', 'specificity', 'f1']:
+            assert np.isclose(curve[key][i], expected[key])
+    assert np.isclose(curve['auc'], roc_auc_score(y, proba))
+
+
+def test_select_respects_constraints():
+    y, proba = _scores()
+    curve = ThresholdAnalyzer.curve(y, proba)
+
+    chosen = ThresholdAnalyzer.select(curve, objective='specificity', min_recall=0.9)
+    assert chosen['recall'] >= 0.9
+    # No higher threshold still meets the recall constraint
+    higher = curve['thresholds'] > chosen['threshold']
+    assert np.all(curve['recall'][higher] < 0.9)
+
+    with pytest.raises(ValueError):
+        ThresholdAnalyzer.select(curve, min_recall=1.0, min_specificity=1.0)
+
+
+def test_tune_applies_validation_threshold_to_test():
+    rng = np.random.RandomState(2)
+    patient_data = {}
+    for i in range(5):
+        y = (rng.rand(80) < 0.2).astype(int)
+        y[:2] = 1
+        patient_data[f'p{i}'] = (rng.randn(80, 6) + y[:, None], y)
+    splits = {'train': ['p0', 'p1', 'p2'], 'val': ['p3'], 'test': ['p4']}
+
+    results = PatientIndependentValidator().validate_model(
+        ImprovedLogisticRegression, patient_data, splits, keep_fitted=True)
+    tuning = ThresholdAnalyzer.tune(results, objective='specificity', min_recall=0.95)
+    assert tuning['val']['recall'] >= 0.95
+
+    # The fitted model reproduces the tuned test metrics without refitting
+    model, scaler = results['fitted']['model'], results['fitted']['scaler']
+    model.set_threshold(tuning['threshold'])
+    X_test, y_test = patient_data['p4']
+    pred = model.predict(scaler.transform(X_test))
+    assert pred.sum() == tuning['test']['tp'] + tuning['test']['fp']
+    assert np.sum(pred & (y_test == 1)) == tuning['test']['tp']